@@ -5,7 +5,9 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException, Header
 from datetime import datetime
 
+from ....core.cache import invalidate_masterdata
 from ....core.supabase import get_supabase_client
+from ....core.supabase_async import get_async_supabase_client, run_blocking
 from ....models.billing import (
     InvoiceNumberResponse,
     NextInvoiceNumberResponse,
@@ -16,6 +18,12 @@ from ....models.billing import (
     MonthlyStatsResponse,
     MonthlyStatItem,
 )
+from ....services.order_aggregates import (
+    get_billing_totals,
+    get_monthly_billing_totals,
+    get_remision_totals,
+)
+from .numbering import INVOICE_NUMBER_KEY, reserve_number_range
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/config")
@@ -28,10 +36,10 @@ async def get_last_invoice_number():
     """Get the last used invoice number from system_config."""
     logger.info("Fetching last invoice number")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     result = (
-        supabase.table("system_config")
+        await supabase.table("system_config")
         .select("config_value")
         .eq("config_key", "invoice_last_number")
         .single()
@@ -60,38 +68,8 @@ async def get_next_invoice_number():
     """
     logger.info("Getting next invoice number")
 
-    supabase = get_supabase_client()
-
     try:
-        # Get current value
-        result = (
-            supabase.table("system_config")
-            .select("config_value")
-            .eq("config_key", "invoice_last_number")
-            .single()
-            .execute()
-        )
-
-        current_number = 0
-        if result.data:
-            try:
-                current_number = int(result.data["config_value"])
-            except (ValueError, TypeError):
-                current_number = 0
-
-        next_number = current_number + 1
-
-        # Update the value
-        supabase.table("system_config").upsert(
-            {
-                "config_key": "invoice_last_number",
-                "config_value": str(next_number),
-                "updated_at": datetime.now().isoformat(),
-            },
-            on_conflict="config_key"
-        ).execute()
-
-        logger.info(f"Reserved invoice number: {next_number}")
+        next_number = await run_blocking(reserve_number_range, get_supabase_client(), INVOICE_NUMBER_KEY, 1)
 
         return NextInvoiceNumberResponse(next_number=next_number)
 
@@ -112,10 +90,10 @@ async def set_invoice_number(
     """
     logger.info(f"Setting invoice number to: {invoice_number}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
-        supabase.table("system_config").upsert(
+        await supabase.table("system_config").upsert(
             {
                 "config_key": "invoice_last_number",
                 "config_value": str(invoice_number),
@@ -138,7 +116,7 @@ async def get_world_office_config():
     """Get World Office export configuration."""
     logger.info("Fetching World Office config")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Get all world office config keys
     config_keys = [
@@ -154,7 +132,7 @@ async def get_world_office_config():
     ]
 
     result = (
-        supabase.table("system_config")
+        await supabase.table("system_config")
         .select("config_key, config_value")
         .in_("config_key", config_keys)
         .execute()
@@ -183,7 +161,7 @@ async def update_world_office_config(config_update: WorldOfficeConfigUpdate):
     """Update World Office export configuration."""
     logger.info("Updating World Office config")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Build updates
@@ -210,7 +188,8 @@ async def update_world_office_config(config_update: WorldOfficeConfigUpdate):
         # Upsert all updates
         for update in updates:
             update["updated_at"] = datetime.now().isoformat()
-            supabase.table("system_config").upsert(update, on_conflict="config_key").execute()
+            await supabase.table("system_config").upsert(update, on_conflict="config_key").execute()
+        invalidate_masterdata("world_office_config")
 
         # Return updated config
         return await get_world_office_config()
@@ -227,19 +206,14 @@ async def get_billing_stats():
     """Get general billing statistics."""
     logger.info("Fetching billing stats")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
-    # Get export history stats
-    exports_result = (
-        supabase.table("export_history")
-        .select("id, total_orders, total_amount, invoice_number_end")
-        .execute()
-    )
+    totals = await get_billing_totals(supabase)
 
-    total_exports = len(exports_result.data)
-    total_orders = sum(e.get("total_orders") or 0 for e in exports_result.data)
-    total_amount = sum(e.get("total_amount") or 0 for e in exports_result.data)
-    latest_invoice = max((e.get("invoice_number_end") or 0 for e in exports_result.data), default=0)
+    total_exports = totals.get("total_exports") or 0
+    total_orders = totals.get("total_orders") or 0
+    total_amount = totals.get("total_amount") or 0
+    latest_invoice = totals.get("latest_invoice_number") or 0
 
     avg_orders = total_orders / total_exports if total_exports > 0 else 0
 
@@ -257,32 +231,14 @@ async def get_remision_stats():
     """Get remision statistics."""
     logger.info("Fetching remision stats")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
-    # Get all remisions
-    remisions_result = (
-        supabase.table("remisions")
-        .select("id, total_amount, order_id")
-        .execute()
-    )
+    totals = await get_remision_totals(supabase)
 
-    total_remisions = len(remisions_result.data)
-    total_amount = sum(r.get("total_amount") or 0 for r in remisions_result.data)
+    total_remisions = totals.get("total_remisions") or 0
+    total_amount = totals.get("total_amount") or 0
     avg_amount = total_amount / total_remisions if total_remisions > 0 else 0
-
-    # Get order IDs to check invoiced status
-    order_ids = [r["order_id"] for r in remisions_result.data if r.get("order_id")]
-
-    invoiced_count = 0
-    if order_ids:
-        invoiced_result = (
-            supabase.table("orders")
-            .select("id")
-            .in_("id", order_ids)
-            .eq("is_invoiced_from_remision", True)
-            .execute()
-        )
-        invoiced_count = len(invoiced_result.data)
+    invoiced_count = totals.get("invoiced_orders") or 0
 
     pending_count = total_remisions - invoiced_count
 
@@ -303,29 +259,13 @@ async def get_monthly_stats(year: Optional[int] = None):
 
     logger.info(f"Fetching monthly stats for year: {year}")
 
-    supabase = get_supabase_client()
-
-    # Get exports for the year
-    start_date = f"{year}-01-01"
-    end_date = f"{year}-12-31"
-
-    exports_result = (
-        supabase.table("export_history")
-        .select("id, export_date, total_orders, total_amount")
-        .gte("export_date", start_date)
-        .lte("export_date", end_date)
-        .execute()
-    )
-
-    # Group by month
-    monthly_data = {i: {"exports": 0, "orders": 0, "amount": 0} for i in range(1, 13)}
+    supabase = get_async_supabase_client()
 
-    for export in exports_result.data:
-        if export.get("export_date"):
-            month = int(export["export_date"].split("-")[1])
-            monthly_data[month]["exports"] += 1
-            monthly_data[month]["orders"] += export.get("total_orders") or 0
-            monthly_data[month]["amount"] += export.get("total_amount") or 0
+    # Totals per month, grouped in Postgres
+    totals = await get_monthly_billing_totals(supabase, year)
+    monthly_data = {
+        i: totals.get(i) or {"exports": 0, "orders": 0, "amount": 0} for i in range(1, 13)
+    }
 
     month_names = [
         "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
@@ -4,7 +4,7 @@ import logging
 from typing import Optional
 from fastapi import APIRouter, Query, HTTPException
 
-from ....core.supabase import get_supabase_client
+from ....core.supabase_async import get_async_supabase_client
 from ....models.billing import (
     PendingOrder,
     PendingOrderItem,
@@ -36,7 +36,7 @@ async def get_pending_orders(
     """
     logger.info(f"Fetching pending orders: page={page}, limit={limit}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     offset = (page - 1) * limit
 
     # Build query for pending orders
@@ -64,7 +64,7 @@ async def get_pending_orders(
     # Apply pagination
     query = query.range(offset, offset + limit - 1)
 
-    result = query.execute()
+    result = await query.execute()
     total_count = result.count if result.count is not None else 0
 
     # Get order IDs for items query
@@ -74,7 +74,7 @@ async def get_pending_orders(
     items_by_order = {}
     if order_ids:
         items_result = (
-            supabase.table("order_items")
+            await supabase.table("order_items")
             .select(
                 "id, order_id, product_id, quantity_requested, quantity_available, "
                 "unit_price, products(id, name)"
@@ -113,7 +113,7 @@ async def get_pending_orders(
     orders_with_remisions = set()
     if order_ids:
         remisions_result = (
-            supabase.table("remisions")
+            await supabase.table("remisions")
             .select("order_id")
             .in_("order_id", order_ids)
             .execute()
@@ -174,11 +174,11 @@ async def get_unfactured_orders():
     """
     logger.info("Fetching unfactured orders (with remision, not invoiced)")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Query remisions that are not yet invoiced
     remisions_result = (
-        supabase.table("remisions")
+        await supabase.table("remisions")
         .select(
             "id, remision_number, order_id, total_amount, created_at, "
             "orders(id, order_number, expected_delivery_date, total_value, "
@@ -232,11 +232,11 @@ async def mark_orders_as_invoiced(request: MarkInvoicedRequest):
     """
     logger.info(f"Marking {len(request.order_ids)} orders as invoiced from remision")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         result = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .update({"is_invoiced_from_remision": True})
             .in_("id", request.order_ids)
             .execute()
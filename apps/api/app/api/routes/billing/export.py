@@ -1,13 +1,22 @@
 """Billing Export - Process billing, download Excel files."""
 
 import logging
-import base64
-from typing import Optional, List
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Header, Query
-from fastapi.responses import Response
-
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+from ....core.pagination import (
+    COUNT_PATTERN,
+    InvalidCursor,
+    count_method,
+    fetch_page,
+    iter_keyset,
+    ndjson_response,
+)
 from ....core.supabase import get_supabase_client
+from ....core.supabase_async import get_async_supabase_client, run_blocking
 from ....models.billing import (
     BillingProcessRequest,
     BillingProcessResponse,
@@ -17,40 +26,32 @@ from ....models.billing import (
     ExportHistoryResponse,
 )
 from ....services.excel_generator import generate_world_office_excel
-from .inventory import deduct_inventory_for_order, prepare_order_items_for_deduction
+from ....services.export_files import (
+    EXCEL_MEDIA_TYPE,
+    decode_legacy_file_data,
+    legacy_file_data,
+    store_export_file,
+)
+from ....services.storage import get_billing_storage_service
+from .inventory import deduct_inventory_for_orders, prepare_order_items_for_deduction
+from .numbering import INVOICE_NUMBER_KEY, REMISION_NUMBER_KEY, format_remision_number, reserve_number_range
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.get("/history", response_model=ExportHistoryResponse)
-async def get_export_history(
-    page: int = Query(1, ge=1),
-    limit: int = Query(100, ge=1, le=500),
-):
-    """Get paginated export history."""
-    logger.info(f"Fetching export history: page={page}, limit={limit}")
-
-    supabase = get_supabase_client()
-    offset = (page - 1) * limit
-
-    result = (
-        supabase.table("export_history")
-        .select(
-            "id, export_date, invoice_number_start, invoice_number_end, "
-            "total_orders, total_amount, file_name, created_by, created_at, "
-            "created_by_user:users!created_by(id, name)",
-            count="exact"
-        )
-        .order("created_at", desc=True)
-        .range(offset, offset + limit - 1)
-        .execute()
+def _export_history_query(supabase, count: Optional[str] = None):
+    return supabase.table("export_history").select(
+        "id, export_date, invoice_number_start, invoice_number_end, "
+        "total_orders, total_amount, file_name, created_by, created_at, "
+        "created_by_user:users!created_by(id, name)",
+        count=count,
     )
 
-    total_count = result.count if result.count is not None else 0
 
+async def _export_history_items(rows: List[dict]) -> List[ExportHistoryItem]:
     exports = []
-    for export in result.data:
+    for export in rows:
         created_by_user = export.get("created_by_user") or {}
         exports.append(ExportHistoryItem(
             id=export["id"],
@@ -64,12 +65,42 @@ async def get_export_history(
             created_by_name=created_by_user.get("name"),
             created_at=export.get("created_at"),
         ))
+    return exports
+
+
+@router.get("/history", response_model=ExportHistoryResponse)
+async def get_export_history(
+    page: int = Query(1, ge=1),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="exact | estimated | none"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams the whole history"),
+):
+    """Get paginated export history (newest first; ?cursor= for keyset pages)."""
+    logger.info(f"Fetching export history: page={page}, limit={limit}, cursor={bool(cursor)}, format={format}")
+
+    supabase = get_async_supabase_client()
+
+    if format == "ndjson":
+        return ndjson_response(
+            iter_keyset(lambda: _export_history_query(supabase)),
+            _export_history_items,
+            filename="export_history.ndjson",
+        )
+
+    query = _export_history_query(supabase, count=count_method(count, cursor))
+    try:
+        result = await fetch_page(query, limit=limit, cursor=cursor, page=page)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return ExportHistoryResponse(
-        exports=exports,
-        total_count=total_count,
+        exports=await _export_history_items(result.rows),
+        total_count=result.total_count,
         page=page,
         limit=limit,
+        has_more=result.has_more,
+        next_cursor=result.next_cursor,
     )
 
 
@@ -78,12 +109,14 @@ async def get_export_detail(export_id: str):
     """Get detailed export history including order invoices."""
     logger.info(f"Fetching export detail: {export_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     result = (
-        supabase.table("export_history")
+        await supabase.table("export_history")
         .select(
-            "*, "
+            "id, export_date, invoice_number_start, invoice_number_end, "
+            "total_orders, total_amount, file_name, routes_exported, route_names, "
+            "export_summary, created_by, created_at, "
             "created_by_user:users!created_by(id, name)"
         )
         .eq("id", export_id)
@@ -124,7 +157,7 @@ async def get_export_detail(export_id: str):
 
     # Get order invoices for this export
     order_invoices_result = (
-        supabase.table("order_invoices")
+        await supabase.table("order_invoices")
         .select(
             "id, order_id, invoice_number, export_history_id, "
             "orders(id, order_number, client_id, total_value, "
@@ -168,14 +201,18 @@ async def get_export_detail(export_id: str):
 
 @router.get("/history/{export_id}/download")
 async def download_export_file(export_id: str):
-    """Download the Excel file for an export."""
+    """Download the Excel file for an export.
+
+    Streams the workbook from storage (file_path). Exports not migrated to
+    storage yet are decoded from the legacy file_data column.
+    """
     logger.info(f"Downloading export file: {export_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     result = (
-        supabase.table("export_history")
-        .select("file_name, file_data")
+        await supabase.table("export_history")
+        .select("file_name, file_path")
         .eq("id", export_id)
         .single()
         .execute()
@@ -184,96 +221,44 @@ async def download_export_file(export_id: str):
     if not result.data:
         raise HTTPException(status_code=404, detail="Export not found")
 
-    file_data = result.data.get("file_data")
+    file_path = result.data.get("file_path")
     file_name = result.data.get("file_name") or f"export_{export_id}.xlsx"
+    headers = {"Content-Disposition": f'attachment; filename="{file_name}"'}
 
+    if file_path:
+        try:
+            download = await get_billing_storage_service().open_download(file_path)
+        except FileNotFoundError:
+            logger.error(f"Export {export_id} file missing in storage: {file_path}")
+            raise HTTPException(status_code=404, detail="File not found in storage")
+        if "content-length" in download.headers:
+            headers["Content-Length"] = download.headers["content-length"]
+        return StreamingResponse(
+            download.aiter_bytes(),
+            media_type=EXCEL_MEDIA_TYPE,
+            headers=headers,
+            background=BackgroundTask(download.aclose),
+        )
+
+    # Legacy row: the file is still inline in file_data
+    legacy = (
+        await supabase.table("export_history")
+        .select("file_data")
+        .eq("id", export_id)
+        .single()
+        .execute()
+    )
+    file_data = (legacy.data or {}).get("file_data")
     if not file_data:
         raise HTTPException(status_code=404, detail="File data not found")
 
-    # Decode file data (could be hex, base64, JSON array, or bytes)
-    # PostgreSQL bytea columns return data as hex strings like \\x...
     try:
-        if isinstance(file_data, str):
-            # Check if it's hex encoded (starts with \\x) - this is how PostgreSQL returns bytea
-            if file_data.startswith("\\x"):
-                # Remove \\x prefix and decode hex
-                hex_str = file_data[2:].replace("\\x", "")
-                raw_bytes = bytes.fromhex(hex_str)
-
-                # Check if raw_bytes is actually a base64 string (what we stored)
-                # Base64 strings contain only alphanumeric, +, /, = characters
-                try:
-                    decoded_str = raw_bytes.decode('utf-8')
-                    # Try to decode as base64
-                    file_bytes = base64.b64decode(decoded_str)
-                    # Verify it's a valid xlsx (starts with PK)
-                    if len(file_bytes) >= 2 and file_bytes[:2] == b'PK':
-                        logger.info("Successfully decoded base64 from hex-encoded bytea")
-                    else:
-                        # Not base64, use raw bytes directly
-                        file_bytes = raw_bytes
-                except Exception:
-                    # Not base64, check if raw bytes are valid xlsx
-                    if len(raw_bytes) >= 2 and raw_bytes[:2] == b'PK':
-                        file_bytes = raw_bytes
-                    else:
-                        # Try JSON format {"0": 80, "1": 75, ...}
-                        try:
-                            import json
-                            json_data = json.loads(raw_bytes.decode('utf-8'))
-                            if isinstance(json_data, dict) and "0" in json_data:
-                                max_idx = max(int(k) for k in json_data.keys() if k.isdigit())
-                                byte_array = [json_data.get(str(i), 0) for i in range(max_idx + 1)]
-                                file_bytes = bytes(byte_array)
-                            else:
-                                file_bytes = raw_bytes
-                        except Exception:
-                            file_bytes = raw_bytes
-
-            elif file_data.startswith("0x"):
-                # Alternative hex format
-                hex_str = file_data[2:]
-                file_bytes = bytes.fromhex(hex_str)
-            else:
-                # Try base64 first (direct base64 string)
-                try:
-                    file_bytes = base64.b64decode(file_data)
-                except Exception:
-                    # Might be raw hex without prefix
-                    try:
-                        file_bytes = bytes.fromhex(file_data)
-                    except Exception:
-                        raise HTTPException(status_code=500, detail="Could not decode file data")
-        elif isinstance(file_data, bytes):
-            file_bytes = file_data
-        elif isinstance(file_data, dict):
-            # Supabase might return {type: "Buffer", data: [...]} or {"0": 80, "1": 75, ...}
-            if "data" in file_data:
-                file_bytes = bytes(file_data["data"])
-            elif "0" in file_data:
-                # JSON format from frontend: {"0": 80, "1": 75, ...}
-                # Convert to bytes array
-                max_idx = max(int(k) for k in file_data.keys() if k.isdigit())
-                byte_array = [file_data.get(str(i), 0) for i in range(max_idx + 1)]
-                file_bytes = bytes(byte_array)
-            else:
-                raise HTTPException(status_code=500, detail="Unknown dict format for file data")
-        else:
-            raise HTTPException(status_code=500, detail="Unknown file format")
-
-    except HTTPException:
-        raise
-    except Exception as e:
+        file_bytes = decode_legacy_file_data(file_data)
+    except ValueError as e:
         logger.error(f"Error decoding file data: {e}")
         raise HTTPException(status_code=500, detail=f"Error decoding file: {str(e)}")
 
-    return Response(
-        content=file_bytes,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f'attachment; filename="{file_name}"'
-        }
-    )
+    return Response(content=file_bytes, media_type=EXCEL_MEDIA_TYPE, headers=headers)
 
 
 @router.post("/unfactured/process", response_model=BillingProcessResponse)
@@ -290,7 +275,17 @@ async def process_unfactured_billing(
     3. Generates World Office Excel with invoice numbers
     4. Creates export history record
     5. Marks orders as is_invoiced_from_remision = true
+
+    Runs on a worker thread (sync client, openpyxl) so it does not block
+    other requests.
     """
+    return await run_blocking(_process_unfactured_billing, request, authorization)
+
+
+def _process_unfactured_billing(
+    request: BillingProcessRequest,
+    authorization: Optional[str],
+) -> BillingProcessResponse:
     logger.info(f"Processing unfactured billing for {len(request.order_ids)} orders")
 
     supabase = get_supabase_client()
@@ -395,34 +390,9 @@ async def process_unfactured_billing(
                     })
                 items_by_order[order_id] = items
 
-        # 5. Get next invoice number
-        config_result = (
-            supabase.table("system_config")
-            .select("config_value")
-            .eq("config_key", "invoice_last_number")
-            .single()
-            .execute()
-        )
-
-        current_invoice = 0
-        if config_result.data:
-            try:
-                current_invoice = int(config_result.data["config_value"])
-            except:
-                current_invoice = 0
-
-        invoice_number_start = current_invoice + 1
-        invoice_number_end = current_invoice + len(valid_orders)
-
-        # Update last invoice number
-        supabase.table("system_config").upsert(
-            {
-                "config_key": "invoice_last_number",
-                "config_value": str(invoice_number_end),
-                "updated_at": datetime.now().isoformat(),
-            },
-            on_conflict="config_key"
-        ).execute()
+        # 5. Reserve invoice numbers
+        invoice_number_start = reserve_number_range(supabase, INVOICE_NUMBER_KEY, len(valid_orders))
+        invoice_number_end = invoice_number_start + len(valid_orders) - 1
 
         # 6. Generate World Office Excel
         try:
@@ -440,7 +410,8 @@ async def process_unfactured_billing(
 
         # 7. Create export history record
         total_amount = sum(o.get("total_value") or 0 for o in valid_orders)
-        file_data_b64 = base64.b64encode(excel_file_bytes).decode('utf-8') if excel_file_bytes else None
+        file_path = store_export_file(excel_file_bytes, excel_file_name) if excel_file_bytes else None
+        file_data_b64 = legacy_file_data(excel_file_bytes) if excel_file_bytes and not file_path else None
 
         export_result = (
             supabase.table("export_history")
@@ -451,6 +422,7 @@ async def process_unfactured_billing(
                 "total_orders": len(valid_orders),
                 "total_amount": total_amount,
                 "file_name": excel_file_name,
+                "file_path": file_path,
                 "file_data": file_data_b64,
                 "created_by": user_id,
                 "export_summary": {"source": "remision_billing"},
@@ -537,8 +509,148 @@ async def process_billing(
     5. Marks orders as invoiced
     6. Creates export history record
 
-    Returns summary and file information.
+    Returns summary and file information. Runs on a worker thread (sync
+    client, openpyxl, inventory deduction) so it does not block other requests.
+    """
+    return await run_blocking(_process_billing, request, authorization)
+
+
+def _create_remisions(
+    supabase,
+    orders: List[dict],
+    items_by_order: Dict[str, List[dict]],
+    user_id: Optional[str],
+) -> Tuple[int, List[dict], List[str]]:
+    """
+    Create remisions (with items) for orders in bulk.
+
+    Orders that already have a remision with items are left alone; orphan
+    remisions (no items) are deleted and recreated. One remision number
+    range is reserved for all new remisions, and remisions and their items
+    are inserted with one statement each. If the bulk remision insert
+    fails, remisions are inserted one order at a time so a single bad
+    order does not block the rest.
+
+    Returns:
+        (remisions created or already present, inventory deductions for
+        deduct_inventory_for_orders, per-order errors)
     """
+    order_ids = [o["id"] for o in orders]
+
+    existing = (
+        supabase.table("remisions")
+        .select("id, order_id")
+        .in_("order_id", order_ids)
+        .execute()
+    ).data or []
+    remision_by_order = {r["order_id"]: r["id"] for r in existing}
+
+    with_items = set()
+    if remision_by_order:
+        items_result = (
+            supabase.table("remision_items")
+            .select("remision_id")
+            .in_("remision_id", list(remision_by_order.values()))
+            .execute()
+        )
+        with_items = {ri["remision_id"] for ri in items_result.data or []}
+
+    orphan_ids = [rid for rid in remision_by_order.values() if rid not in with_items]
+    if orphan_ids:
+        logger.info(f"Deleting {len(orphan_ids)} orphan remisions (no items) to recreate them")
+        supabase.table("remisions").delete().in_("id", orphan_ids).execute()
+
+    already_done = [o for o in orders if remision_by_order.get(o["id"]) in with_items]
+    for order in already_done:
+        logger.info(f"Remision already exists for order {order.get('order_number')}, skipping")
+    new_orders = [o for o in orders if remision_by_order.get(o["id"]) not in with_items]
+    if not new_orders:
+        return len(already_done), [], []
+
+    first_number = reserve_number_range(supabase, REMISION_NUMBER_KEY, len(new_orders))
+
+    remision_rows = []
+    for idx, order in enumerate(new_orders):
+        client = order.get("clients") or {}
+        # Total only from items with available quantity
+        total_amount = sum(
+            item.get("quantity_available", 0) * (item.get("unit_price") or 0)
+            for item in items_by_order.get(order["id"], [])
+            if item.get("quantity_available") and item.get("quantity_available") > 0
+        )
+        remision_rows.append({
+            "remision_number": format_remision_number(first_number + idx),
+            "order_id": order["id"],
+            "total_amount": total_amount,
+            "client_data": {
+                "name": client.get("name"),
+                "razon_social": client.get("razon_social"),
+                "nit": client.get("nit"),
+                "address": client.get("address"),
+                "phone": client.get("phone"),
+                "email": client.get("email"),
+            },
+            "notes": order.get("observations"),
+            "created_by": user_id,
+        })
+
+    errors: List[str] = []
+    try:
+        inserted = supabase.table("remisions").insert(remision_rows).execute().data or []
+    except Exception as e:
+        logger.warning(f"Bulk remision insert failed, inserting per order: {e}")
+        inserted = []
+        for order, row in zip(new_orders, remision_rows):
+            try:
+                inserted.extend(supabase.table("remisions").insert(row).execute().data or [])
+            except Exception as order_error:
+                message = f"Error creating remision for order {order.get('order_number')}: {order_error}"
+                logger.error(message)
+                errors.append(message)
+    remision_ids = {r["order_id"]: (r["id"], r["remision_number"]) for r in inserted}
+
+    remision_items = []
+    deductions = []
+    for order in new_orders:
+        if order["id"] not in remision_ids:
+            continue
+        remision_id, remision_number = remision_ids[order["id"]]
+        order_items = items_by_order.get(order["id"], [])
+
+        # Remision items only for items with available quantity
+        for item in order_items:
+            qty = item.get("quantity_available")
+            if not qty or qty <= 0:
+                continue
+            product = item.get("products") or {}
+            price = item.get("unit_price") or 0
+            remision_items.append({
+                "remision_id": remision_id,
+                "product_id": item["product_id"],
+                "product_name": product.get("name"),
+                "quantity_delivered": qty,
+                "unit_price": price,
+                "total_price": qty * price,
+            })
+
+        # Deduct inventory when creating remision
+        deductions.append({
+            "order_id": order["id"],
+            "order_number": order.get("order_number", ""),
+            "items": prepare_order_items_for_deduction(order_items),
+            "notes": f"Remision {remision_number}",
+        })
+
+    if remision_items:
+        supabase.table("remision_items").insert(remision_items).execute()
+
+    return len(already_done) + len(remision_ids), deductions, errors
+
+
+def _process_billing(
+    request: BillingProcessRequest,
+    authorization: Optional[str],
+) -> BillingProcessResponse:
     logger.info(f"Processing billing for {len(request.order_ids)} orders")
 
     supabase = get_supabase_client()
@@ -621,35 +733,15 @@ async def process_billing(
         excel_file_bytes = None
         export_history_id = None
 
+        # Orders whose inventory is deducted in one bulk call at the end
+        deductions: List[dict] = []
+
         if direct_billing_orders:
-            # Get starting invoice number
-            config_result = (
-                supabase.table("system_config")
-                .select("config_value")
-                .eq("config_key", "invoice_last_number")
-                .single()
-                .execute()
+            # Reserve one invoice number per order
+            invoice_number_start = reserve_number_range(
+                supabase, INVOICE_NUMBER_KEY, len(direct_billing_orders)
             )
-
-            current_invoice = 0
-            if config_result.data:
-                try:
-                    current_invoice = int(config_result.data["config_value"])
-                except:
-                    current_invoice = 0
-
-            invoice_number_start = current_invoice + 1
-            invoice_number_end = current_invoice + len(direct_billing_orders)
-
-            # Update last invoice number
-            supabase.table("system_config").upsert(
-                {
-                    "config_key": "invoice_last_number",
-                    "config_value": str(invoice_number_end),
-                    "updated_at": datetime.now().isoformat(),
-                },
-                on_conflict="config_key"
-            ).execute()
+            invoice_number_end = invoice_number_start + len(direct_billing_orders) - 1
 
             # 5. Generate World Office Excel
             try:
@@ -671,8 +763,9 @@ async def process_billing(
             if excel_file_name and excel_file_bytes:
                 total_direct_amount = sum(o.get("total_value") or 0 for o in direct_billing_orders)
 
-                # Encode file as base64 for storage (matches how frontend stores it)
-                file_data_b64 = base64.b64encode(excel_file_bytes).decode('utf-8') if excel_file_bytes else None
+                # Upload to storage; keep the file inline only if the upload failed
+                file_path = store_export_file(excel_file_bytes, excel_file_name)
+                file_data_b64 = legacy_file_data(excel_file_bytes) if not file_path else None
 
                 export_result = (
                     supabase.table("export_history")
@@ -683,6 +776,7 @@ async def process_billing(
                         "total_orders": len(direct_billing_orders),
                         "total_amount": total_direct_amount,
                         "file_name": excel_file_name,
+                        "file_path": file_path,
                         "file_data": file_data_b64,
                         "created_by": user_id,
                     })
@@ -713,165 +807,39 @@ async def process_billing(
                     "updated_at": datetime.now().isoformat(),
                 }).in_("id", direct_order_ids).execute()
 
-                # Deduct inventory for direct billing orders
+                # Deduct inventory for direct billing orders (with the remisions below)
                 for order in direct_billing_orders:
-                    order_items = items_by_order.get(order["id"], [])
-                    deduction_items = prepare_order_items_for_deduction(order_items)
-                    inv_result = deduct_inventory_for_order(
-                        supabase=supabase,
-                        order_id=order["id"],
-                        order_number=order.get("order_number", ""),
-                        items=deduction_items,
-                        user_id=user_id,
-                        notes=f"Invoice billing",
-                    )
-                    if not inv_result["success"]:
-                        logger.warning(
-                            f"Inventory deduction failed for direct billing order "
-                            f"{order.get('order_number')}: {inv_result['errors']}"
-                        )
+                    deductions.append({
+                        "order_id": order["id"],
+                        "order_number": order.get("order_number", ""),
+                        "items": prepare_order_items_for_deduction(items_by_order.get(order["id"], [])),
+                        "notes": "Invoice billing",
+                    })
 
         # 7. Create remisions for remision-type orders
         remisions_created = 0
         if remision_orders:
-            for order in remision_orders:
-                try:
-                    # Check if remision already exists for this order
-                    existing_remision = (
-                        supabase.table("remisions")
-                        .select("id")
-                        .eq("order_id", order["id"])
-                        .execute()
-                    )
-
-                    if existing_remision.data:
-                        # Remision already exists - check if it has items
-                        remision_id = existing_remision.data[0]["id"]
-                        existing_items = (
-                            supabase.table("remision_items")
-                            .select("id")
-                            .eq("remision_id", remision_id)
-                            .limit(1)
-                            .execute()
-                        )
-
-                        if existing_items.data:
-                            # Remision with items already exists, skip
-                            logger.info(f"Remision already exists for order {order.get('order_number')}, skipping")
-                            remisions_created += 1
-                            continue
-                        else:
-                            # Orphan remision (no items) - delete and recreate
-                            logger.info(f"Found orphan remision for order {order.get('order_number')}, deleting to recreate")
-                            supabase.table("remisions").delete().eq("id", remision_id).execute()
-
-                    # Get next remision number
-                    remision_config = (
-                        supabase.table("system_config")
-                        .select("config_value")
-                        .eq("config_key", "remision_number_current")
-                        .single()
-                        .execute()
-                    )
-
-                    current_remision = 0
-                    if remision_config.data:
-                        try:
-                            current_remision = int(remision_config.data["config_value"])
-                        except:
-                            current_remision = 0
-
-                    next_remision = current_remision + 1
-                    remision_number = f"REM-{str(next_remision).zfill(6)}"
-
-                    # Update remision number
-                    supabase.table("system_config").upsert(
-                        {
-                            "config_key": "remision_number_current",
-                            "config_value": str(next_remision),
-                            "updated_at": datetime.now().isoformat(),
-                        },
-                        on_conflict="config_key"
-                    ).execute()
-
-                    # Get order items
-                    order_items = items_by_order.get(order["id"], [])
-                    client = order.get("clients") or {}
-
-                    # Calculate total (only from items with available quantity)
-                    total_amount = sum(
-                        item.get("quantity_available", 0) * (item.get("unit_price") or 0)
-                        for item in order_items
-                        if item.get("quantity_available") and item.get("quantity_available") > 0
-                    )
-
-                    # Create remision
-                    remision_result = (
-                        supabase.table("remisions")
-                        .insert({
-                            "remision_number": remision_number,
-                            "order_id": order["id"],
-                            "total_amount": total_amount,
-                            "client_data": {
-                                "name": client.get("name"),
-                                "razon_social": client.get("razon_social"),
-                                "nit": client.get("nit"),
-                                "address": client.get("address"),
-                                "phone": client.get("phone"),
-                                "email": client.get("email"),
-                            },
-                            "notes": order.get("observations"),
-                            "created_by": user_id,
-                        })
-                        .execute()
+            try:
+                remisions_created, remision_deductions, remision_errors = _create_remisions(
+                    supabase, remision_orders, items_by_order, user_id
+                )
+                deductions.extend(remision_deductions)
+                errors.extend(remision_errors)
+            except Exception as e:
+                logger.error(f"Error creating remisions: {e}")
+                errors.append(f"Error creating remisions: {str(e)}")
+
+        # Deduct inventory for every invoiced / remisioned order in one call
+        if deductions:
+            inv_results = deduct_inventory_for_orders(supabase, deductions, user_id)
+            for deduction in deductions:
+                inv_result = inv_results[deduction["order_id"]]
+                if not inv_result["success"]:
+                    logger.warning(
+                        f"Inventory deduction failed for order {deduction['order_number']} "
+                        f"({deduction['notes']}): {inv_result['errors']}"
                     )
 
-                    if remision_result.data:
-                        remision_id = remision_result.data[0]["id"]
-
-                        # Create remision items (only items with available quantity)
-                        remision_items = []
-                        for item in order_items:
-                            qty = item.get("quantity_available")
-                            if not qty or qty <= 0:
-                                continue
-
-                            product = item.get("products") or {}
-                            price = item.get("unit_price") or 0
-                            remision_items.append({
-                                "remision_id": remision_id,
-                                "product_id": item["product_id"],
-                                "product_name": product.get("name"),
-                                "quantity_delivered": qty,
-                                "unit_price": price,
-                                "total_price": qty * price,
-                            })
-
-                        if remision_items:
-                            supabase.table("remision_items").insert(remision_items).execute()
-
-                        # Deduct inventory when creating remision
-                        deduction_items = prepare_order_items_for_deduction(order_items)
-                        inv_result = deduct_inventory_for_order(
-                            supabase=supabase,
-                            order_id=order["id"],
-                            order_number=order.get("order_number", ""),
-                            items=deduction_items,
-                            user_id=user_id,
-                            notes=f"Remision {remision_number}",
-                        )
-                        if not inv_result["success"]:
-                            logger.warning(
-                                f"Inventory deduction failed for remision order {order.get('order_number')}: "
-                                f"{inv_result['errors']}"
-                            )
-
-                        remisions_created += 1
-
-                except Exception as e:
-                    logger.error(f"Error creating remision for order {order.get('order_number')}: {e}")
-                    errors.append(f"Error creating remision for order {order.get('order_number')}: {str(e)}")
-
         # 8. Build response
         total_direct = sum(o.get("total_value") or 0 for o in direct_billing_orders)
         total_remision = sum(o.get("total_value") or 0 for o in remision_orders)
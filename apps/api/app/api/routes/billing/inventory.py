@@ -1,7 +1,7 @@
 """Shared inventory deduction logic for billing and remision flows."""
 
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -114,6 +114,63 @@ def deduct_inventory_for_order(
     return result
 
 
+def deduct_inventory_for_orders(
+    supabase,
+    orders: List[dict],
+    user_id: Optional[str],
+) -> Dict[str, dict]:
+    """
+    Deduct inventory for many orders with one perform_bulk_dispatch_movements call.
+
+    The RPC reads the dispatch config once, skips orders already flagged
+    inventory_deducted, runs perform_batch_dispatch_movements for the rest
+    and flags the successful ones in a single UPDATE.
+
+    Args:
+        supabase: Supabase client instance
+        orders: List of dicts with order_id, order_number, items (product_id
+            and quantity, in packages) and notes
+        user_id: The user performing the action
+
+    Returns:
+        {order_id: {success, errors, skipped}} for every order (all failed
+        with the same error if the call itself failed)
+    """
+    if not orders:
+        return {}
+
+    try:
+        rpc_result = (
+            supabase.schema("inventario")
+            .rpc(
+                "perform_bulk_dispatch_movements",
+                {"p_orders": orders, "p_recorded_by": user_id},
+            )
+            .execute()
+        )
+        data = rpc_result.data or {}
+        errors = list(data.get("errors") or [])
+        by_order = data.get("orders") or {}
+    except Exception as e:
+        logger.error(f"Error deducting inventory for {len(orders)} orders: {e}")
+        errors, by_order = [str(e)], {}
+
+    results = {}
+    for order in orders:
+        result = by_order.get(order["order_id"])
+        if result is None:
+            result = {"success": False, "errors": errors or ["No result for order"], "skipped": False}
+        results[order["order_id"]] = {
+            "success": bool(result.get("success")),
+            "errors": result.get("errors") or [],
+            "skipped": bool(result.get("skipped")),
+        }
+
+    deducted = sum(1 for r in results.values() if r["success"] and not r["skipped"])
+    logger.info(f"Inventory deducted for {deducted} of {len(orders)} orders")
+    return results
+
+
 def prepare_order_items_for_deduction(order_items: List[dict]) -> List[dict]:
     """
     Convert order_items to the format expected by perform_batch_dispatch_movements.
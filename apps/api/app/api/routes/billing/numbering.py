@@ -0,0 +1,39 @@
+"""Invoice and remision number ranges (system_config counters)."""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# system_config keys of the counters (last number handed out)
+INVOICE_NUMBER_KEY = "invoice_last_number"
+REMISION_NUMBER_KEY = "remision_number_current"
+
+
+def reserve_number_range(supabase, config_key: str, count: int) -> int:
+    """
+    Reserve count consecutive numbers of a counter and return the first one.
+
+    Runs public.reserve_number_range, which advances the counter in a single
+    statement, so concurrent billing runs get disjoint ranges (reading and
+    upserting system_config could hand the same number out twice).
+
+    Args:
+        supabase: Supabase client instance (sync)
+        config_key: INVOICE_NUMBER_KEY or REMISION_NUMBER_KEY
+        count: How many numbers to reserve (>= 1)
+
+    Returns:
+        First reserved number; the range is [first, first + count - 1]
+    """
+    result = supabase.rpc(
+        "reserve_number_range",
+        {"p_config_key": config_key, "p_count": count},
+    ).execute()
+    first = int(result.data)
+    logger.info(f"Reserved {config_key} {first}..{first + count - 1}")
+    return first
+
+
+def format_remision_number(number: int) -> str:
+    """REM-000123"""
+    return f"REM-{str(number).zfill(6)}"
@@ -1,11 +1,19 @@
 """Remisions CRUD operations - List, detail, create, PDF download."""
 
 import logging
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional
 from fastapi import APIRouter, Query, HTTPException, Header
 
+from ....core.pagination import (
+    COUNT_PATTERN,
+    InvalidCursor,
+    count_method,
+    fetch_page,
+    iter_keyset,
+    ndjson_response,
+)
 from ....core.supabase import get_supabase_client
+from ....core.supabase_async import get_async_supabase_client, run_blocking
 from ....models.billing import (
     RemisionListItem,
     RemisionDetail,
@@ -13,36 +21,25 @@ from ....models.billing import (
     RemisionsListResponse,
 )
 from .inventory import deduct_inventory_for_order, prepare_order_items_for_deduction
+from .numbering import REMISION_NUMBER_KEY, format_remision_number, reserve_number_range
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/remisions")
 
 
-@router.get("/", response_model=RemisionsListResponse)
-async def list_remisions(
-    page: int = Query(1, ge=1),
-    limit: int = Query(100, ge=1, le=500),
-    client_id: Optional[str] = Query(None, description="Filter by client"),
-    date_from: Optional[str] = Query(None, description="Filter from date"),
-    date_to: Optional[str] = Query(None, description="Filter to date"),
+def _remision_list_query(
+    supabase,
+    date_from: Optional[str],
+    date_to: Optional[str],
+    count: Optional[str] = None,
 ):
-    """Get paginated list of remisions."""
-    logger.info(f"Fetching remisions: page={page}, limit={limit}")
-
-    supabase = get_supabase_client()
-    offset = (page - 1) * limit
-
-    query = (
-        supabase.table("remisions")
-        .select(
-            "id, remision_number, order_id, total_amount, notes, "
-            "created_at, created_by, client_data, "
-            "orders(id, order_number, expected_delivery_date, purchase_order_number, "
-            "clients(id, name, nit), branches(id, name)), "
-            "created_by_user:users!created_by(id, name)",
-            count="exact"
-        )
-        .order("created_at", desc=True)
+    query = supabase.table("remisions").select(
+        "id, remision_number, order_id, total_amount, notes, "
+        "created_at, created_by, client_data, "
+        "orders(id, order_number, expected_delivery_date, purchase_order_number, "
+        "clients(id, name, nit), branches(id, name)), "
+        "created_by_user:users!created_by(id, name)",
+        count=count,
     )
 
     # Apply filters
@@ -51,14 +48,12 @@ async def list_remisions(
     if date_to:
         query = query.lte("created_at", f"{date_to}T23:59:59")
 
-    # Apply pagination
-    query = query.range(offset, offset + limit - 1)
+    return query
 
-    result = query.execute()
-    total_count = result.count if result.count is not None else 0
 
+async def _remision_list_items(rows: List[dict]) -> List[RemisionListItem]:
     remisions = []
-    for remision in result.data:
+    for remision in rows:
         order = remision.get("orders") or {}
         client = order.get("clients") or {}
         branch = order.get("branches") or {}
@@ -85,12 +80,45 @@ async def list_remisions(
             created_by=remision.get("created_by"),
             created_by_name=created_by_user.get("name"),
         ))
+    return remisions
+
+
+@router.get("/", response_model=RemisionsListResponse)
+async def list_remisions(
+    page: int = Query(1, ge=1),
+    limit: int = Query(100, ge=1, le=500),
+    client_id: Optional[str] = Query(None, description="Filter by client"),
+    date_from: Optional[str] = Query(None, description="Filter from date"),
+    date_to: Optional[str] = Query(None, description="Filter to date"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="exact | estimated | none"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams every matching remision"),
+):
+    """Get paginated list of remisions (newest first; ?cursor= for keyset pages)."""
+    logger.info(f"Fetching remisions: page={page}, limit={limit}, cursor={bool(cursor)}, format={format}")
+
+    supabase = get_async_supabase_client()
+
+    if format == "ndjson":
+        return ndjson_response(
+            iter_keyset(lambda: _remision_list_query(supabase, date_from, date_to)),
+            _remision_list_items,
+            filename="remisions.ndjson",
+        )
+
+    query = _remision_list_query(supabase, date_from, date_to, count=count_method(count, cursor))
+    try:
+        result = await fetch_page(query, limit=limit, cursor=cursor, page=page)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return RemisionsListResponse(
-        remisions=remisions,
-        total_count=total_count,
+        remisions=await _remision_list_items(result.rows),
+        total_count=result.total_count,
         page=page,
         limit=limit,
+        has_more=result.has_more,
+        next_cursor=result.next_cursor,
     )
 
 
@@ -99,11 +127,11 @@ async def get_remision_detail(remision_id: str):
     """Get full remision details including items."""
     logger.info(f"Fetching remision detail: {remision_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Get remision with order and client info
     remision_result = (
-        supabase.table("remisions")
+        await supabase.table("remisions")
         .select(
             "*, "
             "orders(id, order_number, expected_delivery_date, purchase_order_number, "
@@ -128,7 +156,7 @@ async def get_remision_detail(remision_id: str):
 
     # Get remision items
     items_result = (
-        supabase.table("remision_items")
+        await supabase.table("remision_items")
         .select(
             "id, remision_id, product_id, quantity_delivered, unit_price, "
             "total_price, "
@@ -143,7 +171,7 @@ async def get_remision_detail(remision_id: str):
     product_config_map = {}
     if product_ids:
         config_result = (
-            supabase.table("product_config")
+            await supabase.table("product_config")
             .select("product_id, units_per_package")
             .in_("product_id", product_ids)
             .execute()
@@ -203,7 +231,7 @@ async def create_remision(
     """
     logger.info(f"Creating remision for order: {order_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Extract user_id from JWT
     user_id = None
@@ -221,7 +249,7 @@ async def create_remision(
     try:
         # Verify order exists and is ready for dispatch
         order_result = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .select(
                 "id, order_number, total_value, "
                 "clients(id, name, razon_social, nit, address, phone, email)"
@@ -243,7 +271,7 @@ async def create_remision(
 
         # Check if remision already exists for this order
         existing_result = (
-            supabase.table("remisions")
+            await supabase.table("remisions")
             .select("id")
             .eq("order_id", order_id)
             .execute()
@@ -255,38 +283,14 @@ async def create_remision(
                 detail="Remision already exists for this order"
             )
 
-        # Get next remision number
-        config_result = (
-            supabase.table("system_config")
-            .select("config_value")
-            .eq("config_key", "remision_number_current")
-            .single()
-            .execute()
+        # Reserve next remision number
+        remision_number = format_remision_number(
+            await run_blocking(reserve_number_range, get_supabase_client(), REMISION_NUMBER_KEY, 1)
         )
 
-        current_remision = 0
-        if config_result.data:
-            try:
-                current_remision = int(config_result.data["config_value"])
-            except:
-                current_remision = 0
-
-        next_remision = current_remision + 1
-        remision_number = f"REM-{str(next_remision).zfill(6)}"
-
-        # Update remision number
-        supabase.table("system_config").upsert(
-            {
-                "config_key": "remision_number_current",
-                "config_value": str(next_remision),
-                "updated_at": datetime.now().isoformat(),
-            },
-            on_conflict="config_key"
-        ).execute()
-
         # Get order items
         items_result = (
-            supabase.table("order_items")
+            await supabase.table("order_items")
             .select(
                 "id, product_id, quantity_requested, quantity_available, unit_price, "
                 "products(id, name, units_per_package)"
@@ -306,7 +310,7 @@ async def create_remision(
 
         # Create remision
         remision_result = (
-            supabase.table("remisions")
+            await supabase.table("remisions")
             .insert({
                 "remision_number": remision_number,
                 "order_id": order_id,
@@ -350,12 +354,13 @@ async def create_remision(
             })
 
         if remision_items:
-            supabase.table("remision_items").insert(remision_items).execute()
+            await supabase.table("remision_items").insert(remision_items).execute()
 
         # Deduct inventory when creating remision
         deduction_items = prepare_order_items_for_deduction(items_result.data)
-        inv_result = deduct_inventory_for_order(
-            supabase=supabase,
+        inv_result = await run_blocking(
+            deduct_inventory_for_order,
+            supabase=get_supabase_client(),
             order_id=order_id,
             order_number=order.get("order_number", ""),
             items=deduction_items,
@@ -387,12 +392,12 @@ async def delete_remision(remision_id: str):
     """Delete a remision (and its items)."""
     logger.info(f"Deleting remision: {remision_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Check if remision exists
         existing = (
-            supabase.table("remisions")
+            await supabase.table("remisions")
             .select("id, order_id")
             .eq("id", remision_id)
             .single()
@@ -403,10 +408,10 @@ async def delete_remision(remision_id: str):
             raise HTTPException(status_code=404, detail="Remision not found")
 
         # Delete remision items first (foreign key constraint)
-        supabase.table("remision_items").delete().eq("remision_id", remision_id).execute()
+        await supabase.table("remision_items").delete().eq("remision_id", remision_id).execute()
 
         # Delete remision
-        supabase.table("remisions").delete().eq("id", remision_id).execute()
+        await supabase.table("remisions").delete().eq("id", remision_id).execute()
 
         logger.info(f"Remision deleted: {remision_id}")
 
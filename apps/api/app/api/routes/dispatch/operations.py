@@ -5,7 +5,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Header
 
-from ....core.supabase import get_supabase_client, set_audit_user, backfill_audit_user
+from ....core.supabase_async import get_async_supabase_client, backfill_audit_user_async
 from ....models.route import DispatchOrderRequest, DispatchOrderResponse, DispatchConfig
 
 logger = logging.getLogger(__name__)
@@ -29,10 +29,10 @@ def get_user_id_from_token(authorization: Optional[str]) -> Optional[str]:
 async def get_dispatch_config():
     """Get dispatch configuration (default location, etc.)."""
     logger.info("Getting dispatch config")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
-        result = supabase.table("dispatch_inventory_config").select(
+        result = await supabase.table("dispatch_inventory_config").select(
             "default_dispatch_location_id"
         ).eq("id", "00000000-0000-0000-0000-000000000000").single().execute()
 
@@ -62,13 +62,12 @@ async def dispatch_order(
     4. Records the dispatch event
     """
     logger.info(f"Dispatching order: {order_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     user_id = get_user_id_from_token(authorization)
-    set_audit_user(supabase, user_id)
 
     try:
         # Get order with items
-        order_result = supabase.table("orders").select(
+        order_result = await supabase.table("orders").select(
             "id, order_number, status, assigned_route_id, "
             "order_items(id, product_id, quantity_requested, quantity_available, availability_status)"
         ).eq("id", order_id).single().execute()
@@ -86,13 +85,13 @@ async def dispatch_order(
             )
 
         # Update order status to dispatched
-        update_result = supabase.table("orders").update({
+        update_result = await supabase.table("orders").update({
             "status": "dispatched",
             "updated_at": datetime.utcnow().isoformat(),
         }).eq("id", order_id).execute()
 
         # Record status change event
-        supabase.table("order_events").insert({
+        await supabase.table("order_events").insert({
             "order_id": order_id,
             "event_type": "status_change",
             "payload": {
@@ -109,7 +108,7 @@ async def dispatch_order(
         inventory_errors = []
 
         # Backfill audit entries with the real user
-        backfill_audit_user(supabase, user_id, order_id, ["orders_audit", "order_items_audit"])
+        await backfill_audit_user_async(supabase, user_id, order_id, ["orders_audit", "order_items_audit"])
 
         return DispatchOrderResponse(
             success=True,
@@ -145,9 +144,8 @@ async def update_order_items_availability(
     - quantity_available: int (optional, calculated if not provided)
     """
     logger.info(f"Updating {len(items)} items for order {order_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     user_id = get_user_id_from_token(authorization)
-    set_audit_user(supabase, user_id)
 
     try:
         updated = []
@@ -168,18 +166,18 @@ async def update_order_items_availability(
                 update_data["quantity_available"] = 0
             elif status == "available":
                 # Get requested quantity
-                item_result = supabase.table("order_items").select(
+                item_result = await supabase.table("order_items").select(
                     "quantity_requested"
                 ).eq("id", item_id).single().execute()
                 if item_result.data:
                     update_data["quantity_available"] = item_result.data["quantity_requested"]
 
-            result = supabase.table("order_items").update(update_data).eq("id", item_id).execute()
+            result = await supabase.table("order_items").update(update_data).eq("id", item_id).execute()
             if result.data:
                 updated.append(item_id)
 
         # Backfill audit entries with the real user
-        backfill_audit_user(supabase, user_id, order_id, ["orders_audit", "order_items_audit"])
+        await backfill_audit_user_async(supabase, user_id, order_id, ["orders_audit", "order_items_audit"])
 
         return {
             "success": True,
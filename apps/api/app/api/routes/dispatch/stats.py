@@ -4,7 +4,7 @@ import logging
 from datetime import datetime, timedelta, date
 from fastapi import APIRouter
 
-from ....core.supabase import get_supabase_client
+from ....core.supabase_async import gather_queries, get_async_supabase_client
 from ....models.route import DispatchStats
 
 logger = logging.getLogger(__name__)
@@ -20,7 +20,7 @@ async def get_dispatch_init_data():
     This reduces multiple API calls to a single one for faster page load.
     """
     logger.info("Getting dispatch init data")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         today = get_bogota_today()
@@ -53,20 +53,23 @@ async def get_dispatch_init_data():
             "status", "ready_dispatch"
         ).is_("assigned_route_id", "null")
 
-        # Execute all queries
-        routes_result = routes_query.execute()
-
-        vehicles_result = None
-        try:
-            vehicles_result = vehicles_query.execute()
-        except Exception:
-            pass
-
-        drivers_result = drivers_query.execute()
-        schedules_result = schedules_query.execute()
-        active_routes_result = active_routes_query.execute()
-        dispatched_result = dispatched_query.execute()
-        unassigned_result = unassigned_query.execute()
+        # Execute all queries concurrently (vehicles is optional)
+        results = await gather_queries({
+            "routes": routes_query,
+            "vehicles": vehicles_query,
+            "drivers": drivers_query,
+            "schedules": schedules_query,
+            "active_routes": active_routes_query,
+            "dispatched": dispatched_query,
+            "unassigned": unassigned_query,
+        }, optional=["vehicles"])
+        routes_result = results["routes"]
+        vehicles_result = results["vehicles"]
+        drivers_result = results["drivers"]
+        schedules_result = results["schedules"]
+        active_routes_result = results["active_routes"]
+        dispatched_result = results["dispatched"]
+        unassigned_result = results["unassigned"]
 
         # Get driver and vehicle info for routes
         routes_data = routes_result.data or []
@@ -75,7 +78,7 @@ async def get_dispatch_init_data():
 
         drivers_map = {}
         if driver_ids:
-            drivers_info = supabase.table("users").select("id, name").in_("id", driver_ids).execute()
+            drivers_info = await supabase.table("users").select("id, name").in_("id", driver_ids).execute()
             drivers_map = {d["id"]: d["name"] for d in (drivers_info.data or [])}
 
         vehicles_map = {}
@@ -135,40 +138,39 @@ async def get_dispatch_stats():
     - ready_for_dispatch: All orders with status 'ready_dispatch'
     """
     logger.info("Getting dispatch stats")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         today = get_bogota_today()
         today_start = datetime.combine(today, datetime.min.time())
         today_end = datetime.combine(today, datetime.max.time())
 
-        # Active routes (status = planned)
-        routes_result = supabase.table("routes").select(
-            "id", count="exact"
-        ).eq("status", "planned").execute()
-        active_routes = routes_result.count or 0
-
-        # Dispatched today (status in [dispatched, in_delivery] and updated today)
-        dispatched_result = supabase.table("orders").select(
-            "id", count="exact"
-        ).in_("status", ["dispatched", "in_delivery"]).gte(
-            "updated_at", today_start.isoformat()
-        ).lte(
-            "updated_at", today_end.isoformat()
-        ).execute()
-        dispatched_today = dispatched_result.count or 0
-
-        # Unassigned orders (ready_dispatch without assigned_route_id)
-        unassigned_result = supabase.table("orders").select(
-            "id", count="exact"
-        ).eq("status", "ready_dispatch").is_("assigned_route_id", "null").execute()
-        unassigned_orders = unassigned_result.count or 0
-
-        # Ready for dispatch (all with status ready_dispatch)
-        ready_result = supabase.table("orders").select(
-            "id", count="exact"
-        ).eq("status", "ready_dispatch").execute()
-        ready_for_dispatch = ready_result.count or 0
+        results = await gather_queries({
+            # Active routes (status = planned)
+            "routes": supabase.table("routes").select(
+                "id", count="exact"
+            ).eq("status", "planned"),
+            # Dispatched today (status in [dispatched, in_delivery] and updated today)
+            "dispatched": supabase.table("orders").select(
+                "id", count="exact"
+            ).in_("status", ["dispatched", "in_delivery"]).gte(
+                "updated_at", today_start.isoformat()
+            ).lte(
+                "updated_at", today_end.isoformat()
+            ),
+            # Unassigned orders (ready_dispatch without assigned_route_id)
+            "unassigned": supabase.table("orders").select(
+                "id", count="exact"
+            ).eq("status", "ready_dispatch").is_("assigned_route_id", "null"),
+            # Ready for dispatch (all with status ready_dispatch)
+            "ready": supabase.table("orders").select(
+                "id", count="exact"
+            ).eq("status", "ready_dispatch"),
+        })
+        active_routes = results["routes"].count or 0
+        dispatched_today = results["dispatched"].count or 0
+        unassigned_orders = results["unassigned"].count or 0
+        ready_for_dispatch = results["ready"].count or 0
 
         return DispatchStats(
             active_routes=active_routes,
@@ -202,7 +204,7 @@ async def get_orders_ready_for_dispatch(
     - route_id: Only orders assigned to specific route
     """
     logger.info("Getting orders ready for dispatch")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         query = supabase.table("orders").select(
@@ -222,7 +224,7 @@ async def get_orders_ready_for_dispatch(
             query = query.eq("assigned_route_id", route_id)
 
         query = query.order("expected_delivery_date")
-        result = query.execute()
+        result = await query.execute()
 
         return {"orders": result.data or [], "total": len(result.data or [])}
     except Exception as e:
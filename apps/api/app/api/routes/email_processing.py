@@ -5,7 +5,7 @@ import math
 from typing import Optional
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
 
-from ...core.supabase import get_supabase_client
+from ...core.supabase_async import get_async_supabase_client
 from ...services.email_processor import get_email_processor
 from ...services.rag_sync import match_client, match_branch, match_product
 
@@ -71,7 +71,7 @@ async def get_processing_logs(
     """
     logger.info(f"Fetching processing logs: limit={limit}, offset={offset}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     query = (
         supabase.schema("workflows")
@@ -85,7 +85,7 @@ async def get_processing_logs(
     if status:
         query = query.eq("status", status)
 
-    result = query.execute()
+    result = await query.execute()
 
     return {
         "status": "success",
@@ -103,11 +103,11 @@ async def get_order_details(order_id: str):
     """
     logger.info(f"Fetching order details: {order_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Get order
     order_result = (
-        supabase.schema("workflows")
+        await supabase.schema("workflows")
         .table("ordenes_compra")
         .select("*")
         .eq("id", order_id)
@@ -123,7 +123,7 @@ async def get_order_details(order_id: str):
 
     # Get products
     products_result = (
-        supabase.schema("workflows")
+        await supabase.schema("workflows")
         .table("ordenes_compra_productos")
         .select("*")
         .eq("orden_compra_id", order_id)
@@ -135,7 +135,7 @@ async def get_order_details(order_id: str):
     product_ids = [p["producto_id"] for p in products if p.get("producto_id")]
     if product_ids:
         catalog = (
-            supabase.table("products")
+            await supabase.table("products")
             .select("id, name, weight")
             .in_("id", product_ids)
             .execute()
@@ -167,11 +167,11 @@ async def get_processing_stats():
     """
     logger.info("Fetching processing stats")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Get counts by status
     all_orders = (
-        supabase.schema("workflows")
+        await supabase.schema("workflows")
         .table("ordenes_compra")
         .select("status")
         .execute()
@@ -188,7 +188,7 @@ async def get_processing_stats():
     yesterday = (datetime.now() - timedelta(days=1)).isoformat()
 
     recent = (
-        supabase.schema("workflows")
+        await supabase.schema("workflows")
         .table("ordenes_compra")
         .select("id")
         .gte("created_at", yesterday)
@@ -228,7 +228,7 @@ async def get_reconciliation_status():
 
     try:
         graph = get_graph_service()
-        supabase = get_supabase_client()
+        supabase = get_async_supabase_client()
         classifier = get_classifier()
 
         since = datetime.now(timezone.utc) - timedelta(hours=24)
@@ -241,7 +241,7 @@ async def get_reconciliation_status():
         processed_ids: set[str] = set()
         if inbox_ids:
             result = (
-                supabase.schema("workflows")
+                await supabase.schema("workflows")
                 .table("ordenes_compra")
                 .select("email_id")
                 .in_("email_id", inbox_ids)
@@ -304,10 +304,10 @@ async def run_reconciliation_now(background_tasks: BackgroundTasks):
 async def backfill_client_match():
     """Match existing orders that have no cliente_id against RAG vector DB."""
     logger.info("Starting client match backfill")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     orders = (
-        supabase.schema("workflows")
+        await supabase.schema("workflows")
         .table("ordenes_compra")
         .select("id, cliente")
         .is_("cliente_id", "null")
@@ -323,7 +323,7 @@ async def backfill_client_match():
         try:
             result = await match_client(order["cliente"])
             if result:
-                supabase.schema("workflows").table("ordenes_compra").update({
+                await supabase.schema("workflows").table("ordenes_compra").update({
                     "cliente_id": result["client_id"],
                 }).eq("id", order["id"]).execute()
                 matched += 1
@@ -347,10 +347,10 @@ async def backfill_client_match():
 async def backfill_branch_match():
     """Match existing orders that have cliente_id but no sucursal_id."""
     logger.info("Starting branch match backfill")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     orders = (
-        supabase.schema("workflows")
+        await supabase.schema("workflows")
         .table("ordenes_compra")
         .select("id, cliente_id, sucursal, direccion")
         .not_.is_("cliente_id", "null")
@@ -370,7 +370,7 @@ async def backfill_branch_match():
                 direccion_text=order.get("direccion"),
             )
             if result:
-                supabase.schema("workflows").table("ordenes_compra").update({
+                await supabase.schema("workflows").table("ordenes_compra").update({
                     "sucursal_id": result["branch_id"],
                 }).eq("id", order["id"]).execute()
                 matched += 1
@@ -394,11 +394,11 @@ async def backfill_branch_match():
 async def backfill_product_match():
     """Match existing order products that have no producto_id against aliases and RAG."""
     logger.info("Starting product match backfill")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Get products without a match, joining to get the client_id from the parent order
     products = (
-        supabase.schema("workflows")
+        await supabase.schema("workflows")
         .table("ordenes_compra_productos")
         .select("id, producto, precio, orden_compra_id")
         .is_("producto_id", "null")
@@ -420,7 +420,7 @@ async def backfill_product_match():
             # Get client_id from parent order (cached)
             if order_id not in order_client_cache:
                 order_result = (
-                    supabase.schema("workflows")
+                    await supabase.schema("workflows")
                     .table("ordenes_compra")
                     .select("cliente_id")
                     .eq("id", order_id)
@@ -439,7 +439,7 @@ async def backfill_product_match():
                 precio=float(prod["precio"]) if prod.get("precio") is not None else None,
             )
             if result:
-                supabase.schema("workflows").table("ordenes_compra_productos").update({
+                await supabase.schema("workflows").table("ordenes_compra_productos").update({
                     "producto_id": result["product_id"],
                     "producto_nombre": result["matched_name"],
                     "confidence_score": result["similarity"],
@@ -473,11 +473,11 @@ async def delete_order(order_id: str):
     """
     logger.info(f"Deleting order: {order_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Products are deleted via CASCADE
-        supabase.schema("workflows").table("ordenes_compra").delete().eq(
+        await supabase.schema("workflows").table("ordenes_compra").delete().eq(
             "id", order_id
         ).execute()
 
@@ -503,11 +503,11 @@ async def approve_order(order_id: str):
     """
     logger.info(f"Approving order: {order_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Fetch the ordenes_compra record
     oc_result = (
-        supabase.schema("workflows")
+        await supabase.schema("workflows")
         .table("ordenes_compra")
         .select("*")
         .eq("id", order_id)
@@ -541,7 +541,7 @@ async def approve_order(order_id: str):
 
     # Fetch matched products
     products_result = (
-        supabase.schema("workflows")
+        await supabase.schema("workflows")
         .table("ordenes_compra_productos")
         .select("*")
         .eq("orden_compra_id", order_id)
@@ -556,7 +556,7 @@ async def approve_order(order_id: str):
     # Fetch product prices from products table (standardized prices)
     product_ids = [p["producto_id"] for p in matched_products]
     products_price_result = (
-        supabase.table("products")
+        await supabase.table("products")
         .select("id, price")
         .in_("id", product_ids)
         .execute()
@@ -566,7 +566,7 @@ async def approve_order(order_id: str):
     # Check if client orders by units (needs conversion to packages)
     client_id = oc["cliente_id"]
     config_result = (
-        supabase.table("client_config")
+        await supabase.table("client_config")
         .select("orders_by_units")
         .eq("client_id", client_id)
         .maybe_single()
@@ -578,7 +578,7 @@ async def approve_order(order_id: str):
     product_configs = {}
     if orders_by_units:
         pc_result = (
-            supabase.table("product_config")
+            await supabase.table("product_config")
             .select("product_id, units_per_package")
             .in_("product_id", product_ids)
             .execute()
@@ -591,7 +591,7 @@ async def approve_order(order_id: str):
 
     # Count total products for reporting skipped
     all_products_result = (
-        supabase.schema("workflows")
+        await supabase.schema("workflows")
         .table("ordenes_compra_productos")
         .select("id")
         .eq("orden_compra_id", order_id)
@@ -602,7 +602,7 @@ async def approve_order(order_id: str):
     try:
         # Generate next order_number
         last_order = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .select("order_number")
             .order("created_at", desc=True)
             .limit(1)
@@ -630,7 +630,7 @@ async def approve_order(order_id: str):
         }
 
         order_result = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .insert(order_insert)
             .execute()
         )
@@ -667,16 +667,16 @@ async def approve_order(order_id: str):
                 "quantity_completed": 0,
             })
 
-        supabase.table("order_items").insert(order_items).execute()
+        await supabase.table("order_items").insert(order_items).execute()
 
         # Calculate total
         try:
-            supabase.rpc("calculate_order_total", {"order_uuid": new_order_id}).execute()
+            await supabase.rpc("calculate_order_total", {"order_uuid": new_order_id}).execute()
         except Exception as e:
             logger.warning(f"calculate_order_total failed: {e}")
 
         # Update ordenes_compra status
-        (
+        await (
             supabase.schema("workflows")
             .table("ordenes_compra")
             .update({"status": "approved", "order_number": order_number})
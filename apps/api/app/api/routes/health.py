@@ -3,6 +3,7 @@ from supabase import Client
 from datetime import datetime
 
 from ...core.supabase import get_supabase
+from ...core.supabase_async import run_blocking
 from ...core.config import get_settings
 
 router = APIRouter(tags=["health"])
@@ -30,7 +31,7 @@ async def detailed_health_check(
     db_error = None
     try:
         # Simple query to test connection
-        result = supabase.table("clients").select("id").limit(1).execute()
+        result = await run_blocking(supabase.table("clients").select("id").limit(1).execute)
     except Exception as e:
         db_status = "unhealthy"
         db_error = str(e)
@@ -19,6 +19,7 @@ IDENTIFY_THRESHOLD = 0.5
 IDENTIFY_MIN_MARGIN = 0.08
 
 from ...core.supabase import get_supabase_client
+from ...core.supabase_async import get_async_supabase_client, run_blocking
 from ...services.face_recognition import (
     get_face_service,
     NoFaceDetectedError,
@@ -41,7 +42,7 @@ async def enroll_face(
     Either provide employee_id (update existing) or first_name + last_name (create new).
     """
     face_service = get_face_service()
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     image_bytes = await image.read()
 
@@ -65,19 +66,21 @@ async def enroll_face(
     safe_name = unicodedata.normalize("NFKD", raw_name).encode("ascii", "ignore").decode()
     safe_name = re.sub(r"[^a-zA-Z0-9]", "", safe_name) or "employee"
     filename = f"{int(datetime.now().timestamp())}-{safe_name}.jpg"
+    bucket = get_supabase_client().storage.from_("hr")
     try:
-        supabase.storage.from_("hr").upload(filename, image_bytes, {"content-type": "image/jpeg"})
+        # The async client has no Storage uploads; keep the sync one off the loop
+        await run_blocking(bucket.upload, filename, image_bytes, {"content-type": "image/jpeg"})
     except Exception as e:
         logger.error(f"Storage upload failed for {filename}: {e}")
         raise HTTPException(status_code=500, detail={"error": "storage_upload_failed", "message": "Error al subir la foto."})
-    photo_url = supabase.storage.from_("hr").get_public_url(filename)
+    photo_url = bucket.get_public_url(filename)
 
     descriptor_list = embedding.tolist()
 
     if employee_id:
         # Update existing employee
         result = (
-            supabase.table("employees")
+            await supabase.table("employees")
             .update({"photo_url": photo_url, "face_descriptor": descriptor_list})
             .eq("id", employee_id)
             .execute()
@@ -92,7 +95,7 @@ async def enroll_face(
                 detail={"error": "missing_fields", "message": "first_name y last_name son requeridos para un nuevo empleado."},
             )
         result = (
-            supabase.table("employees")
+            await supabase.table("employees")
             .insert({
                 "first_name": first_name,
                 "last_name": last_name,
@@ -120,11 +123,11 @@ async def verify_face(
 ):
     """Verify a face against a stored employee embedding."""
     face_service = get_face_service()
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Fetch stored embedding
     result = (
-        supabase.table("employees")
+        await supabase.table("employees")
         .select("id, first_name, face_descriptor")
         .eq("id", employee_id)
         .eq("is_active", True)
@@ -171,7 +174,7 @@ async def identify_face(
     (ambiguous — kiosk should retry).
     """
     face_service = get_face_service()
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     import numpy as np
 
@@ -208,7 +211,7 @@ async def identify_face(
         live_embedding = live_embedding / norm
 
     result = (
-        supabase.table("employees")
+        await supabase.table("employees")
         .select("id, first_name, last_name, photo_url, face_descriptor")
         .eq("is_active", True)
         .not_.is_("face_descriptor", "null")
@@ -307,11 +310,11 @@ async def evaluate(req: EvaluateRequest):
     """
     import numpy as np
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Active employees + their stored descriptors. Same shape as /identify.
     emp_result = (
-        supabase.table("employees")
+        await supabase.table("employees")
         .select("id, first_name, last_name, photo_url, face_descriptor")
         .eq("is_active", True)
         .not_.is_("face_descriptor", "null")
@@ -355,8 +358,8 @@ async def evaluate(req: EvaluateRequest):
     if req.scope == "labeled":
         success_q = success_q.not_.is_("review_status", "null")
         failure_q = failure_q.not_.is_("review_status", "null")
-    successes = success_q.execute().data or []
-    failures = failure_q.execute().data or []
+    successes = (await success_q.execute()).data or []
+    failures = (await failure_q.execute()).data or []
 
     def ground_truth_for_success(r: dict) -> Optional[int]:
         # Unreviewed → trust what the system captured as the truth (we don't know otherwise).
@@ -519,10 +522,10 @@ async def migrate_embeddings():
     embeddings to InsightFace 512-dim ArcFace embeddings.
     """
     face_service = get_face_service()
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     result = (
-        supabase.table("employees")
+        await supabase.table("employees")
         .select("id, first_name, last_name, photo_url")
         .eq("is_active", True)
         .execute()
@@ -551,7 +554,7 @@ async def migrate_embeddings():
 
                 embedding = face_service.extract_embedding(image_bytes)
 
-                supabase.table("employees").update(
+                await supabase.table("employees").update(
                     {"face_descriptor": embedding.tolist()}
                 ).eq("id", emp_id).execute()
 
@@ -1,89 +1,130 @@
 """Master data endpoints - clients, products, branches, etc.
 
 These endpoints provide reference data for order management UI.
-Optimized for fast loading with minimal data transfer.
+Optimized for fast loading with minimal data transfer: catalogs are served
+from the process-local master data cache (app/core/cache.py) with ETags, and
+POST /cache/invalidate or the sync-rag endpoints drop them after edits.
 """
 
 import logging
-from fastapi import APIRouter, BackgroundTasks
+from typing import Optional
 
-from ...core.supabase import get_supabase_client
-from ...services.rag_sync import sync_client_to_rag, sync_product_to_rag
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+
+from ...core.cache import MASTERDATA_DEPENDENTS, get_masterdata_cache, invalidate_masterdata
+from ...core.supabase_async import get_async_supabase_client
+from ...services.rag_sync import (
+    sync_all_clients_to_rag,
+    sync_all_products_to_rag,
+    sync_client_to_rag,
+    sync_product_to_rag,
+    warm_client_embeddings,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/masterdata", tags=["masterdata"])
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return etag in tags or f"W/{etag}" in tags
+
+
+async def _cached_response(request: Request, key: tuple, loader) -> Response:
+    """Serve key from the master data cache (loading it on a miss), honoring If-None-Match."""
+    entry = await get_masterdata_cache().get_or_load_async(key, loader)
+    # no-cache: clients may keep the body but must revalidate (cheap 304)
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(entry.value, headers=headers)
+
+
 @router.get("/clients")
-async def get_clients():
+async def get_clients(request: Request):
     """Get all clients ordered by name."""
     logger.info("Fetching clients")
-    supabase = get_supabase_client()
 
-    try:
-        result = (
+    async def load():
+        supabase = get_async_supabase_client()
+        result = await (
             supabase.table("clients")
             .select("*")
             .order("name", desc=False)
             .execute()
         )
         return {"clients": result.data or []}
+
+    try:
+        return await _cached_response(request, ("clients",), load)
     except Exception as e:
         logger.error(f"Error fetching clients: {e}")
         return {"clients": []}
 
 
 @router.get("/products")
-async def get_products(active_only: bool = True, category: str = None):
+async def get_products(request: Request, active_only: bool = True, category: str = None):
     """Get products with optional filters."""
     logger.info(f"Fetching products: active_only={active_only}, category={category}")
-    supabase = get_supabase_client()
 
-    try:
+    # Support comma-separated categories like "PT,PP"
+    categories = tuple(sorted(c.strip() for c in category.split(","))) if category else None
+
+    async def load():
+        supabase = get_async_supabase_client()
         query = supabase.table("products").select("*")
 
         if active_only:
             query = query.eq("is_active", True)
 
-        if category:
-            # Support comma-separated categories like "PT,PP"
-            categories = [c.strip() for c in category.split(",")]
-            query = query.in_("category", categories)
+        if categories:
+            query = query.in_("category", list(categories))
 
-        result = query.order("name", desc=False).execute()
+        result = await query.order("name", desc=False).execute()
         return {"products": result.data or []}
+
+    try:
+        return await _cached_response(request, ("products", active_only, categories), load)
     except Exception as e:
         logger.error(f"Error fetching products: {e}")
         return {"products": []}
 
 
 @router.get("/branches")
-async def get_branches():
+async def get_branches(request: Request):
     """Get all branches with client info."""
     logger.info("Fetching branches")
-    supabase = get_supabase_client()
 
-    try:
-        result = (
+    async def load():
+        supabase = get_async_supabase_client()
+        result = await (
             supabase.table("branches")
             .select("*, client:clients(id, name)")
             .order("created_at", desc=True)
             .execute()
         )
         return {"branches": result.data or []}
+
+    try:
+        return await _cached_response(request, ("branches",), load)
     except Exception as e:
         logger.error(f"Error fetching branches: {e}")
         return {"branches": []}
 
 
 @router.get("/receiving-schedules")
-async def get_receiving_schedules():
+async def get_receiving_schedules(request: Request):
     """Get receiving schedules ordered by day and time."""
     logger.info("Fetching receiving schedules")
-    supabase = get_supabase_client()
 
-    try:
-        result = (
+    async def load():
+        supabase = get_async_supabase_client()
+        result = await (
             supabase.table("receiving_schedules")
             .select("*")
             .order("day_of_week", desc=False)
@@ -91,25 +132,31 @@ async def get_receiving_schedules():
             .execute()
         )
         return {"schedules": result.data or []}
+
+    try:
+        return await _cached_response(request, ("receiving_schedules",), load)
     except Exception as e:
         logger.error(f"Error fetching receiving schedules: {e}")
         return {"schedules": []}
 
 
 @router.get("/product-configs")
-async def get_product_configs():
+async def get_product_configs(request: Request):
     """Get product configurations with product details."""
     logger.info("Fetching product configs")
-    supabase = get_supabase_client()
 
-    try:
-        result = (
+    async def load():
+        supabase = get_async_supabase_client()
+        result = await (
             supabase.table("product_config")
             .select("*, product:products!product_config_product_id_fkey(id, name, description, weight, price)")
             .order("created_at", desc=True)
             .execute()
         )
         return {"configs": result.data or []}
+
+    try:
+        return await _cached_response(request, ("product_configs",), load)
     except Exception as e:
         logger.error(f"Error fetching product configs: {e}")
         return {"configs": []}
@@ -119,11 +166,11 @@ async def get_product_configs():
 async def get_client_frequencies():
     """Get active client delivery frequencies."""
     logger.info("Fetching client frequencies")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         result = (
-            supabase.table("client_frequencies")
+            await supabase.table("client_frequencies")
             .select("*")
             .eq("is_active", True)
             .execute()
@@ -135,33 +182,36 @@ async def get_client_frequencies():
 
 
 @router.get("/vehicles")
-async def get_vehicles():
+async def get_vehicles(request: Request):
     """Get all vehicles."""
     logger.info("Fetching vehicles")
-    supabase = get_supabase_client()
 
-    try:
-        result = (
+    async def load():
+        supabase = get_async_supabase_client()
+        result = await (
             supabase.table("vehicles")
             .select("*")
             .order("vehicle_code", desc=False)
             .execute()
         )
         return {"vehicles": result.data or []}
+
+    try:
+        return await _cached_response(request, ("vehicles",), load)
     except Exception as e:
         logger.error(f"Error fetching vehicles: {e}")
         return {"vehicles": []}
 
 
 @router.get("/drivers")
-async def get_drivers():
+async def get_drivers(request: Request):
     """Get all users with driver role."""
     logger.info("Fetching drivers")
-    supabase = get_supabase_client()
 
-    try:
+    async def load():
+        supabase = get_async_supabase_client()
         # Get users with driver role and active status
-        result = (
+        result = await (
             supabase.table("users")
             .select("id, name, email, cedula")
             .eq("role", "driver")
@@ -171,14 +221,36 @@ async def get_drivers():
         )
         logger.info(f"Found {len(result.data or [])} drivers")
         return {"drivers": result.data or []}
+
+    try:
+        return await _cached_response(request, ("drivers",), load)
     except Exception as e:
         logger.error(f"Error fetching drivers: {e}")
         return {"drivers": []}
 
 
+@router.post("/cache/invalidate")
+async def invalidate_masterdata_cache(resource: Optional[str] = None):
+    """
+    Drop cached master data after it was edited outside the API.
+
+    ?resource=clients|branches|products|... drops that resource (and the ones
+    embedding it); without it the whole cache is dropped.
+    """
+    if resource is None:
+        return {"invalidated": invalidate_masterdata()}
+    if resource not in MASTERDATA_DEPENDENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown resource '{resource}'. Expected one of: {', '.join(MASTERDATA_DEPENDENTS)}",
+        )
+    return {"invalidated": invalidate_masterdata(resource)}
+
+
 @router.post("/products/{product_id}/sync-rag")
 async def sync_product_rag(product_id: str, background_tasks: BackgroundTasks):
     """Sync a product to the vector search table. Call after create/update."""
+    invalidate_masterdata("products")
     background_tasks.add_task(sync_product_to_rag, product_id)
     return {"status": "queued", "product_id": product_id}
 
@@ -187,41 +259,10 @@ async def sync_product_rag(product_id: str, background_tasks: BackgroundTasks):
 async def sync_all_products_rag():
     """Purge stale entries and sync ALL active PT products to the vector search table."""
     logger.info("Syncing all products to RAG (with purge)")
-    supabase = get_supabase_client()
+    invalidate_masterdata("products")
 
     try:
-        # Purge ALL existing entries first to remove stale data
-        supabase.table("productos_rag").delete().neq("id", "00000000-0000-0000-0000-000000000000").execute()
-        logger.info("Purged all existing productos_rag entries")
-
-        result = (
-            supabase.table("products")
-            .select("id")
-            .eq("is_active", True)
-            .eq("category", "PT")
-            .execute()
-        )
-        products = result.data or []
-
-        results = []
-        for product in products:
-            try:
-                r = await sync_product_to_rag(product["id"])
-                results.append(r)
-            except Exception as e:
-                logger.error(f"Failed to sync product {product['id']}: {e}")
-                results.append({"status": "error", "product_id": product["id"], "error": str(e)})
-
-        synced = sum(1 for r in results if r.get("status") == "synced")
-        errors = sum(1 for r in results if r.get("status") == "error")
-
-        return {
-            "status": "completed",
-            "total": len(products),
-            "synced": synced,
-            "errors": errors,
-            "purged": True,
-        }
+        return await sync_all_products_to_rag()
     except Exception as e:
         logger.error(f"Error syncing all products: {e}")
         return {"status": "error", "message": str(e)}
@@ -230,38 +271,26 @@ async def sync_all_products_rag():
 @router.post("/clients/{client_id}/sync-rag")
 async def sync_client_rag(client_id: str, background_tasks: BackgroundTasks):
     """Sync a client to the vector search table. Call after create/update."""
+    invalidate_masterdata("clients")
     background_tasks.add_task(sync_client_to_rag, client_id)
     return {"status": "queued", "client_id": client_id}
 
 
+@router.post("/clients/{client_id}/sync-embeddings")
+async def sync_client_embeddings(client_id: str, background_tasks: BackgroundTasks):
+    """Precompute a client's product alias and branch embeddings. Call after editing them."""
+    background_tasks.add_task(warm_client_embeddings, client_id)
+    return {"status": "queued", "client_id": client_id}
+
+
 @router.post("/clients/sync-rag-all")
 async def sync_all_clients_rag():
     """Sync ALL clients to the vector search table."""
     logger.info("Syncing all clients to RAG")
-    supabase = get_supabase_client()
+    invalidate_masterdata("clients")
 
     try:
-        result = supabase.table("clients").select("id").execute()
-        clients = result.data or []
-
-        results = []
-        for client in clients:
-            try:
-                r = await sync_client_to_rag(client["id"])
-                results.append(r)
-            except Exception as e:
-                logger.error(f"Failed to sync client {client['id']}: {e}")
-                results.append({"status": "error", "client_id": client["id"], "error": str(e)})
-
-        synced = sum(1 for r in results if r.get("status") == "synced")
-        errors = sum(1 for r in results if r.get("status") == "error")
-
-        return {
-            "status": "completed",
-            "total": len(clients),
-            "synced": synced,
-            "errors": errors,
-        }
+        return await sync_all_clients_to_rag()
     except Exception as e:
         logger.error(f"Error syncing all clients: {e}")
         return {"status": "error", "message": str(e)}
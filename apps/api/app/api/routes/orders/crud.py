@@ -5,7 +5,15 @@ from typing import Optional, List
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Query, HTTPException, Header
 
-from ....core.supabase import get_supabase_client, set_audit_user, backfill_audit_user
+from ....core.pagination import (
+    COUNT_PATTERN,
+    InvalidCursor,
+    count_method,
+    fetch_page,
+    iter_keyset,
+    ndjson_response,
+)
+from ....core.supabase_async import get_async_supabase_client, backfill_audit_user_async
 from ....models.order import (
     OrderListItem,
     OrderListResponse,
@@ -18,6 +26,7 @@ from ....models.order import (
     OrderFullUpdateResponse,
     OrderBatchRequest,
 )
+from ....services.order_aggregates import get_delivery_percentages
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -78,42 +87,22 @@ def apply_view_filters(query, view: str):
 
 # === Endpoints ===
 
-@router.get("/", response_model=OrderListResponse)
-async def list_orders(
-    view: str = Query("list", description="View mode: list, review_area1, review_area2, ready_dispatch, today, tomorrow, week"),
-    page: int = Query(1, ge=1),
-    limit: int = Query(50, ge=1, le=200),
-    status: Optional[str] = Query(None, description="Filter by specific status"),
-    search: Optional[str] = Query(None, description="Search by order_number or client name"),
-    client_id: Optional[str] = Query(None, description="Filter by client"),
-    date: Optional[str] = Query(None, description="Filter by expected_delivery_date"),
+def _order_list_query(
+    supabase,
+    view: str,
+    status: Optional[str],
+    search: Optional[str],
+    client_id: Optional[str],
+    date: Optional[str],
+    count: Optional[str] = None,
 ):
-    """
-    Get paginated list of orders with ?view= parameter.
-
-    Views:
-    - list: Default list view
-    - review_area1: Orders for first review (received/review_area1, tomorrow/monday)
-    - review_area2: Orders for second review
-    - ready_dispatch: Orders ready for dispatch
-    - today/tomorrow/week: Date filters
-    """
-    logger.info(f"Fetching orders: view={view}, page={page}, limit={limit}")
-
-    supabase = get_supabase_client()
-    offset = (page - 1) * limit
-
-    # Build query with minimal fields for list view
-    query = (
-        supabase.table("orders")
-        .select(
-            "id, order_number, expected_delivery_date, requested_delivery_date, status, total_value, "
-            "client_id, branch_id, created_at, has_pending_missing, "
-            "clients(id, name), branches(id, name), "
-            "created_by_user:users!created_by(id, name)",
-            count="exact"
-        )
-        .order("created_at", desc=True)
+    """Filtered (unordered) orders query with the list view fields."""
+    query = supabase.table("orders").select(
+        "id, order_number, expected_delivery_date, requested_delivery_date, status, total_value, "
+        "client_id, branch_id, created_at, has_pending_missing, "
+        "clients(id, name), branches(id, name), "
+        "created_by_user:users!created_by(id, name)",
+        count=count,
     )
 
     # Apply view-specific filters
@@ -132,49 +121,25 @@ async def list_orders(
     if search:
         query = query.or_(f"order_number.ilike.%{search}%")
 
-    # Apply pagination
-    query = query.range(offset, offset + limit - 1)
+    return query
 
-    result = query.execute()
-    total_count = result.count if result.count is not None else 0
 
+async def _order_list_items(supabase, rows: List[dict]) -> List[OrderListItem]:
+    """OrderListItem per row, with delivery percentages."""
     # Get order IDs for delivery percentage calculation
-    order_ids = [order["id"] for order in result.data]
+    order_ids = [order["id"] for order in rows]
 
-    # Calculate delivery percentages for delivered orders (single efficient query)
+    # Delivery percentages summed per order in Postgres (no order_items rows)
     delivery_percentages = {}
     if order_ids:
         try:
-            # Get aggregated delivery data for all orders at once
-            items_result = (
-                supabase.table("order_items")
-                .select("order_id, quantity_requested, quantity_delivered")
-                .in_("order_id", order_ids)
-                .execute()
-            )
-
-            # Calculate percentages per order
-            order_totals = {}  # {order_id: {requested: X, delivered: Y}}
-            for item in items_result.data:
-                order_id = item["order_id"]
-                if order_id not in order_totals:
-                    order_totals[order_id] = {"requested": 0, "delivered": 0}
-                order_totals[order_id]["requested"] += item.get("quantity_requested") or 0
-                order_totals[order_id]["delivered"] += item.get("quantity_delivered") or 0
-
-            for order_id, totals in order_totals.items():
-                if totals["requested"] > 0:
-                    delivery_percentages[order_id] = round(
-                        (totals["delivered"] / totals["requested"]) * 100
-                    )
-                else:
-                    delivery_percentages[order_id] = 0
+            delivery_percentages = await get_delivery_percentages(supabase, order_ids)
         except Exception as e:
             logger.warning(f"Failed to calculate delivery percentages: {e}")
 
     # Transform data
     orders = []
-    for order in result.data:
+    for order in rows:
         client = order.get("clients") or {}
         branch = order.get("branches") or {}
         created_by_user = order.get("created_by_user") or {}
@@ -199,15 +164,64 @@ async def list_orders(
             source=source,
             delivery_percentage=delivery_percentages.get(order["id"]),
         ))
+    return orders
+
+
+@router.get("/", response_model=OrderListResponse)
+async def list_orders(
+    view: str = Query("list", description="View mode: list, review_area1, review_area2, ready_dispatch, today, tomorrow, week"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=200),
+    status: Optional[str] = Query(None, description="Filter by specific status"),
+    search: Optional[str] = Query(None, description="Search by order_number or client name"),
+    client_id: Optional[str] = Query(None, description="Filter by client"),
+    date: Optional[str] = Query(None, description="Filter by expected_delivery_date"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="exact | estimated | none"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams every matching order"),
+):
+    """
+    Get paginated list of orders with ?view= parameter.
+
+    Views:
+    - list: Default list view
+    - review_area1: Orders for first review (received/review_area1, tomorrow/monday)
+    - review_area2: Orders for second review
+    - ready_dispatch: Orders ready for dispatch
+    - today/tomorrow/week: Date filters
+
+    Newest first. Pass the returned next_cursor as ?cursor= for the next
+    page (constant cost at any depth); ?page= offsets still work. With
+    ?format=ndjson all matching orders are streamed, one JSON per line.
+    """
+    logger.info(f"Fetching orders: view={view}, page={page}, limit={limit}, cursor={bool(cursor)}, format={format}")
+
+    supabase = get_async_supabase_client()
+
+    if format == "ndjson":
+        return ndjson_response(
+            iter_keyset(lambda: _order_list_query(supabase, view, status, search, client_id, date)),
+            lambda rows: _order_list_items(supabase, rows),
+            filename="orders.ndjson",
+        )
+
+    query = _order_list_query(
+        supabase, view, status, search, client_id, date, count=count_method(count, cursor)
+    )
+    try:
+        result = await fetch_page(query, limit=limit, cursor=cursor, page=page)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    has_more = offset + len(orders) < total_count
+    orders = await _order_list_items(supabase, result.rows)
 
     return OrderListResponse(
         orders=orders,
-        total_count=total_count,
+        total_count=result.total_count,
         page=page,
         limit=limit,
-        has_more=has_more,
+        has_more=result.has_more,
+        next_cursor=result.next_cursor,
     )
 
 
@@ -216,11 +230,11 @@ async def get_order_detail(order_id: str):
     """Get full order details including items."""
     logger.info(f"Fetching order detail: {order_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Get order with related data (include client and branch contact fields)
     order_result = (
-        supabase.table("orders")
+        await supabase.table("orders")
         .select(
             "*, "
             "clients(id, name, razon_social, address, phone, email, contact_person), "
@@ -242,7 +256,7 @@ async def get_order_detail(order_id: str):
 
     # Get order items with products
     items_result = (
-        supabase.table("order_items")
+        await supabase.table("order_items")
         .select(
             "id, product_id, quantity_requested, quantity_available, "
             "quantity_missing, quantity_dispatched, quantity_delivered, "
@@ -323,11 +337,11 @@ async def get_orders_batch(request: OrderBatchRequest):
     order_ids = request.order_ids
     logger.info(f"Batch fetching {len(order_ids)} orders")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Get all orders in one query (include client and branch contact fields)
     orders_result = (
-        supabase.table("orders")
+        await supabase.table("orders")
         .select(
             "*, "
             "clients(id, name, razon_social, address, phone, email, contact_person), "
@@ -343,7 +357,7 @@ async def get_orders_batch(request: OrderBatchRequest):
 
     # Get all items for these orders in one query
     items_result = (
-        supabase.table("order_items")
+        await supabase.table("order_items")
         .select(
             "id, order_id, product_id, quantity_requested, quantity_available, "
             "quantity_missing, quantity_dispatched, quantity_delivered, "
@@ -438,12 +452,12 @@ async def create_order(
     """Create a new order with items."""
     logger.info(f"Creating order for client: {order_data.client_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Get next order number
         last_order_result = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .select("order_number")
             .order("created_at", desc=True)
             .limit(1)
@@ -491,7 +505,7 @@ async def create_order(
             order_insert["created_by"] = user_id
 
         order_result = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .insert(order_insert)
             .execute()
         )
@@ -516,22 +530,22 @@ async def create_order(
             })
 
         items_result = (
-            supabase.table("order_items")
+            await supabase.table("order_items")
             .insert(order_items)
             .execute()
         )
 
         if not items_result.data:
             # Cleanup
-            supabase.table("orders").delete().eq("id", order_id).execute()
+            await supabase.table("orders").delete().eq("id", order_id).execute()
             raise HTTPException(status_code=500, detail="Failed to create order items")
 
         # Backfill audit entries with the real user (set_audit_context is unreliable with connection pooling)
-        backfill_audit_user(supabase, user_id, order_id, ["orders_audit", "order_items_audit"])
+        await backfill_audit_user_async(supabase, user_id, order_id, ["orders_audit", "order_items_audit"])
 
         # Create audit event
         try:
-            supabase.table("order_events").insert({
+            await supabase.table("order_events").insert({
                 "order_id": order_id,
                 "event_type": "created",
                 "payload": {
@@ -569,7 +583,7 @@ async def update_order(
     """Update order (only editable fields)."""
     logger.info(f"Updating order: {order_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     # Build update data (only non-None fields)
     update_data = {}
@@ -588,7 +602,7 @@ async def update_order(
     try:
         # Get current order for audit
         current = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .select("*")
             .eq("id", order_id)
             .single()
@@ -600,7 +614,7 @@ async def update_order(
 
         # Update order
         result = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .update(update_data)
             .eq("id", order_id)
             .execute()
@@ -623,10 +637,10 @@ async def update_order(
                 pass
 
         # Backfill audit entries with the real user
-        backfill_audit_user(supabase, user_id, order_id, ["orders_audit"])
+        await backfill_audit_user_async(supabase, user_id, order_id, ["orders_audit"])
 
         try:
-            supabase.table("order_events").insert({
+            await supabase.table("order_events").insert({
                 "order_id": order_id,
                 "event_type": "updated",
                 "payload": {
@@ -669,12 +683,12 @@ async def update_order_full(
     """
     logger.info(f"Full update order: {order_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Get current order and items
         order_result = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .select("id, status")
             .eq("id", order_id)
             .single()
@@ -695,7 +709,7 @@ async def update_order_full(
 
         # Get current items
         items_result = (
-            supabase.table("order_items")
+            await supabase.table("order_items")
             .select("id, product_id, quantity_requested, unit_price")
             .eq("order_id", order_id)
             .execute()
@@ -772,11 +786,11 @@ async def update_order_full(
         if order_data.observations is not None:
             order_update["observations"] = order_data.observations
 
-        supabase.table("orders").update(order_update).eq("id", order_id).execute()
+        await supabase.table("orders").update(order_update).eq("id", order_id).execute()
 
         # 2. Delete removed items
         if items_to_delete:
-            supabase.table("order_items").delete().in_("id", items_to_delete).execute()
+            await supabase.table("order_items").delete().in_("id", items_to_delete).execute()
             logger.info(f"Deleted {len(items_to_delete)} items")
 
         # 3. Update existing items - recalculate quantity_missing based on
@@ -786,7 +800,7 @@ async def update_order_full(
             current_available = current.get("quantity_available", 0) or 0
             new_missing = max(0, item["quantity_requested"] - current_available)
 
-            supabase.table("order_items").update({
+            await supabase.table("order_items").update({
                 "product_id": item["product_id"],
                 "quantity_requested": item["quantity_requested"],
                 "unit_price": item["unit_price"],
@@ -797,15 +811,15 @@ async def update_order_full(
 
         # 4. Insert new items
         if items_to_insert:
-            supabase.table("order_items").insert(items_to_insert).execute()
+            await supabase.table("order_items").insert(items_to_insert).execute()
             logger.info(f"Inserted {len(items_to_insert)} items")
 
         # 5. Backfill audit entries with the real user (fixes connection pooling issue)
-        backfill_audit_user(supabase, user_id, order_id, ["orders_audit", "order_items_audit"])
+        await backfill_audit_user_async(supabase, user_id, order_id, ["orders_audit", "order_items_audit"])
 
         # 6. Create audit event (user_id already extracted above)
         try:
-            supabase.table("order_events").insert({
+            await supabase.table("order_events").insert({
                 "order_id": order_id,
                 "event_type": "updated",
                 "payload": {
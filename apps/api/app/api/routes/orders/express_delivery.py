@@ -10,7 +10,7 @@ from datetime import datetime
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Header
 
-from ....core.supabase import get_supabase_client, set_audit_user, backfill_audit_user
+from ....core.supabase_async import get_async_supabase_client, backfill_audit_user_async
 from ....models.order import (
     ExpressDeliveryRequest,
     ExpressDeliveryResponse,
@@ -53,13 +53,12 @@ async def express_delivery(
     Note: Photo evidence is OPTIONAL unlike the driver delivery flow.
     """
     logger.info(f"Processing express delivery for order: {order_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     user_id = get_user_id_from_token(authorization)
-    set_audit_user(supabase, user_id)
 
     try:
         # 1. Get order to verify it exists and get current status
-        order_result = supabase.table("orders").select(
+        order_result = await supabase.table("orders").select(
             "id, order_number, status"
         ).eq("id", order_id).single().execute()
 
@@ -77,7 +76,7 @@ async def express_delivery(
             )
 
         # 2. Get order items to calculate totals
-        items_result = supabase.table("order_items").select(
+        items_result = await supabase.table("order_items").select(
             "id, quantity_requested, quantity_available"
         ).eq("order_id", order_id).execute()
 
@@ -109,7 +108,7 @@ async def express_delivery(
                 "quantity_returned": item.quantity_returned,
             }
 
-            update_result = supabase.table("order_items").update(
+            update_result = await supabase.table("order_items").update(
                 update_data
             ).eq("id", item.item_id).execute()
 
@@ -119,7 +118,7 @@ async def express_delivery(
             # Create return record if there are returns
             if item.quantity_returned > 0:
                 # Get product_id from order_item
-                item_detail = supabase.table("order_items").select(
+                item_detail = await supabase.table("order_items").select(
                     "product_id"
                 ).eq("id", item.item_id).single().execute()
 
@@ -134,7 +133,7 @@ async def express_delivery(
                     }
 
                     try:
-                        supabase.table("returns").insert(return_record).execute()
+                        await supabase.table("returns").insert(return_record).execute()
                         returns_created += 1
                     except Exception as e:
                         logger.warning(f"Could not create return record: {e}")
@@ -161,7 +160,7 @@ async def express_delivery(
         if data.evidence_url:
             order_update["delivery_evidence_url"] = data.evidence_url
 
-        supabase.table("orders").update(order_update).eq("id", order_id).execute()
+        await supabase.table("orders").update(order_update).eq("id", order_id).execute()
 
         # 7. Record event
         event_payload = {
@@ -178,7 +177,7 @@ async def express_delivery(
         if data.general_return_reason:
             event_payload["return_reason"] = data.general_return_reason
 
-        supabase.table("order_events").insert({
+        await supabase.table("order_events").insert({
             "order_id": order_id,
             "event_type": "express_delivery",
             "payload": event_payload,
@@ -193,7 +192,7 @@ async def express_delivery(
         }
 
         # Backfill audit entries with the real user
-        backfill_audit_user(supabase, user_id, order_id)
+        await backfill_audit_user_async(supabase, user_id, order_id)
 
         return ExpressDeliveryResponse(
             success=True,
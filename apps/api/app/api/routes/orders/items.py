@@ -5,7 +5,7 @@ from typing import Optional
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Header
 
-from ....core.supabase import get_supabase_client, set_audit_user, backfill_audit_user
+from ....core.supabase_async import get_async_supabase_client, backfill_audit_user_async
 from ....models.order import (
     OrderItemDetail,
     OrderItemUpdate,
@@ -35,12 +35,12 @@ async def list_order_items(order_id: str):
     """Get all items for an order."""
     logger.info(f"Fetching items for order {order_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Check order exists
         order = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .select("id")
             .eq("id", order_id)
             .single()
@@ -52,7 +52,7 @@ async def list_order_items(order_id: str):
 
         # Get items with products
         result = (
-            supabase.table("order_items")
+            await supabase.table("order_items")
             .select(
                 "id, product_id, quantity_requested, quantity_available, "
                 "quantity_missing, quantity_dispatched, quantity_delivered, "
@@ -105,12 +105,12 @@ async def add_order_item(
     """Add a new item to an existing order."""
     logger.info(f"Adding item to order {order_id}: product {item.product_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Check order exists and get current total
         order = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .select("id, total_value, status")
             .eq("id", order_id)
             .single()
@@ -139,7 +139,7 @@ async def add_order_item(
         }
 
         result = (
-            supabase.table("order_items")
+            await supabase.table("order_items")
             .insert(item_data)
             .execute()
         )
@@ -153,7 +153,7 @@ async def add_order_item(
         item_total = item.quantity_requested * item.unit_price
         new_total = (order.data.get("total_value") or 0) + item_total
 
-        supabase.table("orders").update({
+        await supabase.table("orders").update({
             "total_value": new_total,
             "updated_at": datetime.now().isoformat(),
         }).eq("id", order_id).execute()
@@ -161,7 +161,7 @@ async def add_order_item(
         # Create audit event
         user_id = get_user_id_from_token(authorization)
         try:
-            supabase.table("order_events").insert({
+            await supabase.table("order_events").insert({
                 "order_id": order_id,
                 "event_type": "item_added",
                 "payload": {
@@ -202,12 +202,12 @@ async def batch_update_items(
     """
     logger.info(f"Batch updating {len(batch.updates)} items for order {order_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Check order exists
         order = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .select("id")
             .eq("id", order_id)
             .single()
@@ -217,9 +217,7 @@ async def batch_update_items(
         if not order.data:
             raise HTTPException(status_code=404, detail="Order not found")
 
-        # Set audit context for triggers
         user_id = get_user_id_from_token(authorization)
-        set_audit_user(supabase, user_id)
 
         updated_items = []
         errors = []
@@ -251,7 +249,7 @@ async def batch_update_items(
                 if "quantity_available" in update_data:
                     # Get current item to calculate missing
                     current_item = (
-                        supabase.table("order_items")
+                        await supabase.table("order_items")
                         .select("quantity_requested")
                         .eq("id", update.item_id)
                         .single()
@@ -265,7 +263,7 @@ async def batch_update_items(
 
                 # Update item
                 result = (
-                    supabase.table("order_items")
+                    await supabase.table("order_items")
                     .update(update_data)
                     .eq("id", update.item_id)
                     .eq("order_id", order_id)  # Security: ensure item belongs to order
@@ -281,15 +279,15 @@ async def batch_update_items(
                 errors.append({"item_id": update.item_id, "error": str(e)})
 
         # Update order timestamp
-        supabase.table("orders").update({
+        await supabase.table("orders").update({
             "updated_at": datetime.now().isoformat(),
         }).eq("id", order_id).execute()
 
         # Backfill audit entries with the real user
         user_id = get_user_id_from_token(authorization)
-        backfill_audit_user(supabase, user_id, order_id, ["orders_audit", "order_items_audit"])
+        await backfill_audit_user_async(supabase, user_id, order_id, ["orders_audit", "order_items_audit"])
         try:
-            supabase.table("order_events").insert({
+            await supabase.table("order_events").insert({
                 "order_id": order_id,
                 "event_type": "item_updated",
                 "payload": {
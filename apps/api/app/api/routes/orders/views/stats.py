@@ -1,11 +1,13 @@
 """Order statistics and dashboard data endpoints."""
 
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from fastapi import APIRouter
 
-from .....core.supabase import get_supabase_client
+from .....core.supabase_async import gather_queries, get_async_supabase_client
 from .....models.order import OrderStats
+from .....services.order_aggregates import EXCLUDED_STATUSES, get_order_status_counts
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -37,63 +39,21 @@ async def get_order_stats():
     """
     logger.info("Fetching order statistics")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     today = get_today_date()
     tomorrow = get_tomorrow_date()
     week_end = get_week_end_date()
 
-    # Statuses to exclude from counts
-    excluded_statuses = "(delivered,cancelled,returned)"
-
     try:
-        # Get counts by date (using PostgREST filter syntax)
-        today_result = (
-            supabase.table("orders")
-            .select("id", count="exact")
-            .eq("expected_delivery_date", today)
-            .filter("status", "not.in", excluded_statuses)
-            .execute()
-        )
-
-        tomorrow_result = (
-            supabase.table("orders")
-            .select("id", count="exact")
-            .eq("expected_delivery_date", tomorrow)
-            .filter("status", "not.in", excluded_statuses)
-            .execute()
-        )
-
-        week_result = (
-            supabase.table("orders")
-            .select("id", count="exact")
-            .gte("expected_delivery_date", today)
-            .lte("expected_delivery_date", week_end)
-            .filter("status", "not.in", excluded_statuses)
-            .execute()
-        )
-
-        # Get counts by status
-        all_orders = (
-            supabase.table("orders")
-            .select("status")
-            .filter("status", "not.in", excluded_statuses)
-            .execute()
-        )
-
-        # Count by status
-        by_status = {}
-        for order in all_orders.data:
-            status = order["status"]
-            by_status[status] = by_status.get(status, 0) + 1
-
-        total = sum(by_status.values())
+        # Counted in Postgres: no row download, whatever the order history size
+        counts = await get_order_status_counts(supabase, today, tomorrow, week_end, EXCLUDED_STATUSES)
 
         return OrderStats(
-            today=today_result.count or 0,
-            tomorrow=tomorrow_result.count or 0,
-            this_week=week_result.count or 0,
-            by_status=by_status,
-            total=total,
+            today=counts.get("today") or 0,
+            tomorrow=counts.get("tomorrow") or 0,
+            this_week=counts.get("this_week") or 0,
+            by_status=counts.get("by_status") or {},
+            total=counts.get("total") or 0,
         )
 
     except Exception as e:
@@ -111,42 +71,43 @@ async def get_dashboard_data():
     """
     logger.info("Fetching dashboard data")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     today = get_today_date()
     tomorrow = get_tomorrow_date()
 
     try:
-        # Get stats
-        stats_result = await get_order_stats()
-
-        # Get recent orders (last 10)
-        recent_orders = (
-            supabase.table("orders")
-            .select(
-                "id, order_number, expected_delivery_date, status, total_value, "
-                "clients(name)"
-            )
-            .order("created_at", desc=True)
-            .limit(10)
-            .execute()
-        )
-
-        # Get orders with pending missing items
-        pending_missing = (
-            supabase.table("orders")
-            .select("id, order_number, clients(name)", count="exact")
-            .eq("has_pending_missing", True)
-            .filter("status", "not.in", "(delivered,cancelled,returned)")
-            .execute()
-        )
-
-        # Get orders needing review (review_area1 or review_area2)
-        needs_review = (
-            supabase.table("orders")
-            .select("id", count="exact")
-            .filter("status", "in", "(received,review_area1,review_area2)")
-            .execute()
+        # Stats, recent orders and alerts run concurrently
+        stats_result, results = await asyncio.gather(
+            get_order_stats(),
+            gather_queries({
+                # Get recent orders (last 10)
+                "recent_orders": (
+                    supabase.table("orders")
+                    .select(
+                        "id, order_number, expected_delivery_date, status, total_value, "
+                        "clients(name)"
+                    )
+                    .order("created_at", desc=True)
+                    .limit(10)
+                ),
+                # Get orders with pending missing items
+                "pending_missing": (
+                    supabase.table("orders")
+                    .select("id, order_number, clients(name)", count="exact")
+                    .eq("has_pending_missing", True)
+                    .filter("status", "not.in", "(delivered,cancelled,returned)")
+                ),
+                # Get orders needing review (review_area1 or review_area2)
+                "needs_review": (
+                    supabase.table("orders")
+                    .select("id", count="exact")
+                    .filter("status", "in", "(received,review_area1,review_area2)")
+                ),
+            }),
         )
+        recent_orders = results["recent_orders"]
+        pending_missing = results["pending_missing"]
+        needs_review = results["needs_review"]
 
         # Format recent orders
         recent = []
@@ -188,10 +149,10 @@ async def get_client_frequencies():
     """
     logger.info("Fetching client frequencies")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
-        result = (
+        result = await (
             supabase.table("client_frequencies")
             .select("*")
             .eq("is_active", True)
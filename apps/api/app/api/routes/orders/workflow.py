@@ -5,7 +5,7 @@ from typing import Optional
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Header, Query
 
-from ....core.supabase import get_supabase_client, backfill_audit_user
+from ....core.supabase_async import get_async_supabase_client, backfill_audit_user_async
 from ....models.order import (
     OrderTransition,
     OrderCancel,
@@ -52,12 +52,12 @@ async def transition_order(
     """
     logger.info(f"Transitioning order {order_id} to {transition.new_status}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Get current order
         current = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .select("id, status, order_number")
             .eq("id", order_id)
             .single()
@@ -85,7 +85,7 @@ async def transition_order(
         }
 
         result = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .update(update_data)
             .eq("id", order_id)
             .execute()
@@ -96,11 +96,11 @@ async def transition_order(
 
         # Backfill audit entries with the real user
         user_id = get_user_id_from_token(authorization)
-        backfill_audit_user(supabase, user_id, order_id, ["orders_audit"])
+        await backfill_audit_user_async(supabase, user_id, order_id, ["orders_audit"])
 
         # Create audit event
         try:
-            supabase.table("order_events").insert({
+            await supabase.table("order_events").insert({
                 "order_id": order_id,
                 "event_type": "status_change",
                 "payload": {
@@ -143,12 +143,12 @@ async def cancel_order(
     """
     logger.info(f"Cancelling order {order_id}: {cancel.reason}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Get current order
         current = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .select("id, status, order_number")
             .eq("id", order_id)
             .single()
@@ -169,7 +169,7 @@ async def cancel_order(
 
         # Update to cancelled
         result = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .update({
                 "status": "cancelled",
                 "updated_at": datetime.now().isoformat(),
@@ -183,11 +183,11 @@ async def cancel_order(
 
         # Backfill audit entries with the real user
         user_id = get_user_id_from_token(authorization)
-        backfill_audit_user(supabase, user_id, order_id, ["orders_audit"])
+        await backfill_audit_user_async(supabase, user_id, order_id, ["orders_audit"])
 
         # Create audit event
         try:
-            supabase.table("order_events").insert({
+            await supabase.table("order_events").insert({
                 "order_id": order_id,
                 "event_type": "cancelled",
                 "payload": {
@@ -224,11 +224,11 @@ async def update_pending_missing(
     """Mark/unmark order as having pending missing items."""
     logger.info(f"Updating pending_missing for order {order_id}: {data.has_pending_missing}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         result = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .update({
                 "has_pending_missing": data.has_pending_missing,
                 "updated_at": datetime.now().isoformat(),
@@ -243,7 +243,7 @@ async def update_pending_missing(
         # Create audit event
         user_id = get_user_id_from_token(authorization)
         try:
-            supabase.table("order_events").insert({
+            await supabase.table("order_events").insert({
                 "order_id": order_id,
                 "event_type": "item_updated",
                 "payload": {
@@ -276,12 +276,12 @@ async def get_order_events(
     """Get audit events for an order."""
     logger.info(f"Fetching events for order {order_id}")
 
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Check order exists
         order = (
-            supabase.table("orders")
+            await supabase.table("orders")
             .select("id")
             .eq("id", order_id)
             .single()
@@ -294,7 +294,7 @@ async def get_order_events(
         # Get events (handle case where table doesn't exist yet)
         try:
             result = (
-                supabase.table("order_events")
+                await supabase.table("order_events")
                 .select("*", count="exact")
                 .eq("order_id", order_id)
                 .order("created_at", desc=True)
@@ -313,7 +313,7 @@ async def get_order_events(
             if event.get("created_by"):
                 try:
                     user_result = (
-                        supabase.table("users")
+                        await supabase.table("users")
                         .select("name")
                         .eq("id", event["created_by"])
                         .single()
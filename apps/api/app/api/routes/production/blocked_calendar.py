@@ -0,0 +1,115 @@
+"""Blocked-shift calendar for cascade queue recalculation.
+
+Blocked periods (shift_blocking rows) are merged into sorted, disjoint
+intervals. A max-segment-tree over the free gaps between them answers
+"earliest start >= t where a batch of duration d fits" in O(log n),
+instead of rescanning the whole blocked list on every move.
+"""
+
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+# Gap after the last blocked period is unbounded
+_OPEN_GAP = timedelta.max
+
+
+class BlockedCalendar:
+    """Merged blocked periods of one work center with fast free-window lookups.
+
+    Behaves like the sorted list of (start, end) tuples returned by
+    get_blocked_shifts (truthiness, len, iteration), so existing callers
+    that only check for emptiness keep working.
+    """
+
+    __slots__ = ("_starts", "_ends", "_tree", "_leaves")
+
+    def __init__(self, blocked_periods: Iterable[Tuple[datetime, datetime]] = ()):
+        starts: List[datetime] = []
+        ends: List[datetime] = []
+        for block_start, block_end in sorted(blocked_periods, key=lambda p: p[0]):
+            if ends and block_start <= ends[-1]:
+                # Overlapping or adjacent: extend the current interval
+                if block_end > ends[-1]:
+                    ends[-1] = block_end
+            else:
+                starts.append(block_start)
+                ends.append(block_end)
+        self._starts = starts
+        self._ends = ends
+
+        # gap[j] = free time between interval j and j+1
+        gaps = [starts[j + 1] - ends[j] for j in range(len(starts) - 1)]
+        if starts:
+            gaps.append(_OPEN_GAP)
+
+        leaves = 1
+        while leaves < max(len(gaps), 1):
+            leaves *= 2
+        tree = [timedelta.min] * (2 * leaves)
+        tree[leaves:leaves + len(gaps)] = gaps
+        for node in range(leaves - 1, 0, -1):
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+        self._tree = tree
+        self._leaves = leaves
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __bool__(self) -> bool:
+        return bool(self._starts)
+
+    def __iter__(self) -> Iterator[Tuple[datetime, datetime]]:
+        return iter(zip(self._starts, self._ends))
+
+    def __repr__(self) -> str:
+        return f"BlockedCalendar({len(self._starts)} periods)"
+
+    def _first_gap_at_least(self, from_index: int, duration: timedelta) -> int:
+        """Index of the first interval >= from_index followed by a gap >= duration."""
+        tree = self._tree
+        node = from_index + self._leaves
+        # Climb until a right sibling (or this node) can contain the answer
+        if tree[node] >= duration:
+            return from_index
+        while True:
+            if node % 2 == 0 and tree[node + 1] >= duration:
+                node += 1
+                break
+            node //= 2
+        # Descend to the leftmost qualifying leaf
+        while node < self._leaves:
+            node = 2 * node if tree[2 * node] >= duration else 2 * node + 1
+        return node - self._leaves
+
+    def earliest_start(self, start_time: datetime, duration_minutes: float) -> datetime:
+        """Earliest time >= start_time where [t, t + duration) avoids all blocks.
+
+        Same result as repeatedly moving past the block the batch starts in
+        or spans into (the original skip_blocked_periods loop).
+        """
+        starts = self._starts
+        if not starts:
+            return start_time
+
+        duration = timedelta(minutes=duration_minutes)
+        index = bisect_right(starts, start_time)
+
+        # Starts inside a blocked interval: move to its end
+        if index > 0 and start_time < self._ends[index - 1]:
+            start_time = self._ends[index - 1]
+
+        # Fits in the free window before the next blocked interval
+        if index == len(starts) or start_time + duration <= starts[index]:
+            return start_time
+
+        return self._ends[self._first_gap_at_least(index, duration)]
+
+
+def as_blocked_calendar(
+    blocked_periods: Optional[Union[BlockedCalendar, Iterable[Tuple[datetime, datetime]]]],
+) -> BlockedCalendar:
+    """Return blocked_periods as a BlockedCalendar, building one if needed."""
+    if isinstance(blocked_periods, BlockedCalendar):
+        return blocked_periods
+    return BlockedCalendar(blocked_periods or ())
@@ -0,0 +1,255 @@
+"""PP dependency graph built from bill_of_materials.
+
+The backward cascade follows active BOM rows whose material is a PP. Walking
+that row by row through Supabase costs queries per BOM level (and used to
+need asyncio.run inside check_circular_dependency). BomGraph loads the whole
+BOM and the PT/PP products once and answers, in memory:
+
+- pp_children / pp_closure: PPs a product needs directly / transitively
+- find_cycles / find_cycle_from: circular PP dependencies (Tarjan SCC)
+- topological_levels: production order (0 = no PP ingredients)
+
+The graph is cached per process with a TTL; invalidate_bom_graph() after
+editing BOMs (the cascade master-data invalidation endpoint does it).
+"""
+
+import logging
+import time
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Graph older than this is reloaded on next access
+BOM_GRAPH_TTL_SECONDS = 300
+
+# PostgREST returns at most this many rows per request
+PAGE_SIZE = 1000
+
+PRODUCT_COLUMNS = "id, name, category, lote_minimo, is_recipe_by_grams"
+BOM_COLUMNS = "product_id, material_id, quantity_needed, operation_id, tiempo_reposo_horas, is_active"
+
+
+class BomGraph:
+    """Adjacency index of PP dependencies (product -> PP materials of active BOM rows)."""
+
+    def __init__(self, products: Iterable[dict], bom_rows: Iterable[dict]):
+        self.loaded_at = time.monotonic()
+        self.products: Dict[str, dict] = {p["id"]: p for p in products}
+
+        self._bom_rows: Dict[str, List[dict]] = {}
+        self._children: Dict[str, List[str]] = {}
+        for row in bom_rows:
+            self._bom_rows.setdefault(row["product_id"], []).append(row)
+            material = self.products.get(row["material_id"])
+            if row.get("is_active") and material and material.get("category") == "PP":
+                children = self._children.setdefault(row["product_id"], [])
+                if row["material_id"] not in children:
+                    children.append(row["material_id"])
+
+        self._components = self._strongly_connected_components()
+        self._component_of: Dict[str, int] = {}
+        for index, component in enumerate(self._components):
+            for node in component:
+                self._component_of[node] = index
+        self._cyclic = [
+            len(component) > 1 or component[0] in self._children.get(component[0], [])
+            for component in self._components
+        ]
+        self._reach = self._component_reach()
+
+    # --- Structure ---
+
+    def nodes(self) -> List[str]:
+        """Every product that has BOM rows or is a PP material of one."""
+        seen = dict.fromkeys(self._bom_rows)
+        for children in self._children.values():
+            seen.update(dict.fromkeys(children))
+        return list(seen)
+
+    def _strongly_connected_components(self) -> List[List[str]]:
+        """Tarjan's algorithm (iterative). Components come out children-first."""
+        index_of: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack = set()
+        stack: List[str] = []
+        components: List[List[str]] = []
+        counter = 0
+
+        for root in self.nodes():
+            if root in index_of:
+                continue
+            work = [(root, iter(self._children.get(root, [])))]
+            index_of[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for child in children:
+                    if child not in index_of:
+                        index_of[child] = lowlink[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self._children.get(child, []))))
+                        advanced = True
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[child])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+        return components
+
+    def _component_reach(self) -> List[FrozenSet[str]]:
+        """PPs reachable from each component (members included if it is a cycle)."""
+        reach: List[FrozenSet[str]] = []
+        for index, component in enumerate(self._components):
+            reachable = set(component) if self._cyclic[index] else set()
+            for node in component:
+                for child in self._children.get(node, []):
+                    child_component = self._component_of[child]
+                    if child_component != index:
+                        reachable.add(child)
+                        reachable |= reach[child_component]
+            reach.append(frozenset(reachable))
+        return reach
+
+    # --- Queries ---
+
+    def pp_children(self, product_id: str) -> List[str]:
+        return self._children.get(product_id, [])
+
+    def bom_rows(self, product_id: str) -> List[dict]:
+        """All BOM rows of a product (active or not), as loaded."""
+        return self._bom_rows.get(product_id, [])
+
+    def pp_closure(self, product_id: str) -> FrozenSet[str]:
+        """Every PP the product depends on, directly or through other PPs."""
+        component = self._component_of.get(product_id)
+        if component is None:
+            return frozenset()
+        return self._reach[component]
+
+    def find_cycles(self) -> List[List[str]]:
+        """Groups of products that depend on each other (including self-loops)."""
+        return [
+            list(component) for index, component in enumerate(self._components)
+            if self._cyclic[index]
+        ]
+
+    def find_cycle_from(self, product_id: str) -> Optional[List[str]]:
+        """A dependency path product -> ... -> X -> ... -> X if a cycle is reachable."""
+        if not self.has_cycle_from(product_id):
+            return None
+        # Iterative DFS until a node on the current path is seen again
+        path = [product_id]
+        on_path = {product_id}
+        iterators = [iter(self._children.get(product_id, []))]
+        while iterators:
+            child = next(iterators[-1], None)
+            if child is None:
+                on_path.discard(path.pop())
+                iterators.pop()
+                continue
+            if child in on_path:
+                return path + [child]
+            if self.has_cycle_from(child):
+                path.append(child)
+                on_path.add(child)
+                iterators.append(iter(self._children.get(child, [])))
+        return None
+
+    def has_cycle_from(self, product_id: str) -> bool:
+        component = self._component_of.get(product_id)
+        if component is None:
+            return False
+        if self._cyclic[component]:
+            return True
+        return any(self._cyclic[self._component_of[node]] for node in self._reach[component])
+
+    def topological_levels(self) -> Dict[str, int]:
+        """Production level per product: 0 = no PP ingredients, else 1 + deepest PP.
+
+        Products in the same cycle share a level.
+        """
+        component_level: List[int] = []
+        for index, component in enumerate(self._components):
+            level = 0
+            for node in component:
+                for child in self._children.get(node, []):
+                    child_component = self._component_of[child]
+                    if child_component != index:
+                        level = max(level, component_level[child_component] + 1)
+            component_level.append(level)
+        return {
+            node: component_level[index]
+            for index, component in enumerate(self._components)
+            for node in component
+        }
+
+    def describe_cycle(self, cycle: List[str]) -> str:
+        return " -> ".join(self.products.get(node, {}).get("name", node) for node in cycle)
+
+
+def fetch_all_rows(query_factory: Callable[[], object], page_size: int = PAGE_SIZE) -> List[dict]:
+    """Read every row of a query, page by page (query_factory builds a fresh query)."""
+    rows: List[dict] = []
+    offset = 0
+    while True:
+        page = query_factory().range(offset, offset + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += page_size
+
+
+def load_bom_graph(supabase) -> BomGraph:
+    """Load all BOM rows and PT/PP products into a BomGraph."""
+    bom_rows = fetch_all_rows(
+        lambda: supabase.schema("produccion").table("bill_of_materials").select(BOM_COLUMNS)
+    )
+    products = fetch_all_rows(
+        lambda: supabase.table("products").select(PRODUCT_COLUMNS).in_("category", ["PT", "PP"])
+    )
+    graph = BomGraph(products, bom_rows)
+    cycles = graph.find_cycles()
+    logger.info(
+        f"Loaded BOM graph: {len(products)} PT/PP products, {len(bom_rows)} BOM rows, "
+        f"{len(cycles)} circular dependencies"
+    )
+    for cycle in cycles:
+        logger.warning(f"Circular PP dependency in BOM: {graph.describe_cycle(cycle)}")
+    return graph
+
+
+_bom_graph: Optional[BomGraph] = None
+
+
+def get_bom_graph(supabase, ttl_seconds: float = BOM_GRAPH_TTL_SECONDS) -> BomGraph:
+    """Get the cached BOM graph, loading it if missing or expired."""
+    global _bom_graph
+    if _bom_graph is None or time.monotonic() - _bom_graph.loaded_at > ttl_seconds:
+        _bom_graph = load_bom_graph(supabase)
+    return _bom_graph
+
+
+def invalidate_bom_graph() -> bool:
+    """Drop the cached graph. Returns True if there was one."""
+    global _bom_graph
+    had_graph = _bom_graph is not None
+    _bom_graph = None
+    return had_graph
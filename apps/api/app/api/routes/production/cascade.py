@@ -4,13 +4,33 @@ import logging
 import math
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from fastapi import APIRouter, HTTPException, Header
 
 from ....core.supabase import get_supabase_client
+from ....core.supabase_async import run_blocking
+from .blocked_calendar import BlockedCalendar, as_blocked_calendar
+from .queue_columns import QueueColumns
+from .queue_simulator import WorkCenterQueue
+from .planning_context import CascadePlanningContext
+from .staffing_calendar import (
+    determine_shift_from_datetime,
+    get_staffing_calendar,
+    invalidate_staffing_calendar,
+)
+from .bom_graph import get_bom_graph, invalidate_bom_graph
+from .master_data import (
+    CascadeMasterData,
+    get_cascade_master_data,
+    invalidate_cascade_master_data,
+    load_cascade_master_data,
+)
 from ....models.production import (
     CreateCascadeRequest,
+    CreateCascadeBatchRequest,
     CascadePreviewRequest,
+    CascadeBatchItemResult,
+    CascadeBatchResponse,
     CascadeScheduleResponse,
     CascadePreviewResponse,
     ProductionOrderDetail,
@@ -114,11 +134,18 @@ def distribute_units_into_batches(total_units: float, lote_minimo: float) -> Lis
     return batches
 
 
-async def get_product_route(supabase, product_id: str) -> List[dict]:
+async def get_product_route(
+    supabase,
+    product_id: str,
+    master_data: Optional[CascadeMasterData] = None,
+) -> List[dict]:
     """Get production route for a product, ordered by sequence."""
-    result = supabase.schema("produccion").table("production_routes").select(
+    if master_data is not None and master_data.covers(product_id):
+        return master_data.get_product_route(product_id)
+
+    result = await run_blocking(supabase.schema("produccion").table("production_routes").select(
         "*, work_center:work_centers(*)"
-    ).eq("product_id", product_id).eq("is_active", True).order("sequence_order").execute()
+    ).eq("product_id", product_id).eq("is_active", True).order("sequence_order").execute)
 
     return result.data or []
 
@@ -127,7 +154,8 @@ async def get_productivity(
     supabase,
     product_id: str,
     work_center_id: str,
-    operation_id: Optional[str] = None
+    operation_id: Optional[str] = None,
+    master_data: Optional[CascadeMasterData] = None,
 ) -> Optional[dict]:
     """Get productivity parameters for a product at a work center.
 
@@ -135,19 +163,22 @@ async def get_productivity(
     1. product_id + work_center_id (direct mapping)
     2. product_id + operation_id (via work center's operation)
     """
+    if master_data is not None and master_data.covers(product_id):
+        return master_data.get_productivity(product_id, work_center_id, operation_id)
+
     # First try direct work_center_id match
-    result = supabase.schema("produccion").table("production_productivity").select(
+    result = await run_blocking(supabase.schema("produccion").table("production_productivity").select(
         "*"
-    ).eq("product_id", product_id).eq("work_center_id", work_center_id).execute()
+    ).eq("product_id", product_id).eq("work_center_id", work_center_id).execute)
 
     if result.data:
         return result.data[0]
 
     # If no direct match and we have operation_id, try by operation
     if operation_id:
-        result = supabase.schema("produccion").table("production_productivity").select(
+        result = await run_blocking(supabase.schema("produccion").table("production_productivity").select(
             "*"
-        ).eq("product_id", product_id).eq("operation_id", operation_id).execute()
+        ).eq("product_id", product_id).eq("operation_id", operation_id).execute)
 
         if result.data:
             return result.data[0]
@@ -193,6 +224,65 @@ def cascade_bulk_upsert(
     return result.data if result.data else {}
 
 
+def cascade_bulk_upsert_batch(
+    supabase,
+    schedules_to_move: List[dict],
+    schedules_to_insert: List[dict],
+    parking_zone_start: datetime,
+    parking_zone_end: datetime,
+) -> dict:
+    """Four-phase update for many work centers at once (single RPC).
+
+    schedules_to_move carry their resource_id so the parking zone of every
+    affected WC is cleaned first. Inserts must be ordered sources first.
+    """
+    move_data = [
+        {
+            "id": s["id"],
+            "resource_id": s["resource_id"],
+            "duration_minutes": s["duration_minutes"],
+            "start_date": s["new_start_date"].isoformat(),
+            "end_date": s["new_end_date"].isoformat(),
+        }
+        for s in schedules_to_move
+    ]
+    result = supabase.schema("produccion").rpc("cascade_bulk_upsert_batch", {
+        "p_schedules_to_move": move_data,
+        "p_schedules_to_insert": schedules_to_insert,
+        "p_parking_zone_start": parking_zone_start.isoformat(),
+        "p_parking_zone_end": parking_zone_end.isoformat(),
+    }).execute()
+    return result.data if result.data else {}
+
+
+def reserve_production_order_numbers(supabase, count: int) -> List[int]:
+    """Reserve count production order numbers in a single RPC (ascending)."""
+    result = supabase.schema("produccion").rpc(
+        "reserve_production_order_numbers", {"p_count": count}
+    ).execute()
+    return list(result.data or [])
+
+
+def get_production_week(start_datetime: datetime):
+    """Production week (Saturday 22:00 to Saturday 22:00) containing start_datetime.
+
+    Production week starts Saturday at 22:00 (T1 of Sunday starts then).
+    """
+    start_dt = start_datetime
+    if start_dt.tzinfo is not None:
+        start_dt = start_dt.replace(tzinfo=None)
+    # Find the Saturday at 22:00 that starts this week
+    # weekday(): Monday=0, Saturday=5, Sunday=6
+    days_since_saturday = (start_dt.weekday() - 5) % 7  # Days since last Saturday
+    week_start = start_dt - timedelta(days=days_since_saturday)
+    week_start = week_start.replace(hour=22, minute=0, second=0, microsecond=0)
+    # If start_datetime is before 22:00 on Saturday, go back to previous Saturday
+    if start_dt < week_start:
+        week_start = week_start - timedelta(days=7)
+    week_end = week_start + timedelta(days=7)
+    return week_start, week_end
+
+
 def calculate_context_window(week_start: datetime, week_end: datetime, extend_weeks: int = 1):
     """Expand week boundaries to include adjacent weeks for context queries.
 
@@ -208,8 +298,15 @@ def calculate_context_window(week_start: datetime, week_end: datetime, extend_we
     return context_start, context_end
 
 
-def get_alternative_work_centers(supabase, product_id: str, operation_id: str) -> List[dict]:
+def get_alternative_work_centers(
+    supabase,
+    product_id: str,
+    operation_id: str,
+    master_data: Optional[CascadeMasterData] = None,
+) -> List[dict]:
     """Get all work centers enabled for this product+operation from mapping table."""
+    if master_data is not None and master_data.covers(product_id):
+        return master_data.get_alternative_work_centers(product_id, operation_id)
     result = supabase.schema("produccion").table("product_work_center_mapping").select(
         "work_center_id, work_center:work_centers(*)"
     ).eq("product_id", product_id).eq("operation_id", operation_id).execute()
@@ -217,34 +314,17 @@ def get_alternative_work_centers(supabase, product_id: str, operation_id: str) -
 
 
 def get_staffed_work_centers(supabase, wc_ids: List[str], target_date, shift_number: int) -> List[dict]:
-    """Filter work centers to only those with staff assigned for the given date/shift."""
-    if not wc_ids:
-        return []
-    result = supabase.schema("produccion").table("work_center_staffing").select(
-        "work_center_id, staff_count"
-    ).in_("work_center_id", wc_ids).eq("date", target_date.isoformat()).eq(
-        "shift_number", shift_number
-    ).gt("staff_count", 0).execute()
-    return result.data or []
-
+    """Filter work centers to only those with staff assigned for the given date/shift.
 
-def determine_shift_from_datetime(dt: datetime):
-    """Return (date, shift_number) for a given datetime.
-
-    Maps datetime to the production shift it falls in:
-    T1: 22:00-06:00 (date = next day for >=22:00)
-    T2: 06:00-14:00
-    T3: 14:00-22:00
+    Served from the cached staffing calendar of the date's production week.
     """
-    hour = dt.hour
-    if hour >= 22:
-        return (dt.date() + timedelta(days=1)), 1
-    elif hour < 6:
-        return dt.date(), 1
-    elif hour < 14:
-        return dt.date(), 2
-    else:
-        return dt.date(), 3
+    if not wc_ids:
+        return []
+    staffed = get_staffing_calendar(supabase, target_date).staffed(target_date, shift_number)
+    return [
+        {"work_center_id": wc_id, "staff_count": staffed[wc_id]}
+        for wc_id in dict.fromkeys(wc_ids) if wc_id in staffed
+    ]
 
 
 def simulate_wc_finish_time(
@@ -255,27 +335,13 @@ def simulate_wc_finish_time(
 ) -> Optional[datetime]:
     """Simulate when the last new batch would finish at a WC.
 
-    Creates shallow copies to avoid mutating originals.
-    Returns None if new_batches is empty.
+    Does not mutate the schedules. Returns None if new_batches is empty.
+    For repeated queries against the same WC, build a WorkCenterQueue once.
     """
     if not new_batches:
         return None
 
-    sim_existing = [{**s} for s in existing_schedules]
-    sim_new = [{**b} for b in new_batches]
-
-    all_schedules = sim_existing + sim_new
-    if is_hybrid:
-        recalculated = recalculate_queue_times_hybrid(all_schedules, blocked_periods or None)
-    else:
-        recalculated = recalculate_queue_times(all_schedules, blocked_periods or None)
-
-    last_finish = None
-    for s in recalculated:
-        if not s.get("is_existing") and "new_end_date" in s:
-            if last_finish is None or s["new_end_date"] > last_finish:
-                last_finish = s["new_end_date"]
-    return last_finish
+    return WorkCenterQueue(existing_schedules, blocked_periods, is_hybrid).finish_time(new_batches)
 
 
 def distribute_batches_to_work_centers(
@@ -289,6 +355,11 @@ def distribute_batches_to_work_centers(
     Strategy: assign all to primary WC (first in list). If deadline can't be met,
     spill batches from the end to the next WC. Repeat with additional WCs if needed.
 
+    Each WC's existing queue is prepared once (WorkCenterQueue) and the split
+    point is binary-searched: the source finish time only grows as it keeps
+    more batches and the target's only shrinks, so the largest split where the
+    source meets the deadline is the one the one-by-one spill would stop at.
+
     Args:
         new_batches: Batches to distribute, ordered by batch_number
         wc_contexts: List of {wc_id, existing_schedules, blocked_periods}, primary first
@@ -313,13 +384,18 @@ def distribute_batches_to_work_centers(
     if deadline is None or len(wc_contexts) <= 1:
         return {k: v for k, v in distribution.items() if v}
 
+    # Prepare each WC's existing queue once for repeated finish-time queries
+    queues = [
+        WorkCenterQueue(ctx["existing_schedules"], ctx["blocked_periods"], is_hybrid)
+        for ctx in wc_contexts
+    ]
+
+    def meets_deadline(queue: WorkCenterQueue, batches: List[dict]) -> bool:
+        finish = queue.finish_time(batches)
+        return finish is None or finish <= deadline
+
     # Check if primary meets deadline
-    primary_finish = simulate_wc_finish_time(
-        distribution[primary_id],
-        wc_contexts[0]["existing_schedules"],
-        wc_contexts[0]["blocked_periods"],
-        is_hybrid,
-    )
+    primary_finish = queues[0].finish_time(distribution[primary_id])
 
     if primary_finish is None or primary_finish <= deadline:
         return {k: v for k, v in distribution.items() if v}
@@ -335,35 +411,34 @@ def distribute_batches_to_work_centers(
         source_id = wc_contexts[source_idx]["wc_id"]
         target_id = wc_contexts[target_idx]["wc_id"]
 
-        while distribution[source_id]:
-            # Move last batch from source to target (insert at start to maintain order)
-            batch = distribution[source_id].pop()
-            distribution[target_id].insert(0, batch)
-
-            # Simulate both
-            source_finish = simulate_wc_finish_time(
-                distribution[source_id],
-                wc_contexts[source_idx]["existing_schedules"],
-                wc_contexts[source_idx]["blocked_periods"],
-                is_hybrid,
-            )
-            target_finish = simulate_wc_finish_time(
-                distribution[target_id],
-                wc_contexts[target_idx]["existing_schedules"],
-                wc_contexts[target_idx]["blocked_periods"],
-                is_hybrid,
-            )
-
-            source_ok = source_finish is None or source_finish <= deadline
-            target_ok = target_finish is None or target_finish <= deadline
-
-            if source_ok and target_ok:
-                result = {k: v for k, v in distribution.items() if v}
-                for wc_id, batches in result.items():
-                    logger.info(f"Multi-WC: {wc_id[:8]} assigned {len(batches)} batches")
-                return result
-
-        # Source emptied, target becomes new source for next WC
+        source_batches = distribution[source_id]
+        source_queue = queues[source_idx]
+        target_queue = queues[target_idx]
+
+        # Largest split k (source keeps source_batches[:k], target gets the rest)
+        # with at least one batch moved where the source meets the deadline.
+        # k = 0 (source empty) always does.
+        low, high = 0, len(source_batches) - 1
+        while low < high:
+            mid = (low + high + 1) // 2
+            if meets_deadline(source_queue, source_batches[:mid]):
+                low = mid
+            else:
+                high = mid - 1
+        split = low
+
+        if meets_deadline(target_queue, source_batches[split:]):
+            distribution[source_id] = source_batches[:split]
+            distribution[target_id] = source_batches[split:]
+            result = {k: v for k, v in distribution.items() if v}
+            for wc_id, batches in result.items():
+                logger.info(f"Multi-WC: {wc_id[:8]} assigned {len(batches)} batches")
+            return result
+
+        # Target can't meet the deadline at any split: source empties into it,
+        # and the target becomes the new source for the next WC
+        distribution[source_id] = []
+        distribution[target_id] = source_batches
         source_idx = target_idx
 
     # Best effort - return distribution even if deadline not fully met
@@ -384,10 +459,11 @@ async def get_existing_schedules_with_arrival(
 
     For each schedule, fetches the cascade_source to calculate arrival time.
     Arrival time = source schedule end_date + rest_time (from BOM).
-    Returns schedules with arrival_time for queue recalculation.
+    Returns schedules with arrival_time for queue recalculation (and
+    arrival_rest_hours when the arrival was derived from a source).
     """
     # Get schedules with their source info
-    result = supabase.schema("produccion").table("production_schedules").select(
+    result = await run_blocking(supabase.schema("produccion").table("production_schedules").select(
         "id, start_date, end_date, cascade_source_id, product_id, quantity, "
         "cascade_level, batch_number, total_batches, batch_size, status, "
         "production_order_number, week_plan_id"
@@ -397,7 +473,7 @@ async def get_existing_schedules_with_arrival(
         "start_date", week_start_datetime.isoformat()
     ).lt(
         "start_date", week_end_datetime.isoformat()
-    ).execute()
+    ).execute)
 
     raw_schedules = result.data or []
     if not raw_schedules:
@@ -407,9 +483,9 @@ async def get_existing_schedules_with_arrival(
     source_ids = [s["cascade_source_id"] for s in raw_schedules if s.get("cascade_source_id")]
     source_map = {}  # source_id -> {end_date, resource_id}
     if source_ids:
-        source_result = supabase.schema("produccion").table("production_schedules").select(
+        source_result = await run_blocking(supabase.schema("produccion").table("production_schedules").select(
             "id, end_date, resource_id"
-        ).in_("id", source_ids).execute()
+        ).in_("id", source_ids).execute)
         for src in (source_result.data or []):
             source_map[src["id"]] = src
 
@@ -417,9 +493,9 @@ async def get_existing_schedules_with_arrival(
     source_wc_ids = list(set(src["resource_id"] for src in source_map.values()))
     wc_operation_map = {}  # wc_id -> operation_id
     if source_wc_ids:
-        wc_result = supabase.schema("produccion").table("work_centers").select(
+        wc_result = await run_blocking(supabase.schema("produccion").table("work_centers").select(
             "id, operation_id"
-        ).in_("id", source_wc_ids).execute()
+        ).in_("id", source_wc_ids).execute)
         for wc in (wc_result.data or []):
             if wc.get("operation_id"):
                 wc_operation_map[wc["id"]] = wc["operation_id"]
@@ -429,11 +505,11 @@ async def get_existing_schedules_with_arrival(
     operation_ids = list(set(wc_operation_map.values()))
     bom_rest_map = {}  # (product_id, operation_id) -> rest_time_hours
     if product_ids_in_schedules and operation_ids:
-        bom_result = supabase.schema("produccion").table("bill_of_materials").select(
+        bom_result = await run_blocking(supabase.schema("produccion").table("bill_of_materials").select(
             "product_id, operation_id, tiempo_reposo_horas"
         ).in_("product_id", product_ids_in_schedules).in_(
             "operation_id", operation_ids
-        ).not_.is_("tiempo_reposo_horas", "null").execute()
+        ).not_.is_("tiempo_reposo_horas", "null").execute)
         for bom in (bom_result.data or []):
             key = (bom["product_id"], bom["operation_id"])
             bom_rest_map[key] = float(bom.get("tiempo_reposo_horas") or 0)
@@ -441,49 +517,67 @@ async def get_existing_schedules_with_arrival(
     # Build schedules with arrival times using cached data
     schedules = []
     for s in raw_schedules:
-        schedule = {
-            "id": s["id"],
-            "start_date": parse_datetime_str(s["start_date"]),
-            "end_date": parse_datetime_str(s["end_date"]),
-            "cascade_source_id": s.get("cascade_source_id"),
-            "product_id": s["product_id"],
-            "quantity": s["quantity"],
-            "cascade_level": s.get("cascade_level", 0),
-            "batch_number": s.get("batch_number"),
-            "total_batches": s.get("total_batches"),
-            "batch_size": s.get("batch_size"),
-            "status": s.get("status"),
-            "production_order_number": s.get("production_order_number"),
-            "week_plan_id": s.get("week_plan_id"),
-            "is_existing": True,
-            "duration_minutes": (parse_datetime_str(s["end_date"]) - parse_datetime_str(s["start_date"])).total_seconds() / 60,
-        }
-
-        # Calculate arrival time from cached source data
+        source_end = None
+        rest_time_hours = 0.0
         if s.get("cascade_source_id") and s["cascade_source_id"] in source_map:
             src = source_map[s["cascade_source_id"]]
-            source_end = parse_datetime_str(src["end_date"])
-            source_wc_id = src["resource_id"]
-            rest_time_hours = 0.0
-            op_id = wc_operation_map.get(source_wc_id)
+            source_end = src["end_date"]
+            op_id = wc_operation_map.get(src["resource_id"])
             if op_id:
                 rest_time_hours = bom_rest_map.get((s["product_id"], op_id), 0.0)
-            schedule["arrival_time"] = source_end + timedelta(hours=rest_time_hours)
-        else:
-            schedule["arrival_time"] = schedule["start_date"]
-
-        schedules.append(schedule)
+        schedules.append(build_schedule_with_arrival(s, work_center_id, source_end, rest_time_hours))
 
     return schedules
 
 
+def build_schedule_with_arrival(
+    row: dict,
+    work_center_id: str,
+    source_end_date: Optional[str],
+    rest_time_hours: float,
+) -> dict:
+    """Queue entry for an existing production_schedules row.
+
+    Arrival time = source schedule end_date + rest_time (from BOM) when the
+    row has a source schedule, otherwise its own start_date.
+    """
+    start_date = parse_datetime_str(row["start_date"])
+    end_date = parse_datetime_str(row["end_date"])
+    schedule = {
+        "id": row["id"],
+        "resource_id": work_center_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "cascade_source_id": row.get("cascade_source_id"),
+        "product_id": row["product_id"],
+        "quantity": row["quantity"],
+        "cascade_level": row.get("cascade_level", 0),
+        "batch_number": row.get("batch_number"),
+        "total_batches": row.get("total_batches"),
+        "batch_size": row.get("batch_size"),
+        "status": row.get("status"),
+        "production_order_number": row.get("production_order_number"),
+        "week_plan_id": row.get("week_plan_id"),
+        "is_existing": True,
+        "duration_minutes": (end_date - start_date).total_seconds() / 60,
+    }
+
+    if source_end_date:
+        schedule["arrival_time"] = parse_datetime_str(source_end_date) + timedelta(hours=rest_time_hours)
+        schedule["arrival_rest_hours"] = rest_time_hours
+    else:
+        schedule["arrival_time"] = start_date
+
+    return schedule
+
+
 async def get_blocked_shifts(
     supabase,
     work_center_id: str,
     week_start: datetime,
     week_end: datetime,
-) -> List[tuple]:
-    """Get blocked periods as list of (start_datetime, end_datetime) tuples.
+) -> BlockedCalendar:
+    """Get blocked periods as a BlockedCalendar of (start_datetime, end_datetime).
 
     Queries the shift_blocking table and converts each (date, shift_number)
     to a datetime range:
@@ -491,7 +585,7 @@ async def get_blocked_shifts(
       T2: date 06:00 -> date 14:00
       T3: date 14:00 -> date 22:00
     """
-    result = supabase.schema("produccion").table("shift_blocking").select(
+    result = await run_blocking(supabase.schema("produccion").table("shift_blocking").select(
         "date, shift_number"
     ).eq(
         "work_center_id", work_center_id
@@ -499,77 +593,173 @@ async def get_blocked_shifts(
         "date", week_start.strftime("%Y-%m-%d")
     ).lte(
         "date", week_end.strftime("%Y-%m-%d")
-    ).execute()
+    ).execute)
 
-    blocked_periods = []
-    for row in (result.data or []):
-        date_str = row["date"]
-        shift = row["shift_number"]
-        # Parse date
-        date_parts = date_str.split("-")
-        year, month, day = int(date_parts[0]), int(date_parts[1]), int(date_parts[2])
-        base_date = datetime(year, month, day)
-
-        if shift == 1:
-            # T1: previous day 22:00 -> this day 06:00
-            start = base_date - timedelta(hours=2)  # day-1 22:00
-            end = base_date + timedelta(hours=6)     # day 06:00
-        elif shift == 2:
-            # T2: 06:00 -> 14:00
-            start = base_date + timedelta(hours=6)
-            end = base_date + timedelta(hours=14)
-        else:
-            # T3: 14:00 -> 22:00
-            start = base_date + timedelta(hours=14)
-            end = base_date + timedelta(hours=22)
+    # Sorted and merged for O(log n) free-window lookups
+    return BlockedCalendar(
+        blocked_shift_period(row["date"], row["shift_number"]) for row in (result.data or [])
+    )
+
+
+def blocked_shift_period(date_str: str, shift: int) -> tuple:
+    """(start, end) datetimes of a shift_blocking row."""
+    # Parse date
+    date_parts = date_str.split("-")
+    year, month, day = int(date_parts[0]), int(date_parts[1]), int(date_parts[2])
+    base_date = datetime(year, month, day)
+
+    if shift == 1:
+        # T1: previous day 22:00 -> this day 06:00
+        start = base_date - timedelta(hours=2)  # day-1 22:00
+        end = base_date + timedelta(hours=6)     # day 06:00
+    elif shift == 2:
+        # T2: 06:00 -> 14:00
+        start = base_date + timedelta(hours=6)
+        end = base_date + timedelta(hours=14)
+    else:
+        # T3: 14:00 -> 22:00
+        start = base_date + timedelta(hours=14)
+        end = base_date + timedelta(hours=22)
+
+    return (start, end)
+
+
+async def load_work_center_queues(
+    supabase,
+    work_center_ids: List[str],
+    window_start: datetime,
+    window_end: datetime,
+) -> Dict[str, Dict[str, Any]]:
+    """Existing schedules (with arrival times) and blocked shifts of several WCs.
+
+    One get_work_center_queue_context RPC instead of the four queries of
+    get_existing_schedules_with_arrival plus get_blocked_shifts per WC.
+    Returns {wc_id: {"existing_schedules": [...], "blocked_periods": BlockedCalendar}}
+    for every requested WC (empty when it has nothing in the window).
+    """
+    work_center_ids = list(dict.fromkeys(work_center_ids))
+    if not work_center_ids:
+        return {}
+
+    result = await run_blocking(supabase.schema("produccion").rpc("get_work_center_queue_context", {
+        "p_work_center_ids": work_center_ids,
+        "p_start": window_start.isoformat(),
+        "p_end": window_end.isoformat(),
+        "p_blocked_from": window_start.strftime("%Y-%m-%d"),
+        "p_blocked_to": window_end.strftime("%Y-%m-%d"),
+    }).execute)
+    data = result.data or {}
+
+    schedules: Dict[str, List[dict]] = {wc_id: [] for wc_id in work_center_ids}
+    for row in data.get("schedules") or []:
+        schedules[row["resource_id"]].append(build_schedule_with_arrival(
+            row, row["resource_id"], row.get("source_end_date"), float(row.get("arrival_rest_hours") or 0)
+        ))
+
+    blocked: Dict[str, List[tuple]] = {wc_id: [] for wc_id in work_center_ids}
+    for row in data.get("blocked_shifts") or []:
+        blocked[row["work_center_id"]].append(blocked_shift_period(row["date"], row["shift_number"]))
+
+    return {
+        wc_id: {
+            "existing_schedules": schedules[wc_id],
+            "blocked_periods": BlockedCalendar(blocked[wc_id]),
+        }
+        for wc_id in work_center_ids
+    }
 
-        blocked_periods.append((start, end))
 
-    # Sort by start time
-    blocked_periods.sort(key=lambda x: x[0])
-    return blocked_periods
+async def get_work_center_queues(
+    supabase,
+    work_center_ids: List[str],
+    query_start: datetime,
+    query_end: datetime,
+    planning_context: Optional[CascadePlanningContext] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Existing schedules and blocked shifts for several WCs, keyed by WC.
+
+    Without a planning context this is one load_work_center_queues call for
+    the query window. With one, WCs not in the context yet are loaded into
+    it (for the context's window) in a single call, and every WC is read
+    from the context so schedules planned in memory are included.
+    """
+    if planning_context is None:
+        return await load_work_center_queues(supabase, work_center_ids, query_start, query_end)
+
+    missing = [
+        wc_id for wc_id in work_center_ids
+        if not planning_context.has_work_center(wc_id)
+        or not planning_context.has_blocked_periods(wc_id)
+    ]
+    if missing:
+        loaded = await load_work_center_queues(
+            supabase, missing, planning_context.window_start, planning_context.window_end
+        )
+        for wc_id, queue in loaded.items():
+            if not planning_context.has_work_center(wc_id):
+                planning_context.load_work_center(wc_id, queue["existing_schedules"])
+            if not planning_context.has_blocked_periods(wc_id):
+                planning_context.load_blocked_periods(wc_id, queue["blocked_periods"])
+
+    return {
+        wc_id: {
+            "existing_schedules": planning_context.existing_schedules(wc_id),
+            "blocked_periods": planning_context.blocked_periods(wc_id),
+        }
+        for wc_id in dict.fromkeys(work_center_ids)
+    }
+
+
+async def get_work_center_queue(
+    supabase,
+    work_center_id: str,
+    query_start: datetime,
+    query_end: datetime,
+    planning_context: Optional[CascadePlanningContext] = None,
+) -> List[dict]:
+    """Existing schedules with arrival times for a WC.
+
+    With a planning context, the WC is loaded into it once (for the
+    context's window) and later reads include schedules planned in memory.
+    """
+    queues = await get_work_center_queues(
+        supabase, [work_center_id], query_start, query_end, planning_context
+    )
+    return queues[work_center_id]["existing_schedules"]
+
+
+async def get_work_center_blocked_periods(
+    supabase,
+    work_center_id: str,
+    query_start: datetime,
+    query_end: datetime,
+    planning_context: Optional[CascadePlanningContext] = None,
+) -> BlockedCalendar:
+    """Blocked shifts for a WC, from the planning context when given."""
+    if planning_context is None:
+        return await get_blocked_shifts(supabase, work_center_id, query_start, query_end)
+    queues = await get_work_center_queues(
+        supabase, [work_center_id], query_start, query_end, planning_context
+    )
+    return queues[work_center_id]["blocked_periods"]
 
 
 def skip_blocked_periods(
     start_time: datetime,
     duration_minutes: float,
-    blocked_periods: List[tuple],
+    blocked_periods: Union[BlockedCalendar, List[tuple]],
 ) -> datetime:
     """If start_time falls in a blocked period, move to end of block.
 
     Also checks if the full batch (start_time + duration) fits before
-    the next blocked period. If not, moves past it.
-    Repeats until the batch can fit in an unblocked window.
+    the next blocked period. If not, moves past it, until the batch fits
+    in an unblocked window. Accepts a BlockedCalendar (O(log n) lookup)
+    or a plain list of (start, end) tuples.
     """
     if not blocked_periods:
         return start_time
 
-    end_time = start_time + timedelta(minutes=duration_minutes)
-    max_iterations = len(blocked_periods) * 2 + 1  # Safety limit
-
-    for _ in range(max_iterations):
-        moved = False
-
-        for block_start, block_end in blocked_periods:
-            # If start is inside a blocked period, move past it
-            if block_start <= start_time < block_end:
-                start_time = block_end
-                end_time = start_time + timedelta(minutes=duration_minutes)
-                moved = True
-                break
-
-            # If batch spans into a blocked period (starts before, ends during/after)
-            if start_time < block_start < end_time:
-                # Batch doesn't fit before this block, move past it
-                start_time = block_end
-                end_time = start_time + timedelta(minutes=duration_minutes)
-                moved = True
-                break
-
-        if not moved:
-            break
-
-    return start_time
+    return as_blocked_calendar(blocked_periods).earliest_start(start_time, duration_minutes)
 
 
 def recalculate_queue_times(
@@ -584,33 +774,7 @@ def recalculate_queue_times(
     """
     if not all_schedules:
         return []
-
-    # Sort by arrival time
-    sorted_schedules = sorted(all_schedules, key=lambda x: x["arrival_time"])
-
-    # Assign times sequentially
-    queue_end = None
-    for schedule in sorted_schedules:
-        arrival = schedule["arrival_time"]
-        duration = schedule["duration_minutes"]
-
-        # Start time is max(arrival, queue_end)
-        if queue_end is None or arrival >= queue_end:
-            start_time = arrival
-        else:
-            start_time = queue_end
-
-        # Skip blocked periods
-        if blocked_periods:
-            start_time = skip_blocked_periods(start_time, duration, blocked_periods)
-
-        end_time = start_time + timedelta(minutes=duration)
-
-        schedule["new_start_date"] = start_time
-        schedule["new_end_date"] = end_time
-        queue_end = end_time
-
-    return sorted_schedules
+    return QueueColumns(all_schedules, blocked_periods).to_schedules()
 
 
 def recalculate_queue_times_hybrid(
@@ -621,58 +785,30 @@ def recalculate_queue_times_hybrid(
 
     Within the same production_order_number: batches process sequentially (FIFO).
     Between different production_order_numbers: batches can overlap (parallel).
-    Skips blocked periods if provided.
+    Skips blocked periods if provided. Result is sorted by new_start_date.
     """
     if not all_schedules:
         return []
-
-    # Group schedules by production_order_number
-    groups: Dict[Any, List[dict]] = {}
-    for schedule in all_schedules:
-        key = schedule.get("production_order_number")
-        if key not in groups:
-            groups[key] = []
-        groups[key].append(schedule)
-
-    # Within each group, sort by arrival_time and assign sequential times
-    for key, group_schedules in groups.items():
-        sorted_group = sorted(group_schedules, key=lambda x: x["arrival_time"])
-        queue_end = None
-        for schedule in sorted_group:
-            arrival = schedule["arrival_time"]
-            duration = schedule["duration_minutes"]
-
-            # Start time is max(arrival, queue_end)
-            if queue_end is None or arrival >= queue_end:
-                start_time = arrival
-            else:
-                start_time = queue_end
-
-            # Skip blocked periods
-            if blocked_periods:
-                start_time = skip_blocked_periods(start_time, duration, blocked_periods)
-
-            end_time = start_time + timedelta(minutes=duration)
-
-            schedule["new_start_date"] = start_time
-            schedule["new_end_date"] = end_time
-            queue_end = end_time
-
-    # Sort by new_start_date for consistent ordering
-    result = sorted(all_schedules, key=lambda x: x["new_start_date"])
-    return result
+    return QueueColumns(all_schedules, blocked_periods, is_hybrid=True).to_schedules()
 
 
-async def get_rest_time_hours(supabase, product_id: str, operation_id: str) -> float:
+async def get_rest_time_hours(
+    supabase,
+    product_id: str,
+    operation_id: str,
+    master_data: Optional[CascadeMasterData] = None,
+) -> float:
     """Get rest time from BOM for an operation (tiempo_reposo_horas)."""
     if not operation_id:
         return 0
+    if master_data is not None and master_data.covers(product_id):
+        return master_data.get_rest_time_hours(product_id, operation_id)
 
-    result = supabase.schema("produccion").table("bill_of_materials").select(
+    result = await run_blocking(supabase.schema("produccion").table("bill_of_materials").select(
         "tiempo_reposo_horas"
     ).eq("product_id", product_id).eq(
         "operation_id", operation_id
-    ).not_.is_("tiempo_reposo_horas", "null").execute()
+    ).not_.is_("tiempo_reposo_horas", "null").execute)
 
     if result.data:
         return float(result.data[0].get("tiempo_reposo_horas") or 0)
@@ -682,37 +818,52 @@ async def get_rest_time_hours(supabase, product_id: str, operation_id: str) -> f
 # === BACKWARD CASCADE FUNCTIONS (NEW - DO NOT MODIFY FORWARD CASCADE) ===
 
 
-async def get_rest_time_from_route(supabase, product_id: str, work_center_id: str) -> float:
+async def get_rest_time_from_route(
+    supabase,
+    product_id: str,
+    work_center_id: str,
+    master_data: Optional[CascadeMasterData] = None,
+) -> float:
     """Get rest time from production_routes for this work center.
 
     This is a NEW function for backward cascade. Forward cascade continues
     using get_rest_time_hours() which reads from BOM.
     """
-    result = supabase.schema("produccion").table("production_routes").select(
+    if master_data is not None and master_data.covers(product_id):
+        return master_data.get_rest_time_from_route(product_id, work_center_id)
+
+    result = await run_blocking(supabase.schema("produccion").table("production_routes").select(
         "tiempo_reposo_horas"
-    ).eq("product_id", product_id).eq("work_center_id", work_center_id).execute()
+    ).eq("product_id", product_id).eq("work_center_id", work_center_id).execute)
 
     if result.data and len(result.data) > 0:
         return float(result.data[0].get("tiempo_reposo_horas") or 0)
     return 0
 
 
-async def get_pp_ingredients(supabase, product_id: str) -> List[dict]:
+async def get_pp_ingredients(
+    supabase,
+    product_id: str,
+    master_data: Optional[CascadeMasterData] = None,
+) -> List[dict]:
     """Get PP ingredients from BOM for a product.
 
     Returns list of PP materials with their quantities and operations.
     """
+    if master_data is not None and master_data.covers(product_id):
+        return master_data.get_pp_ingredients(product_id)
+
     # Get BOM entries
-    result = supabase.schema("produccion").table("bill_of_materials").select(
+    result = await run_blocking(supabase.schema("produccion").table("bill_of_materials").select(
         "material_id, quantity_needed, operation_id, tiempo_reposo_horas"
-    ).eq("product_id", product_id).eq("is_active", True).execute()
+    ).eq("product_id", product_id).eq("is_active", True).execute)
 
     pp_materials = []
     for item in (result.data or []):
         # Fetch material info separately
-        material = supabase.table("products").select(
+        material = await run_blocking(supabase.table("products").select(
             "id, name, category, lote_minimo"
-        ).eq("id", item["material_id"]).single().execute()
+        ).eq("id", item["material_id"]).single().execute)
 
         if material.data and material.data.get("category") == "PP":
             item["material"] = material.data
@@ -734,41 +885,33 @@ def calculate_pp_quantity(pt_batch_size: float, bom_quantity: float) -> float:
     return pt_batch_size * bom_quantity
 
 
-def check_circular_dependency(supabase, product_id: str, visited: set = None) -> bool:
+def check_circular_dependency(supabase, product_id: str) -> bool:
     """Check if product has circular PP dependencies.
 
+    Uses the cached BOM graph (no per-row queries, safe inside the event loop).
+
     Args:
         supabase: Supabase client
         product_id: Product to check
-        visited: Set of already visited product IDs
 
     Returns:
         True if circular dependency detected, False otherwise
     """
-    if visited is None:
-        visited = set()
+    return get_bom_graph(supabase).has_cycle_from(product_id)
 
-    if product_id in visited:
-        return True
 
-    visited.add(product_id)
-
-    # Get PP ingredients synchronously (not async)
-    import asyncio
-    pp_ingredients = asyncio.run(get_pp_ingredients(supabase, product_id))
-
-    for pp in pp_ingredients:
-        if check_circular_dependency(supabase, pp["material"]["id"], visited.copy()):
-            return True
-
-    return False
-
-
-async def get_product(supabase, product_id: str) -> dict:
+async def get_product(
+    supabase,
+    product_id: str,
+    master_data: Optional[CascadeMasterData] = None,
+) -> dict:
     """Get product information by ID."""
-    result = supabase.table("products").select(
+    if master_data is not None and master_data.get_product(product_id):
+        return master_data.get_product(product_id)
+
+    result = await run_blocking(supabase.table("products").select(
         "id, name, category, lote_minimo, is_recipe_by_grams"
-    ).eq("id", product_id).single().execute()
+    ).eq("id", product_id).single().execute)
 
     if not result.data:
         raise HTTPException(404, f"Product {product_id} not found")
@@ -786,6 +929,7 @@ async def calculate_pp_start_time(
     pp_material: dict,
     pp_route: List[dict],
     required_pp_quantity: float,
+    master_data: Optional[CascadeMasterData] = None,
 ) -> datetime:
     """Calculate when PP production should start for just-in-time delivery.
 
@@ -805,19 +949,21 @@ async def calculate_pp_start_time(
         pp_material: PP material info from BOM
         pp_route: Production route for PP
         required_pp_quantity: Total PP units needed
+        master_data: Optional preloaded snapshot to serve lookups from
 
     Returns:
         Calculated start datetime for PP production
     """
     # 1. Calculate PT timeline
     # Get PT productivity to calculate total units
-    pt_route = await get_product_route(supabase, pt_product_id)
+    pt_route = await get_product_route(supabase, pt_product_id, master_data)
     if not pt_route:
         raise HTTPException(400, f"No production route for PT product {pt_product_id}")
 
     first_wc = pt_route[0].get("work_center") or {}
     pt_productivity = await get_productivity(
-        supabase, pt_product_id, pt_route[0]["work_center_id"], first_wc.get("operation_id")
+        supabase, pt_product_id, pt_route[0]["work_center_id"], first_wc.get("operation_id"),
+        master_data=master_data,
     )
 
     if not pt_productivity:
@@ -843,7 +989,7 @@ async def calculate_pp_start_time(
     pt_last_batch_start = pt_start_datetime + timedelta(hours=pt_last_batch_offset)
 
     # 2. Calculate PP timeline
-    pp_product = await get_product(supabase, pp_material["material"]["id"])
+    pp_product = await get_product(supabase, pp_material["material"]["id"], master_data)
     pp_lote_minimo = float(pp_product.get("lote_minimo") or 100)
     pp_batches = distribute_units_into_batches(required_pp_quantity, pp_lote_minimo)
 
@@ -851,17 +997,17 @@ async def calculate_pp_start_time(
     pp_total_time = timedelta(0)
 
     for operation in pp_route:
-        # Time for all batches in this operation
+        # Productivity is the same for every batch in this operation
+        productivity = await get_productivity(
+            supabase, pp_product["id"], operation["work_center_id"], master_data=master_data
+        )
         for batch_size in pp_batches:
-            productivity = await get_productivity(
-                supabase, pp_product["id"], operation["work_center_id"]
-            )
             batch_duration = calculate_batch_duration_minutes(productivity, batch_size)
             pp_total_time += timedelta(minutes=batch_duration)
 
         # Add rest time after this operation (NEW: from production_routes)
         rest_time_hours = await get_rest_time_from_route(
-            supabase, pp_product["id"], operation["work_center_id"]
+            supabase, pp_product["id"], operation["work_center_id"], master_data
         )
         pp_total_time += timedelta(hours=rest_time_hours)
 
@@ -905,6 +1051,8 @@ async def generate_backward_cascade_recursive(
     parent_last_batch_start_actual: Optional[datetime] = None,
     context_start_datetime: Optional[datetime] = None,
     context_end_datetime: Optional[datetime] = None,
+    master_data: Optional[CascadeMasterData] = None,
+    planning_context: Optional[CascadePlanningContext] = None,
 ) -> List[dict]:
     """Recursively generate backward cascades for PP dependencies.
 
@@ -929,6 +1077,9 @@ async def generate_backward_cascade_recursive(
         week_plan_id: Optional week plan ID
         context_start_datetime: Expanded window start for cross-week queries
         context_end_datetime: Expanded window end for cross-week queries
+        master_data: Optional preloaded snapshot to serve lookups from
+        planning_context: Optional in-memory context to read queues from and
+            record writes into (batch planning)
 
     Returns:
         List of all created cascade results (for PP and nested PPs)
@@ -942,11 +1093,11 @@ async def generate_backward_cascade_recursive(
     logger.info(f"[Depth {depth}] Generating backward cascade for PP {pp_material_id}, qty {required_quantity}")
 
     # 1. Get PP route and product info
-    pp_route = await get_product_route(supabase, pp_material_id)
+    pp_route = await get_product_route(supabase, pp_material_id, master_data)
     if not pp_route:
         raise HTTPException(400, f"No production route for PP product {pp_material_id}")
 
-    pp_product = await get_product(supabase, pp_material_id)
+    pp_product = await get_product(supabase, pp_material_id, master_data)
     pp_lote_minimo = float(pp_product.get("lote_minimo") or 100)
 
     # 2. Calculate PP start time: synchronize with LAST batch of parent
@@ -998,7 +1149,8 @@ async def generate_backward_cascade_recursive(
         wc = operation.get("work_center") or {}
         is_parallel = is_parallel_processing(wc)
         productivity = await get_productivity(
-            supabase, pp_material_id, operation["work_center_id"], wc.get("operation_id")
+            supabase, pp_material_id, operation["work_center_id"], wc.get("operation_id"),
+            master_data=master_data,
         )
 
         # Calculate batch durations at this work center
@@ -1028,7 +1180,7 @@ async def generate_backward_cascade_recursive(
 
         # Get rest time after this operation
         rest_time_hours = await get_rest_time_from_route(
-            supabase, pp_material_id, operation["work_center_id"]
+            supabase, pp_material_id, operation["work_center_id"], master_data
         )
         rest_delta = timedelta(hours=rest_time_hours)
         total_rest_time += rest_delta
@@ -1069,8 +1221,8 @@ async def generate_backward_cascade_recursive(
         for sim_data in pp_wc_sim_data:
             wc_id = sim_data["wc_id"]
             if wc_id not in pp_wc_blocked:
-                pp_wc_blocked[wc_id] = await get_blocked_shifts(
-                    supabase, wc_id, query_start, query_end
+                pp_wc_blocked[wc_id] = await get_work_center_blocked_periods(
+                    supabase, wc_id, query_start, query_end, planning_context
                 )
 
         has_any_blockings = any(periods for periods in pp_wc_blocked.values())
@@ -1138,7 +1290,7 @@ async def generate_backward_cascade_recursive(
     )
 
     # 3. Check if this PP has nested PP ingredients
-    nested_pp_ingredients = await get_pp_ingredients(supabase, pp_material_id)
+    nested_pp_ingredients = await get_pp_ingredients(supabase, pp_material_id, master_data)
 
     # 4. If nested PPs exist, recurse first
     nested_results = []
@@ -1148,7 +1300,7 @@ async def generate_backward_cascade_recursive(
         # For recursion: this PP becomes the "parent"
         # Calculate PP's production parameters
         first_wc_productivity = await get_productivity(
-            supabase, pp_material_id, pp_route[0]["work_center_id"]
+            supabase, pp_material_id, pp_route[0]["work_center_id"], master_data=master_data
         )
 
         pp_staff_count = 1  # Default
@@ -1187,13 +1339,15 @@ async def generate_backward_cascade_recursive(
                 week_plan_id=week_plan_id,
                 context_start_datetime=context_start_datetime,
                 context_end_datetime=context_end_datetime,
+                master_data=master_data,
+                planning_context=planning_context,
             )
             nested_results.extend(nested_cascade)
 
     # 5. Calculate PP duration based on required quantity
     # Get productivity for first work center of PP
     first_wc_productivity = await get_productivity(
-        supabase, pp_material_id, pp_route[0]["work_center_id"]
+        supabase, pp_material_id, pp_route[0]["work_center_id"], master_data=master_data
     )
 
     pp_staff_count = 1  # Default, could be parameterized
@@ -1242,6 +1396,8 @@ async def generate_backward_cascade_recursive(
         context_start_datetime=context_start_datetime,
         context_end_datetime=context_end_datetime,
         deadline_datetime=pp_deadline,
+        master_data=master_data,
+        planning_context=planning_context,
     )
 
     # 7. Return all results (nested + current)
@@ -1266,6 +1422,8 @@ async def generate_cascade_schedules(
     context_start_datetime: Optional[datetime] = None,
     context_end_datetime: Optional[datetime] = None,
     deadline_datetime: Optional[datetime] = None,
+    master_data: Optional[CascadeMasterData] = None,
+    planning_context: Optional[CascadePlanningContext] = None,
 ) -> Dict[str, Any]:
     """
     Generate cascade schedules for a product through all work centers.
@@ -1288,6 +1446,10 @@ async def generate_cascade_schedules(
         context_end_datetime: Expanded window end for cross-week queries
         deadline_datetime: If set, enables multi-WC distribution when deadline can't be
             met with a single WC (used by backward cascade for PP production)
+        master_data: Optional preloaded snapshot to serve route/productivity/BOM
+            lookups from instead of querying per work center
+        planning_context: If set, queues are read from it and inserts/moves are
+            recorded into it instead of being written (flushed by the caller)
 
     Returns:
         Dictionary with cascade results
@@ -1309,7 +1471,8 @@ async def generate_cascade_schedules(
 
     # Get productivity for source work center
     source_productivity = await get_productivity(
-        supabase, product_id, source_wc_id, source_wc.get("operation_id")
+        supabase, product_id, source_wc_id, source_wc.get("operation_id"),
+        master_data=master_data,
     )
     if not source_productivity:
         raise HTTPException(
@@ -1332,13 +1495,17 @@ async def generate_cascade_schedules(
     batch_sizes = distribute_units_into_batches(total_units, lote_minimo)
     num_batches = len(batch_sizes)
 
-    # Get next production order number if creating
+    # Get next production order number if creating (reserved by the batch
+    # when planning in a context, one RPC otherwise)
     production_order_number = None
     if create_in_db:
-        order_result = supabase.schema("produccion").rpc(
-            "get_next_production_order_number", {}
-        ).execute()
-        production_order_number = order_result.data
+        if planning_context is not None:
+            production_order_number = planning_context.take_order_number()
+        if production_order_number is None:
+            order_result = await run_blocking(supabase.schema("produccion").rpc(
+                "get_next_production_order_number", {}
+            ).execute)
+            production_order_number = order_result.data
 
     # Track all created schedules by work center
     work_center_schedules: Dict[str, WorkCenterSchedule] = {}
@@ -1368,12 +1535,12 @@ async def generate_cascade_schedules(
 
         # Get productivity for this work center (by operation_id)
         wc_productivity = await get_productivity(
-            supabase, product_id, wc_id, wc.get("operation_id")
+            supabase, product_id, wc_id, wc.get("operation_id"), master_data=master_data
         )
 
         # Get rest time from BOM
         rest_time_hours = await get_rest_time_hours(
-            supabase, product_id, wc.get("operation_id")
+            supabase, product_id, wc.get("operation_id"), master_data
         )
 
         # Initialize work center schedule tracking
@@ -1391,7 +1558,9 @@ async def generate_cascade_schedules(
 
         if (operation_id and deadline_datetime is not None
                 and not is_parallel and week_start_datetime and week_end_datetime):
-            alternative_wcs = get_alternative_work_centers(supabase, product_id, operation_id)
+            alternative_wcs = get_alternative_work_centers(
+                supabase, product_id, operation_id, master_data
+            )
 
             if len(alternative_wcs) > 1:
                 # Determine target shift from first batch arrival time
@@ -1407,8 +1576,8 @@ async def generate_cascade_schedules(
 
                 target_date, target_shift = determine_shift_from_datetime(first_arrival)
                 alt_wc_ids = [m["work_center_id"] for m in alternative_wcs]
-                staffed_results = get_staffed_work_centers(
-                    supabase, alt_wc_ids, target_date, target_shift
+                staffed_results = await run_blocking(
+                    get_staffed_work_centers, supabase, alt_wc_ids, target_date, target_shift
                 )
                 staffed_wc_ids = {s["work_center_id"] for s in staffed_results}
 
@@ -1416,13 +1585,13 @@ async def generate_cascade_schedules(
                     use_multi_wc = True
                     # Prepare contexts: primary WC first, then others
                     ordered_wc_ids = [wc_id] + [wid for wid in staffed_wc_ids if wid != wc_id]
+                    # All staffed WCs' queues and blocked shifts in one round-trip
+                    alt_queues = await get_work_center_queues(
+                        supabase, ordered_wc_ids, query_start, query_end, planning_context
+                    )
                     for alt_wc_id in ordered_wc_ids:
-                        existing = await get_existing_schedules_with_arrival(
-                            supabase, alt_wc_id, query_start, query_end
-                        )
-                        blocked = await get_blocked_shifts(
-                            supabase, alt_wc_id, query_start, query_end
-                        )
+                        existing = alt_queues[alt_wc_id]["existing_schedules"]
+                        blocked = alt_queues[alt_wc_id]["blocked_periods"]
                         alt_wc_info = {}
                         for alt in alternative_wcs:
                             if alt["work_center_id"] == alt_wc_id:
@@ -1499,7 +1668,8 @@ async def generate_cascade_schedules(
 
                 # Get productivity for this specific WC
                 assigned_wc_productivity = await get_productivity(
-                    supabase, product_id, assigned_wc_id, assigned_wc_info.get("operation_id")
+                    supabase, product_id, assigned_wc_id, assigned_wc_info.get("operation_id"),
+                    master_data=master_data,
                 )
 
                 # Recalculate batch durations with this WC's productivity
@@ -1510,23 +1680,10 @@ async def generate_cascade_schedules(
 
                 # Combine existing + new, recalculate queue
                 all_schedules_wc = [{**s} for s in existing_schedules] + assigned_batches
-                if is_hybrid:
-                    recalculated = recalculate_queue_times_hybrid(
-                        all_schedules_wc, blocked_periods or None
-                    )
-                else:
-                    recalculated = recalculate_queue_times(
-                        all_schedules_wc, blocked_periods or None
-                    )
+                queue = QueueColumns(all_schedules_wc, blocked_periods or None, is_hybrid=is_hybrid)
 
                 # Four-phase update for this WC via single RPC
-                existing_to_update = [
-                    s for s in recalculated
-                    if s.get("is_existing") and (
-                        s["new_start_date"] != s["start_date"] or
-                        s["new_end_date"] != s["end_date"]
-                    )
-                ]
+                existing_to_update = queue.moved_existing()
 
                 parking_zone_base = query_end or week_end_datetime
                 parking_zone_start = parking_zone_base + timedelta(days=30)
@@ -1535,65 +1692,69 @@ async def generate_cascade_schedules(
                 # Prepare new schedule data
                 assigned_wc_batches: List[BatchInfo] = []
                 multi_wc_bulk_insert = []
-                for schedule in recalculated:
-                    if not schedule.get("is_existing"):
-                        batch_start = schedule["new_start_date"]
-                        batch_end = schedule["new_end_date"]
-                        batch_number = schedule["batch_number"]
-                        batch_size_val = schedule["batch_size"]
-                        batch_dur = schedule["duration_minutes"]
-
-                        schedule_data = {
-                            "production_order_number": production_order_number,
-                            "resource_id": assigned_wc_id,
-                            "product_id": product_id,
-                            "quantity": int(batch_size_val),
-                            "start_date": batch_start.isoformat(),
-                            "end_date": batch_end.isoformat(),
-                            "cascade_level": cascade_level,
-                            "cascade_source_id": schedule["cascade_source_id"],
-                            "batch_number": batch_number,
-                            "total_batches": num_batches,
-                            "batch_size": float(batch_size_val),
-                            "status": "scheduled",
-                            "produced_for_order_number": produced_for_order_number,
-                            "cascade_type": "backward" if produced_for_order_number else "forward",
-                        }
-
-                        if week_plan_id:
-                            schedule_data["week_plan_id"] = week_plan_id
-
-                        schedule_id = str(uuid.uuid4()) if create_in_db else f"preview-{assigned_wc_id}-{batch_number}"
-                        schedule_data["id"] = schedule_id
-                        if create_in_db:
-                            multi_wc_bulk_insert.append(schedule_data)
-
-                        multi_wc_created_schedules.append(schedule_data)
-
-                        if wc_earliest_start is None or batch_start < wc_earliest_start:
-                            wc_earliest_start = batch_start
-                        if wc_latest_end is None or batch_end > wc_latest_end:
-                            wc_latest_end = batch_end
-                        if batch_end > cascade_end:
-                            cascade_end = batch_end
-
-                        batch_info = BatchInfo(
-                            batch_number=batch_number,
-                            batch_size=float(batch_size_val),
-                            start_date=batch_start,
-                            end_date=batch_end,
-                            work_center_id=assigned_wc_id,
-                            work_center_name=assigned_wc_name,
-                            cascade_level=cascade_level,
-                            processing_type=processing_type,
-                            duration_minutes=batch_dur,
-                        )
-                        assigned_wc_batches.append(batch_info)
-                        all_batches.append(batch_info)
-
-                # Execute four-phase via single RPC call
-                if create_in_db and (multi_wc_bulk_insert or existing_to_update):
-                    cascade_bulk_upsert(
+                for schedule in queue.new_schedules():
+                    batch_start = schedule["new_start_date"]
+                    batch_end = schedule["new_end_date"]
+                    batch_number = schedule["batch_number"]
+                    batch_size_val = schedule["batch_size"]
+                    batch_dur = schedule["duration_minutes"]
+
+                    schedule_data = {
+                        "production_order_number": production_order_number,
+                        "resource_id": assigned_wc_id,
+                        "product_id": product_id,
+                        "quantity": int(batch_size_val),
+                        "start_date": batch_start.isoformat(),
+                        "end_date": batch_end.isoformat(),
+                        "cascade_level": cascade_level,
+                        "cascade_source_id": schedule["cascade_source_id"],
+                        "batch_number": batch_number,
+                        "total_batches": num_batches,
+                        "batch_size": float(batch_size_val),
+                        "status": "scheduled",
+                        "produced_for_order_number": produced_for_order_number,
+                        "cascade_type": "backward" if produced_for_order_number else "forward",
+                    }
+
+                    if week_plan_id:
+                        schedule_data["week_plan_id"] = week_plan_id
+
+                    schedule_id = str(uuid.uuid4()) if (create_in_db or planning_context) else f"preview-{assigned_wc_id}-{batch_number}"
+                    schedule_data["id"] = schedule_id
+                    multi_wc_bulk_insert.append(schedule_data)
+
+                    multi_wc_created_schedules.append(schedule_data)
+
+                    if wc_earliest_start is None or batch_start < wc_earliest_start:
+                        wc_earliest_start = batch_start
+                    if wc_latest_end is None or batch_end > wc_latest_end:
+                        wc_latest_end = batch_end
+                    if batch_end > cascade_end:
+                        cascade_end = batch_end
+
+                    batch_info = BatchInfo(
+                        batch_number=batch_number,
+                        batch_size=float(batch_size_val),
+                        start_date=batch_start,
+                        end_date=batch_end,
+                        work_center_id=assigned_wc_id,
+                        work_center_name=assigned_wc_name,
+                        cascade_level=cascade_level,
+                        processing_type=processing_type,
+                        duration_minutes=batch_dur,
+                    )
+                    assigned_wc_batches.append(batch_info)
+                    all_batches.append(batch_info)
+
+                # Execute four-phase via single RPC call (or record it for the batch flush)
+                if planning_context is not None:
+                    planning_context.apply_queue(existing_to_update)
+                    planning_context.add_schedules(multi_wc_bulk_insert)
+                    if create_in_db:
+                        total_schedules_created += len(multi_wc_bulk_insert)
+                elif create_in_db and (multi_wc_bulk_insert or existing_to_update):
+                    await run_blocking(
+                        cascade_bulk_upsert,
                         supabase,
                         schedules_to_park=existing_to_update,
                         schedules_to_insert=multi_wc_bulk_insert,
@@ -1625,8 +1786,8 @@ async def generate_cascade_schedules(
 
         elif (not is_parallel) and week_start_datetime and week_end_datetime:
             # Get existing schedules with their arrival times
-            existing_schedules = await get_existing_schedules_with_arrival(
-                supabase, wc_id, query_start, query_end
+            existing_schedules = await get_work_center_queue(
+                supabase, wc_id, query_start, query_end, planning_context
             )
             logger.info(f"Work center {wc_name} has {len(existing_schedules)} existing schedules")
 
@@ -1669,31 +1830,23 @@ async def generate_cascade_schedules(
                 })
 
             # Fetch blocked shifts for this work center
-            wc_blocked_periods = await get_blocked_shifts(
-                supabase, wc_id, query_start, query_end
+            wc_blocked_periods = await get_work_center_blocked_periods(
+                supabase, wc_id, query_start, query_end, planning_context
             )
             if wc_blocked_periods:
                 logger.info(f"Work center {wc_name} has {len(wc_blocked_periods)} blocked periods")
 
             # Combine existing and new, then recalculate
+            # HYBRID: per-reference queue (different references run in parallel)
+            # SEQUENTIAL: global FIFO queue
             all_schedules = existing_schedules + new_batches
+            queue = QueueColumns(all_schedules, wc_blocked_periods or None, is_hybrid=is_hybrid)
             if is_hybrid:
-                # HYBRID: per-reference queue (different references run in parallel)
-                recalculated = recalculate_queue_times_hybrid(all_schedules, wc_blocked_periods or None)
                 logger.info(f"Work center {wc_name} using HYBRID mode - per-reference queue")
-            else:
-                # SEQUENTIAL: global FIFO queue
-                recalculated = recalculate_queue_times(all_schedules, wc_blocked_periods or None)
 
             # FOUR-PHASE UPDATE via single RPC call to avoid overlap constraint violations
             # and minimize DB round-trips (park -> insert -> move back in one call)
-            existing_to_update = [
-                s for s in recalculated
-                if s.get("is_existing") and (
-                    s["new_start_date"] != s["start_date"] or
-                    s["new_end_date"] != s["end_date"]
-                )
-            ]
+            existing_to_update = queue.moved_existing()
 
             parking_zone_base = query_end or week_end_datetime
             parking_zone_start = parking_zone_base + timedelta(days=30)
@@ -1701,67 +1854,71 @@ async def generate_cascade_schedules(
 
             # Prepare new schedule data
             bulk_insert_data = []
-            for schedule in recalculated:
-                if not schedule.get("is_existing"):
-                    batch_start = schedule["new_start_date"]
-                    batch_end = schedule["new_end_date"]
-                    batch_number = schedule["batch_number"]
-                    batch_size = schedule["batch_size"]
-                    batch_duration_minutes = schedule["duration_minutes"]
+            for schedule in queue.new_schedules():
+                batch_start = schedule["new_start_date"]
+                batch_end = schedule["new_end_date"]
+                batch_number = schedule["batch_number"]
+                batch_size = schedule["batch_size"]
+                batch_duration_minutes = schedule["duration_minutes"]
 
-                    schedule_data = {
-                        "production_order_number": production_order_number,
-                        "resource_id": wc_id,
-                        "product_id": product_id,
-                        "quantity": int(batch_size),
-                        "start_date": batch_start.isoformat(),
-                        "end_date": batch_end.isoformat(),
-                        "cascade_level": cascade_level,
-                        "cascade_source_id": schedule["cascade_source_id"],
-                        "batch_number": batch_number,
-                        "total_batches": num_batches,
-                        "batch_size": float(batch_size),
-                        "status": "scheduled",
-                        "produced_for_order_number": produced_for_order_number,
-                        "cascade_type": "backward" if produced_for_order_number else "forward",
-                    }
+                schedule_data = {
+                    "production_order_number": production_order_number,
+                    "resource_id": wc_id,
+                    "product_id": product_id,
+                    "quantity": int(batch_size),
+                    "start_date": batch_start.isoformat(),
+                    "end_date": batch_end.isoformat(),
+                    "cascade_level": cascade_level,
+                    "cascade_source_id": schedule["cascade_source_id"],
+                    "batch_number": batch_number,
+                    "total_batches": num_batches,
+                    "batch_size": float(batch_size),
+                    "status": "scheduled",
+                    "produced_for_order_number": produced_for_order_number,
+                    "cascade_type": "backward" if produced_for_order_number else "forward",
+                }
 
-                    if week_plan_id:
-                        schedule_data["week_plan_id"] = week_plan_id
+                if week_plan_id:
+                    schedule_data["week_plan_id"] = week_plan_id
 
-                    schedule_id = str(uuid.uuid4()) if create_in_db else f"preview-{wc_id}-{batch_number}"
-                    schedule_data["id"] = schedule_id
-                    if create_in_db:
-                        bulk_insert_data.append(schedule_data)
+                schedule_id = str(uuid.uuid4()) if (create_in_db or planning_context) else f"preview-{wc_id}-{batch_number}"
+                schedule_data["id"] = schedule_id
+                bulk_insert_data.append(schedule_data)
 
-                    current_batch_schedules.append(schedule_data)
+                current_batch_schedules.append(schedule_data)
 
-                    # Track earliest/latest
-                    if wc_earliest_start is None or batch_start < wc_earliest_start:
-                        wc_earliest_start = batch_start
-                    if wc_latest_end is None or batch_end > wc_latest_end:
-                        wc_latest_end = batch_end
-                    if batch_end > cascade_end:
-                        cascade_end = batch_end
+                # Track earliest/latest
+                if wc_earliest_start is None or batch_start < wc_earliest_start:
+                    wc_earliest_start = batch_start
+                if wc_latest_end is None or batch_end > wc_latest_end:
+                    wc_latest_end = batch_end
+                if batch_end > cascade_end:
+                    cascade_end = batch_end
 
-                    # Create BatchInfo
-                    batch_info = BatchInfo(
-                        batch_number=batch_number,
-                        batch_size=float(batch_size),
-                        start_date=batch_start,
-                        end_date=batch_end,
-                        work_center_id=wc_id,
-                        work_center_name=wc_name,
-                        cascade_level=cascade_level,
-                        processing_type=processing_type,
-                        duration_minutes=batch_duration_minutes,
-                    )
-                    wc_batches.append(batch_info)
-                    all_batches.append(batch_info)
+                # Create BatchInfo
+                batch_info = BatchInfo(
+                    batch_number=batch_number,
+                    batch_size=float(batch_size),
+                    start_date=batch_start,
+                    end_date=batch_end,
+                    work_center_id=wc_id,
+                    work_center_name=wc_name,
+                    cascade_level=cascade_level,
+                    processing_type=processing_type,
+                    duration_minutes=batch_duration_minutes,
+                )
+                wc_batches.append(batch_info)
+                all_batches.append(batch_info)
 
-            # Execute four-phase in single RPC call
-            if create_in_db and (bulk_insert_data or existing_to_update):
-                cascade_bulk_upsert(
+            # Execute four-phase in single RPC call (or record it for the batch flush)
+            if planning_context is not None:
+                planning_context.apply_queue(existing_to_update)
+                planning_context.add_schedules(bulk_insert_data)
+                if create_in_db:
+                    total_schedules_created += len(bulk_insert_data)
+            elif create_in_db and (bulk_insert_data or existing_to_update):
+                await run_blocking(
+                    cascade_bulk_upsert,
                     supabase,
                     schedules_to_park=existing_to_update,
                     schedules_to_insert=bulk_insert_data,
@@ -1778,8 +1935,8 @@ async def generate_cascade_schedules(
             # Fetch blocked shifts for this work center
             wc_blocked_periods_par = []
             if week_start_datetime and week_end_datetime:
-                wc_blocked_periods_par = await get_blocked_shifts(
-                    supabase, wc_id, query_start, query_end
+                wc_blocked_periods_par = await get_work_center_blocked_periods(
+                    supabase, wc_id, query_start, query_end, planning_context
                 )
                 if wc_blocked_periods_par:
                     logger.info(f"Work center {wc_name} (parallel/source) has {len(wc_blocked_periods_par)} blocked periods")
@@ -1846,10 +2003,9 @@ async def generate_cascade_schedules(
                 if week_plan_id:
                     schedule_data["week_plan_id"] = week_plan_id
 
-                schedule_id = str(uuid.uuid4()) if create_in_db else f"preview-{wc_id}-{batch_number}"
+                schedule_id = str(uuid.uuid4()) if (create_in_db or planning_context) else f"preview-{wc_id}-{batch_number}"
                 schedule_data["id"] = schedule_id
-                if create_in_db:
-                    par_bulk_insert.append(schedule_data)
+                par_bulk_insert.append(schedule_data)
 
                 current_batch_schedules.append(schedule_data)
 
@@ -1869,10 +2025,14 @@ async def generate_cascade_schedules(
                 all_batches.append(batch_info)
 
             # Bulk insert all parallel/source schedules
-            if create_in_db and par_bulk_insert:
-                supabase.schema("produccion").table(
+            if planning_context is not None:
+                planning_context.add_schedules(par_bulk_insert)
+                if create_in_db:
+                    total_schedules_created += len(par_bulk_insert)
+            elif create_in_db and par_bulk_insert:
+                await run_blocking(supabase.schema("produccion").table(
                     "production_schedules"
-                ).insert(par_bulk_insert).execute()
+                ).insert(par_bulk_insert).execute)
                 total_schedules_created += len(par_bulk_insert)
 
         # Store work center schedule (single WC paths only - multi-WC stores its own)
@@ -1907,6 +2067,169 @@ async def generate_cascade_schedules(
     }
 
 
+def get_last_batch_start(result: Dict[str, Any], work_center_id: str) -> Optional[datetime]:
+    """Start of the highest-numbered batch a cascade result placed in a work center."""
+    last_batch = None
+    for batch in result["all_batches"]:
+        if batch.work_center_id != work_center_id:
+            continue
+        if last_batch is None or batch.batch_number > last_batch.batch_number:
+            last_batch = batch
+    return last_batch.start_date if last_batch else None
+
+
+async def create_cascade_with_dependencies(
+    supabase,
+    request: CreateCascadeRequest,
+    master_data: CascadeMasterData,
+    planning_context: Optional[CascadePlanningContext] = None,
+) -> Dict[str, Any]:
+    """Create the PT cascade of a request plus the backward cascades of its PPs.
+
+    With a planning_context nothing is written: schedules are recorded in the
+    context and a PP cascade that fails is rolled back from it.
+    """
+    # Get product with lote_minimo
+    product = master_data.get_product(request.product_id)
+    if not product:
+        raise HTTPException(404, f"Product {request.product_id} not found")
+
+    # Reject circular PP dependencies before creating anything
+    if master_data.bom_graph is not None:
+        cycle = master_data.bom_graph.find_cycle_from(request.product_id)
+        if cycle:
+            raise HTTPException(
+                400, f"Circular PP dependency in BOM: {master_data.bom_graph.describe_cycle(cycle)}"
+            )
+
+    lote_minimo = float(product.get("lote_minimo") or 100)
+
+    # Get production route - this defines ALL work centers for the cascade
+    production_route = await get_product_route(supabase, request.product_id, master_data)
+
+    if not production_route:
+        raise HTTPException(
+            400,
+            f"No production route defined for product {product['name']}. "
+            "Please configure production routes first."
+        )
+
+    # Log the route being used
+    route_names = [step.get("work_center", {}).get("name", "?") for step in production_route]
+    logger.info(f"Using production route: {' -> '.join(route_names)}")
+
+    # Calculate week boundaries (Saturday 22:00 to Saturday 22:00)
+    week_start, week_end = get_production_week(request.start_datetime)
+
+    # Calculate expanded context window for cross-week visibility
+    context_start, context_end = calculate_context_window(week_start, week_end)
+
+    # Generate cascade schedules (starts from first work center in route)
+    result = await generate_cascade_schedules(
+        supabase=supabase,
+        product_id=request.product_id,
+        product_name=product["name"],
+        start_datetime=request.start_datetime,
+        duration_hours=request.duration_hours,
+        staff_count=request.staff_count,
+        lote_minimo=lote_minimo,
+        production_route=production_route,
+        create_in_db=True,
+        week_plan_id=request.week_plan_id,
+        week_start_datetime=week_start,
+        week_end_datetime=week_end,
+        context_start_datetime=context_start,
+        context_end_datetime=context_end,
+        master_data=master_data,
+        planning_context=planning_context,
+    )
+
+    logger.info(
+        f"Created cascade order #{result['production_order_number']} "
+        f"with {result['schedules_created']} schedules"
+    )
+
+    # After PT cascade is created, check for PP dependencies
+    pp_ingredients = await get_pp_ingredients(supabase, request.product_id, master_data)
+
+    pp_cascades = []
+    if pp_ingredients:
+        logger.info(f"Found {len(pp_ingredients)} PP ingredients, generating backward cascades")
+
+        # ACTUAL start_date of the last batch of PT's first work center
+        # This is more accurate than calculating with uniform distribution
+        pt_last_batch_start_actual = get_last_batch_start(
+            result, production_route[0]["work_center_id"]
+        )
+        if pt_last_batch_start_actual:
+            logger.info(f"PT last batch (first WC) actual start: {pt_last_batch_start_actual}")
+
+        for pp_material in pp_ingredients:
+            checkpoint = planning_context.checkpoint() if planning_context else None
+            try:
+                # Calculate required PP quantity (total for all PT batches)
+                required_pp_quantity = calculate_pp_quantity(
+                    result["total_units"], pp_material["quantity_needed"]
+                )
+
+                # Get rest time from BOM
+                bom_rest_time_hours = float(pp_material.get("tiempo_reposo_horas") or 0)
+
+                logger.info(
+                    f"Creating backward cascade for PP {pp_material['material']['name']}, "
+                    f"qty {required_pp_quantity}"
+                )
+
+                # Generate recursive backward cascade for this PP
+                pp_cascade_results = await generate_backward_cascade_recursive(
+                    supabase=supabase,
+                    pp_material_id=pp_material["material"]["id"],
+                    required_quantity=required_pp_quantity,
+                    parent_start_datetime=request.start_datetime,
+                    parent_duration_hours=request.duration_hours,
+                    parent_staff_count=request.staff_count,
+                    parent_lote_minimo=lote_minimo,
+                    parent_total_units=result["total_units"],
+                    bom_rest_time_hours=bom_rest_time_hours,
+                    create_in_db=True,
+                    week_start_datetime=week_start,
+                    week_end_datetime=week_end,
+                    produced_for_order_number=result["production_order_number"],
+                    week_plan_id=request.week_plan_id,
+                    parent_last_batch_start_actual=pt_last_batch_start_actual,
+                    context_start_datetime=context_start,
+                    context_end_datetime=context_end,
+                    master_data=master_data,
+                    planning_context=planning_context,
+                )
+                pp_cascades.extend(pp_cascade_results)
+
+                logger.info(
+                    f"Successfully created backward cascade for PP {pp_material['material']['name']}"
+                )
+
+            except Exception as e:
+                if checkpoint is not None:
+                    planning_context.rollback(checkpoint)
+                logger.warning(
+                    f"Failed to create PP cascade for {pp_material['material']['name']}: {e}",
+                    exc_info=True
+                )
+                # Continue with other PPs even if one fails
+
+    # Include PP cascade info in response
+    result["pp_dependencies"] = pp_cascades
+    return result
+
+
+def invalidate_preview_inputs() -> None:
+    """Drop cached preview inputs after production_schedules were written."""
+    # preview_engine imports this module, so import it lazily
+    from .preview_engine import invalidate_cascade_preview_inputs
+
+    invalidate_cascade_preview_inputs()
+
+
 @router.post("/create", response_model=CascadeScheduleResponse)
 async def create_cascade_production(
     request: CreateCascadeRequest,
@@ -1927,154 +2250,126 @@ async def create_cascade_production(
     user_id = get_user_id_from_token(authorization)
 
     try:
-        # Get product with lote_minimo
-        product_result = supabase.table("products").select(
-            "id, name, lote_minimo"
-        ).eq("id", request.product_id).single().execute()
-
-        if not product_result.data:
-            raise HTTPException(404, f"Product {request.product_id} not found")
+        # Load routes/productivity/BOM for the PT and all its PPs in bulk
+        master_data = await run_blocking(get_cascade_master_data, supabase, request.product_id)
 
-        product = product_result.data
-        lote_minimo = float(product.get("lote_minimo") or 100)
+        result = await create_cascade_with_dependencies(supabase, request, master_data)
+        invalidate_preview_inputs()
+        return CascadeScheduleResponse(**result)
 
-        # Get production route - this defines ALL work centers for the cascade
-        production_route = await get_product_route(supabase, request.product_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Failed to create cascade production")
+        raise HTTPException(500, f"Failed to create cascade: {str(e)}")
 
-        if not production_route:
-            raise HTTPException(
-                400,
-                f"No production route defined for product {product['name']}. "
-                "Please configure production routes first."
-            )
 
-        # Log the route being used
-        route_names = [step.get("work_center", {}).get("name", "?") for step in production_route]
-        logger.info(f"Using production route: {' -> '.join(route_names)}")
+@router.post("/create-batch", response_model=CascadeBatchResponse)
+async def create_cascade_batch(
+    request: CreateCascadeBatchRequest,
+    authorization: Optional[str] = Header(None),
+):
+    """
+    Create many cascades (e.g. a whole week plan) in one call.
 
-        # Calculate week boundaries (Saturday 22:00 to Saturday 22:00)
-        # Production week starts Saturday at 22:00 (T1 of Sunday starts then)
-        start_dt = request.start_datetime
-        if start_dt.tzinfo is not None:
-            start_dt = start_dt.replace(tzinfo=None)
-        # Find the Saturday at 22:00 that starts this week
-        # weekday(): Monday=0, Saturday=5, Sunday=6
-        days_since_saturday = (start_dt.weekday() - 5) % 7  # Days since last Saturday
-        week_start = start_dt - timedelta(days=days_since_saturday)
-        week_start = week_start.replace(hour=22, minute=0, second=0, microsecond=0)
-        # If start_datetime is before 22:00 on Saturday, go back to previous Saturday
-        if start_dt < week_start:
-            week_start = week_start - timedelta(days=7)
-        week_end = week_start + timedelta(days=7)
+    Master data for every product is loaded once, existing schedules and
+    blocked shifts of all their work centers in one RPC, and the cascades are planned in
+    memory in start_datetime order (input order on ties), each one seeing
+    the queues left by the previous ones. Production order numbers for every
+    cascade and PP cascade are reserved in one RPC. All inserts and queue
+    moves are then persisted with a single cascade_bulk_upsert_batch RPC.
 
-        # Calculate expanded context window for cross-week visibility
-        context_start, context_end = calculate_context_window(week_start, week_end)
+    An item that fails is rolled back from the plan and reported with its
+    error; the rest are still created. Results keep the input order.
+    """
+    logger.info(f"Creating cascade batch with {len(request.items)} items")
+    supabase = get_supabase_client()
+    user_id = get_user_id_from_token(authorization)
 
-        # Generate cascade schedules (starts from first work center in route)
-        result = await generate_cascade_schedules(
-            supabase=supabase,
-            product_id=request.product_id,
-            product_name=product["name"],
-            start_datetime=request.start_datetime,
-            duration_hours=request.duration_hours,
-            staff_count=request.staff_count,
-            lote_minimo=lote_minimo,
-            production_route=production_route,
-            create_in_db=True,
-            week_plan_id=request.week_plan_id,
-            week_start_datetime=week_start,
-            week_end_datetime=week_end,
-            context_start_datetime=context_start,
-            context_end_datetime=context_end,
+    try:
+        bom_graph = await run_blocking(get_bom_graph, supabase)
+        master_data = await run_blocking(
+            load_cascade_master_data, supabase, [item.product_id for item in request.items], bom_graph
         )
 
-        logger.info(
-            f"Created cascade order #{result['production_order_number']} "
-            f"with {result['schedules_created']} schedules"
+        # One context window covering every item's week
+        windows = [
+            calculate_context_window(*get_production_week(item.start_datetime))
+            for item in request.items
+        ]
+        planning_context = CascadePlanningContext(
+            window_start=min(w[0] for w in windows),
+            window_end=max(w[1] for w in windows),
+            rest_lookup=master_data.get_arrival_rest_hours,
+        )
+        # Order numbers for every cascade and PP cascade of the batch, in one round-trip
+        orders_per_product = {
+            product_id: master_data.count_cascade_orders(product_id)
+            for product_id in {item.product_id for item in request.items}
+        }
+        planning_context.reserve_order_numbers(await run_blocking(
+            reserve_production_order_numbers, supabase,
+            sum(orders_per_product[item.product_id] for item in request.items),
+        ))
+        # Queues and blocked shifts of every WC the cascades can use, in one round-trip
+        await get_work_center_queues(
+            supabase, list(master_data.work_centers), planning_context.window_start,
+            planning_context.window_end, planning_context,
         )
 
-        # NEW: After PT cascade is created, check for PP dependencies
-        pp_ingredients = await get_pp_ingredients(supabase, request.product_id)
-
-        pp_cascades = []
-        if pp_ingredients:
-            logger.info(f"Found {len(pp_ingredients)} PP ingredients, generating backward cascades")
-
-            # Get the ACTUAL start_date of the last batch of PT's first work center
-            # This is more accurate than calculating with uniform distribution
-            first_wc_id = production_route[0]["work_center_id"]
-            pt_last_batch_query = supabase.schema("produccion").table("production_schedules").select(
-                "start_date, batch_number"
-            ).eq(
-                "production_order_number", result["production_order_number"]
-            ).eq(
-                "resource_id", first_wc_id
-            ).order("batch_number", desc=True).limit(1).execute()
-
-            pt_last_batch_start_actual = None
-            if pt_last_batch_query.data:
-                pt_last_batch_start_str = pt_last_batch_query.data[0]["start_date"]
-                pt_last_batch_start_actual = parse_datetime_str(pt_last_batch_start_str)
-                logger.info(f"PT last batch (first WC) actual start: {pt_last_batch_start_actual}")
-
-            for pp_material in pp_ingredients:
-                try:
-                    # Calculate required PP quantity (total for all PT batches)
-                    required_pp_quantity = calculate_pp_quantity(
-                        result["total_units"], pp_material["quantity_needed"]
-                    )
-
-                    # Get rest time from BOM
-                    bom_rest_time_hours = float(pp_material.get("tiempo_reposo_horas") or 0)
-
-                    logger.info(
-                        f"Creating backward cascade for PP {pp_material['material']['name']}, "
-                        f"qty {required_pp_quantity}"
-                    )
-
-                    # Generate recursive backward cascade for this PP
-                    pp_cascade_results = await generate_backward_cascade_recursive(
-                        supabase=supabase,
-                        pp_material_id=pp_material["material"]["id"],
-                        required_quantity=required_pp_quantity,
-                        parent_start_datetime=request.start_datetime,
-                        parent_duration_hours=request.duration_hours,
-                        parent_staff_count=request.staff_count,
-                        parent_lote_minimo=lote_minimo,
-                        parent_total_units=result["total_units"],
-                        bom_rest_time_hours=bom_rest_time_hours,
-                        create_in_db=True,
-                        week_start_datetime=week_start,
-                        week_end_datetime=week_end,
-                        produced_for_order_number=result["production_order_number"],
-                        week_plan_id=request.week_plan_id,
-                        parent_last_batch_start_actual=pt_last_batch_start_actual,
-                        context_start_datetime=context_start,
-                        context_end_datetime=context_end,
-                    )
-                    pp_cascades.extend(pp_cascade_results)
-
-                    logger.info(
-                        f"Successfully created backward cascade for PP {pp_material['material']['name']}"
-                    )
-
-                except Exception as e:
-                    logger.warning(
-                        f"Failed to create PP cascade for {pp_material['material']['name']}: {e}",
-                        exc_info=True
-                    )
-                    # Continue with other PPs even if one fails
+        def planning_order(index: int):
+            start = request.items[index].start_datetime
+            return (start.replace(tzinfo=None) if start.tzinfo else start, index)
+
+        results: Dict[int, CascadeBatchItemResult] = {}
+        for index in sorted(range(len(request.items)), key=planning_order):
+            item = request.items[index]
+            checkpoint = planning_context.checkpoint()
+            try:
+                result = await create_cascade_with_dependencies(
+                    supabase, item, master_data, planning_context
+                )
+                results[index] = CascadeBatchItemResult(
+                    index=index,
+                    product_id=item.product_id,
+                    result=CascadeScheduleResponse(**result),
+                )
+            except Exception as e:
+                planning_context.rollback(checkpoint)
+                logger.warning(f"Cascade batch item {index} ({item.product_id}) failed: {e}")
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                results[index] = CascadeBatchItemResult(
+                    index=index, product_id=item.product_id, error=str(detail)
+                )
 
-        # Include PP cascade info in response
-        result["pp_dependencies"] = pp_cascades
+        schedules_to_insert = planning_context.pending_inserts()
+        schedules_to_move = planning_context.pending_moves()
+        if schedules_to_insert or schedules_to_move:
+            await run_blocking(
+                cascade_bulk_upsert_batch,
+                supabase,
+                schedules_to_move=schedules_to_move,
+                schedules_to_insert=schedules_to_insert,
+                parking_zone_start=planning_context.window_end + timedelta(days=30),
+                parking_zone_end=planning_context.window_end + timedelta(days=32),
+            )
+        invalidate_preview_inputs()
+        logger.info(
+            f"Cascade batch flushed: inserted {len(schedules_to_insert)}, "
+            f"moved {len(schedules_to_move)}"
+        )
 
-        return CascadeScheduleResponse(**result)
+        return CascadeBatchResponse(
+            items=[results[index] for index in range(len(request.items))],
+            schedules_created=len(schedules_to_insert),
+            schedules_moved=len(schedules_to_move),
+        )
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.exception("Failed to create cascade production")
-        raise HTTPException(500, f"Failed to create cascade: {str(e)}")
+        logger.exception("Failed to create cascade batch")
+        raise HTTPException(500, f"Failed to create cascade batch: {str(e)}")
 
 
 @router.post("/preview", response_model=CascadePreviewResponse)
@@ -2084,58 +2379,44 @@ async def preview_cascade_production(request: CascadePreviewRequest):
 
     Returns what schedules would be created, allowing the user
     to validate before committing.
+
+    Data is loaded up front (and cached for a few seconds per product and
+    week) and the cascade is computed in memory, so repeated previews while
+    dragging start times or staff counts do not hit the database.
     """
+    from .preview_engine import compute_cascade_preview, get_cascade_preview_inputs
+
     logger.info(f"Previewing cascade for product {request.product_id}")
     supabase = get_supabase_client()
 
     try:
-        # Get product
-        product_result = supabase.table("products").select(
-            "id, name, lote_minimo"
-        ).eq("id", request.product_id).single().execute()
+        master_data = await run_blocking(get_cascade_master_data, supabase, request.product_id)
 
-        if not product_result.data:
+        # Get product
+        product = master_data.get_product(request.product_id)
+        if not product:
             raise HTTPException(404, f"Product {request.product_id} not found")
 
-        product = product_result.data
-        lote_minimo = float(product.get("lote_minimo") or 100)
-
-        # Get production route
-        production_route = await get_product_route(supabase, request.product_id)
-
-        warnings = []
-        if not production_route:
-            warnings.append("No production route defined - using default single work center")
-
         # Calculate week boundaries (Saturday 22:00 to Saturday 22:00)
-        start_dt = request.start_datetime
-        if start_dt.tzinfo is not None:
-            start_dt = start_dt.replace(tzinfo=None)
-        days_since_saturday = (start_dt.weekday() - 5) % 7
-        week_start = start_dt - timedelta(days=days_since_saturday)
-        week_start = week_start.replace(hour=22, minute=0, second=0, microsecond=0)
-        if start_dt < week_start:
-            week_start = week_start - timedelta(days=7)
-        week_end = week_start + timedelta(days=7)
+        week_start, week_end = get_production_week(request.start_datetime)
 
         # Calculate expanded context window for cross-week visibility
         context_start, context_end = calculate_context_window(week_start, week_end)
 
-        # Generate preview (no DB insert)
-        result = await generate_cascade_schedules(
-            supabase=supabase,
-            product_id=request.product_id,
-            product_name=product["name"],
+        inputs = await get_cascade_preview_inputs(
+            supabase, product, master_data, context_start, context_end
+        )
+
+        warnings = []
+        if not inputs.steps:
+            warnings.append("No production route defined - using default single work center")
+
+        # Generate preview (no DB access)
+        result = compute_cascade_preview(
+            inputs,
             start_datetime=request.start_datetime,
             duration_hours=request.duration_hours,
             staff_count=request.staff_count,
-            lote_minimo=lote_minimo,
-            production_route=production_route,
-            create_in_db=False,
-            week_start_datetime=week_start,
-            week_end_datetime=week_end,
-            context_start_datetime=context_start,
-            context_end_datetime=context_end,
         )
 
         return CascadePreviewResponse(
@@ -2157,6 +2438,41 @@ async def preview_cascade_production(request: CascadePreviewRequest):
         raise HTTPException(500, f"Failed to preview: {str(e)}")
 
 
+@router.post("/staffing/invalidate")
+async def invalidate_staffing(date: Optional[str] = None):
+    """
+    Drop the cached work center staffing calendar.
+
+    Call after editing work_center_staffing so multi-WC distribution sees
+    the change before the cache TTL expires. With date (YYYY-MM-DD) only
+    that production week is dropped, otherwise every week.
+    """
+    try:
+        shift_date = datetime.strptime(date, "%Y-%m-%d").date() if date else None
+    except ValueError:
+        raise HTTPException(400, f"Invalid date: {date}")
+    removed = invalidate_staffing_calendar(shift_date)
+    logger.info(f"Invalidated {removed} staffing calendars (date={date})")
+    return {"invalidated": removed}
+
+
+@router.post("/master-data/invalidate")
+async def invalidate_master_data(product_id: Optional[str] = None):
+    """
+    Drop cached cascade master data (routes, productivity, BOM, products).
+
+    Call after editing production routes, productivity or BOMs so the next
+    cascade sees the change before the cache TTL expires. Without product_id
+    every snapshot is dropped. The BOM graph and the cached preview inputs
+    (built from these routes) are always reloaded.
+    """
+    invalidate_bom_graph()
+    invalidate_preview_inputs()
+    removed = invalidate_cascade_master_data(product_id)
+    logger.info(f"Invalidated {removed} cascade master data snapshots (product={product_id})")
+    return {"invalidated": removed}
+
+
 @router.get("/order/{order_number}", response_model=ProductionOrderDetail)
 async def get_cascade_order(order_number: int):
     """
@@ -2169,10 +2485,10 @@ async def get_cascade_order(order_number: int):
 
     try:
         # Use the RPC function
-        result = supabase.schema("produccion").rpc(
+        result = await run_blocking(supabase.schema("produccion").rpc(
             "get_production_order_schedules",
             {"p_order_number": order_number}
-        ).execute()
+        ).execute)
 
         if not result.data:
             raise HTTPException(404, f"Production order #{order_number} not found")
@@ -2244,7 +2560,7 @@ async def delete_cascade_order(
                         orders_to_delete.append(pp_order_num)
 
         # First collect all PP dependencies (deepest first)
-        collect_pp_dependencies(order_number)
+        await run_blocking(collect_pp_dependencies, order_number)
         # Then add the PT order itself (deleted last)
         orders_to_delete.append(order_number)
 
@@ -2255,21 +2571,22 @@ async def delete_cascade_order(
         for order_num in orders_to_delete:
             # Nullify cascade_source_id references within this order first
             # to avoid FK constraint issues between batches of the same order
-            supabase.schema("produccion").table("production_schedules").update(
+            await run_blocking(supabase.schema("produccion").table("production_schedules").update(
                 {"cascade_source_id": None}
             ).eq(
                 "production_order_number", order_num
-            ).execute()
+            ).execute)
 
-            result = supabase.schema("produccion").rpc(
+            result = await run_blocking(supabase.schema("produccion").rpc(
                 "delete_production_order",
                 {"order_number": order_num}
-            ).execute()
+            ).execute)
 
             deleted_count = result.data if result.data else 0
             total_deleted += deleted_count
             logger.info(f"Deleted {deleted_count} schedules for order #{order_num}")
 
+        invalidate_preview_inputs()
         if total_deleted == 0:
             raise HTTPException(404, f"Production order #{order_number} not found or already deleted")
 
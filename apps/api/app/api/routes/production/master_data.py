@@ -0,0 +1,323 @@
+"""In-memory master data snapshot for the production cascade.
+
+The cascade needs routes, productivity, BOM rest times and product info for
+every product it touches (the PT plus all PP reachable through its BOM).
+Fetching those row by row costs one or two PostgREST round-trips per work
+center and per batch. This module loads them in a handful of bulk queries
+and serves every lookup from indexed dicts.
+
+Snapshots are cached per root product with a TTL. Call
+invalidate_cascade_master_data() after editing routes, productivity or BOMs.
+"""
+
+import logging
+import time
+from typing import Optional, List, Dict, Iterable, Set, Tuple
+
+from .bom_graph import BOM_COLUMNS, PRODUCT_COLUMNS, BomGraph, get_bom_graph
+
+logger = logging.getLogger(__name__)
+
+# Snapshots older than this are reloaded on next access
+MASTER_DATA_TTL_SECONDS = 300
+
+# Safety limit for BOM traversal (same as backward cascade max_depth)
+MAX_BOM_DEPTH = 10
+
+
+class CascadeMasterData:
+    """Indexed routes, productivity, BOM and product data for a set of products.
+
+    Lookups mirror the semantics of the per-row query helpers in cascade.py
+    (get_product_route, get_productivity, get_rest_time_hours, ...).
+    """
+
+    def __init__(
+        self,
+        product_ids: Iterable[str],
+        products: List[dict],
+        routes: List[dict],
+        productivity: List[dict],
+        bom_rows: List[dict],
+        wc_mappings: Optional[List[dict]] = None,
+        bom_graph: Optional[BomGraph] = None,
+    ):
+        self.product_ids: Set[str] = set(product_ids)
+        self.loaded_at = time.monotonic()
+        self.bom_graph = bom_graph
+
+        self.products: Dict[str, dict] = {p["id"]: p for p in products}
+
+        # production_routes: active rows ordered by sequence, plus rest time per WC
+        self.work_centers: Dict[str, dict] = {}
+        self._routes: Dict[str, List[dict]] = {}
+        self._route_rest: Dict[Tuple[str, str], float] = {}
+        for row in routes:
+            wc = row.get("work_center")
+            if wc:
+                self.work_centers[row["work_center_id"]] = wc
+            key = (row["product_id"], row["work_center_id"])
+            if key not in self._route_rest:
+                self._route_rest[key] = float(row.get("tiempo_reposo_horas") or 0)
+            if row.get("is_active"):
+                self._routes.setdefault(row["product_id"], []).append(row)
+        for steps in self._routes.values():
+            steps.sort(key=lambda r: r.get("sequence_order") or 0)
+
+        # production_productivity: by (product, wc) first, then (product, operation)
+        self._productivity_by_wc: Dict[Tuple[str, str], dict] = {}
+        self._productivity_by_op: Dict[Tuple[str, str], dict] = {}
+        for row in productivity:
+            if row.get("work_center_id"):
+                self._productivity_by_wc.setdefault((row["product_id"], row["work_center_id"]), row)
+            if row.get("operation_id"):
+                self._productivity_by_op.setdefault((row["product_id"], row["operation_id"]), row)
+
+        # bill_of_materials: rest time per (product, operation), active rows per product
+        self._bom_rest: Dict[Tuple[str, str], float] = {}
+        self._bom_active: Dict[str, List[dict]] = {}
+        for row in bom_rows:
+            if row.get("operation_id") and row.get("tiempo_reposo_horas") is not None:
+                self._bom_rest.setdefault(
+                    (row["product_id"], row["operation_id"]), float(row["tiempo_reposo_horas"] or 0)
+                )
+            if row.get("is_active"):
+                self._bom_active.setdefault(row["product_id"], []).append(row)
+
+        # product_work_center_mapping: alternative WCs per (product, operation)
+        self._wc_mappings: Dict[Tuple[str, str], List[dict]] = {}
+        for row in (wc_mappings or []):
+            if row.get("work_center"):
+                self.work_centers.setdefault(row["work_center_id"], row["work_center"])
+            self._wc_mappings.setdefault((row["product_id"], row["operation_id"]), []).append(
+                {"work_center_id": row["work_center_id"], "work_center": row.get("work_center")}
+            )
+
+    def covers(self, product_id: str) -> bool:
+        """True if routes/productivity/BOM were loaded for this product."""
+        return product_id in self.product_ids
+
+    def is_expired(self, ttl_seconds: float = MASTER_DATA_TTL_SECONDS) -> bool:
+        return time.monotonic() - self.loaded_at > ttl_seconds
+
+    def get_product(self, product_id: str) -> Optional[dict]:
+        return self.products.get(product_id)
+
+    def get_product_route(self, product_id: str) -> List[dict]:
+        return self._routes.get(product_id, [])
+
+    def get_productivity(
+        self,
+        product_id: str,
+        work_center_id: str,
+        operation_id: Optional[str] = None,
+    ) -> Optional[dict]:
+        productivity = self._productivity_by_wc.get((product_id, work_center_id))
+        if productivity is None and operation_id:
+            productivity = self._productivity_by_op.get((product_id, operation_id))
+        return productivity
+
+    def get_rest_time_hours(self, product_id: str, operation_id: Optional[str]) -> float:
+        if not operation_id:
+            return 0
+        return self._bom_rest.get((product_id, operation_id), 0)
+
+    def get_rest_time_from_route(self, product_id: str, work_center_id: str) -> float:
+        return self._route_rest.get((product_id, work_center_id), 0)
+
+    def get_arrival_rest_hours(self, product_id: str, source_work_center_id: str) -> float:
+        """BOM rest time applied when a schedule arrives from a source WC.
+
+        Same rule get_existing_schedules_with_arrival uses: the BOM rest time
+        of the product for the source work center's operation.
+        """
+        source_wc = self.work_centers.get(source_work_center_id) or {}
+        return self.get_rest_time_hours(product_id, source_wc.get("operation_id"))
+
+    def get_pp_ingredients(self, product_id: str) -> List[dict]:
+        """Active BOM rows whose material is a PP, shaped like get_pp_ingredients()."""
+        pp_materials = []
+        for row in self._bom_active.get(product_id, []):
+            material = self.products.get(row["material_id"])
+            if material and material.get("category") == "PP":
+                pp_materials.append({
+                    "material_id": row["material_id"],
+                    "quantity_needed": row.get("quantity_needed"),
+                    "operation_id": row.get("operation_id"),
+                    "tiempo_reposo_horas": row.get("tiempo_reposo_horas"),
+                    "material": {
+                        "id": material["id"],
+                        "name": material.get("name"),
+                        "category": material.get("category"),
+                        "lote_minimo": material.get("lote_minimo"),
+                    },
+                })
+        return pp_materials
+
+    def get_alternative_work_centers(self, product_id: str, operation_id: str) -> List[dict]:
+        return self._wc_mappings.get((product_id, operation_id), [])
+
+    def count_cascade_orders(self, product_id: str, max_depth: int = MAX_BOM_DEPTH) -> int:
+        """Production orders a cascade of product_id creates at most.
+
+        One for the product plus one per backward PP cascade below it (a PP
+        reached through several paths is counted once per path, as the
+        backward cascade creates it once per path).
+        """
+        memo: Dict[Tuple[str, int], int] = {}
+
+        def pp_orders(pid: str, depth: int) -> int:
+            if depth > max_depth:
+                return 0
+            if (pid, depth) not in memo:
+                memo[(pid, depth)] = sum(
+                    1 + pp_orders(pp["material_id"], depth + 1)
+                    for pp in self.get_pp_ingredients(pid)
+                )
+            return memo[(pid, depth)]
+
+        return 1 + pp_orders(product_id, 0)
+
+
+def _fetch_products(supabase, product_ids: List[str]) -> List[dict]:
+    if not product_ids:
+        return []
+    result = supabase.table("products").select(PRODUCT_COLUMNS).in_("id", product_ids).execute()
+    return result.data or []
+
+
+def _closure_from_graph(
+    supabase, roots: List[str], bom_graph: BomGraph,
+) -> Tuple[List[str], Dict[str, dict], List[dict], int]:
+    """Closure, products and BOM rows straight from the BOM graph (no BOM queries)."""
+    closure = list(roots)
+    for pp_id in sorted(set().union(*(bom_graph.pp_closure(root) for root in roots)) - set(roots)):
+        closure.append(pp_id)
+    products = {pid: bom_graph.products[pid] for pid in closure if pid in bom_graph.products}
+    missing = [pid for pid in closure if pid not in products]
+    for product in _fetch_products(supabase, missing):
+        products[product["id"]] = product
+    bom_rows = [row for pid in closure for row in bom_graph.bom_rows(pid)]
+    return closure, products, bom_rows, 1 if missing else 0
+
+
+def load_cascade_master_data(
+    supabase,
+    root_product_ids: Iterable[str],
+    bom_graph: Optional[BomGraph] = None,
+) -> CascadeMasterData:
+    """Load master data for the given products and every PP reachable via BOM.
+
+    With a BomGraph the PP closure and BOM rows come from memory; otherwise
+    the BOM is walked one level at a time (two queries per level). Routes,
+    productivity and WC mappings are then fetched for the whole closure at once.
+    """
+    roots = list(dict.fromkeys(root_product_ids))
+    if bom_graph is not None:
+        closure, products, bom_rows, query_count = _closure_from_graph(supabase, roots, bom_graph)
+        return _load_closure_master_data(
+            supabase, closure, products, bom_rows, query_count, bom_graph
+        )
+
+    products: Dict[str, dict] = {p["id"]: p for p in _fetch_products(supabase, roots)}
+    visited: Set[str] = set(roots)
+    frontier = list(roots)
+    bom_rows: List[dict] = []
+    query_count = 1
+
+    for _ in range(MAX_BOM_DEPTH + 1):
+        if not frontier:
+            break
+        result = supabase.schema("produccion").table("bill_of_materials").select(
+            BOM_COLUMNS
+        ).in_("product_id", frontier).execute()
+        query_count += 1
+        level_rows = result.data or []
+        bom_rows.extend(level_rows)
+
+        missing = list({r["material_id"] for r in level_rows if r["material_id"] not in products})
+        for product in _fetch_products(supabase, missing):
+            products[product["id"]] = product
+        if missing:
+            query_count += 1
+
+        next_frontier = []
+        for row in level_rows:
+            material = products.get(row["material_id"])
+            if (row.get("is_active") and material and material.get("category") == "PP"
+                    and material["id"] not in visited):
+                visited.add(material["id"])
+                next_frontier.append(material["id"])
+        frontier = next_frontier
+
+    return _load_closure_master_data(supabase, list(visited), products, bom_rows, query_count)
+
+
+def _load_closure_master_data(
+    supabase,
+    closure: List[str],
+    products: Dict[str, dict],
+    bom_rows: List[dict],
+    query_count: int,
+    bom_graph: Optional[BomGraph] = None,
+) -> CascadeMasterData:
+    routes_result = supabase.schema("produccion").table("production_routes").select(
+        "*, work_center:work_centers(*)"
+    ).in_("product_id", closure).execute()
+
+    productivity_result = supabase.schema("produccion").table("production_productivity").select(
+        "*"
+    ).in_("product_id", closure).execute()
+
+    mapping_result = supabase.schema("produccion").table("product_work_center_mapping").select(
+        "product_id, operation_id, work_center_id, work_center:work_centers(*)"
+    ).in_("product_id", closure).execute()
+    query_count += 3
+
+    logger.info(
+        f"Loaded cascade master data for {len(closure)} products "
+        f"({len(bom_rows)} BOM rows) in {query_count} queries"
+    )
+
+    return CascadeMasterData(
+        product_ids=closure,
+        products=list(products.values()),
+        routes=routes_result.data or [],
+        productivity=productivity_result.data or [],
+        bom_rows=bom_rows,
+        wc_mappings=mapping_result.data or [],
+        bom_graph=bom_graph,
+    )
+
+
+# Process-level cache: root product_id -> snapshot
+_master_data_cache: Dict[str, CascadeMasterData] = {}
+
+
+def get_cascade_master_data(
+    supabase,
+    product_id: str,
+    ttl_seconds: float = MASTER_DATA_TTL_SECONDS,
+) -> CascadeMasterData:
+    """Get the cached snapshot for a product, loading it if missing or expired."""
+    snapshot = _master_data_cache.get(product_id)
+    if snapshot is None or snapshot.is_expired(ttl_seconds):
+        snapshot = load_cascade_master_data(supabase, [product_id], get_bom_graph(supabase))
+        _master_data_cache[product_id] = snapshot
+    return snapshot
+
+
+def invalidate_cascade_master_data(product_id: Optional[str] = None) -> int:
+    """Drop cached snapshots. With a product_id, only those that include it.
+
+    Returns the number of snapshots removed.
+    """
+    if product_id is None:
+        removed = len(_master_data_cache)
+        _master_data_cache.clear()
+        return removed
+
+    stale = [root for root, snap in _master_data_cache.items() if snap.covers(product_id)]
+    for root in stale:
+        del _master_data_cache[root]
+    return len(stale)
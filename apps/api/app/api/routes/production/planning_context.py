@@ -0,0 +1,255 @@
+"""In-memory planning context for scheduling several cascades together.
+
+A CascadePlanningContext holds the production_schedules of the work centers
+touched by a plan (for one context window) plus their blocked shifts. The
+cascade reads queues from it instead of querying per work center, and
+records its inserts and queue moves into it instead of writing. Later
+cascades in the same plan see earlier ones exactly as they would after a
+round-trip to the database, and everything is persisted at the end with a
+single cascade_bulk_upsert_batch RPC.
+
+Production order numbers can be reserved for the whole plan up front and
+handed out from the context. Checkpoints are positions in an undo log of the
+rows each change touched, so rolling back a failed cascade costs as much as
+that cascade did, not a copy of the whole plan.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .blocked_calendar import BlockedCalendar, as_blocked_calendar
+
+logger = logging.getLogger(__name__)
+
+# (product_id, source_work_center_id) -> BOM rest hours on arrival
+RestLookup = Callable[[str, str], float]
+
+# (undo log length, order numbers handed out)
+Checkpoint = Tuple[int, int]
+
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None) if value.tzinfo is not None else value
+    value = value.replace("+00:00", "").replace("Z", "")
+    return datetime.fromisoformat(value)
+
+
+class CascadePlanningContext:
+    """Schedules and blocked shifts of a planning window, updated in memory.
+
+    Schedules are kept in the shape returned by get_existing_schedules_with_arrival
+    (datetime start/end, is_existing=True). Arrival times are recomputed on
+    read from the current end of the source schedule, like a fresh load would.
+    """
+
+    def __init__(
+        self,
+        window_start: datetime,
+        window_end: datetime,
+        rest_lookup: Optional[RestLookup] = None,
+    ):
+        self.window_start = window_start
+        self.window_end = window_end
+        self._rest_lookup = rest_lookup
+
+        self._schedules: Dict[str, dict] = {}
+        self._wc_schedule_ids: Dict[str, List[str]] = {}
+        self._blocked: Dict[str, BlockedCalendar] = {}
+
+        # DB rows: id -> (start, end) as loaded, to diff at flush time
+        self._original_times: Dict[str, Tuple[datetime, datetime]] = {}
+        # New rows in creation order (sources always before dependents)
+        self._inserted_ids: List[str] = []
+        self._insert_rows: Dict[str, dict] = {}
+
+        # Reserved production order numbers and how many were handed out
+        self._order_numbers: List[int] = []
+        self._order_numbers_used = 0
+        # ("insert", id) or ("move", id, previous row times, previous insert times)
+        self._undo_log: List[Tuple[Any, ...]] = []
+
+    # --- Loading ---
+
+    def has_work_center(self, wc_id: str) -> bool:
+        return wc_id in self._wc_schedule_ids
+
+    def has_blocked_periods(self, wc_id: str) -> bool:
+        return wc_id in self._blocked
+
+    def load_work_center(self, wc_id: str, existing_schedules: List[dict]) -> None:
+        """Register a WC's schedules (get_existing_schedules_with_arrival) as loaded."""
+        ids = []
+        for schedule in existing_schedules:
+            if schedule["id"] in self._schedules:
+                ids.append(schedule["id"])
+                continue
+            row = {**schedule, "resource_id": wc_id, "is_existing": True}
+            self._schedules[row["id"]] = row
+            self._original_times[row["id"]] = (row["start_date"], row["end_date"])
+            ids.append(row["id"])
+        # Rows planned in memory before this WC was loaded are not in the DB yet
+        ids.extend(
+            schedule_id for schedule_id in self._inserted_ids
+            if self._schedules[schedule_id]["resource_id"] == wc_id
+        )
+        self._wc_schedule_ids[wc_id] = ids
+
+    def load_blocked_periods(self, wc_id: str, blocked_periods) -> None:
+        self._blocked[wc_id] = as_blocked_calendar(blocked_periods)
+
+    # --- Reading ---
+
+    def _arrival_time(self, schedule: dict) -> datetime:
+        source = self._schedules.get(schedule.get("cascade_source_id"))
+        if source is not None and "arrival_rest_hours" in schedule:
+            return source["end_date"] + timedelta(hours=schedule["arrival_rest_hours"])
+        if "arrival_rest_hours" in schedule:
+            # Source outside the context: it is never moved, arrival stays as loaded
+            return schedule["arrival_time"]
+        return schedule["start_date"]
+
+    def existing_schedules(self, wc_id: str) -> List[dict]:
+        """Copies of the WC's schedules in the window, with current arrival times."""
+        schedules = []
+        for schedule_id in self._wc_schedule_ids.get(wc_id, []):
+            schedule = self._schedules[schedule_id]
+            if not (self.window_start <= schedule["start_date"] < self.window_end):
+                continue
+            schedules.append({**schedule, "arrival_time": self._arrival_time(schedule)})
+        return schedules
+
+    def blocked_periods(self, wc_id: str) -> BlockedCalendar:
+        return self._blocked.get(wc_id) or BlockedCalendar()
+
+    # --- Recording ---
+
+    def apply_queue(self, recalculated: List[dict]) -> None:
+        """Apply recalculated times of existing schedules (new_start_date/new_end_date)."""
+        for schedule in recalculated:
+            if not schedule.get("is_existing"):
+                continue
+            row = self._schedules.get(schedule["id"])
+            if row is None:
+                continue
+            insert_row = self._insert_rows.get(schedule["id"])
+            self._undo_log.append((
+                "move", schedule["id"], (row["start_date"], row["end_date"]),
+                (insert_row["start_date"], insert_row["end_date"]) if insert_row else None,
+            ))
+            row["start_date"] = schedule["new_start_date"]
+            row["end_date"] = schedule["new_end_date"]
+            if schedule["id"] in self._insert_rows:
+                insert_row = self._insert_rows[schedule["id"]]
+                insert_row["start_date"] = row["start_date"].isoformat()
+                insert_row["end_date"] = row["end_date"].isoformat()
+
+    def add_schedules(self, schedule_rows: List[dict]) -> None:
+        """Record new production_schedules rows (insert payloads) in creation order."""
+        for schedule_data in schedule_rows:
+            start = _as_datetime(schedule_data["start_date"])
+            end = _as_datetime(schedule_data["end_date"])
+            row = {
+                "id": schedule_data["id"],
+                "resource_id": schedule_data["resource_id"],
+                "start_date": start,
+                "end_date": end,
+                "cascade_source_id": schedule_data.get("cascade_source_id"),
+                "product_id": schedule_data["product_id"],
+                "quantity": schedule_data.get("quantity"),
+                "cascade_level": schedule_data.get("cascade_level", 0),
+                "batch_number": schedule_data.get("batch_number"),
+                "total_batches": schedule_data.get("total_batches"),
+                "batch_size": schedule_data.get("batch_size"),
+                "status": schedule_data.get("status"),
+                "production_order_number": schedule_data.get("production_order_number"),
+                "week_plan_id": schedule_data.get("week_plan_id"),
+                "is_existing": True,
+                "duration_minutes": (end - start).total_seconds() / 60,
+                "arrival_time": start,
+            }
+            source = self._schedules.get(row["cascade_source_id"])
+            if source is not None:
+                rest_hours = 0.0
+                if self._rest_lookup:
+                    rest_hours = self._rest_lookup(row["product_id"], source["resource_id"])
+                row["arrival_rest_hours"] = rest_hours
+                row["arrival_time"] = source["end_date"] + timedelta(hours=rest_hours)
+
+            self._schedules[row["id"]] = row
+            self._insert_rows[row["id"]] = {**schedule_data}
+            self._inserted_ids.append(row["id"])
+            if row["resource_id"] in self._wc_schedule_ids:
+                self._wc_schedule_ids[row["resource_id"]].append(row["id"])
+            self._undo_log.append(("insert", row["id"]))
+
+    # --- Production order numbers ---
+
+    def reserve_order_numbers(self, numbers: List[int]) -> None:
+        """Add reserved production order numbers, handed out in the given order."""
+        self._order_numbers.extend(numbers)
+
+    def take_order_number(self) -> Optional[int]:
+        """Next reserved order number, or None when the reservation is used up."""
+        if self._order_numbers_used >= len(self._order_numbers):
+            return None
+        self._order_numbers_used += 1
+        return self._order_numbers[self._order_numbers_used - 1]
+
+    # --- Checkpoints (roll back a failed cascade without touching others) ---
+
+    def checkpoint(self) -> Checkpoint:
+        return (len(self._undo_log), self._order_numbers_used)
+
+    def rollback(self, checkpoint: Checkpoint) -> None:
+        """Undo every insert and move recorded since the checkpoint, newest first.
+
+        Work centers and blocked shifts loaded meanwhile stay loaded (they
+        are database state), and order numbers handed out since are reused.
+        """
+        log_length, self._order_numbers_used = checkpoint
+        while len(self._undo_log) > log_length:
+            entry = self._undo_log.pop()
+            if entry[0] == "insert":
+                self._undo_insert(entry[1])
+                continue
+            _, schedule_id, (start, end), insert_times = entry
+            row = self._schedules[schedule_id]
+            row["start_date"], row["end_date"] = start, end
+            if insert_times is not None:
+                insert_row = self._insert_rows[schedule_id]
+                insert_row["start_date"], insert_row["end_date"] = insert_times
+
+    def _undo_insert(self, schedule_id: str) -> None:
+        row = self._schedules.pop(schedule_id)
+        del self._insert_rows[schedule_id]
+        # Undone newest first, so the row is the last one inserted
+        self._inserted_ids.pop()
+        ids = self._wc_schedule_ids.get(row["resource_id"])
+        if ids:
+            if ids[-1] == schedule_id:
+                ids.pop()
+            else:
+                ids.remove(schedule_id)
+
+    # --- Flush ---
+
+    def pending_inserts(self) -> List[dict]:
+        """New rows with their final times, sources before dependents."""
+        return [self._insert_rows[schedule_id] for schedule_id in self._inserted_ids]
+
+    def pending_moves(self) -> List[dict]:
+        """DB rows whose times changed, with their original duration and final times."""
+        moves = []
+        for schedule_id, (start, end) in self._original_times.items():
+            row = self._schedules[schedule_id]
+            if row["start_date"] != start or row["end_date"] != end:
+                moves.append({
+                    "id": schedule_id,
+                    "resource_id": row["resource_id"],
+                    "duration_minutes": row["duration_minutes"],
+                    "new_start_date": row["start_date"],
+                    "new_end_date": row["end_date"],
+                })
+        return moves
@@ -0,0 +1,311 @@
+"""In-memory cascade preview engine.
+
+preview_cascade_production used to run generate_cascade_schedules with
+create_in_db=False, which still queried schedules and blocked shifts work
+center by work center inside the cascade loop. The preview is now split in:
+
+1. load_cascade_preview_inputs(): async, loads everything the preview of a
+   product needs for a week window (route, productivity, rest times, existing
+   queues, blocked shifts) into CascadePreviewInputs.
+2. compute_cascade_preview(): pure and synchronous, no I/O. Same result as
+   generate_cascade_schedules(create_in_db=False) for the same data, in a
+   few milliseconds, so the planner can re-preview on every drag.
+
+Inputs are cached per (product, window) for a few seconds; any cascade write
+invalidates them.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from .blocked_calendar import BlockedCalendar
+from .cascade import (
+    calculate_batch_duration_minutes,
+    distribute_units_into_batches,
+    load_work_center_queues,
+    get_processing_mode,
+    get_product_route,
+    get_productivity,
+    get_rest_time_hours,
+)
+from .master_data import CascadeMasterData
+from .queue_simulator import WorkCenterQueue
+from ....core.cache import TTLCache
+from ....models.production import BatchInfo, ProcessingType, WorkCenterSchedule
+
+logger = logging.getLogger(__name__)
+
+# Existing queues change with every cascade write (also V2 writes that bypass
+# this process), so keep this short
+PREVIEW_INPUTS_TTL_SECONDS = 15
+# One entry per (product, week) previewed within the TTL
+PREVIEW_INPUTS_MAX_ENTRIES = 64
+
+_PROCESSING_TYPES = {
+    "parallel": ProcessingType.PARALLEL,
+    "hybrid": ProcessingType.HYBRID,
+    "sequential": ProcessingType.SEQUENTIAL,
+}
+
+
+class PreviewStep:
+    """One route step with everything needed to place batches in it."""
+
+    __slots__ = (
+        "work_center_id", "work_center_name", "cascade_level", "processing_mode",
+        "productivity", "rest_time_hours", "queue", "calendar",
+    )
+
+    def __init__(
+        self,
+        work_center_id: str,
+        work_center_name: str,
+        cascade_level: int,
+        processing_mode: str,
+        productivity: Optional[dict],
+        rest_time_hours: float,
+        queue: Optional[WorkCenterQueue],
+        calendar: BlockedCalendar,
+    ):
+        self.work_center_id = work_center_id
+        self.work_center_name = work_center_name
+        self.cascade_level = cascade_level
+        self.processing_mode = processing_mode
+        self.productivity = productivity
+        self.rest_time_hours = rest_time_hours
+        self.queue = queue  # None for parallel WCs (no queueing)
+        self.calendar = calendar
+
+
+class CascadePreviewInputs:
+    """Product, route steps and WC state for previewing one product in one window."""
+
+    __slots__ = (
+        "product_id", "product_name", "lote_minimo", "source_productivity",
+        "steps", "window_start", "window_end", "loaded_at",
+    )
+
+    def __init__(
+        self,
+        product_id: str,
+        product_name: str,
+        lote_minimo: float,
+        source_productivity: Optional[dict],
+        steps: List[PreviewStep],
+        window_start: datetime,
+        window_end: datetime,
+    ):
+        self.product_id = product_id
+        self.product_name = product_name
+        self.lote_minimo = lote_minimo
+        self.source_productivity = source_productivity
+        self.steps = steps
+        self.window_start = window_start
+        self.window_end = window_end
+        self.loaded_at = time.monotonic()
+
+
+async def load_cascade_preview_inputs(
+    supabase,
+    product: dict,
+    master_data: CascadeMasterData,
+    window_start: datetime,
+    window_end: datetime,
+) -> CascadePreviewInputs:
+    """Load route, productivity and WC queues/blocked shifts for a preview.
+
+    The schedules and blocked shifts of every work center in the route are
+    read in a single round-trip, even if a WC appears several times.
+    """
+    product_id = product["id"]
+    route = await get_product_route(supabase, product_id, master_data)
+    wc_queues = await load_work_center_queues(
+        supabase, [step["work_center_id"] for step in route], window_start, window_end
+    )
+
+    queues: Dict[Tuple[str, str], WorkCenterQueue] = {}
+    steps = []
+    for route_step in route:
+        wc = route_step.get("work_center") or {}
+        wc_id = route_step["work_center_id"]
+        processing_mode = get_processing_mode(wc)
+
+        calendar = wc_queues[wc_id]["blocked_periods"]
+
+        queue = None
+        if processing_mode != "parallel":
+            if (wc_id, processing_mode) not in queues:
+                queues[(wc_id, processing_mode)] = WorkCenterQueue(
+                    wc_queues[wc_id]["existing_schedules"], calendar, is_hybrid=processing_mode == "hybrid"
+                )
+            queue = queues[(wc_id, processing_mode)]
+
+        steps.append(PreviewStep(
+            work_center_id=wc_id,
+            work_center_name=wc.get("name", f"WC-{wc_id[:8]}"),
+            cascade_level=route_step["sequence_order"],
+            processing_mode=processing_mode,
+            productivity=await get_productivity(
+                supabase, product_id, wc_id, wc.get("operation_id"), master_data=master_data
+            ),
+            rest_time_hours=await get_rest_time_hours(
+                supabase, product_id, wc.get("operation_id"), master_data
+            ),
+            queue=queue,
+            calendar=calendar,
+        ))
+
+    source_productivity = steps[0].productivity if steps else None
+    return CascadePreviewInputs(
+        product_id=product_id,
+        product_name=product["name"],
+        lote_minimo=float(product.get("lote_minimo") or 100),
+        source_productivity=source_productivity,
+        steps=steps,
+        window_start=window_start,
+        window_end=window_end,
+    )
+
+
+def compute_cascade_preview(
+    inputs: CascadePreviewInputs,
+    start_datetime: datetime,
+    duration_hours: float,
+    staff_count: int,
+) -> Dict[str, Any]:
+    """Forward cascade preview from preloaded inputs. No I/O.
+
+    Returns the same dictionary generate_cascade_schedules returns with
+    create_in_db=False.
+    """
+    if not inputs.steps:
+        raise HTTPException(400, f"No production route defined for product {inputs.product_id}")
+
+    if start_datetime.tzinfo is not None:
+        start_datetime = start_datetime.replace(tzinfo=None)
+
+    source_productivity = inputs.source_productivity
+    if not source_productivity:
+        raise HTTPException(
+            400,
+            f"No productivity parameters for product at work center {inputs.steps[0].work_center_name}"
+        )
+
+    lote_minimo = inputs.lote_minimo
+    if source_productivity.get("usa_tiempo_fijo"):
+        total_units = lote_minimo * staff_count * (duration_hours / 1)
+    else:
+        units_per_hour = float(source_productivity.get("units_per_hour") or 1)
+        total_units = units_per_hour * staff_count * duration_hours
+
+    batch_sizes = distribute_units_into_batches(total_units, lote_minimo)
+    num_batches = len(batch_sizes)
+
+    work_center_schedules: Dict[str, WorkCenterSchedule] = {}
+    all_batches: List[BatchInfo] = []
+    previous_ends: List[datetime] = []
+    cascade_end = start_datetime
+
+    for step in inputs.steps:
+        processing_type = _PROCESSING_TYPES[step.processing_mode]
+        rest_delta = timedelta(hours=step.rest_time_hours)
+        durations = [
+            calculate_batch_duration_minutes(step.productivity, size) for size in batch_sizes
+        ]
+
+        # (batch_index, start, end) in the order the cascade hands them to the next step
+        placed: List[Tuple[int, datetime, datetime]] = []
+        if step.queue is not None:
+            new_batches = [
+                {
+                    "index": idx,
+                    "arrival_time": previous_ends[idx] + rest_delta if previous_ends else start_datetime,
+                    "duration_minutes": durations[idx],
+                    "production_order_number": None,
+                }
+                for idx in range(num_batches)
+            ]
+            placed = [(batch["index"], start, end) for batch, start, end in step.queue.place(new_batches)]
+        else:
+            for idx in range(num_batches):
+                if not previous_ends:
+                    batch_start = start_datetime + timedelta(hours=(duration_hours / num_batches) * idx)
+                else:
+                    batch_start = previous_ends[idx] + rest_delta
+                if step.calendar:
+                    batch_start = step.calendar.earliest_start(batch_start, durations[idx])
+                placed.append((idx, batch_start, batch_start + timedelta(minutes=durations[idx])))
+
+        wc_batches = []
+        for idx, batch_start, batch_end in placed:
+            if batch_end > cascade_end:
+                cascade_end = batch_end
+            batch_info = BatchInfo(
+                batch_number=idx + 1,
+                batch_size=float(batch_sizes[idx]),
+                start_date=batch_start,
+                end_date=batch_end,
+                work_center_id=step.work_center_id,
+                work_center_name=step.work_center_name,
+                cascade_level=step.cascade_level,
+                processing_type=processing_type,
+                duration_minutes=durations[idx],
+            )
+            wc_batches.append(batch_info)
+            all_batches.append(batch_info)
+
+        work_center_schedules[step.work_center_id] = WorkCenterSchedule(
+            work_center_id=step.work_center_id,
+            work_center_name=step.work_center_name,
+            cascade_level=step.cascade_level,
+            processing_type=processing_type,
+            batches=wc_batches,
+            total_duration_minutes=sum(durations),
+            earliest_start=min(start for _, start, _ in placed),
+            latest_end=max(end for _, _, end in placed),
+        )
+
+        # The next step pairs batch i with the i-th schedule in queue order, like the DB path
+        previous_ends = [end for _, _, end in placed]
+
+    return {
+        "production_order_number": None,
+        "product_id": inputs.product_id,
+        "product_name": inputs.product_name,
+        "total_units": total_units,
+        "lote_minimo": lote_minimo,
+        "num_batches": num_batches,
+        "schedules_created": 0,
+        "work_centers": list(work_center_schedules.values()),
+        "cascade_start": start_datetime,
+        "cascade_end": cascade_end,
+        "all_batches": all_batches,
+    }
+
+
+# Process-level cache: ("preview_inputs", product_id, window_start, window_end) -> inputs
+_preview_inputs_cache = TTLCache(max_entries=PREVIEW_INPUTS_MAX_ENTRIES, ttl_seconds=PREVIEW_INPUTS_TTL_SECONDS)
+
+
+async def get_cascade_preview_inputs(
+    supabase,
+    product: dict,
+    master_data: CascadeMasterData,
+    window_start: datetime,
+    window_end: datetime,
+) -> CascadePreviewInputs:
+    """Cached load_cascade_preview_inputs (re-previews of the same week hit memory)."""
+    entry = await _preview_inputs_cache.get_or_load_async(
+        ("preview_inputs", product["id"], window_start, window_end),
+        lambda: load_cascade_preview_inputs(supabase, product, master_data, window_start, window_end),
+    )
+    return entry.value
+
+
+def invalidate_cascade_preview_inputs() -> int:
+    """Drop all cached preview inputs (call after any production_schedules write)."""
+    return _preview_inputs_cache.invalidate()
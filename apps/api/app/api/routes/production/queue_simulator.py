@@ -0,0 +1,154 @@
+"""Incremental finish-time simulation for a work center queue.
+
+distribute_batches_to_work_centers asks "when would the last new batch
+finish if these batches were added to this WC?" many times for the same
+existing queue. WorkCenterQueue sorts the existing schedules once and keeps
+the queue end-time after every prefix, so each query only replays the part
+of the queue from the first new batch onwards, without copying or
+re-sorting the existing schedules.
+
+WorkCenterQueue.place() returns the start/end of every new batch the same
+way, which is what the in-memory cascade preview uses.
+
+Results match recalculate_queue_times / recalculate_queue_times_hybrid.
+"""
+
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .blocked_calendar import as_blocked_calendar
+
+# (new batch, start, end)
+Placement = Tuple[dict, datetime, datetime]
+
+
+class _QueueLane:
+    """One FIFO lane: existing schedules sorted by arrival with prefix end-times."""
+
+    __slots__ = ("arrivals", "durations", "prefix_ends")
+
+    def __init__(self, schedules: List[dict], calendar):
+        ordered = sorted(schedules, key=lambda s: s["arrival_time"])
+        self.arrivals: List[datetime] = [s["arrival_time"] for s in ordered]
+        self.durations: List[float] = [s["duration_minutes"] for s in ordered]
+
+        # prefix_ends[k] = queue end after processing the first k schedules
+        self.prefix_ends: List[Optional[datetime]] = [None]
+        queue_end = None
+        for arrival, duration in zip(self.arrivals, self.durations):
+            queue_end = _process(arrival, duration, queue_end, calendar)
+            self.prefix_ends.append(queue_end)
+
+    def place(self, new_batches: List[dict], calendar) -> List[Placement]:
+        """Start/end of each new batch once merged into this lane, in queue order."""
+        if not new_batches:
+            return []
+
+        # Stable order: new batches keep list order on ties, and go after
+        # existing schedules with the same arrival (as in sorted(existing + new))
+        ordered_new = sorted(new_batches, key=lambda b: b["arrival_time"])
+        index = bisect_right(self.arrivals, ordered_new[0]["arrival_time"])
+        queue_end = self.prefix_ends[index]
+
+        arrivals = self.arrivals
+        durations = self.durations
+        placements = []
+        for batch in ordered_new:
+            arrival = batch["arrival_time"]
+            while index < len(arrivals) and arrivals[index] <= arrival:
+                queue_end = _process(arrivals[index], durations[index], queue_end, calendar)
+                index += 1
+            duration = batch["duration_minutes"]
+            start_time = _start(arrival, duration, queue_end, calendar)
+            queue_end = start_time + timedelta(minutes=duration)
+            placements.append((batch, start_time, queue_end))
+        return placements
+
+    def finish_time(self, new_batches: List[dict], calendar) -> Optional[datetime]:
+        """End time of the last new batch once merged into this lane."""
+        placements = self.place(new_batches, calendar)
+        # End times are non-decreasing along the queue, so the last new batch finishes last
+        return placements[-1][2] if placements else None
+
+
+def _start(arrival: datetime, duration: float, queue_end: Optional[datetime], calendar) -> datetime:
+    """Start at max(arrival, queue_end), skipping blocked periods."""
+    if queue_end is None or arrival >= queue_end:
+        start_time = arrival
+    else:
+        start_time = queue_end
+    if calendar:
+        start_time = calendar.earliest_start(start_time, duration)
+    return start_time
+
+
+def _process(arrival: datetime, duration: float, queue_end: Optional[datetime], calendar) -> datetime:
+    """Process one schedule and return its end time."""
+    return _start(arrival, duration, queue_end, calendar) + timedelta(minutes=duration)
+
+
+class WorkCenterQueue:
+    """Existing queue of one work center, prepared for repeated finish-time queries.
+
+    Sequential WCs have a single FIFO lane. Hybrid WCs have one lane per
+    production_order_number (references run in parallel).
+    """
+
+    __slots__ = ("calendar", "is_hybrid", "_lanes")
+
+    def __init__(self, existing_schedules: List[dict], blocked_periods=None, is_hybrid: bool = False):
+        self.calendar = as_blocked_calendar(blocked_periods) if blocked_periods else None
+        self.is_hybrid = is_hybrid
+
+        groups: Dict[Any, List[dict]] = {}
+        for schedule in existing_schedules:
+            key = schedule.get("production_order_number") if is_hybrid else None
+            groups.setdefault(key, []).append(schedule)
+        self._lanes: Dict[Any, _QueueLane] = {
+            key: _QueueLane(schedules, self.calendar) for key, schedules in groups.items()
+        }
+
+    def _lane(self, key) -> _QueueLane:
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = _QueueLane([], self.calendar)
+            self._lanes[key] = lane
+        return lane
+
+    def place(self, new_batches: List[dict]) -> List[Placement]:
+        """Start/end of each new batch if added to this WC (existing queue unchanged).
+
+        Same order recalculate_queue_times(_hybrid) leaves the new batches in:
+        by arrival for sequential WCs, by new start for hybrid ones.
+        """
+        if not self.is_hybrid:
+            return self._lane(None).place(new_batches, self.calendar)
+
+        by_key: Dict[Any, List[dict]] = {}
+        for batch in new_batches:
+            by_key.setdefault(batch.get("production_order_number"), []).append(batch)
+        placements = []
+        for key, batches in by_key.items():
+            placements.extend(self._lane(key).place(batches, self.calendar))
+        position = {id(batch): i for i, batch in enumerate(new_batches)}
+        placements.sort(key=lambda p: (p[1], position[id(p[0])]))
+        return placements
+
+    def finish_time(self, new_batches: List[dict]) -> Optional[datetime]:
+        """When the last of new_batches would finish if added to this WC.
+
+        Returns None if new_batches is empty.
+        """
+        if not new_batches:
+            return None
+        if not self.is_hybrid:
+            return self._lane(None).finish_time(new_batches, self.calendar)
+
+        by_key: Dict[Any, List[dict]] = {}
+        for batch in new_batches:
+            by_key.setdefault(batch.get("production_order_number"), []).append(batch)
+        return max(
+            self._lane(key).finish_time(batches, self.calendar)
+            for key, batches in by_key.items()
+        )
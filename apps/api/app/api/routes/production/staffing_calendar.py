@@ -0,0 +1,133 @@
+"""Work center staffing calendar for multi-WC decisions.
+
+When a cascade has a deadline, every route step with alternative work
+centers asks which of them have staff on the shift its first batch arrives
+in. That used to be a work_center_staffing query per step, repeating the
+same (date, shift) tuples within a cascade and across requests.
+
+StaffingCalendar holds the staffed WCs (staff_count > 0) of every work
+center for one production week, loaded in a single query, and answers
+"staffed WCs at datetime t" with a dict lookup. Calendars are cached per
+week with a short TTL because staffing is edited live from the weekly
+grid; call invalidate_staffing_calendar() (or POST /staffing/invalidate)
+after editing it.
+"""
+
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from .bom_graph import fetch_all_rows
+
+logger = logging.getLogger(__name__)
+
+# Calendars older than this are reloaded on next access
+STAFFING_CALENDAR_TTL_SECONDS = 60
+
+
+def determine_shift_from_datetime(dt: datetime):
+    """Return (date, shift_number) for a given datetime.
+
+    Maps datetime to the production shift it falls in:
+    T1: 22:00-06:00 (date = next day for >=22:00)
+    T2: 06:00-14:00
+    T3: 14:00-22:00
+    """
+    hour = dt.hour
+    if hour >= 22:
+        return (dt.date() + timedelta(days=1)), 1
+    elif hour < 6:
+        return dt.date(), 1
+    elif hour < 14:
+        return dt.date(), 2
+    else:
+        return dt.date(), 3
+
+
+def staffing_week_start(shift_date: date) -> date:
+    """Sunday of the production week a shift date belongs to.
+
+    The production week runs Saturday 22:00 to Saturday 22:00, i.e. shift
+    dates Sunday (its T1 starts Saturday 22:00) through Saturday.
+    """
+    return shift_date - timedelta(days=(shift_date.weekday() + 1) % 7)
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class StaffingCalendar:
+    """Staffed work centers per (shift date, shift number) for one production week."""
+
+    __slots__ = ("week_start", "loaded_at", "_staffed")
+
+    def __init__(self, week_start: date, rows: Iterable[dict]):
+        self.week_start = week_start
+        self.loaded_at = time.monotonic()
+        self._staffed: Dict[Tuple[date, int], Dict[str, int]] = {}
+        for row in rows:
+            if (row.get("staff_count") or 0) <= 0:
+                continue
+            key = (_as_date(row["date"]), int(row["shift_number"]))
+            self._staffed.setdefault(key, {})[row["work_center_id"]] = row["staff_count"]
+
+    def staffed(self, shift_date: date, shift_number: int) -> Dict[str, int]:
+        """{wc_id: staff_count} of the WCs staffed on that shift. Do not mutate."""
+        return self._staffed.get((shift_date, shift_number), {})
+
+    def staffed_at(self, dt: datetime) -> Dict[str, int]:
+        """{wc_id: staff_count} of the WCs staffed on the shift dt falls in."""
+        return self.staffed(*determine_shift_from_datetime(dt))
+
+    def is_expired(self, ttl_seconds: float = STAFFING_CALENDAR_TTL_SECONDS) -> bool:
+        return time.monotonic() - self.loaded_at > ttl_seconds
+
+
+def load_staffing_calendar(supabase, week_start: date) -> StaffingCalendar:
+    """Load the staffing of all work centers for the production week starting week_start."""
+    week_end = week_start + timedelta(days=6)
+    rows = fetch_all_rows(
+        lambda: supabase.schema("produccion").table("work_center_staffing").select(
+            "work_center_id, date, shift_number, staff_count"
+        ).gte("date", week_start.isoformat()).lte("date", week_end.isoformat()).gt("staff_count", 0)
+    )
+    logger.info(f"Loaded staffing calendar for week {week_start}: {len(rows)} staffed shifts")
+    return StaffingCalendar(week_start, rows)
+
+
+_staffing_calendars: Dict[date, StaffingCalendar] = {}
+
+
+def get_staffing_calendar(
+    supabase,
+    shift_date,
+    ttl_seconds: float = STAFFING_CALENDAR_TTL_SECONDS,
+) -> StaffingCalendar:
+    """Cached calendar of the production week containing shift_date (loaded if missing or expired)."""
+    week_start = staffing_week_start(_as_date(shift_date))
+    calendar = _staffing_calendars.get(week_start)
+    if calendar is None or calendar.is_expired(ttl_seconds):
+        calendar = load_staffing_calendar(supabase, week_start)
+        _staffing_calendars[week_start] = calendar
+    return calendar
+
+
+def get_staffed_work_centers_at(supabase, dt: datetime) -> Dict[str, int]:
+    """{wc_id: staff_count} of the WCs staffed on the shift dt falls in."""
+    shift_date, shift_number = determine_shift_from_datetime(dt)
+    return get_staffing_calendar(supabase, shift_date).staffed(shift_date, shift_number)
+
+
+def invalidate_staffing_calendar(shift_date: Optional[date] = None) -> int:
+    """Drop the cached calendar of shift_date's week (all weeks if None). Returns how many were dropped."""
+    if shift_date is None:
+        removed = len(_staffing_calendars)
+        _staffing_calendars.clear()
+        return removed
+    return 1 if _staffing_calendars.pop(staffing_week_start(_as_date(shift_date)), None) else 0
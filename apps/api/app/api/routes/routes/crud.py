@@ -2,10 +2,18 @@
 
 import logging
 from datetime import date, datetime, timedelta
-from typing import Optional
-from fastapi import APIRouter, HTTPException, Header
-
-from ....core.supabase import get_supabase_client
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Header, Query
+
+from ....core.pagination import (
+    COUNT_PATTERN,
+    InvalidCursor,
+    count_method,
+    fetch_page,
+    iter_keyset,
+    ndjson_response,
+)
+from ....core.supabase_async import gather_queries, get_async_supabase_client
 from ....models.route import (
     RouteCreate,
     RouteUpdate,
@@ -49,7 +57,7 @@ async def list_routes(
     - exclude_completed: Exclude completed routes (default True)
     """
     logger.info(f"Listing routes: status={status}, page={page}, limit={limit}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Build query
@@ -73,7 +81,7 @@ async def list_routes(
         offset = (page - 1) * limit
         query = query.order("route_date", desc=True).range(offset, offset + limit - 1)
 
-        result = query.execute()
+        result = await query.execute()
         total = result.count or 0
 
         # Get driver and vehicle info
@@ -84,14 +92,14 @@ async def list_routes(
         # Fetch drivers
         drivers_map = {}
         if driver_ids:
-            drivers_result = supabase.table("users").select("id, name").in_("id", driver_ids).execute()
+            drivers_result = await supabase.table("users").select("id, name").in_("id", driver_ids).execute()
             drivers_map = {d["id"]: d["name"] for d in (drivers_result.data or [])}
 
         # Fetch vehicles
         vehicles_map = {}
         if vehicle_ids:
             try:
-                vehicles_result = supabase.table("vehicles").select("id, vehicle_code").in_("id", vehicle_ids).execute()
+                vehicles_result = await supabase.table("vehicles").select("id, vehicle_code").in_("id", vehicle_ids).execute()
                 vehicles_map = {v["id"]: v["vehicle_code"] for v in (vehicles_result.data or [])}
             except Exception:
                 pass  # Table might not exist
@@ -131,11 +139,11 @@ async def list_routes(
 async def get_route(route_id: str):
     """Get detailed route with all orders."""
     logger.info(f"Getting route: {route_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Get route with route_orders
-        result = supabase.table("routes").select(
+        result = await supabase.table("routes").select(
             "*, route_orders(id, order_id, delivery_sequence)"
         ).eq("id", route_id).single().execute()
 
@@ -146,14 +154,14 @@ async def get_route(route_id: str):
         # Get driver info
         driver_name = None
         if route.get("driver_id"):
-            driver_result = supabase.table("users").select("name").eq("id", route["driver_id"]).single().execute()
+            driver_result = await supabase.table("users").select("name").eq("id", route["driver_id"]).single().execute()
             driver_name = driver_result.data.get("name") if driver_result.data else None
 
         # Get vehicle info
         vehicle_code = None
         if route.get("vehicle_id"):
             try:
-                vehicle_result = supabase.table("vehicles").select("vehicle_code").eq("id", route["vehicle_id"]).single().execute()
+                vehicle_result = await supabase.table("vehicles").select("vehicle_code").eq("id", route["vehicle_id"]).single().execute()
                 vehicle_code = vehicle_result.data.get("vehicle_code") if vehicle_result.data else None
             except Exception:
                 pass
@@ -164,7 +172,7 @@ async def get_route(route_id: str):
 
         orders_map = {}
         if order_ids:
-            orders_result = supabase.table("orders").select(
+            orders_result = await supabase.table("orders").select(
                 "id, order_number, expected_delivery_date, status, "
                 "clients(name), branches(name), "
                 "order_items(id)"
@@ -217,7 +225,7 @@ async def create_route(
 ):
     """Create a new route."""
     logger.info(f"Creating route: {data.route_name}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     user_id = get_user_id_from_token(authorization)
 
     try:
@@ -234,7 +242,7 @@ async def create_route(
         if user_id:
             insert_data["created_by"] = user_id
 
-        result = supabase.table("routes").insert(insert_data).execute()
+        result = await supabase.table("routes").insert(insert_data).execute()
 
         if not result.data:
             raise HTTPException(status_code=500, detail="Failed to create route")
@@ -259,7 +267,7 @@ async def update_route(
 ):
     """Update a route (driver, vehicle, status)."""
     logger.info(f"Updating route: {route_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Build update data (only non-None fields)
@@ -274,7 +282,7 @@ async def update_route(
         if not update_data:
             raise HTTPException(status_code=400, detail="No fields to update")
 
-        result = supabase.table("routes").update(update_data).eq("id", route_id).execute()
+        result = await supabase.table("routes").update(update_data).eq("id", route_id).execute()
 
         if not result.data:
             raise HTTPException(status_code=404, detail="Route not found")
@@ -304,7 +312,7 @@ async def get_driver_routes(
     If role is admin/administrator, returns all routes.
     """
     logger.info(f"Getting routes for driver: {driver_id}, role: {role}, page: {page}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         is_admin = role in ["admin", "administrator", "super_admin", "coordinador_logistico"]
@@ -323,7 +331,7 @@ async def get_driver_routes(
         offset = (page - 1) * limit
         query = query.order("route_date", desc=True).range(offset, offset + limit - 1)
 
-        result = query.execute()
+        result = await query.execute()
         total = result.count or 0
         routes_data = result.data or []
 
@@ -337,7 +345,7 @@ async def get_driver_routes(
         # Fetch all orders with full details
         orders_map = {}
         if all_order_ids:
-            orders_result = supabase.table("orders").select(
+            orders_result = await supabase.table("orders").select(
                 "id, order_number, expected_delivery_date, status, observations, "
                 "clients(id, name, address), "
                 "branches(id, name, address, observations, contact_person, phone), "
@@ -354,12 +362,12 @@ async def get_driver_routes(
 
         drivers_map = {}
         if driver_ids:
-            drivers_result = supabase.table("users").select("id, name").in_("id", driver_ids).execute()
+            drivers_result = await supabase.table("users").select("id, name").in_("id", driver_ids).execute()
             drivers_map = {d["id"]: d["name"] for d in (drivers_result.data or [])}
 
         vehicles_map = {}
         if vehicle_ids:
-            vehicles_result = supabase.table("vehicles").select("id, vehicle_code").in_("id", vehicle_ids).execute()
+            vehicles_result = await supabase.table("vehicles").select("id, vehicle_code").in_("id", vehicle_ids).execute()
             vehicles_map = {v["id"]: v["vehicle_code"] for v in (vehicles_result.data or [])}
 
         # Build enriched routes
@@ -405,94 +413,106 @@ async def get_driver_routes(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _completed_route_items(supabase, routes_data: List[dict]) -> List[dict]:
+    """Completed routes enriched with their orders and driver names."""
+    # Get order IDs for all routes
+    all_order_ids = []
+    for r in routes_data:
+        for ro in r.get("route_orders", []):
+            if ro.get("order_id"):
+                all_order_ids.append(ro["order_id"])
+    driver_ids = list(set([r["driver_id"] for r in routes_data if r.get("driver_id")]))
+
+    # Orders with basic details and driver names
+    lookups = await gather_queries({
+        "orders": supabase.table("orders").select(
+            "id, order_number, status, "
+            "clients(id, name), "
+            "order_items(id)"
+        ).in_("id", all_order_ids) if all_order_ids else None,
+        "drivers": supabase.table("users").select("id, name").in_(
+            "id", driver_ids
+        ) if driver_ids else None,
+    })
+    orders_map = {o["id"]: o for o in (lookups["orders"].data if lookups["orders"] else [])}
+    drivers_map = {d["id"]: d["name"] for d in (lookups["drivers"].data if lookups["drivers"] else [])}
+
+    # Build enriched routes
+    routes = []
+    for r in routes_data:
+        route_orders = []
+        for ro in sorted(r.get("route_orders", []), key=lambda x: x.get("delivery_sequence", 0)):
+            order = orders_map.get(ro["order_id"])
+            route_orders.append({
+                "id": ro["id"],
+                "order_id": ro["order_id"],
+                "delivery_sequence": ro.get("delivery_sequence", 0),
+                "orders": order,
+            })
+
+        routes.append({
+            "id": r["id"],
+            "route_number": r.get("route_number"),
+            "route_name": r["route_name"],
+            "route_date": r["route_date"],
+            "status": r["status"],
+            "driver_id": r.get("driver_id"),
+            "driver_name": drivers_map.get(r.get("driver_id")),
+            "created_at": r.get("created_at"),
+            "route_orders": route_orders,
+        })
+    return routes
+
+
 @router.get("/completed/list")
 async def get_completed_routes(
     driver_id: Optional[str] = None,
     role: str = "driver",
     page: int = 1,
     limit: int = 20,
+    cursor: Optional[str] = None,
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
     authorization: Optional[str] = Header(None),
 ):
     """
     Get completed routes with pagination.
     If role is admin/administrator, returns all completed routes.
-    """
-    logger.info(f"Getting completed routes: driver={driver_id}, role={role}, page={page}")
-    supabase = get_supabase_client()
 
-    try:
-        is_admin = role in ["admin", "administrator", "super_admin", "coordinador_logistico"]
+    Newest route_date first. Pass next_cursor as ?cursor= for keyset pages;
+    ?format=ndjson streams every completed route.
+    """
+    logger.info(f"Getting completed routes: driver={driver_id}, role={role}, page={page}, cursor={bool(cursor)}")
+    supabase = get_async_supabase_client()
+    is_admin = role in ["admin", "administrator", "super_admin", "coordinador_logistico"]
 
-        # Build query
+    def completed_query(count_mode: Optional[str] = None):
         query = supabase.table("routes").select(
             "*, route_orders(id, order_id, delivery_sequence)",
-            count="exact"
+            count=count_mode,
         ).eq("status", "completed")
 
         # Filter by driver if not admin and driver_id provided
         if not is_admin and driver_id:
             query = query.eq("driver_id", driver_id)
+        return query
 
-        # Pagination
-        offset = (page - 1) * limit
-        query = query.order("route_date", desc=True).range(offset, offset + limit - 1)
-
-        result = query.execute()
-        total = result.count or 0
-        routes_data = result.data or []
-
-        # Get order IDs for all routes
-        all_order_ids = []
-        for r in routes_data:
-            for ro in r.get("route_orders", []):
-                if ro.get("order_id"):
-                    all_order_ids.append(ro["order_id"])
-
-        # Fetch orders with basic details
-        orders_map = {}
-        if all_order_ids:
-            orders_result = supabase.table("orders").select(
-                "id, order_number, status, "
-                "clients(id, name), "
-                "order_items(id)"
-            ).in_("id", all_order_ids).execute()
-
-            for o in (orders_result.data or []):
-                orders_map[o["id"]] = o
-
-        # Get driver names
-        driver_ids = list(set([r["driver_id"] for r in routes_data if r.get("driver_id")]))
-        drivers_map = {}
-        if driver_ids:
-            drivers_result = supabase.table("users").select("id, name").in_("id", driver_ids).execute()
-            drivers_map = {d["id"]: d["name"] for d in (drivers_result.data or [])}
-
-        # Build enriched routes
-        routes = []
-        for r in routes_data:
-            route_orders = []
-            for ro in sorted(r.get("route_orders", []), key=lambda x: x.get("delivery_sequence", 0)):
-                order = orders_map.get(ro["order_id"])
-                route_orders.append({
-                    "id": ro["id"],
-                    "order_id": ro["order_id"],
-                    "delivery_sequence": ro.get("delivery_sequence", 0),
-                    "orders": order,
-                })
+    if format == "ndjson":
+        return ndjson_response(
+            iter_keyset(completed_query, sort_column="route_date"),
+            lambda rows: _completed_route_items(supabase, rows),
+            filename="completed_routes.ndjson",
+        )
 
-            routes.append({
-                "id": r["id"],
-                "route_number": r.get("route_number"),
-                "route_name": r["route_name"],
-                "route_date": r["route_date"],
-                "status": r["status"],
-                "driver_id": r.get("driver_id"),
-                "driver_name": drivers_map.get(r.get("driver_id")),
-                "created_at": r.get("created_at"),
-                "route_orders": route_orders,
-            })
+    try:
+        result = await fetch_page(
+            completed_query(count_method(count, cursor)),
+            limit=limit, cursor=cursor, page=page, sort_column="route_date",
+        )
+        routes = await _completed_route_items(supabase, result.rows)
 
-        total_pages = (total + limit - 1) // limit if total > 0 else 1
+        total = result.total_count
+        total_pages = ((total + limit - 1) // limit if total > 0 else 1) if total is not None else None
 
         return {
             "routes": routes,
@@ -500,9 +520,12 @@ async def get_completed_routes(
             "page": page,
             "limit": limit,
             "total_pages": total_pages,
-            "has_more": page < total_pages,
+            "has_more": result.has_more,
+            "next_cursor": result.next_cursor,
         }
 
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting completed routes: {e}")
         raise HTTPException(status_code=500, detail=str(e))
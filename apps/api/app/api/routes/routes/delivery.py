@@ -8,7 +8,8 @@ from uuid import uuid4
 from fastapi import APIRouter, HTTPException, Header, UploadFile, File
 from pydantic import BaseModel
 
-from ....core.supabase import get_supabase_client, set_audit_user, backfill_audit_user
+from ....core.supabase import get_supabase_client
+from ....core.supabase_async import get_async_supabase_client, backfill_audit_user_async, run_blocking
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -127,7 +128,6 @@ async def upload_evidence(
     Upload delivery evidence with automatic compression to ≤50KB.
     """
     logger.info(f"Uploading evidence: {file.filename}")
-    supabase = get_supabase_client()
 
     try:
         # 1. Leer contenido
@@ -142,14 +142,12 @@ async def upload_evidence(
         filename = f"evidence_{uuid4()}.jpg"
 
         # 4. Subir a Supabase Storage
-        upload_result = supabase.storage.from_("evidencia_de_entrega").upload(
-            filename,
-            compressed,
-            {"content-type": "image/jpeg"}
-        )
+        # The async client has no Storage uploads; keep the sync one off the loop
+        bucket = get_supabase_client().storage.from_("evidencia_de_entrega")
+        await run_blocking(bucket.upload, filename, compressed, {"content-type": "image/jpeg"})
 
         # 5. Obtener URL pública
-        url_data = supabase.storage.from_("evidencia_de_entrega").get_public_url(filename)
+        url_data = bucket.get_public_url(filename)
 
         return {
             "success": True,
@@ -175,7 +173,7 @@ async def get_pending_orders(
     If role is admin/administrator, returns all pending orders.
     """
     logger.info(f"Getting pending orders for driver: {driver_id}, role: {role}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         is_admin = role in ["admin", "administrator", "super_admin"]
@@ -188,7 +186,7 @@ async def get_pending_orders(
         if not is_admin:
             routes_query = routes_query.eq("driver_id", driver_id)
 
-        routes_result = routes_query.execute()
+        routes_result = await routes_query.execute()
 
         if not routes_result.data:
             return {"orders": [], "total": 0}
@@ -196,7 +194,7 @@ async def get_pending_orders(
         route_ids = [r["id"] for r in routes_result.data]
 
         # 2. Obtener pedidos dispatched de esas rutas
-        orders_result = supabase.table("orders").select(
+        orders_result = await supabase.table("orders").select(
             "id, order_number, expected_delivery_date, status, observations, assigned_route_id, "
             "clients(id, name), "
             "branches(id, name, address), "
@@ -226,14 +224,13 @@ async def receive_order_to_route(
     Updates item quantities and changes order status.
     """
     logger.info(f"Receiving order: {data.order_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     user_id = get_user_id_from_token(authorization)
-    set_audit_user(supabase, user_id)
 
     try:
         # 1. Actualizar cantidades de cada item
         for item in data.items:
-            update_result = supabase.table("order_items").update({
+            update_result = await supabase.table("order_items").update({
                 "quantity_available": item.quantity_available,
                 "quantity_missing": item.quantity_missing,
             }).eq("id", item.item_id).execute()
@@ -242,7 +239,7 @@ async def receive_order_to_route(
                 logger.warning(f"Item not found: {item.item_id}")
 
         # 2. Cambiar estado del pedido a in_delivery
-        order_result = supabase.table("orders").update({
+        order_result = await supabase.table("orders").update({
             "status": "in_delivery",
         }).eq("id", data.order_id).execute()
 
@@ -250,7 +247,7 @@ async def receive_order_to_route(
             raise HTTPException(status_code=404, detail="Order not found")
 
         # 3. Registrar evento
-        supabase.table("order_events").insert({
+        await supabase.table("order_events").insert({
             "order_id": data.order_id,
             "event_type": "status_change",
             "payload": {
@@ -261,7 +258,7 @@ async def receive_order_to_route(
         }).execute()
 
         # Backfill audit entries with the real user
-        backfill_audit_user(supabase, user_id, data.order_id)
+        await backfill_audit_user_async(supabase, user_id, data.order_id)
 
         return {
             "success": True,
@@ -287,9 +284,8 @@ async def complete_delivery(
     Updates item delivery status and order final status.
     """
     logger.info(f"Completing delivery for order: {data.order_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     user_id = get_user_id_from_token(authorization)
-    set_audit_user(supabase, user_id)
 
     # Validar evidencia obligatoria
     if not data.evidence_url:
@@ -318,13 +314,13 @@ async def complete_delivery(
             }
 
             # Upsert en order_item_deliveries (por si ya existe)
-            supabase.table("order_item_deliveries").upsert(
+            await supabase.table("order_item_deliveries").upsert(
                 delivery_record,
                 on_conflict="route_order_id,order_item_id"
             ).execute()
 
             # Actualizar cantidad entregada en order_items
-            supabase.table("order_items").update({
+            await supabase.table("order_items").update({
                 "quantity_delivered": item.quantity_delivered,
                 "quantity_returned": item.quantity_rejected,
             }).eq("id", item.item_id).execute()
@@ -346,12 +342,12 @@ async def complete_delivery(
             final_status = "delivered"
 
         # 3. Actualizar pedido
-        supabase.table("orders").update({
+        await supabase.table("orders").update({
             "status": final_status,
         }).eq("id", data.order_id).execute()
 
         # 4. Registrar evento
-        supabase.table("order_events").insert({
+        await supabase.table("order_events").insert({
             "order_id": data.order_id,
             "event_type": "delivery_completed",
             "payload": {
@@ -368,7 +364,7 @@ async def complete_delivery(
         route_id = None
         if data.route_order_id:
             # Obtener route_id desde route_orders
-            route_order_result = supabase.table("route_orders").select(
+            route_order_result = await supabase.table("route_orders").select(
                 "route_id"
             ).eq("id", data.route_order_id).single().execute()
 
@@ -376,7 +372,7 @@ async def complete_delivery(
                 route_id = route_order_result.data["route_id"]
 
                 # Obtener todos los pedidos de la ruta
-                route_orders_result = supabase.table("route_orders").select(
+                route_orders_result = await supabase.table("route_orders").select(
                     "order_id"
                 ).eq("route_id", route_id).execute()
 
@@ -384,7 +380,7 @@ async def complete_delivery(
                     order_ids = [ro["order_id"] for ro in route_orders_result.data]
 
                     # Obtener status de todos los pedidos
-                    orders_result = supabase.table("orders").select(
+                    orders_result = await supabase.table("orders").select(
                         "id, status"
                     ).in_("id", order_ids).execute()
 
@@ -397,14 +393,14 @@ async def complete_delivery(
 
                         if all_completed:
                             # Marcar ruta como completada
-                            supabase.table("routes").update({
+                            await supabase.table("routes").update({
                                 "status": "completed"
                             }).eq("id", route_id).execute()
                             route_completed = True
                             logger.info(f"Route {route_id} marked as completed")
 
         # Backfill audit entries with the real user
-        backfill_audit_user(supabase, user_id, data.order_id)
+        await backfill_audit_user_async(supabase, user_id, data.order_id)
 
         return {
             "success": True,
@@ -432,7 +428,7 @@ async def create_return(
     Automatically appears in returns module.
     """
     logger.info(f"Creating return for order: {data.order_id}, product: {data.product_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     user_id = get_user_id_from_token(authorization)
 
     try:
@@ -449,7 +445,7 @@ async def create_return(
             "processed_by": user_id,
         }
 
-        result = supabase.table("returns").insert(return_data).select().single().execute()
+        result = await supabase.table("returns").insert(return_data).select().single().execute()
 
         if not result.data:
             raise HTTPException(status_code=500, detail="Failed to create return")
@@ -477,12 +473,12 @@ async def complete_route(
     Validates all orders are in final state.
     """
     logger.info(f"Completing route: {route_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     user_id = get_user_id_from_token(authorization)
 
     try:
         # 1. Verificar que la ruta existe
-        route_result = supabase.table("routes").select(
+        route_result = await supabase.table("routes").select(
             "id, status, route_orders(order_id)"
         ).eq("id", route_id).single().execute()
 
@@ -495,7 +491,7 @@ async def complete_route(
         order_ids = [ro["order_id"] for ro in route.get("route_orders", []) if ro.get("order_id")]
 
         if order_ids:
-            orders_result = supabase.table("orders").select(
+            orders_result = await supabase.table("orders").select(
                 "id, status"
             ).in_("id", order_ids).execute()
 
@@ -512,7 +508,7 @@ async def complete_route(
                 )
 
         # 3. Marcar ruta como completada
-        supabase.table("routes").update({
+        await supabase.table("routes").update({
             "status": "completed",
         }).eq("id", route_id).execute()
 
@@ -4,7 +4,7 @@ import logging
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Header
 
-from ....core.supabase import get_supabase_client
+from ....core.supabase_async import get_async_supabase_client
 from ....models.route import AssignOrdersRequest, ReorderSequenceRequest
 
 logger = logging.getLogger(__name__)
@@ -28,11 +28,11 @@ def get_user_id_from_token(authorization: Optional[str]) -> Optional[str]:
 async def get_route_orders(route_id: str):
     """Get all orders assigned to a route with full details."""
     logger.info(f"Getting orders for route: {route_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Get route_orders
-        result = supabase.table("route_orders").select(
+        result = await supabase.table("route_orders").select(
             "id, order_id, delivery_sequence"
         ).eq("route_id", route_id).order("delivery_sequence").execute()
 
@@ -43,7 +43,7 @@ async def get_route_orders(route_id: str):
             return {"orders": [], "total": 0}
 
         # Get full order details
-        orders_result = supabase.table("orders").select(
+        orders_result = await supabase.table("orders").select(
             "id, order_number, expected_delivery_date, status, observations, "
             "clients(id, name), "
             "branches(id, name, address), "
@@ -111,11 +111,11 @@ async def get_route_orders(route_id: str):
 async def get_unassigned_orders():
     """Get orders ready for dispatch that are not assigned to any route."""
     logger.info("Getting unassigned orders")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Get orders with status=ready_dispatch and no assigned route
-        result = supabase.table("orders").select(
+        result = await supabase.table("orders").select(
             "id, order_number, expected_delivery_date, status, observations, "
             "clients(id, name), "
             "branches(id, name, address), "
@@ -174,16 +174,16 @@ async def assign_orders_to_route(
 ):
     """Assign multiple orders to a route."""
     logger.info(f"Assigning {len(data.order_ids)} orders to route {route_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Verify route exists
-        route_result = supabase.table("routes").select("id, status").eq("id", route_id).single().execute()
+        route_result = await supabase.table("routes").select("id, status").eq("id", route_id).single().execute()
         if not route_result.data:
             raise HTTPException(status_code=404, detail="Route not found")
 
         # Get current max sequence
-        seq_result = supabase.table("route_orders").select(
+        seq_result = await supabase.table("route_orders").select(
             "delivery_sequence"
         ).eq("route_id", route_id).order("delivery_sequence", desc=True).limit(1).execute()
 
@@ -201,11 +201,11 @@ async def assign_orders_to_route(
             })
 
         # Insert route_orders
-        insert_result = supabase.table("route_orders").insert(route_orders_data).execute()
+        insert_result = await supabase.table("route_orders").insert(route_orders_data).execute()
 
         # Update orders with assigned_route_id
         for order_id in data.order_ids:
-            supabase.table("orders").update({
+            await supabase.table("orders").update({
                 "assigned_route_id": route_id
             }).eq("id", order_id).execute()
 
@@ -230,17 +230,17 @@ async def remove_order_from_route(
 ):
     """Remove an order from a route."""
     logger.info(f"Removing order {order_id} from route {route_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Delete from route_orders
-        delete_result = supabase.table("route_orders").delete().match({
+        delete_result = await supabase.table("route_orders").delete().match({
             "route_id": route_id,
             "order_id": order_id,
         }).execute()
 
         # Clear assigned_route_id from order
-        supabase.table("orders").update({
+        await supabase.table("orders").update({
             "assigned_route_id": None
         }).eq("id", order_id).execute()
 
@@ -261,12 +261,12 @@ async def reorder_delivery_sequence(
 ):
     """Reorder the delivery sequence of orders in a route."""
     logger.info(f"Reordering {len(data.items)} items in route {route_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Update each item's sequence
         for item in data.items:
-            supabase.table("route_orders").update({
+            await supabase.table("route_orders").update({
                 "delivery_sequence": item.new_sequence
             }).eq("id", item.route_order_id).eq("route_id", route_id).execute()
 
@@ -289,15 +289,15 @@ async def swap_order_positions(
 ):
     """Swap positions of two orders in a route."""
     logger.info(f"Swapping orders in route {route_id}")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
 
     try:
         # Get both route_orders
-        result1 = supabase.table("route_orders").select(
+        result1 = await supabase.table("route_orders").select(
             "id, delivery_sequence"
         ).eq("id", route_order_id_1).eq("route_id", route_id).single().execute()
 
-        result2 = supabase.table("route_orders").select(
+        result2 = await supabase.table("route_orders").select(
             "id, delivery_sequence"
         ).eq("id", route_order_id_2).eq("route_id", route_id).single().execute()
 
@@ -308,11 +308,11 @@ async def swap_order_positions(
         seq2 = result2.data["delivery_sequence"]
 
         # Swap sequences
-        supabase.table("route_orders").update({
+        await supabase.table("route_orders").update({
             "delivery_sequence": seq2
         }).eq("id", route_order_id_1).execute()
 
-        supabase.table("route_orders").update({
+        await supabase.table("route_orders").update({
             "delivery_sequence": seq1
         }).eq("id", route_order_id_2).execute()
 
@@ -4,7 +4,7 @@ import logging
 from typing import Optional
 from fastapi import APIRouter, Header
 
-from ....core.supabase import get_supabase_client
+from ....core.supabase_async import gather_queries, get_async_supabase_client
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -37,33 +37,33 @@ async def get_routes_init_data(
     - stats (active routes count, etc)
     """
     logger.info("Getting routes init data")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     user_id = get_user_id_from_token(authorization)
 
     try:
-        # === QUERIES ===
-
-        # 1. Routes activas (no completadas) con route_orders
-        routes_query = supabase.table("routes").select(
-            "*, route_orders(id, order_id, delivery_sequence)"
-        ).neq("status", "completed").order("route_date", desc=True).limit(20)
-
-        routes_result = routes_query.execute()
-
-        # 2. Vehicles
-        vehicles_result = supabase.table("vehicles").select(
-            "id, vehicle_code, capacity_kg, status"
-        ).execute()
-
-        # 3. Drivers (usuarios con rol driver)
-        drivers_result = supabase.table("users").select(
-            "id, name, email"
-        ).eq("role", "driver").execute()
-
-        # 4. Stats
-        active_routes_result = supabase.table("routes").select(
-            "id", count="exact"
-        ).in_("status", ["planned", "in_progress"]).execute()
+        # === QUERIES (concurrentes) ===
+        results = await gather_queries({
+            # 1. Routes activas (no completadas) con route_orders
+            "routes": supabase.table("routes").select(
+                "*, route_orders(id, order_id, delivery_sequence)"
+            ).neq("status", "completed").order("route_date", desc=True).limit(20),
+            # 2. Vehicles
+            "vehicles": supabase.table("vehicles").select(
+                "id, vehicle_code, capacity_kg, status"
+            ),
+            # 3. Drivers (usuarios con rol driver)
+            "drivers": supabase.table("users").select(
+                "id, name, email"
+            ).eq("role", "driver"),
+            # 4. Stats
+            "active_routes": supabase.table("routes").select(
+                "id", count="exact"
+            ).in_("status", ["planned", "in_progress"]),
+        })
+        routes_result = results["routes"]
+        vehicles_result = results["vehicles"]
+        drivers_result = results["drivers"]
+        active_routes_result = results["active_routes"]
 
         # === ENRIQUECIMIENTO ===
         routes_data = routes_result.data or []
@@ -77,27 +77,33 @@ async def get_routes_init_data(
                 if ro.get("order_id"):
                     all_order_ids.append(ro["order_id"])
 
-        # Fetch orders with client info
-        orders_map = {}
-        if all_order_ids:
-            orders_result = supabase.table("orders").select(
+        # Orders (con cliente), drivers y vehicles de las rutas, tambien concurrentes
+        lookups = await gather_queries({
+            "orders": supabase.table("orders").select(
                 "id, order_number, status, client_id, clients(id, name, razon_social, nit)"
-            ).in_("id", all_order_ids).execute()
+            ).in_("id", all_order_ids) if all_order_ids else None,
+            "drivers": supabase.table("users").select("id, name").in_(
+                "id", driver_ids
+            ) if driver_ids else None,
+            "vehicles": supabase.table("vehicles").select("id, vehicle_code").in_(
+                "id", vehicle_ids
+            ) if vehicle_ids else None,
+        })
 
-            for o in (orders_result.data or []):
+        orders_map = {}
+        if lookups["orders"]:
+            for o in (lookups["orders"].data or []):
                 orders_map[o["id"]] = o
 
         # Mapeo de drivers
         drivers_map = {}
-        if driver_ids:
-            drivers_info = supabase.table("users").select("id, name").in_("id", driver_ids).execute()
-            drivers_map = {d["id"]: d["name"] for d in (drivers_info.data or [])}
+        if lookups["drivers"]:
+            drivers_map = {d["id"]: d["name"] for d in (lookups["drivers"].data or [])}
 
         # Mapeo de vehicles
         vehicles_map = {}
-        if vehicle_ids:
-            vehicles_info = supabase.table("vehicles").select("id, vehicle_code").in_("id", vehicle_ids).execute()
-            vehicles_map = {v["id"]: v["vehicle_code"] for v in (vehicles_info.data or [])}
+        if lookups["vehicles"]:
+            vehicles_map = {v["id"]: v["vehicle_code"] for v in (lookups["vehicles"].data or [])}
 
         # === TRANSFORMACION ===
         routes = []
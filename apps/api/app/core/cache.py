@@ -0,0 +1,210 @@
+"""Process-local read-through cache for master data.
+
+Catalogs (clients, products, branches, vehicles, product configs, credit
+terms, prices) change a few times a day but were read from Supabase on
+every request. TTLCache keeps the last results in memory:
+
+    cache = get_masterdata_cache()
+    entry = await cache.get_or_load_async(("products", True, None), load_products)
+    entry.value, entry.etag
+
+Entries expire after settings.masterdata_cache_ttl_seconds and the least
+recently used ones are evicted beyond settings.masterdata_cache_max_entries.
+Per-id lookups (credit terms, product configs, price lists and prices of
+one id each, via get_or_load_many) live in a separate cache bounded by
+settings.masterdata_lookup_cache_max_entries: a billing run touches
+thousands of ids and would otherwise evict the catalogs.
+Keys are tuples whose first element is the resource name, so
+invalidate("products") drops every cached variant of /products. Each entry
+carries an ETag (hash of its JSON) for conditional GETs.
+
+The cache is shared by async handlers and by sync helpers running on worker
+threads (excel_generator), so every operation takes a lock. Loaders run
+outside the lock; concurrent misses may both load, last one wins.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    """A cached value with its load time and (lazily computed) ETag."""
+
+    __slots__ = ("value", "loaded_at", "_etag")
+
+    def __init__(self, value: Any):
+        self.value = value
+        self.loaded_at = time.monotonic()
+        self._etag: Optional[str] = None
+
+    @property
+    def etag(self) -> str:
+        if self._etag is None:
+            self._etag = compute_etag(self.value)
+        return self._etag
+
+
+def compute_etag(value: Any) -> str:
+    """Strong ETag of a JSON-serializable value."""
+    body = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire ttl_seconds after loading."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[Hashable, ...], CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[CacheEntry]:
+        """Fresh entry for key (marked most recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry.loaded_at > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: Tuple[Hashable, ...], value: Any) -> CacheEntry:
+        entry = CacheEntry(value)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_or_load(self, key: Tuple[Hashable, ...], loader: Callable[[], Any]) -> CacheEntry:
+        """Cached entry for key, calling loader() on a miss (exceptions are not cached)."""
+        entry = self.get(key)
+        if entry is None:
+            entry = self.set(key, loader())
+        return entry
+
+    async def get_or_load_async(self, key: Tuple[Hashable, ...], loader: Callable[[], Awaitable[Any]]) -> CacheEntry:
+        """get_or_load for an async loader."""
+        entry = self.get(key)
+        if entry is None:
+            entry = self.set(key, await loader())
+        return entry
+
+    def get_or_load_many(
+        self,
+        resource: str,
+        ids: Iterable[Hashable],
+        loader: Callable[[list], Dict[Hashable, Any]],
+    ) -> Dict[Hashable, Any]:
+        """{id: value} for ids, cached per (resource, id).
+
+        loader(missing_ids) fetches every missing id in one go and returns
+        {id: value}; ids it does not return are cached as None (known absent)
+        and left out of the result.
+        """
+        found: Dict[Hashable, Any] = {}
+        missing = []
+        for item_id in dict.fromkeys(ids):
+            entry = self.get((resource, item_id))
+            if entry is None:
+                missing.append(item_id)
+            elif entry.value is not None:
+                found[item_id] = entry.value
+        if missing:
+            loaded = loader(missing)
+            for item_id in missing:
+                value = loaded.get(item_id)
+                self.set((resource, item_id), value)
+                if value is not None:
+                    found[item_id] = value
+        return found
+
+    def invalidate(self, *resources: str) -> int:
+        """Drop the entries of the given resources (all entries if none). Returns how many were dropped."""
+        with self._lock:
+            if not resources:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [key for key in self._entries if key[0] in resources]
+                for key in stale:
+                    del self._entries[key]
+                removed = len(stale)
+        if removed:
+            logger.info(f"Invalidated {removed} cached entries ({', '.join(resources) or 'all'})")
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Cached resources to drop when a resource changes (branches embed client
+# names, product configs embed product names, ...)
+MASTERDATA_DEPENDENTS = {
+    "clients": ("clients", "branches"),
+    "branches": ("branches",),
+    "products": ("products", "product_configs", "product_prices"),
+    "product_configs": ("product_configs",),
+    "receiving_schedules": ("receiving_schedules",),
+    "vehicles": ("vehicles",),
+    "drivers": ("drivers",),
+    "credit_terms": ("credit_terms",),
+    "client_price_lists": ("client_price_lists",),
+    "world_office_config": ("world_office_config",),
+}
+
+_masterdata_cache: Optional[TTLCache] = None
+_lookup_cache: Optional[TTLCache] = None
+
+
+def get_masterdata_cache() -> TTLCache:
+    """Process-wide master data cache, created on first use."""
+    global _masterdata_cache
+    if _masterdata_cache is None:
+        settings = get_settings()
+        _masterdata_cache = TTLCache(
+            max_entries=settings.masterdata_cache_max_entries,
+            ttl_seconds=settings.masterdata_cache_ttl_seconds,
+        )
+    return _masterdata_cache
+
+
+def get_lookup_cache() -> TTLCache:
+    """Process-wide cache of per-id master data lookups, created on first use."""
+    global _lookup_cache
+    if _lookup_cache is None:
+        settings = get_settings()
+        _lookup_cache = TTLCache(
+            max_entries=settings.masterdata_lookup_cache_max_entries,
+            ttl_seconds=settings.masterdata_cache_ttl_seconds,
+        )
+    return _lookup_cache
+
+
+def invalidate_masterdata(*resources: str) -> int:
+    """Drop cached master data of the given resources and their dependents (everything if none).
+
+    Call after writing clients, products, branches, etc. Returns how many
+    entries were dropped.
+    """
+    caches = (get_masterdata_cache(), get_lookup_cache())
+    if not resources:
+        return sum(c.invalidate() for c in caches)
+    stale = sorted({dependent for r in resources for dependent in MASTERDATA_DEPENDENTS.get(r, (r,))})
+    return sum(c.invalidate(*stale) for c in caches)
@@ -14,6 +14,37 @@ class Settings(BaseSettings):
     supabase_url: str
     supabase_service_key: str
     supabase_storage_bucket: str = "ordenesdecompra"
+    # World Office billing workbooks (app/services/export_files.py)
+    billing_exports_bucket: str = "billing-exports"
+    # Async client pool (app/core/supabase_async.py)
+    supabase_http2: bool = True
+    supabase_max_connections: int = 10
+    supabase_max_concurrency: int = 50
+    supabase_timeout_seconds: float = 30.0
+    supabase_blocking_threads: int = 8
+    # Master data cache (app/core/cache.py)
+    masterdata_cache_ttl_seconds: float = 300.0
+    masterdata_cache_max_entries: int = 256
+    # Per-id lookups (credit terms, product configs, price lists, prices), kept apart
+    masterdata_lookup_cache_max_entries: int = 20000
+
+    # Embedding cache (app/services/embeddings.py): vectors kept in memory (~6 KB each)
+    embedding_cache_max_entries: int = 5000
+    # Batched OpenAI embedding requests: estimated tokens and texts per request,
+    # requests in flight per batch
+    embedding_batch_max_tokens: int = 100_000
+    embedding_batch_max_inputs: int = 2048
+    embedding_batch_concurrency: int = 4
+    # In-process productos_rag / clientes_rag vector index (app/services/vector_index.py);
+    # reloaded by the scheduler to pick up other instances' syncs
+    vector_index_enabled: bool = True
+    vector_index_refresh_minutes: int = 15
+    # Order lines matched at once by rag_sync.match_products
+    product_match_concurrency: int = 8
+
+    # Request metrics (app/core/metrics.py)
+    # Requests slower than this are logged with their DB / LLM / Graph breakdown (0 disables)
+    slow_request_ms: float = 1000.0
 
     # Google Cloud (for production)
     gcp_project_id: str = ""
@@ -24,6 +55,8 @@ class Settings(BaseSettings):
     ms_graph_client_secret: str = ""
     ms_graph_tenant_id: str = ""
     ms_graph_target_mailbox: str = "comercial@pastrychef.com.co"
+    # Pooled HTTP/2 connections to graph.microsoft.com
+    ms_graph_max_connections: int = 10
 
     # Webhook Configuration
     webhook_base_url: str = ""
@@ -31,6 +64,21 @@ class Settings(BaseSettings):
 
     # OpenAI
     openai_api_key: str = ""
+    # Pooled HTTP/2 connections to api.openai.com
+    openai_max_connections: int = 20
+    # Email purchase orders (app/services/email_processor.py): PDF attachments of
+    # one email processed at once
+    email_attachment_concurrency: int = 4
+    # Vision fallback of the PDF extractor (app/services/ai_extractor.py): pages
+    # sent (only the first by default; raise to send multi-page orders), render
+    # resolution and JPEG quality, rendering processes (0 renders on a worker
+    # thread) and rendered PDFs kept in memory
+    pdf_vision_max_pages: int = 1
+    pdf_render_dpi: int = 200
+    pdf_jpeg_quality: int = 85
+    pdf_render_workers: int = 2
+    pdf_page_cache_max_entries: int = 16
+    pdf_page_cache_ttl_seconds: float = 3600.0
 
     # Telegram Bot
     telegram_bot_token: str = ""
@@ -0,0 +1,330 @@
+"""Request latency metrics and per-request round-trip accounting.
+
+RequestMetricsMiddleware times every HTTP request and, while it runs, keeps a
+RequestStats in a context variable. The Supabase, OpenAI and Microsoft Graph
+clients are built on InstrumentedTransport / InstrumentedAsyncTransport (or
+wrap a call in track()), so every round-trip they make is counted against the
+request that caused it:
+
+    with track("graph"):
+        result = msal_app.acquire_token_for_client(scopes=[...])
+
+Requests slower than settings.slow_request_ms are logged with their
+breakdown ("14 queries / 812 ms DB / 1200 ms LLM"). Durations of the same
+service are summed, so gathered queries can add up to more than the
+request's wall time.
+
+Everything is also aggregated into process-wide histograms and counters,
+rendered in Prometheus text format by render_metrics() (GET /metrics).
+Calls made outside a request (scheduler jobs) only reach the histograms.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Services whose round-trips are counted per request
+DB = "db"
+LLM = "llm"
+GRAPH = "graph"
+SERVICES = (DB, LLM, GRAPH)
+
+# Prometheus client defaults (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request extension for streamed downloads: the transports return once headers
+# arrive instead of reading the body
+STREAM_BODY = "stream_body"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (
+        str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in values
+    )
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values (thread-safe)."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                label_str = _format_labels((*self.labelnames, "le"), (*labels, le))
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """Monotonic counter keyed by label values (thread-safe)."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+REQUEST_DURATION = Histogram(
+    "bakery_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+EXTERNAL_CALL_DURATION = Histogram(
+    "bakery_external_call_duration_seconds",
+    "Round-trip latency of calls to Supabase (db), OpenAI (llm) and Microsoft Graph (graph).",
+    ("service",),
+)
+REQUEST_EXTERNAL_CALLS = Counter(
+    "bakery_http_request_external_calls_total",
+    "External round-trips made while serving each route.",
+    ("route", "service"),
+)
+REQUEST_EXTERNAL_SECONDS = Counter(
+    "bakery_http_request_external_seconds_total",
+    "Time spent in external round-trips while serving each route.",
+    ("route", "service"),
+)
+REGISTRY = (REQUEST_DURATION, EXTERNAL_CALL_DURATION, REQUEST_EXTERNAL_CALLS, REQUEST_EXTERNAL_SECONDS)
+
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    """Drop every recorded series (tests)."""
+    for metric in REGISTRY:
+        metric.clear()
+
+
+class RequestStats:
+    """Round-trip counts and time per service for one request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {service: 0 for service in SERVICES}
+        self.seconds: Dict[str, float] = {service: 0.0 for service in SERVICES}
+
+    def add(self, service: str, seconds: float) -> None:
+        # Sync clients run on worker threads, concurrently with the handler
+        with self._lock:
+            self.calls[service] = self.calls.get(service, 0) + 1
+            self.seconds[service] = self.seconds.get(service, 0.0) + seconds
+
+    def summary(self) -> str:
+        """'14 queries / 812 ms DB / 1 LLM calls / 1200 ms LLM / 0 Graph calls / 0 ms Graph'"""
+        return (
+            f"{self.calls[DB]} queries / {self.seconds[DB] * 1000:.0f} ms DB / "
+            f"{self.calls[LLM]} LLM calls / {self.seconds[LLM] * 1000:.0f} ms LLM / "
+            f"{self.calls[GRAPH]} Graph calls / {self.seconds[GRAPH] * 1000:.0f} ms Graph"
+        )
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats of the request being served, or None outside a request."""
+    return _request_stats.get()
+
+
+def record_call(service: str, seconds: float) -> None:
+    """Account one round-trip to service against the current request."""
+    EXTERNAL_CALL_DURATION.observe(seconds, service)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add(service, seconds)
+
+
+@contextmanager
+def track(service: str) -> Iterator[None]:
+    """Time the enclosed block as one round-trip to service."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_call(service, time.perf_counter() - start)
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """Sync transport that records each request as a round-trip to service."""
+
+    def __init__(self, transport: httpx.BaseTransport, service: str):
+        self._transport = transport
+        self.service = service
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = self._transport.handle_request(request)
+            # The body is part of the round-trip
+            response.read()
+            return response
+        finally:
+            record_call(self.service, time.perf_counter() - start)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class InstrumentedAsyncTransport(httpx.AsyncBaseTransport):
+    """Async twin of InstrumentedTransport (requests marked STREAM_BODY are
+    timed to their headers and left unread)."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, service: str):
+        self._transport = transport
+        self.service = service
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+            if not request.extensions.get(STREAM_BODY):
+                await response.aread()
+            return response
+        finally:
+            record_call(self.service, time.perf_counter() - start)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware: per-route latency histogram and slow request log.
+
+    Pure ASGI (not BaseHTTPMiddleware), so streamed responses are timed until
+    their last chunk and the stats context variable reaches the endpoint.
+    Routes are labelled by template (/api/orders/{order_id}); requests that
+    match no route are labelled "unmatched" to keep the series bounded.
+    """
+
+    def __init__(self, app, slow_request_ms: Optional[float] = None, excluded_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            self._record(scope, status, elapsed, stats)
+
+    def _record(self, scope, status: int, elapsed: float, stats: RequestStats) -> None:
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        method = scope.get("method", "")
+        REQUEST_DURATION.observe(elapsed, method, route, str(status))
+        for service in SERVICES:
+            if stats.calls[service]:
+                REQUEST_EXTERNAL_CALLS.inc(stats.calls[service], route, service)
+                REQUEST_EXTERNAL_SECONDS.inc(stats.seconds[service], route, service)
+
+        slow_ms = self.slow_request_ms
+        if slow_ms is None:
+            slow_ms = get_settings().slow_request_ms
+        elapsed_ms = elapsed * 1000
+        if slow_ms > 0 and elapsed_ms >= slow_ms:
+            logger.warning(
+                f"Slow request {method} {scope.get('path')} ({route}) {status} "
+                f"in {elapsed_ms:.0f} ms: {stats.summary()}",
+                extra={
+                    "route": route,
+                    "method": method,
+                    "status": status,
+                    "duration_ms": round(elapsed_ms, 1),
+                    "db_queries": stats.calls[DB],
+                    "db_ms": round(stats.seconds[DB] * 1000, 1),
+                    "llm_calls": stats.calls[LLM],
+                    "llm_ms": round(stats.seconds[LLM] * 1000, 1),
+                    "graph_calls": stats.calls[GRAPH],
+                    "graph_ms": round(stats.seconds[GRAPH] * 1000, 1),
+                },
+            )
@@ -0,0 +1,165 @@
+"""Keyset (cursor) pagination and NDJSON streaming for history lists.
+
+Offset pagination (``range(offset, offset + limit)`` plus ``count="exact"``)
+makes Postgres walk every skipped row and count the whole filtered table on
+each page, so order, remision and export lists get slower as history grows.
+Keyset pagination instead continues from the last row of the previous page:
+
+    query = supabase.table("orders").select("...", count=count_method(count, cursor))
+    page = await fetch_page(query, limit=50, cursor=cursor, page=page)
+    page.rows, page.next_cursor, page.has_more, page.total_count
+
+Rows are ordered by (sort_column DESC NULLS LAST, id DESC) and a cursor is an
+opaque token of the last row's (sort value, id), so a page costs an index
+range scan whatever its depth. Rows whose sort value is NULL (created_at is
+nullable on orders, remisions and export_history) come after all the others,
+ordered by id, and a cursor may point into that tail. ``page`` is still accepted (offset mode) for existing
+callers; a cursor takes precedence.
+
+count_method() maps the ``count`` query parameter: ``exact`` (default of
+offset mode), ``estimated`` (planner estimate, exact only for small
+results) or ``none`` (default of cursor mode, no count at all).
+
+iter_keyset() walks a whole filtered history in keyset batches and
+ndjson_response() streams it as newline-delimited JSON, for full-history
+exports that would not fit in one response.
+"""
+
+import base64
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, List, NamedTuple, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+# Accepted values of the ``count`` query parameter
+COUNT_PATTERN = "^(exact|estimated|none)$"
+
+# Rows per query when streaming a full history
+STREAM_BATCH_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was not produced by encode_cursor()."""
+
+
+class Page(NamedTuple):
+    rows: List[dict]
+    next_cursor: Optional[str]
+    has_more: bool
+    total_count: Optional[int]
+
+
+def encode_cursor(sort_value: Any, row_id: Any) -> str:
+    """Opaque cursor pointing after a row with (sort_value, row_id)."""
+    raw = json.dumps([sort_value, row_id], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """(sort_value, row_id) of a cursor. Raises InvalidCursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+    if row_id is None:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return sort_value, row_id
+
+
+def count_method(count: Optional[str], cursor: Optional[str]) -> Optional[str]:
+    """select(count=...) for the ``count`` parameter (exact for offset pages, none for cursor pages)."""
+    if count is None:
+        count = "none" if cursor else "exact"
+    return None if count == "none" else count
+
+
+def _quote(value: Any) -> str:
+    # Double quotes keep ":", "+", "," and "." of timestamps literal in or=()
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def apply_keyset(query, cursor: Optional[str], sort_column: str = "created_at"):
+    """Order query by (sort_column NULLS LAST, id) descending, starting after cursor."""
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        rid = _quote(row_id)
+        if sort_value is None:
+            # Inside the NULL tail: only NULL rows with a smaller id follow
+            query = query.or_(f"and({sort_column}.is.null,id.lt.{rid})")
+        else:
+            value = _quote(sort_value)
+            query = query.or_(
+                f"{sort_column}.lt.{value},and({sort_column}.eq.{value},id.lt.{rid}),{sort_column}.is.null"
+            )
+    return query.order(sort_column, desc=True, nullsfirst=False).order("id", desc=True)
+
+
+def _cursor_after(row: dict, sort_column: str) -> str:
+    return encode_cursor(row.get(sort_column), row["id"])
+
+
+async def fetch_page(
+    query,
+    *,
+    limit: int,
+    cursor: Optional[str] = None,
+    page: int = 1,
+    sort_column: str = "created_at",
+) -> Page:
+    """Execute one page of query (already filtered and selected).
+
+    Fetches limit + 1 rows to tell whether another page follows. The query
+    must not be ordered yet (apply_keyset orders it).
+    """
+    query = apply_keyset(query, cursor, sort_column)
+    if cursor:
+        query = query.limit(limit + 1)
+    else:
+        offset = (page - 1) * limit
+        query = query.range(offset, offset + limit)
+
+    result = await query.execute()
+    rows = result.data or []
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = _cursor_after(rows[-1], sort_column) if has_more and rows else None
+    return Page(rows, next_cursor, has_more, result.count)
+
+
+async def iter_keyset(
+    make_query: Callable[[], Any],
+    *,
+    sort_column: str = "created_at",
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> AsyncIterator[List[dict]]:
+    """Yield every row of make_query() (a fresh filtered query) in keyset batches."""
+    cursor = None
+    while True:
+        result = await apply_keyset(make_query(), cursor, sort_column).limit(batch_size).execute()
+        rows = result.data or []
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        cursor = _cursor_after(rows[-1], sort_column)
+
+
+def ndjson_response(
+    batches: AsyncIterator[List[dict]],
+    transform: Callable[[List[dict]], Awaitable[List[Any]]],
+    filename: Optional[str] = None,
+) -> StreamingResponse:
+    """Stream transform(batch) items as newline-delimited JSON."""
+
+    async def lines():
+        async for rows in batches:
+            for item in await transform(rows):
+                if isinstance(item, BaseModel):
+                    yield item.model_dump_json() + "\n"
+                else:
+                    yield json.dumps(item, default=str) + "\n"
+
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'} if filename else None
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
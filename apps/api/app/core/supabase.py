@@ -1,10 +1,14 @@
-from supabase import create_client, Client
+from supabase import Client, ClientOptions
+from postgrest import SyncPostgrestClient
 from functools import lru_cache
 from typing import Optional, List
 from datetime import datetime, timedelta, timezone
 import logging
 
+import httpx
+
 from .config import get_settings
+from .metrics import DB, InstrumentedTransport
 
 logger = logging.getLogger(__name__)
 
@@ -12,13 +16,40 @@ logger = logging.getLogger(__name__)
 ALL_AUDIT_TABLES = ["orders_audit", "order_items_audit", "order_item_deliveries_audit"]
 
 
+class _SharedSessionClient(Client):
+    """supabase Client whose schema() clients reuse the shared HTTP session.
+
+    supabase-py's schema() builds a PostgREST client with a fresh httpx.Client
+    on every call, which neither reuses connections nor goes through the
+    instrumented transport.
+    """
+
+    def schema(self, schema: str) -> SyncPostgrestClient:
+        return SyncPostgrestClient(
+            str(self.rest_url),
+            schema=schema,
+            headers=dict(self.options.headers),
+            http_client=self.options.httpx_client,
+        )
+
+
 @lru_cache()
 def get_supabase_client() -> Client:
-    """Get cached Supabase client instance."""
+    """Get cached Supabase client instance.
+
+    Requests go through InstrumentedTransport, so each round-trip is counted
+    against the HTTP request being served (app/core/metrics.py).
+    """
     settings = get_settings()
-    return create_client(
+    http_client = httpx.Client(
+        transport=InstrumentedTransport(httpx.HTTPTransport(http2=settings.supabase_http2), DB),
+        timeout=httpx.Timeout(120.0),
+        follow_redirects=True,
+    )
+    return _SharedSessionClient.create(
         settings.supabase_url,
-        settings.supabase_service_key
+        settings.supabase_service_key,
+        options=ClientOptions(httpx_client=http_client),
     )
 
 
@@ -0,0 +1,263 @@
+"""Async Supabase (PostgREST) access for FastAPI routes.
+
+get_supabase_client() is synchronous: every .execute() inside an
+``async def`` handler blocks the event loop for a full PostgREST round-trip,
+so one slow billing run stalls every other request on the worker.
+
+get_async_supabase_client() returns a process-wide AsyncSupabase with the
+same query-builder ergonomics (table/schema/rpc, then ``await .execute()``)
+over one shared HTTP/2 connection pool:
+
+    supabase = get_async_supabase_client()
+    result = await supabase.table("orders").select("id").eq("status", "received").execute()
+
+All requests share one httpx.AsyncClient. At most
+settings.supabase_max_concurrency requests are in flight at once (the rest
+wait for a slot), and each one times out after
+settings.supabase_timeout_seconds. Use execute(query, timeout=...) for a
+different per-call timeout, and gather_queries() to run independent queries
+of one handler concurrently. Code that still has to use the sync client
+(helpers shared with jobs and services) can be moved off the event loop with
+run_blocking().
+
+Storage objects are downloaded over the same pool with
+open_storage_object(), which streams the body instead of buffering it.
+
+The client is closed by close_async_supabase_client() on app shutdown.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
+from urllib.parse import quote
+
+import anyio
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+
+from .config import get_settings
+from .metrics import DB, STREAM_BODY, InstrumentedAsyncTransport
+from .supabase import ALL_AUDIT_TABLES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _BoundedTransport(httpx.AsyncBaseTransport):
+    """Transport that lets at most max_concurrency requests run at once."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_concurrency: int):
+        self._transport = transport
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async with self._semaphore:
+            response = await self._transport.handle_async_request(request)
+            if request.extensions.get(STREAM_BODY):
+                # Streamed downloads release the slot once headers arrive
+                return response
+            # Hold the slot until the body is read (aread closes the stream),
+            # so the limit covers the whole round-trip
+            await response.aread()
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class AsyncSupabase:
+    """PostgREST query builders (postgrest-py async) on a shared connection pool.
+
+    postgrest's own schema() opens a new HTTP client per call; here every
+    schema reuses the same one.
+    """
+
+    def __init__(self, url: str, key: str, http_client: httpx.AsyncClient):
+        self.http_client = http_client
+        self._rest_url = f"{url.rstrip('/')}/rest/v1"
+        self._storage_url = f"{url.rstrip('/')}/storage/v1"
+        self._auth_headers = {"apiKey": key, "Authorization": f"Bearer {key}"}
+        self._headers = {**DEFAULT_POSTGREST_CLIENT_HEADERS, **self._auth_headers}
+        self._schemas: Dict[str, AsyncPostgrestClient] = {}
+
+    def schema(self, schema: str) -> AsyncPostgrestClient:
+        client = self._schemas.get(schema)
+        if client is None:
+            client = AsyncPostgrestClient(
+                self._rest_url, schema=schema, headers=dict(self._headers), http_client=self.http_client
+            )
+            self._schemas[schema] = client
+        return client
+
+    def table(self, table_name: str):
+        return self.schema("public").table(table_name)
+
+    def from_(self, table_name: str):
+        return self.table(table_name)
+
+    def rpc(self, fn: str, params: Optional[Dict[str, Any]] = None, **kwargs):
+        return self.schema("public").rpc(fn, params or {}, **kwargs)
+
+    async def open_storage_object(self, bucket: str, path: str) -> httpx.Response:
+        """Start a streamed download of a Storage object.
+
+        The body is not read yet: iterate response.aiter_bytes() and
+        aclose() the response when done. Check the status first.
+        """
+        request = self.http_client.build_request(
+            "GET",
+            f"{self._storage_url}/object/{quote(bucket)}/{quote(path)}",
+            headers=self._auth_headers,
+            extensions={STREAM_BODY: True},
+        )
+        return await self.http_client.send(request, stream=True)
+
+    async def aclose(self) -> None:
+        await self.http_client.aclose()
+
+
+def create_async_supabase_client(
+    url: str,
+    key: str,
+    *,
+    max_connections: int,
+    max_concurrency: int,
+    timeout_seconds: float,
+    http2: bool = True,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> AsyncSupabase:
+    """Build an AsyncSupabase (transport is for tests and the load benchmark)."""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    inner = transport or httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+    http_client = httpx.AsyncClient(
+        # Outermost, so a counted round-trip includes the wait for a slot
+        transport=InstrumentedAsyncTransport(_BoundedTransport(inner, max_concurrency), DB),
+        timeout=httpx.Timeout(timeout_seconds),
+        follow_redirects=True,
+    )
+    return AsyncSupabase(url, key, http_client)
+
+
+_async_client: Optional[AsyncSupabase] = None
+
+
+def get_async_supabase_client() -> AsyncSupabase:
+    """Get the process-wide async Supabase client, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        settings = get_settings()
+        _async_client = create_async_supabase_client(
+            settings.supabase_url,
+            settings.supabase_service_key,
+            max_connections=settings.supabase_max_connections,
+            max_concurrency=settings.supabase_max_concurrency,
+            timeout_seconds=settings.supabase_timeout_seconds,
+            http2=settings.supabase_http2,
+        )
+    return _async_client
+
+
+async def close_async_supabase_client() -> None:
+    """Close the shared connection pool (app shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        client, _async_client = _async_client, None
+        await client.aclose()
+
+
+async def execute(query, timeout: Optional[float] = None):
+    """Await query.execute(), failing with asyncio.TimeoutError after timeout seconds."""
+    if timeout is None:
+        return await query.execute()
+    return await asyncio.wait_for(query.execute(), timeout)
+
+
+async def gather_queries(
+    queries: Dict[str, Any],
+    *,
+    optional: Iterable[str] = (),
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Execute independent queries concurrently and return their results by name.
+
+    Page "init" endpoints used to await a handful of unrelated queries one
+    after another, so a page load cost the sum of their latencies; gathered,
+    it costs the slowest one.
+
+        results = await gather_queries({
+            "routes": supabase.table("routes").select("*"),
+            "vehicles": supabase.table("vehicles").select("*"),
+        }, optional=["vehicles"])
+
+    A query given as None is skipped and yields None (handy for follow-ups
+    that only run when there are ids to look up). A failing query named in
+    optional yields None and is logged; any other failure is raised once all
+    queries have finished, so no request is left running in the background.
+    """
+    optional = set(optional)
+    names = [name for name, query in queries.items() if query is not None]
+    outcomes = await asyncio.gather(
+        *(execute(queries[name], timeout=timeout) for name in names),
+        return_exceptions=True,
+    )
+
+    results: Dict[str, Any] = {name: None for name in queries}
+    error: Optional[BaseException] = None
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, BaseException):
+            if name in optional:
+                logger.warning(f"Optional query '{name}' failed: {outcome}")
+            elif error is None:
+                error = outcome
+            continue
+        results[name] = outcome
+    if error is not None:
+        raise error
+    return results
+
+
+_blocking_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+async def run_blocking(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run sync code (sync Supabase client, openpyxl) on a worker thread.
+
+    At most settings.supabase_blocking_threads run at once, so a burst of
+    heavy billing runs cannot take every thread of the default pool.
+    """
+    global _blocking_limiter
+    if _blocking_limiter is None:
+        _blocking_limiter = anyio.CapacityLimiter(get_settings().supabase_blocking_threads)
+    return await anyio.to_thread.run_sync(partial(fn, *args, **kwargs), limiter=_blocking_limiter)
+
+
+async def backfill_audit_user_async(
+    supabase: AsyncSupabase,
+    user_id: Optional[str],
+    order_id: str,
+    tables: Optional[List[str]] = None,
+    since_seconds: int = 10,
+) -> None:
+    """Async twin of app.core.supabase.backfill_audit_user (same semantics)."""
+    if not user_id or not order_id:
+        return
+
+    if tables is None:
+        tables = ALL_AUDIT_TABLES
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=since_seconds)).isoformat()
+
+    for table in tables:
+        try:
+            await supabase.table(table) \
+                .update({"changed_by": user_id}) \
+                .eq("order_id", order_id) \
+                .is_("changed_by", "null") \
+                .gte("changed_at", cutoff) \
+                .execute()
+        except Exception as e:
+            logger.warning(f"Failed to backfill audit user in {table}: {e}")
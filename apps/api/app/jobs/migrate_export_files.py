@@ -0,0 +1,112 @@
+"""Move legacy billing Excel files from export_history.file_data to storage.
+
+One-off (and safe to re-run) companion of app/services/export_files.py:
+
+    python -m app.jobs.migrate_export_files --batch-size 20 [--limit 500] [--dry-run]
+
+Rows with file_data and no file_path are walked by id in batches. Each batch
+lists only ids (file_data is fetched one row at a time, so memory stays at
+one workbook), then every file is decoded, uploaded to
+world-office/{YYYY}/{MM}/{export_id}_{file_name} (upsert, so a re-run after a
+crash overwrites instead of duplicating), and the row gets file_path with
+file_data cleared. Rows that cannot be decoded or uploaded are logged and
+skipped; they keep file_data and stay downloadable.
+"""
+
+import argparse
+import logging
+from datetime import datetime
+
+from ..core.supabase import get_supabase_client
+from ..services.export_files import EXCEL_MEDIA_TYPE, decode_legacy_file_data, export_file_path
+from ..services.storage import get_billing_storage_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 20
+
+
+def _export_date(row: dict) -> datetime:
+    try:
+        return datetime.fromisoformat(str(row.get("created_at"))[:19])
+    except ValueError:
+        return datetime.now()
+
+
+def _migrate_row(supabase, storage, row: dict, dry_run: bool) -> None:
+    result = (
+        supabase.table("export_history")
+        .select("file_data")
+        .eq("id", row["id"])
+        .single()
+        .execute()
+    )
+    file_bytes = decode_legacy_file_data((result.data or {}).get("file_data"))
+    path = export_file_path(row.get("file_name") or "export.xlsx", key=row["id"], when=_export_date(row))
+    if dry_run:
+        logger.info(f"[dry-run] Would move export {row['id']} ({len(file_bytes)} bytes) to {path}")
+        return
+
+    storage.upload_file(file_bytes, path, EXCEL_MEDIA_TYPE, upsert=True)
+    supabase.table("export_history").update({
+        "file_path": path,
+        "file_data": None,
+    }).eq("id", row["id"]).execute()
+
+
+def migrate_export_files(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    limit: int | None = None,
+    dry_run: bool = False,
+) -> dict:
+    """Move up to limit legacy export files to storage, batch_size rows per query."""
+    supabase = get_supabase_client()
+    storage = get_billing_storage_service()
+    migrated = failed = 0
+    last_id = None
+
+    while limit is None or migrated + failed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - migrated - failed)
+        query = (
+            supabase.table("export_history")
+            .select("id, file_name, created_at")
+            .is_("file_path", "null")
+            .not_.is_("file_data", "null")
+            .order("id")
+            .limit(size)
+        )
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+
+        for row in rows:
+            try:
+                _migrate_row(supabase, storage, row, dry_run)
+                migrated += 1
+            except Exception as e:
+                logger.error(f"migrate_export_files: export {row['id']} failed, keeping file_data: {e}")
+                failed += 1
+
+        if len(rows) < size:
+            break
+        last_id = rows[-1]["id"]
+        logger.info(f"migrate_export_files: {migrated} migrated, {failed} failed so far")
+
+    result = {"migrated": migrated, "failed": failed, "dry_run": dry_run}
+    logger.info(f"migrate_export_files done: {result}")
+    return result
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per query")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many rows")
+    parser.add_argument("--dry-run", action="store_true", help="decode and log without uploading")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    migrate_export_files(batch_size=args.batch_size, limit=args.limit, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
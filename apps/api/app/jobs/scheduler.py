@@ -7,7 +7,9 @@ import logging
 
 BOG_TZ = ZoneInfo("America/Bogota")
 
+from ..core.config import get_settings
 from ..core.supabase import get_supabase_client
+from ..services.vector_index import load_vector_indexes
 from .daily_orders_report import generate_daily_orders_report
 from .telegram_daily_summary import run_am_summary, run_pm_summary
 from .email_daily_summary import run_email_am_summary, run_email_pm_summary
@@ -145,6 +147,17 @@ def init_scheduler() -> AsyncIOScheduler:
         replace_existing=True,
     )
 
+    # Vector index reload - picks up RAG syncs made by other instances
+    settings = get_settings()
+    if settings.vector_index_enabled:
+        scheduler.add_job(
+            load_vector_indexes,
+            IntervalTrigger(minutes=settings.vector_index_refresh_minutes, timezone=BOG_TZ),
+            id="vector_index_refresh",
+            name="Vector Index Refresh",
+            replace_existing=True,
+        )
+
     # Webhook renewal is handled externally by Cloud Scheduler + startup check
     # (resilient to Cloud Run scale-to-zero)
 
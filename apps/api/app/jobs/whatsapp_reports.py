@@ -5,6 +5,8 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 
 from ..core.supabase import get_supabase_client
+from ..core.supabase_async import get_async_supabase_client
+from ..services.order_aggregates import get_delivery_summary
 from ..services.whatsapp import send_template_message
 
 logger = logging.getLogger(__name__)
@@ -24,12 +26,13 @@ RECEPCIONES_RECIPIENTS = [
 async def send_entregas_report():
     """Send daily delivery report via WhatsApp."""
     logger.info("Starting WhatsApp entregas report")
-    supabase = get_supabase_client()
+    supabase = get_async_supabase_client()
     today = datetime.now(BOG_TZ).strftime("%d/%m/%Y")
 
     try:
-        pct_pedidos = await _query_pct_pedidos(supabase)
-        pct_unidades = await _query_pct_unidades(supabase)
+        summary = await get_delivery_summary(supabase, datetime.now(BOG_TZ).strftime("%Y-%m-%d"))
+        pct_pedidos = _format_pct(summary.get("orders_delivered"), summary.get("orders_total"))
+        pct_unidades = _format_pct(summary.get("units_delivered"), summary.get("units_requested"))
 
         logger.info(f"Entregas stats: pedidos={pct_pedidos}, unidades={pct_unidades}")
 
@@ -96,48 +99,11 @@ async def send_recepciones_report():
         logger.error(f"WhatsApp recepciones report failed: {e}", exc_info=True)
 
 
-async def _query_pct_pedidos(supabase) -> str:
-    """Query percentage of orders delivered today."""
-    result = supabase.table("orders").select(
-        "id, status"
-    ).eq(
-        "expected_delivery_date",
-        datetime.now(BOG_TZ).strftime("%Y-%m-%d"),
-    ).execute()
-
-    rows = result.data or []
-    if not rows:
+def _format_pct(part, total) -> str:
+    """part / total as a percentage with one decimal ("0%" when total is 0)."""
+    if not total:
         return "0%"
-
-    delivered = sum(1 for r in rows if r["status"] == "delivered")
-    pct = round(delivered / len(rows) * 100, 1)
-    return f"{pct}%"
-
-
-async def _query_pct_unidades(supabase) -> str:
-    """Query in-full percentage for today's deliveries."""
-    # Get today's order IDs
-    orders = supabase.table("orders").select("id").eq(
-        "expected_delivery_date",
-        datetime.now(BOG_TZ).strftime("%Y-%m-%d"),
-    ).execute()
-
-    order_ids = [o["id"] for o in (orders.data or [])]
-    if not order_ids:
-        return "0%"
-
-    items = supabase.table("order_items").select(
-        "quantity_requested, quantity_delivered"
-    ).in_("order_id", order_ids).execute()
-
-    rows = items.data or []
-    total_requested = sum(r.get("quantity_requested", 0) or 0 for r in rows)
-    total_delivered = sum(r.get("quantity_delivered", 0) or 0 for r in rows)
-
-    if total_requested == 0:
-        return "0%"
-
-    pct = round(total_delivered / total_requested * 100, 1)
+    pct = round((part or 0) / total * 100, 1)
     return f"{pct}%"
 
 
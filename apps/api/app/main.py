@@ -1,9 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from contextlib import asynccontextmanager
 import logging
 
 from .core.config import get_settings
+from .core.metrics import PROMETHEUS_CONTENT_TYPE, RequestMetricsMiddleware, render_metrics
+from .core.supabase_async import close_async_supabase_client
+from .services.ai_extractor import shutdown_render_pool
+from .services.microsoft_graph import close_graph_service
+from .services.openai_client import close_openai_client
+from .services.vector_index import load_vector_indexes
 from .api.routes import health, jobs, webhooks, email_processing, telegram_webhook, pqrs
 from .api.routes.orders import router as orders_router
 from .api.routes.masterdata import router as masterdata_router
@@ -47,6 +54,13 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"Startup subscription check failed: {e}")
 
+    # Load the product / client vector indexes used by order matching
+    # (matching falls back to the Supabase RPCs until they are loaded)
+    try:
+        await load_vector_indexes()
+    except Exception as e:
+        logger.error(f"Vector index load failed: {e}")
+
     # Initialize Telegram bot (webhook mode)
     if settings.telegram_bot_token:
         try:
@@ -70,6 +84,14 @@ async def lifespan(app: FastAPI):
 
     shutdown_scheduler()
 
+    # Close the shared connection pools
+    await close_async_supabase_client()
+    await close_graph_service()
+    await close_openai_client()
+
+    # Stop the PDF page render processes
+    shutdown_render_pool()
+
 
 # Create FastAPI app
 settings = get_settings()
@@ -91,6 +113,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency histograms and slow request log (added last, so it wraps CORS)
+app.add_middleware(RequestMetricsMiddleware)
+
 # Include routers
 app.include_router(health.router)
 app.include_router(jobs.router, prefix="/api")
@@ -119,6 +144,12 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Request and external call metrics in Prometheus text format."""
+    return Response(content=render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -15,10 +15,13 @@ from .production import (
     CascadeStatus,
     ProcessingType,
     CreateCascadeRequest,
+    CreateCascadeBatchRequest,
     CascadePreviewRequest,
     BatchInfo,
     WorkCenterSchedule,
     CascadeScheduleResponse,
+    CascadeBatchItemResult,
+    CascadeBatchResponse,
     CascadePreviewResponse,
     ProductionOrderDetail,
     DeleteCascadeResponse,
@@ -37,10 +40,13 @@ __all__ = [
     "CascadeStatus",
     "ProcessingType",
     "CreateCascadeRequest",
+    "CreateCascadeBatchRequest",
     "CascadePreviewRequest",
     "BatchInfo",
     "WorkCenterSchedule",
     "CascadeScheduleResponse",
+    "CascadeBatchItemResult",
+    "CascadeBatchResponse",
     "CascadePreviewResponse",
     "ProductionOrderDetail",
     "DeleteCascadeResponse",
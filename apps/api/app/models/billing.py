@@ -176,9 +176,11 @@ class RemisionDetail(BaseModel):
 class RemisionsListResponse(BaseModel):
     """Paginated remisions response."""
     remisions: List[RemisionListItem]
-    total_count: int
+    total_count: Optional[int] = None  # None when count=none (cursor pages)
     page: int = 1
     limit: int = 100
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 
 # === Export History (Tab: Historial) ===
@@ -220,9 +222,11 @@ class ExportHistoryDetail(BaseModel):
 class ExportHistoryResponse(BaseModel):
     """Paginated export history response."""
     exports: List[ExportHistoryItem]
-    total_count: int
+    total_count: Optional[int] = None  # None when count=none (cursor pages)
     page: int = 1
     limit: int = 100
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 
 # === Billing Process (Main Action) ===
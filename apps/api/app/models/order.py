@@ -65,10 +65,11 @@ class OrderListItem(BaseModel):
 class OrderListResponse(BaseModel):
     """Paginated list response."""
     orders: List[OrderListItem]
-    total_count: int
+    total_count: Optional[int] = None  # None when count=none (cursor pages)
     page: int
     limit: int
     has_more: bool
+    next_cursor: Optional[str] = None
 
 
 class OrderBatchRequest(BaseModel):
@@ -34,6 +34,11 @@ class CreateCascadeRequest(BaseModel):
     week_plan_id: Optional[str] = Field(None, description="Optional weekly plan ID to associate")
 
 
+class CreateCascadeBatchRequest(BaseModel):
+    """Request to create many cascades planned together (e.g. a week plan)."""
+    items: List[CreateCascadeRequest] = Field(..., min_length=1, max_length=200)
+
+
 class CascadePreviewRequest(BaseModel):
     """Request to preview cascade without creating schedules."""
     work_center_id: str
@@ -85,6 +90,21 @@ class CascadeScheduleResponse(BaseModel):
     pp_dependencies: List[dict] = []  # Backward cascade results for PP products
 
 
+class CascadeBatchItemResult(BaseModel):
+    """Outcome of one item of a cascade batch (result or error)."""
+    index: int  # Position in the request items
+    product_id: str
+    result: Optional[CascadeScheduleResponse] = None
+    error: Optional[str] = None
+
+
+class CascadeBatchResponse(BaseModel):
+    """Response from batch cascade creation (items in request order)."""
+    items: List[CascadeBatchItemResult]
+    schedules_created: int
+    schedules_moved: int
+
+
 class CascadePreviewResponse(BaseModel):
     """Preview response without creating schedules."""
     product_id: str
@@ -1,17 +1,23 @@
 """PDF extraction service using OpenAI."""
 
+import asyncio
 import base64
-import io
+import hashlib
 import json
 import logging
+import multiprocessing
 import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import date, datetime, timedelta
 from functools import lru_cache
-from typing import Optional
+from typing import List, Optional, Sequence
 
 import fitz  # PyMuPDF
-from PIL import Image
 
+from ..core.cache import TTLCache
+from ..core.config import get_settings
+from ..core.supabase_async import run_blocking
 from ..core.tz import today_bogota
 from ..models.purchase_order import ExtractionResult, ProductoExtraido
 from .openai_client import OpenAIClient, get_openai_client
@@ -63,6 +69,105 @@ Formato para DIRECCIÓN:
 Responde ÚNICAMENTE con el JSON, sin texto adicional."""
 
 
+def count_pdf_pages(pdf_content: bytes) -> int:
+    """Number of pages of a PDF (parses the document, renders nothing)."""
+    with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+        return doc.page_count
+
+
+def render_pdf_pages(pdf_content: bytes, pages: Sequence[int], dpi: int, jpeg_quality: int) -> List[str]:
+    """Render pages of a PDF as base64 JPEG data URLs.
+
+    Runs in the render process pool, so it takes and returns only picklable
+    values. Pixmaps are encoded to JPEG by PyMuPDF directly.
+    """
+    matrix = fitz.Matrix(dpi / 72, dpi / 72)
+    image_urls = []
+    with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+        for number in pages:
+            pix = doc[number].get_pixmap(matrix=matrix, alpha=False)
+            jpeg = pix.tobytes("jpeg", jpg_quality=jpeg_quality)
+            image_urls.append("data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii"))
+    return image_urls
+
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_page_cache: Optional[TTLCache] = None
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Process pool (settings.pdf_render_workers) that rasterizes PDF pages.
+
+    Workers are spawned rather than forked: the API process runs threads
+    (Supabase worker threads, scheduler) that a fork would copy mid-state.
+    """
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(
+            max_workers=get_settings().pdf_render_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _render_pool
+
+
+def shutdown_render_pool() -> None:
+    """Stop the render processes (app shutdown)."""
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+
+def get_page_cache() -> TTLCache:
+    """Rendered page images keyed by ("pdf_pages", sha256, dpi, quality, pages)."""
+    global _page_cache
+    if _page_cache is None:
+        settings = get_settings()
+        _page_cache = TTLCache(
+            max_entries=settings.pdf_page_cache_max_entries,
+            ttl_seconds=settings.pdf_page_cache_ttl_seconds,
+        )
+    return _page_cache
+
+
+async def _render_pages(pdf_content: bytes, pages: Sequence[int], dpi: int, jpeg_quality: int) -> List[str]:
+    """render_pdf_pages in the process pool (or a worker thread with no pool)."""
+    if get_settings().pdf_render_workers <= 0:
+        return await run_blocking(render_pdf_pages, pdf_content, pages, dpi, jpeg_quality)
+    global _render_pool
+    pool = get_render_pool()
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, render_pdf_pages, pdf_content, pages, dpi, jpeg_quality)
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory): start a fresh pool next time
+        if _render_pool is pool:
+            _render_pool = None
+        raise
+
+
+async def pdf_to_image_urls(pdf_content: bytes) -> List[str]:
+    """JPEG data URLs of the first settings.pdf_vision_max_pages pages.
+
+    Pages are rendered concurrently, one per pool task, and the result is
+    cached by the PDF's hash, so a retried or reconciled email does not
+    render the same attachment again.
+    """
+    settings = get_settings()
+    dpi, quality = settings.pdf_render_dpi, settings.pdf_jpeg_quality
+    max_pages = settings.pdf_vision_max_pages
+    key = ("pdf_pages", hashlib.sha256(pdf_content).hexdigest(), dpi, quality, max_pages)
+
+    async def render() -> List[str]:
+        page_count = min(await run_blocking(count_pdf_pages, pdf_content), max_pages)
+        rendered = await asyncio.gather(*(
+            _render_pages(pdf_content, [number], dpi, quality) for number in range(page_count)
+        ))
+        return [url for page in rendered for url in page]
+
+    return (await get_page_cache().get_or_load_async(key, render)).value
+
+
 def _build_extraction_prompt(email_body: str | None = None, email_subject: str | None = None) -> str:
     """Build the extraction prompt, optionally including email subject and body context."""
     today = today_bogota()
@@ -212,39 +317,29 @@ class PDFExtractor:
         except Exception as e:
             logger.warning(f"File upload method failed: {e}, trying PDF-to-image vision fallback")
 
-            # Fallback: Convert PDF pages to PNG images and send to vision API
-            image_urls = self._pdf_to_image_urls(pdf_content)
+            # Fallback: Convert PDF pages to JPEG images and send to vision API
+            image_urls = await self._pdf_to_image_urls(pdf_content)
             if not image_urls:
                 raise ValueError("Could not convert PDF to images for vision fallback")
 
             logger.info(f"Converted PDF to {len(image_urls)} page image(s)")
 
-            # Send first page (most purchase orders are single-page)
+            # First pages in one request (most purchase orders are single-page)
             response = await self.client.vision_completion(
                 prompt=prompt,
-                image_url=image_urls[0],
+                image_url=image_urls,
             )
 
             return self._parse_extraction_response(response)
 
     @staticmethod
-    def _pdf_to_image_urls(pdf_content: bytes, dpi: int = 200) -> list[str]:
-        """Convert PDF pages to base64-encoded PNG data URLs for the vision API."""
-        image_urls = []
+    async def _pdf_to_image_urls(pdf_content: bytes) -> List[str]:
+        """Convert PDF pages to base64-encoded JPEG data URLs for the vision API."""
         try:
-            doc = fitz.open(stream=pdf_content, filetype="pdf")
-            for page in doc:
-                mat = fitz.Matrix(dpi / 72, dpi / 72)
-                pix = page.get_pixmap(matrix=mat)
-                img = Image.open(io.BytesIO(pix.tobytes("png")))
-                buf = io.BytesIO()
-                img.save(buf, format="PNG")
-                b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
-                image_urls.append(f"data:image/png;base64,{b64}")
-            doc.close()
+            return await pdf_to_image_urls(pdf_content)
         except Exception as e:
             logger.error(f"PDF to image conversion failed: {e}")
-        return image_urls
+            return []
 
     def _parse_extraction_response(self, response: str) -> ExtractionResult:
         """Parse the extraction response into structured data."""
@@ -1,5 +1,6 @@
 """Email processor orchestrator service."""
 
+import asyncio
 import logging
 import time
 from datetime import datetime
@@ -8,6 +9,7 @@ from typing import List, Optional
 
 from supabase import Client
 
+from ..core.config import get_settings
 from ..core.supabase import get_supabase_client
 from ..models.email import EmailAttachment, EmailMessage
 from ..models.purchase_order import (
@@ -19,7 +21,7 @@ from .ai_classifier import EmailClassifier, get_classifier
 from .ai_extractor import PDFExtractor, get_extractor
 from .microsoft_graph import MicrosoftGraphService, get_graph_service
 from .openai_client import get_openai_client
-from .rag_sync import match_client, match_branch, match_product
+from .rag_sync import match_client, match_branch, match_products
 from .storage import StorageService, get_storage_service
 
 logger = logging.getLogger(__name__)
@@ -34,7 +36,7 @@ class EmailProcessor:
     2. Classify email (purchase order or other)
     3. If purchase order, get attachments
     4. Filter PDF attachments
-    5. For each PDF:
+    5. For each PDF (settings.email_attachment_concurrency at once):
        a. Upload to Supabase Storage
        b. Extract data using OpenAI
        c. Save to database
@@ -163,26 +165,36 @@ class EmailProcessor:
                     details={"logs": processing_logs},
                 )
 
-            # Step 4: Process each PDF
+            # Step 4: Process the PDFs concurrently; each keeps its own log,
+            # appended in attachment order
+            semaphore = asyncio.Semaphore(max(1, get_settings().email_attachment_concurrency))
+
+            async def process(attachment: EmailAttachment) -> tuple[Optional[str], list]:
+                attachment_logs: list = []
+                async with semaphore:
+                    try:
+                        order_id = await self._process_pdf_attachment(
+                            email=email,
+                            attachment=attachment,
+                            processing_logs=attachment_logs,
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to process attachment {attachment.name}: {e}")
+                        attachment_logs.append({
+                            "step": "process_attachment",
+                            "timestamp": datetime.now().isoformat(),
+                            "status": "error",
+                            "attachment": attachment.name,
+                            "error": str(e),
+                        })
+                        order_id = None
+                return order_id, attachment_logs
+
             orders_created = 0
-            for attachment in pdf_attachments:
-                try:
-                    order_id = await self._process_pdf_attachment(
-                        email=email,
-                        attachment=attachment,
-                        processing_logs=processing_logs,
-                    )
-                    if order_id:
-                        orders_created += 1
-                except Exception as e:
-                    logger.error(f"Failed to process attachment {attachment.name}: {e}")
-                    processing_logs.append({
-                        "step": "process_attachment",
-                        "timestamp": datetime.now().isoformat(),
-                        "status": "error",
-                        "attachment": attachment.name,
-                        "error": str(e),
-                    })
+            for order_id, attachment_logs in await asyncio.gather(*(process(a) for a in pdf_attachments)):
+                processing_logs.extend(attachment_logs)
+                if order_id:
+                    orders_created += 1
 
             return ProcessingResult(
                 email_id=email_id,
@@ -424,10 +436,20 @@ class EmailProcessor:
 
         order_id = result.data[0]["id"]
 
-        # Insert products with matching
+        # Insert products with matching (all lines in one batched pass)
         if extraction.productos:
+            try:
+                matches = await match_products(
+                    [prod.producto for prod in extraction.productos],
+                    client_id=matched_client_id,
+                    precios=[prod.precio for prod in extraction.productos],
+                    return_exceptions=True,
+                )
+            except Exception as e:
+                matches = [e] * len(extraction.productos)
+
             products_data = []
-            for prod in extraction.productos:
+            for prod, product_match in zip(extraction.productos, matches):
                 product_row = {
                     "orden_compra_id": order_id,
                     "producto": prod.producto,
@@ -436,13 +458,16 @@ class EmailProcessor:
                     "precio": prod.precio,
                 }
 
-                # Match product against catalog
-                try:
-                    product_match = await match_product(
-                        extracted_name=prod.producto,
-                        client_id=matched_client_id,
-                        precio=prod.precio,
-                    )
+                if isinstance(product_match, Exception):
+                    logger.error(f"Product matching failed for '{prod.producto}': {product_match}")
+                    processing_logs.append({
+                        "step": "match_product",
+                        "timestamp": datetime.now().isoformat(),
+                        "status": "error",
+                        "extracted_name": prod.producto,
+                        "error": str(product_match),
+                    })
+                else:
                     if product_match:
                         product_row["producto_id"] = product_match["product_id"]
                         product_row["producto_nombre"] = product_match["matched_name"]
@@ -455,15 +480,6 @@ class EmailProcessor:
                         "extracted_name": prod.producto,
                         **(product_match or {}),
                     })
-                except Exception as e:
-                    logger.error(f"Product matching failed for '{prod.producto}': {e}")
-                    processing_logs.append({
-                        "step": "match_product",
-                        "timestamp": datetime.now().isoformat(),
-                        "status": "error",
-                        "extracted_name": prod.producto,
-                        "error": str(e),
-                    })
 
                 products_data.append(product_row)
 
@@ -0,0 +1,244 @@
+"""Text embeddings behind a content-hash cache.
+
+Every generate_embedding() call used to hit OpenAI: match_product re-embedded
+each client alias for every extracted line and match_branch each branch per
+email, so a 30-line order for a client with 40 aliases cost over a thousand
+calls. Embeddings are now looked up by content hash, sha256(model + "\\n" +
+normalized text), in
+
+1. an in-process LRU (settings.embedding_cache_max_entries entries),
+2. public.embedding_cache, shared by every instance and kept across restarts,
+3. OpenAI, for texts neither has; results are written back to both.
+
+    vectors = await get_embeddings(["PAN TAJADO", "CROISSANT EUROPA"])
+
+get_embeddings() takes any number of texts: the ones that reach OpenAI are
+split by embed_batch() into requests of at most
+settings.embedding_batch_max_tokens (estimated) tokens and
+settings.embedding_batch_max_inputs texts, sent at most
+settings.embedding_batch_concurrency at a time and retried per request, so a
+full catalog re-sync is a handful of calls rather than one per product.
+
+Texts are normalized (Unicode NFC, trimmed, inner whitespace collapsed)
+before hashing and embedding, so "Pan  tajado " and "Pan tajado" share an
+entry. Vectors are float32, like pgvector stores them, so a cached vector
+equals a freshly computed one. Failures of the persistent cache are logged
+and fall through to OpenAI.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import unicodedata
+from array import array
+from hashlib import sha256
+from typing import Dict, Iterable, List, Optional
+
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+from ..core.cache import TTLCache
+from ..core.config import get_settings
+from ..core.supabase_async import get_async_supabase_client
+from .openai_client import get_openai_client
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_CACHE_TABLE = "embedding_cache"
+# Content hashes per PostgREST lookup (keeps the in.(...) filter well under URL limits)
+LOOKUP_CHUNK_SIZE = 100
+# Rows per embedding_cache upsert (~20 KB of JSON per 1536-dim vector)
+PERSIST_CHUNK_SIZE = 200
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of text for hashing and embedding."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+def content_hash(text: str, model: str = EMBEDDING_MODEL) -> str:
+    """Cache key of an already normalized text."""
+    return sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """Upper-bound token estimate for batching (no tokenizer dependency).
+
+    cl100k averages ~4 bytes per token on English and ~3 on Spanish product
+    names; counting one token per 3 UTF-8 bytes keeps requests under budget.
+    """
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def chunk_by_tokens(texts: List[str], max_tokens: int, max_inputs: int) -> List[List[str]]:
+    """Split texts (in order) into chunks within both limits.
+
+    A text larger than max_tokens on its own gets a chunk of its own.
+    """
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _as_float32(values: Iterable[float]) -> array:
+    return array("f", values)
+
+
+def _parse_vector(value) -> Optional[array]:
+    """pgvector comes back from PostgREST as the string '[0.1,0.2,...]'."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return _as_float32(value)
+
+
+_memory_cache: Optional[TTLCache] = None
+
+
+def get_embedding_memory_cache() -> TTLCache:
+    """Process-wide LRU of float32 vectors keyed by ("embedding", hash)."""
+    global _memory_cache
+    if _memory_cache is None:
+        _memory_cache = TTLCache(
+            max_entries=get_settings().embedding_cache_max_entries,
+            ttl_seconds=float("inf"),
+        )
+    return _memory_cache
+
+
+async def _load_persisted(hashes: List[str]) -> Dict[str, array]:
+    """{hash: vector} of the hashes found in public.embedding_cache."""
+    found: Dict[str, array] = {}
+    supabase = get_async_supabase_client()
+    for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+        chunk = hashes[start:start + LOOKUP_CHUNK_SIZE]
+        result = await (
+            supabase.table(EMBEDDING_CACHE_TABLE)
+            .select("content_hash, embedding")
+            .in_("content_hash", chunk)
+            .execute()
+        )
+        for row in result.data or []:
+            vector = _parse_vector(row.get("embedding"))
+            if vector is not None:
+                found[row["content_hash"]] = vector
+    return found
+
+
+async def _persist(rows: List[dict]) -> None:
+    supabase = get_async_supabase_client()
+    for start in range(0, len(rows), PERSIST_CHUNK_SIZE):
+        await (
+            supabase.table(EMBEDDING_CACHE_TABLE)
+            .upsert(rows[start:start + PERSIST_CHUNK_SIZE], on_conflict="content_hash", ignore_duplicates=True)
+            .execute()
+        )
+
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=2, max=10),
+)
+async def _embed_chunk(texts: List[str], model: str) -> List[List[float]]:
+    """One OpenAI embeddings request for texts (in order)."""
+    openai = get_openai_client()
+    response = await openai.client.embeddings.create(input=texts, model=model)
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+async def embed_batch(texts: List[str], model: str = EMBEDDING_MODEL) -> List[List[float]]:
+    """Embed texts with OpenAI, bypassing the cache (same order as texts).
+
+    Texts are sent in token-budgeted requests, a bounded number at a time;
+    each request is retried on its own, so one throttled chunk does not
+    recompute the rest.
+    """
+    settings = get_settings()
+    chunks = chunk_by_tokens(texts, settings.embedding_batch_max_tokens, settings.embedding_batch_max_inputs)
+    semaphore = asyncio.Semaphore(settings.embedding_batch_concurrency)
+
+    async def embed(chunk: List[str]) -> List[List[float]]:
+        async with semaphore:
+            return await _embed_chunk(chunk, model)
+
+    results = await asyncio.gather(*(embed(chunk) for chunk in chunks))
+    if len(chunks) > 1:
+        logger.info(f"Embedded {len(texts)} texts in {len(chunks)} requests")
+    return [vector for result in results for vector in result]
+
+
+async def get_embeddings(texts: List[str], model: str = EMBEDDING_MODEL) -> List[List[float]]:
+    """Embedding of each text (same order), computing only the ones never seen.
+
+    Raises ValueError for a text that is empty after normalization.
+    """
+    normalized = [normalize_text(t) for t in texts]
+    if not all(normalized):
+        raise ValueError("Cannot embed an empty text")
+
+    memory = get_embedding_memory_cache()
+    hashes = {text: content_hash(text, model) for text in dict.fromkeys(normalized)}
+    vectors: Dict[str, array] = {}
+
+    missing = []
+    for text, key in hashes.items():
+        entry = memory.get(("embedding", key))
+        if entry is None:
+            missing.append(text)
+        else:
+            vectors[text] = entry.value
+
+    if missing:
+        try:
+            persisted = await _load_persisted([hashes[t] for t in missing])
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            persisted = {}
+        for text in missing:
+            vector = persisted.get(hashes[text])
+            if vector is not None:
+                vectors[text] = vector
+                memory.set(("embedding", hashes[text]), vector)
+        missing = [t for t in missing if t not in vectors]
+
+    if missing:
+        computed = await embed_batch(missing, model)
+        rows = []
+        for text, values in zip(missing, computed):
+            vector = _as_float32(values)
+            vectors[text] = vector
+            memory.set(("embedding", hashes[text]), vector)
+            rows.append({
+                "content_hash": hashes[text],
+                "model": model,
+                "content": text,
+                "embedding": vector.tolist(),
+            })
+        try:
+            await _persist(rows)
+        except Exception as e:
+            logger.warning(f"Could not store {len(rows)} embeddings in the cache: {e}")
+
+    logger.debug(
+        f"Embeddings: {len(hashes)} texts, {len(hashes) - len(missing)} cached, {len(missing)} computed"
+    )
+    return [vectors[text].tolist() for text in normalized]
+
+
+async def get_embedding(text: str, model: str = EMBEDDING_MODEL) -> List[float]:
+    """Embedding of a single text (see get_embeddings)."""
+    return (await get_embeddings([text], model))[0]
@@ -5,13 +5,15 @@ Replicates the exact logic from use-world-office-export.ts hook.
 """
 
 import logging
-from io import BytesIO
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from io import BytesIO
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional
+
+from ..core.cache import get_lookup_cache, get_masterdata_cache
 
 logger = logging.getLogger(__name__)
 
-# Column headers in exact order (44 columns total)
+# Column headers in exact order (57 columns total)
 EXCEL_COLUMNS = [
     "Encab: Empresa",
     "Encab: Tipo Documento",
@@ -104,7 +106,14 @@ def calculate_due_date(delivery_date_str: str, credit_days: int) -> str:
 
 
 def get_world_office_config(supabase) -> Dict[str, Any]:
-    """Get World Office configuration from system_config table."""
+    """Get World Office configuration from system_config table (cached)."""
+    entry = get_masterdata_cache().get_or_load(
+        ("world_office_config",), lambda: _load_world_office_config(supabase)
+    )
+    return dict(entry.value)
+
+
+def _load_world_office_config(supabase) -> Dict[str, Any]:
     config_keys = [
         "wo_company_name",
         "wo_document_type",
@@ -149,33 +158,62 @@ def get_world_office_config(supabase) -> Dict[str, Any]:
 
 
 def get_credit_terms(supabase, client_ids: List[str]) -> Dict[str, int]:
-    """Get credit terms for clients."""
+    """Get credit terms for clients (cached per client)."""
     if not client_ids:
         return {}
 
-    result = (
-        supabase.table("client_credit_terms")
-        .select("client_id, credit_days")
-        .in_("client_id", client_ids)
-        .execute()
-    )
+    def load(missing: List[str]) -> Dict[str, int]:
+        result = (
+            supabase.table("client_credit_terms")
+            .select("client_id, credit_days")
+            .in_("client_id", missing)
+            .execute()
+        )
+        return {ct["client_id"]: ct["credit_days"] for ct in result.data}
 
-    return {ct["client_id"]: ct["credit_days"] for ct in result.data}
+    return get_lookup_cache().get_or_load_many("credit_terms", client_ids, load)
 
 
 def get_product_configs(supabase, product_ids: List[str]) -> Dict[str, Dict[str, Any]]:
-    """Get product configurations (units_per_package)."""
+    """Get product configurations (units_per_package), cached per product."""
     if not product_ids:
         return {}
 
-    result = (
-        supabase.table("product_config")  # Note: singular, not plural
-        .select("product_id, units_per_package")
-        .in_("product_id", product_ids)
-        .execute()
-    )
+    def load(missing: List[str]) -> Dict[str, Dict[str, Any]]:
+        result = (
+            supabase.table("product_config")  # Note: singular, not plural
+            .select("product_id, units_per_package")
+            .in_("product_id", missing)
+            .execute()
+        )
+        return {pc["product_id"]: pc for pc in result.data}
+
+    return get_lookup_cache().get_or_load_many("product_configs", product_ids, load)
+
+
+def get_client_price_lists(supabase, client_ids: List[str]) -> Dict[str, Dict[str, float]]:
+    """Get {client_id: {product_id: unit_price}} price lists, cached per client."""
+    if not client_ids:
+        return {}
 
-    return {pc["product_id"]: pc for pc in result.data}
+    def load(missing: List[str]) -> Dict[str, Dict[str, float]]:
+        result = (
+            supabase.table("client_price_lists")
+            .select("client_id, product_id, unit_price")
+            .in_("client_id", missing)
+            .execute()
+        )
+        # Clients without a price list are cached as {} (not looked up again)
+        price_lists = {cid: {} for cid in missing}
+        for pl in result.data:
+            price_lists[pl["client_id"]][pl["product_id"]] = pl["unit_price"]
+        return price_lists
+
+    return {
+        cid: prices
+        for cid, prices in get_lookup_cache().get_or_load_many("client_price_lists", client_ids, load).items()
+        if prices
+    }
 
 
 def calculate_unit_price(
@@ -205,105 +243,105 @@ def calculate_unit_price(
     return package_price
 
 
-def generate_world_office_excel(
+class WorldOfficeLookups(NamedTuple):
+    """Master data an export needs, loaded once per export."""
+    config: Dict[str, Any]
+    credit_terms: Dict[str, int]
+    product_configs: Dict[str, Dict[str, Any]]
+    client_price_lists: Dict[str, Dict[str, float]]
+
+
+def load_world_office_lookups(
+    supabase,
     orders: List[Dict[str, Any]],
     items_by_order: Dict[str, List[Dict[str, Any]]],
-    invoice_number_start: int,
-    supabase,
-) -> Dict[str, Any]:
-    """
-    Generate World Office Excel file.
+) -> WorldOfficeLookups:
+    """Load config, credit terms, product configs and price lists for an export."""
+    client_ids = list({o["client_id"] for o in orders if o.get("client_id")})
+    product_ids = list({
+        item["product_id"]
+        for items in items_by_order.values()
+        for item in items
+        if item.get("product_id")
+    })
+    return WorldOfficeLookups(
+        config=get_world_office_config(supabase),
+        credit_terms=get_credit_terms(supabase, client_ids),
+        product_configs=get_product_configs(supabase, product_ids),
+        client_price_lists=get_client_price_lists(supabase, client_ids),
+    )
 
-    Args:
-        orders: List of order dictionaries with client and branch info
-        items_by_order: Dictionary mapping order_id to list of order items
-        invoice_number_start: Starting invoice number
-        supabase: Supabase client
 
-    Returns:
-        Dictionary with file_bytes and file_name
-    """
-    try:
-        import openpyxl
-        from openpyxl import Workbook
-    except ImportError:
-        logger.error("openpyxl not installed. Run: pip install openpyxl")
-        raise ImportError("openpyxl library required for Excel generation")
+# Blank detail columns after "Detalle: Vencimiento" (Nota .. Código Centro Costos)
+_DETAIL_BLANKS = (None,) * 18
 
-    logger.info(f"Generating World Office Excel for {len(orders)} orders")
 
-    # Get World Office config
-    wo_config = get_world_office_config(supabase)
+def iter_world_office_rows(
+    orders: List[Dict[str, Any]],
+    items_by_order: Dict[str, List[Dict[str, Any]]],
+    invoice_number_start: int,
+    lookups: WorldOfficeLookups,
+) -> Iterator[list]:
+    """
+    Yield the data rows of a World Office export (one per billable item).
 
-    # Get client IDs and product IDs
-    client_ids = list(set(o.get("client_id") for o in orders if o.get("client_id")))
-    all_product_ids = []
-    for items in items_by_order.values():
-        for item in items:
-            if item.get("product_id"):
-                all_product_ids.append(item["product_id"])
-    product_ids = list(set(all_product_ids))
-
-    # Get credit terms and product configs
-    credit_terms = get_credit_terms(supabase, client_ids)
-    product_configs = get_product_configs(supabase, product_ids)
-
-    # Get client price lists
-    client_price_lists = {}
-    if client_ids:
-        price_list_result = (
-            supabase.table("client_price_lists")
-            .select("client_id, product_id, unit_price")
-            .in_("client_id", client_ids)
-            .execute()
-        )
-        for pl in price_list_result.data:
-            cid = pl["client_id"]
-            if cid not in client_price_lists:
-                client_price_lists[cid] = {}
-            client_price_lists[cid][pl["product_id"]] = pl["unit_price"]
-
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Encab+Movim.Inven Talla y Color"
-
-    # Write headers
-    for col_idx, header in enumerate(EXCEL_COLUMNS, start=1):
-        ws.cell(row=1, column=col_idx, value=header)
-
-    # Generate rows
-    row_num = 2
-    current_invoice = invoice_number_start
+    Header columns are built once per order and product columns once per
+    product; each item only adds its quantity and price.
+    """
+    wo_config = lookups.config
+    company = wo_config.get("company_name", "")
+    document_type = wo_config.get("document_type", "")
+    document_prefix = wo_config.get("document_prefix", "")
+    default_internal = wo_config.get("third_party_internal", "")
+    default_external = wo_config.get("third_party_external", "")
+    warehouse = wo_config.get("warehouse", "")
+    unit_measure = wo_config.get("unit_measure", "")
+
+    # product_id -> (units_per_package, product code, IVA rate)
+    product_columns: Dict[Any, tuple] = {}
 
+    current_invoice = invoice_number_start
     for order in orders:
-        order_id = order["id"]
-        items = items_by_order.get(order_id, [])
-
+        items = items_by_order.get(order["id"], [])
         if not items:
             continue
 
         client = order.get("clients") or {}
         branch = order.get("branches") or {}
-
-        # Get credit days for this client
         client_id = order.get("client_id")
-        credit_days = credit_terms.get(client_id, 30)  # Default 30 days
+        credit_days = lookups.credit_terms.get(client_id, 30)  # Default 30 days
 
-        # Format dates
         delivery_date = order.get("expected_delivery_date", "")
         delivery_date_formatted = format_date_for_export(delivery_date)
         due_date_formatted = calculate_due_date(delivery_date, credit_days)
 
-        # Branch info for Encab: Sucursal
-        branch_info = branch.get("name") or client.get("name") or ""
-
-        # Get assigned user cedula for Tercero Interno
-        tercero_interno = wo_config.get("third_party_internal", "")
+        # Tercero Interno is the cedula of the client's assigned user
+        tercero_interno = default_internal
         if client.get("assigned_user"):
-            cedula = client["assigned_user"].get("cedula")
-            if cedula:
-                tercero_interno = cedula
+            tercero_interno = client["assigned_user"].get("cedula") or default_internal
+
+        header = [
+            company,                                     # Empresa
+            document_type,                               # Tipo Documento
+            document_prefix,                             # Prefijo
+            current_invoice,                             # Documento Número
+            delivery_date_formatted,                     # Fecha
+            tercero_interno,                             # Tercero Interno
+            client.get("nit") or default_external,       # Tercero Externo
+            "",                                          # Nota
+            "Credito",                                   # FormaPago
+            delivery_date_formatted,                     # Fecha Entrega
+            None,                                        # Prefijo Documento Externo
+            None,                                        # Número_Documento_Externo
+            None,                                        # Verificado
+            None,                                        # Anulado
+            None,                                        # Personalizado 1
+            order.get("purchase_order_number"),          # Personalizado 2
+            None, None, None, None, None, None, None,    # Personalizado 3-9
+            None, None, None, None, None, None,          # Personalizado 10-15
+            branch.get("name") or client.get("name") or "",  # Sucursal
+            None,                                        # Clasificación
+        ]
 
         for item in items:
             # Only process items with available quantity
@@ -312,120 +350,115 @@ def generate_world_office_excel(
                 continue
 
             product = item.get("products") or {}
-
-            # Get units per package
             product_id = item.get("product_id")
-            pc = product_configs.get(product_id, {})
-            units_per_package = pc.get("units_per_package") or product.get("units_per_package") or 1
-
-            # Convert quantity from packages to units
-            quantity_in_units = quantity_available * units_per_package
+            columns = product_columns.get(product_id)
+            if columns is None:
+                pc = lookups.product_configs.get(product_id, {})
+                product_tax_rate = product.get("tax_rate") or 0
+                columns = (
+                    pc.get("units_per_package") or product.get("units_per_package") or 1,
+                    product.get("codigo_wo") or product.get("name") or "",
+                    0 if product_tax_rate == 0 else product_tax_rate / 100,
+                )
+                if product_id is not None:
+                    product_columns[product_id] = columns
+            units_per_package, product_code, iva_rate = columns
 
-            # Calculate unit price
             package_price = product.get("price") or item.get("unit_price") or 0
             unit_price = calculate_unit_price(
                 package_price,
                 units_per_package,
                 product_id,
                 client_id,
-                client_price_lists
+                lookups.client_price_lists,
             )
 
-            # Calculate IVA based on product tax_rate
-            product_tax_rate = product.get("tax_rate") or 0
-            iva_rate = 0 if product_tax_rate == 0 else product_tax_rate / 100
-
-            # Product code for World Office
-            product_code = product.get("codigo_wo") or product.get("name") or ""
-
-            # Build row data
-            row_data = [
-                wo_config.get("company_name", ""),           # Empresa
-                wo_config.get("document_type", ""),          # Tipo Documento
-                wo_config.get("document_prefix", ""),        # Prefijo
-                current_invoice,                              # Documento Número
-                delivery_date_formatted,                     # Fecha
-                tercero_interno,                             # Tercero Interno
-                client.get("nit") or wo_config.get("third_party_external", ""),  # Tercero Externo
-                "",                                          # Nota
-                "Credito",                                   # FormaPago
-                delivery_date_formatted,                     # Fecha Entrega
-                None,                                        # Prefijo Documento Externo
-                None,                                        # Número_Documento_Externo
-                None,                                        # Verificado
-                None,                                        # Anulado
-                None,                                        # Personalizado 1
-                order.get("purchase_order_number"),          # Personalizado 2
-                None,                                        # Personalizado 3
-                None,                                        # Personalizado 4
-                None,                                        # Personalizado 5
-                None,                                        # Personalizado 6
-                None,                                        # Personalizado 7
-                None,                                        # Personalizado 8
-                None,                                        # Personalizado 9
-                None,                                        # Personalizado 10
-                None,                                        # Personalizado 11
-                None,                                        # Personalizado 12
-                None,                                        # Personalizado 13
-                None,                                        # Personalizado 14
-                None,                                        # Personalizado 15
-                branch_info,                                 # Sucursal
-                None,                                        # Clasificación
-                product_code,                                # Producto
-                wo_config.get("warehouse", ""),              # Bodega
-                wo_config.get("unit_measure", ""),           # UnidadDeMedida
-                quantity_in_units,                           # Cantidad
-                iva_rate,                                    # IVA
-                round(unit_price),                           # Valor Unitario
-                0,                                           # Descuento
-                due_date_formatted,                          # Vencimiento
-                None,                                        # Nota
-                None,                                        # Centro costos
-                None,                                        # Personalizado1
-                None,                                        # Personalizado2
-                None,                                        # Personalizado3
-                None,                                        # Personalizado4
-                None,                                        # Personalizado5
-                None,                                        # Personalizado6
-                None,                                        # Personalizado7
-                None,                                        # Personalizado8
-                None,                                        # Personalizado9
-                None,                                        # Personalizado10
-                None,                                        # Personalizado11
-                None,                                        # Personalizado12
-                None,                                        # Personalizado13
-                None,                                        # Personalizado14
-                None,                                        # Personalizado15
-                None,                                        # Código Centro Costos
+            yield header + [
+                product_code,                            # Producto
+                warehouse,                               # Bodega
+                unit_measure,                            # UnidadDeMedida
+                quantity_available * units_per_package,  # Cantidad (packages -> units)
+                iva_rate,                                # IVA
+                round(unit_price),                       # Valor Unitario
+                0,                                       # Descuento
+                due_date_formatted,                      # Vencimiento
+                *_DETAIL_BLANKS,
             ]
 
-            # Write row
-            for col_idx, value in enumerate(row_data, start=1):
-                ws.cell(row=row_num, column=col_idx, value=value)
-
-            row_num += 1
-
         # Each order gets its own invoice number
         current_invoice += 1
 
-    # Add secondary sheet with IVA
+
+def write_world_office_excel(
+    fileobj: BinaryIO,
+    orders: List[Dict[str, Any]],
+    items_by_order: Dict[str, List[Dict[str, Any]]],
+    invoice_number_start: int,
+    lookups: WorldOfficeLookups,
+) -> int:
+    """
+    Stream a World Office workbook into fileobj and return the number of data rows.
+
+    Uses an openpyxl write-only workbook: rows are serialized as they are
+    appended instead of being kept as cell objects, so memory stays flat
+    however many items are billed.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        logger.error("openpyxl not installed. Run: pip install openpyxl")
+        raise ImportError("openpyxl library required for Excel generation")
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Encab+Movim.Inven Talla y Color")
+    ws.append(EXCEL_COLUMNS)
+
+    row_count = 0
+    for row in iter_world_office_rows(orders, items_by_order, invoice_number_start, lookups):
+        ws.append(row)
+        row_count += 1
+
+    # Secondary sheet with IVA
     iva_sheet = wb.create_sheet("Hoja1")
-    iva_sheet.cell(row=1, column=1, value="IVA")
-    iva_sheet.cell(row=2, column=1, value=wo_config.get("iva_rate", 0.19))
+    iva_sheet.append(["IVA"])
+    iva_sheet.append([lookups.config.get("iva_rate", 0.19)])
+
+    wb.save(fileobj)
+    return row_count
+
+
+def generate_world_office_excel(
+    orders: List[Dict[str, Any]],
+    items_by_order: Dict[str, List[Dict[str, Any]]],
+    invoice_number_start: int,
+    supabase,
+) -> Dict[str, Any]:
+    """
+    Generate World Office Excel file.
 
-    # Generate filename
-    today = datetime.now()
-    file_name = f"WorldOffice_{today.strftime('%Y-%m-%d')}.xlsx"
+    Args:
+        orders: List of order dictionaries with client and branch info
+        items_by_order: Dictionary mapping order_id to list of order items
+        invoice_number_start: Starting invoice number
+        supabase: Supabase client
+
+    Returns:
+        Dictionary with file_bytes, file_name and row_count
+    """
+    logger.info(f"Generating World Office Excel for {len(orders)} orders")
+
+    lookups = load_world_office_lookups(supabase, orders, items_by_order)
 
-    # Save to bytes
     buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    file_bytes = buffer.read()
+    row_count = write_world_office_excel(buffer, orders, items_by_order, invoice_number_start, lookups)
+    file_bytes = buffer.getvalue()
+
+    file_name = f"WorldOffice_{datetime.now().strftime('%Y-%m-%d')}.xlsx"
 
-    logger.info(f"Generated Excel with {row_num - 2} rows")
+    logger.info(f"Generated Excel with {row_count} rows ({len(file_bytes)} bytes)")
 
     return {
         "file_bytes": file_bytes,
         "file_name": file_name,
+        "row_count": row_count,
     }
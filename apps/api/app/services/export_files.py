@@ -0,0 +1,125 @@
+"""World Office export files in Supabase Storage.
+
+Billing runs used to base64-encode the generated workbook into
+export_history.file_data (bytea), so every export row carried the whole file
+and downloads had to untangle hex/base64/JSON encodings in memory. Exports
+are now uploaded to the billing exports bucket and the row keeps only
+file_path:
+
+    path = store_export_file(excel_bytes, excel_file_name)
+    insert({..., "file_path": path} if path else {..., "file_data": legacy_file_data(excel_bytes)})
+
+Downloads stream the object from storage. Rows written before (or while
+storage was unavailable) keep file_data; decode_legacy_file_data() reads them
+and app/jobs/migrate_export_files.py moves them to storage.
+"""
+
+import base64
+import json
+import logging
+import re
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+
+from .storage import get_billing_storage_service
+
+logger = logging.getLogger(__name__)
+
+EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Folder of World Office workbooks in the billing exports bucket
+EXPORTS_FOLDER = "world-office"
+
+# Zip signature every .xlsx starts with
+_XLSX_MAGIC = b"PK"
+
+
+def export_file_path(file_name: str, key: Optional[str] = None, when: Optional[datetime] = None) -> str:
+    """Object path for an export: world-office/{YYYY}/{MM}/{key}_{file_name}.
+
+    key defaults to a random id; the migration passes the export id so
+    re-running it overwrites instead of duplicating.
+    """
+    when = when or datetime.now()
+    safe_name = re.sub(r"[^A-Za-z0-9\-._]", "_", file_name)[:120] or "export.xlsx"
+    key = key or uuid.uuid4().hex
+    return f"{EXPORTS_FOLDER}/{when:%Y}/{when:%m}/{key}_{safe_name}"
+
+
+def store_export_file(content: bytes, file_name: str) -> Optional[str]:
+    """Upload a generated workbook and return its path (None if the upload failed).
+
+    Sync: billing runs on worker threads. Callers fall back to
+    legacy_file_data() on None so a storage outage never loses an export
+    whose invoice numbers are already taken.
+    """
+    path = export_file_path(file_name)
+    try:
+        return get_billing_storage_service().upload_file(content, path, EXCEL_MEDIA_TYPE)
+    except Exception as e:
+        logger.error(f"Failed to upload export file {file_name} to storage, keeping it inline: {e}")
+        return None
+
+
+def legacy_file_data(content: bytes) -> str:
+    """Inline file_data value (base64 text, as the web app stores it)."""
+    return base64.b64encode(content).decode("utf-8")
+
+
+def _bytes_from_index_dict(data: dict) -> bytes:
+    # {"0": 80, "1": 75, ...} as written by older frontend versions
+    max_idx = max(int(k) for k in data.keys() if k.isdigit())
+    return bytes(data.get(str(i), 0) for i in range(max_idx + 1))
+
+
+def _decode_bytea_payload(raw_bytes: bytes) -> bytes:
+    """Contents of a bytea value, which may itself hold base64 or a JSON index dict."""
+    if raw_bytes[:2] == _XLSX_MAGIC:
+        return raw_bytes
+    try:
+        decoded = base64.b64decode(raw_bytes, validate=True)
+        if decoded[:2] == _XLSX_MAGIC:
+            return decoded
+    except ValueError:
+        pass
+    try:
+        data = json.loads(raw_bytes.decode("utf-8"))
+        if isinstance(data, dict) and "0" in data:
+            return _bytes_from_index_dict(data)
+    except (ValueError, UnicodeDecodeError):
+        pass
+    return raw_bytes
+
+
+def decode_legacy_file_data(file_data: Any) -> bytes:
+    """Workbook bytes of an export_history.file_data value.
+
+    PostgREST returns bytea as "\\x<hex>"; what was stored inside is base64
+    text (API and current web app), raw bytes or a JSON index dict (older web
+    app). Raises ValueError for anything else.
+    """
+    if isinstance(file_data, bytes):
+        return file_data
+    if isinstance(file_data, dict):
+        # {type: "Buffer", data: [...]} or {"0": 80, "1": 75, ...}
+        if "data" in file_data:
+            return bytes(file_data["data"])
+        if "0" in file_data:
+            return _bytes_from_index_dict(file_data)
+        raise ValueError("Unknown dict format for file data")
+    if not isinstance(file_data, str):
+        raise ValueError(f"Unknown file data type: {type(file_data).__name__}")
+
+    if file_data.startswith("\\x"):
+        return _decode_bytea_payload(bytes.fromhex(file_data[2:].replace("\\x", "")))
+    if file_data.startswith("0x"):
+        return bytes.fromhex(file_data[2:])
+    try:
+        return base64.b64decode(file_data, validate=True)
+    except ValueError:
+        pass
+    try:
+        return bytes.fromhex(file_data)
+    except ValueError:
+        raise ValueError("Could not decode file data") from None
@@ -1,5 +1,6 @@
 """Microsoft Graph API service for email operations."""
 
+import asyncio
 import logging
 from functools import lru_cache
 from typing import List, Optional
@@ -10,6 +11,7 @@ from msal import ConfidentialClientApplication
 from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 
 from ..core.config import get_settings
+from ..core.metrics import GRAPH, InstrumentedAsyncTransport, track
 from ..models.email import EmailMessage, EmailAttachment, SubscriptionResponse
 
 logger = logging.getLogger(__name__)
@@ -35,6 +37,8 @@ class MicrosoftGraphService:
         client_secret: str,
         tenant_id: str,
         target_mailbox: str,
+        max_connections: int = 10,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
     ):
         self.client_id = client_id
         self.client_secret = client_secret
@@ -43,42 +47,88 @@ class MicrosoftGraphService:
         self._access_token: Optional[str] = None
         self._token_expires_at: Optional[datetime] = None
 
-        # Initialize MSAL client
-        self.msal_app = ConfidentialClientApplication(
-            client_id=client_id,
-            client_credential=client_secret,
-            authority=f"https://login.microsoftonline.com/{tenant_id}",
+        # MSAL client, built on the first token refresh: its constructor
+        # fetches the tenant's OpenID configuration over the network
+        self.msal_app: Optional[ConfidentialClientApplication] = None
+
+        # One pooled HTTP/2 client for every Graph call (created on first use,
+        # closed by close_graph_service on app shutdown)
+        self._max_connections = max_connections
+        self._transport = transport  # tests
+        self._http_client: Optional[httpx.AsyncClient] = None
+        # Single-flight token refresh: concurrent requests wait for one MSAL call
+        self._token_lock = asyncio.Lock()
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Shared connection pool to graph.microsoft.com."""
+        if self._http_client is None:
+            limits = httpx.Limits(
+                max_connections=self._max_connections,
+                max_keepalive_connections=self._max_connections,
+            )
+            transport = self._transport or httpx.AsyncHTTPTransport(http2=True, limits=limits)
+            self._http_client = httpx.AsyncClient(
+                transport=InstrumentedAsyncTransport(transport, GRAPH),
+                timeout=httpx.Timeout(30.0),
+            )
+        return self._http_client
+
+    async def aclose(self) -> None:
+        """Close the connection pool."""
+        if self._http_client is not None:
+            client, self._http_client = self._http_client, None
+            await client.aclose()
+
+    def _token_is_fresh(self) -> bool:
+        return bool(
+            self._access_token
+            and self._token_expires_at
+            and datetime.now() < self._token_expires_at - timedelta(minutes=5)
         )
 
+    def _acquire_token(self) -> dict:
+        """Blocking MSAL calls (runs on a worker thread)."""
+        with track(GRAPH):
+            if self.msal_app is None:
+                self.msal_app = ConfidentialClientApplication(
+                    client_id=self.client_id,
+                    client_credential=self.client_secret,
+                    authority=f"https://login.microsoftonline.com/{self.tenant_id}",
+                )
+            return self.msal_app.acquire_token_for_client(
+                scopes=["https://graph.microsoft.com/.default"]
+            )
+
     async def _get_access_token(self) -> str:
         """Get or refresh access token."""
         # Check if we have a valid cached token
-        if (
-            self._access_token
-            and self._token_expires_at
-            and datetime.now() < self._token_expires_at - timedelta(minutes=5)
-        ):
+        if self._token_is_fresh():
             return self._access_token
 
-        logger.info("Acquiring new access token from Azure AD")
+        async with self._token_lock:
+            # Another request may have refreshed it while this one waited
+            if self._token_is_fresh():
+                return self._access_token
 
-        result = self.msal_app.acquire_token_for_client(
-            scopes=["https://graph.microsoft.com/.default"]
-        )
+            logger.info("Acquiring new access token from Azure AD")
 
-        if "access_token" not in result:
-            error = result.get("error_description", "Unknown error")
-            logger.error(f"Failed to acquire token: {error}")
-            raise Exception(f"Failed to acquire access token: {error}")
+            # MSAL is synchronous (requests); keep it off the event loop
+            result = await asyncio.to_thread(self._acquire_token)
 
-        self._access_token = result["access_token"]
-        # Token usually valid for 1 hour
-        self._token_expires_at = datetime.now() + timedelta(
-            seconds=result.get("expires_in", 3600)
-        )
+            if "access_token" not in result:
+                error = result.get("error_description", "Unknown error")
+                logger.error(f"Failed to acquire token: {error}")
+                raise Exception(f"Failed to acquire access token: {error}")
 
-        logger.info("Access token acquired successfully")
-        return self._access_token
+            self._access_token = result["access_token"]
+            # Token usually valid for 1 hour
+            self._token_expires_at = datetime.now() + timedelta(
+                seconds=result.get("expires_in", 3600)
+            )
+
+            logger.info("Access token acquired successfully")
+            return self._access_token
 
     async def _make_request(
         self,
@@ -99,24 +149,23 @@ class MicrosoftGraphService:
         if extra_headers:
             headers.update(extra_headers)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method=method,
-                url=url,
-                headers=headers,
-                json=json_data,
-                timeout=timeout,
-            )
+        response = await self.http_client.request(
+            method=method,
+            url=url,
+            headers=headers,
+            json=json_data,
+            timeout=timeout,
+        )
 
-            if response.status_code >= 400:
-                error_body = response.text
-                logger.error(f"Graph API error {response.status_code}: {error_body}")
-                response.raise_for_status()
+        if response.status_code >= 400:
+            error_body = response.text
+            logger.error(f"Graph API error {response.status_code}: {error_body}")
+            response.raise_for_status()
 
-            if response.status_code in (202, 204):
-                return {}
+        if response.status_code in (202, 204):
+            return {}
 
-            return response.json()
+        return response.json()
 
     @retry(
         stop=stop_after_attempt(3),
@@ -579,4 +628,11 @@ def get_graph_service() -> MicrosoftGraphService:
         client_secret=settings.ms_graph_client_secret,
         tenant_id=settings.ms_graph_tenant_id,
         target_mailbox=settings.ms_graph_target_mailbox,
+        max_connections=settings.ms_graph_max_connections,
     )
+
+
+async def close_graph_service() -> None:
+    """Close the cached service's connection pool (app shutdown)."""
+    if get_graph_service.cache_info().currsize:
+        await get_graph_service().aclose()
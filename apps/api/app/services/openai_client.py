@@ -9,6 +9,7 @@ from openai import AsyncOpenAI
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from ..core.config import get_settings
+from ..core.metrics import LLM, InstrumentedAsyncTransport
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +17,23 @@ logger = logging.getLogger(__name__)
 class OpenAIClient:
     """OpenAI API client with retry and error handling."""
 
-    def __init__(self, api_key: str):
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        max_connections: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        # One pooled HTTP/2 client for the SDK and the raw Responses API calls
+        # (closed by close_openai_client on app shutdown)
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        transport = transport or httpx.AsyncHTTPTransport(http2=True, limits=limits)
+        self.http_client = httpx.AsyncClient(
+            transport=InstrumentedAsyncTransport(transport, LLM),
+            # The SDK's default: generations can take minutes
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            follow_redirects=True,
+        )
+        self.client = AsyncOpenAI(api_key=api_key, http_client=self.http_client)
         self.default_model = "gpt-4o-mini"
         self.vision_model = "gpt-4o"
 
@@ -76,16 +92,17 @@ class OpenAIClient:
     async def vision_completion(
         self,
         prompt: str,
-        image_url: str,
+        image_url: str | List[str],
         model: Optional[str] = None,
         max_tokens: int = 4000,
     ) -> str:
         """
-        Create a vision completion with an image URL.
+        Create a vision completion with one or more image URLs.
 
         Args:
             prompt: The text prompt
-            image_url: URL of the image (can be base64 data URL)
+            image_url: URL of the image (can be base64 data URL), or a list of
+                them (e.g. the pages of a document), sent in order
             model: Model to use (defaults to gpt-4o)
             max_tokens: Maximum tokens in response
 
@@ -96,12 +113,12 @@ class OpenAIClient:
 
         logger.info(f"Creating vision completion with model: {model}")
 
+        image_urls = [image_url] if isinstance(image_url, str) else image_url
         messages = [
             {
                 "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": image_url}},
+                "content": [{"type": "text", "text": prompt}] + [
+                    {"type": "image_url", "image_url": {"url": url}} for url in image_urls
                 ],
             }
         ]
@@ -196,43 +213,42 @@ class OpenAIClient:
         # since the SDK might not have full support yet
         settings = get_settings()
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/responses",
-                headers={
-                    "Authorization": f"Bearer {settings.openai_api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": model,
-                    "input": [
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "input_text", "text": prompt},
-                                {"type": "input_file", "file_id": file_id},
-                            ],
-                        }
-                    ],
-                },
-                timeout=120.0,
-            )
+        response = await self.http_client.post(
+            "https://api.openai.com/v1/responses",
+            headers={
+                "Authorization": f"Bearer {settings.openai_api_key}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": model,
+                "input": [
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "input_text", "text": prompt},
+                            {"type": "input_file", "file_id": file_id},
+                        ],
+                    }
+                ],
+            },
+            timeout=120.0,
+        )
 
-            if response.status_code != 200:
-                logger.error(
-                    f"Responses API error {response.status_code}: {response.text}"
-                )
-            response.raise_for_status()
-            data = response.json()
+        if response.status_code != 200:
+            logger.error(
+                f"Responses API error {response.status_code}: {response.text}"
+            )
+        response.raise_for_status()
+        data = response.json()
 
-            # Extract text from response
-            output = data.get("output", [])
-            if output and len(output) > 0:
-                content = output[0].get("content", [])
-                if content and len(content) > 0:
-                    return content[0].get("text", "")
+        # Extract text from response
+        output = data.get("output", [])
+        if output and len(output) > 0:
+            content = output[0].get("content", [])
+            if content and len(content) > 0:
+                return content[0].get("text", "")
 
-            return ""
+        return ""
 
 
     @retry(
@@ -272,4 +288,13 @@ class OpenAIClient:
 def get_openai_client() -> OpenAIClient:
     """Get cached OpenAI client instance."""
     settings = get_settings()
-    return OpenAIClient(api_key=settings.openai_api_key)
+    return OpenAIClient(
+        api_key=settings.openai_api_key,
+        max_connections=settings.openai_max_connections,
+    )
+
+
+async def close_openai_client() -> None:
+    """Close the cached client's connection pool (app shutdown)."""
+    if get_openai_client.cache_info().currsize:
+        await get_openai_client().http_client.aclose()
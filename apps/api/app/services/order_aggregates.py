@@ -0,0 +1,85 @@
+"""Order, delivery and billing aggregates computed in Postgres.
+
+Thin async wrappers over the aggregate RPCs of migration
+20261017000003_order_aggregate_rpcs.sql. Each one returns the numbers the
+endpoints used to compute by downloading rows and counting them in Python,
+so payload size and latency no longer grow with order history.
+"""
+
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, List
+
+from ..core.supabase_async import AsyncSupabase
+
+logger = logging.getLogger(__name__)
+
+# Terminal statuses left out of the open-order counts
+EXCLUDED_STATUSES = ["delivered", "cancelled", "returned"]
+
+
+def _iso(value) -> str:
+    return value.isoformat() if isinstance(value, date) else str(value)
+
+
+async def get_order_status_counts(
+    supabase: AsyncSupabase,
+    today,
+    tomorrow,
+    week_end,
+    excluded_statuses: List[str] = EXCLUDED_STATUSES,
+) -> Dict[str, Any]:
+    """Open-order counts: {today, tomorrow, this_week, by_status, total}."""
+    result = await supabase.rpc("get_order_status_counts", {
+        "p_today": _iso(today),
+        "p_tomorrow": _iso(tomorrow),
+        "p_week_end": _iso(week_end),
+        "p_excluded_statuses": list(excluded_statuses),
+    }).execute()
+    return result.data or {}
+
+
+def delivery_percentage(requested, delivered) -> int:
+    """Delivered units as a rounded percentage of requested (0 if nothing requested)."""
+    if not requested:
+        return 0
+    return round((delivered / requested) * 100)
+
+
+async def get_delivery_percentages(supabase: AsyncSupabase, order_ids: Iterable[str]) -> Dict[str, int]:
+    """{order_id: delivery percentage} for the orders that have items."""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {}
+    result = await supabase.rpc("get_order_delivery_totals", {"p_order_ids": order_ids}).execute()
+    return {
+        row["order_id"]: delivery_percentage(row["quantity_requested"], row["quantity_delivered"])
+        for row in (result.data or [])
+    }
+
+
+async def get_delivery_summary(supabase: AsyncSupabase, delivery_date) -> Dict[str, Any]:
+    """{orders_total, orders_delivered, units_requested, units_delivered} for one delivery date."""
+    result = await supabase.rpc("get_delivery_summary", {"p_date": _iso(delivery_date)}).execute()
+    return result.data or {}
+
+
+async def get_monthly_billing_totals(supabase: AsyncSupabase, year: int) -> Dict[int, Dict[str, Any]]:
+    """{month: {exports, orders, amount}} for the months of year with exports."""
+    result = await supabase.rpc("get_monthly_billing_totals", {"p_year": year}).execute()
+    return {
+        row["month"]: {"exports": row["exports"], "orders": row["orders"], "amount": row["amount"]}
+        for row in (result.data or [])
+    }
+
+
+async def get_billing_totals(supabase: AsyncSupabase) -> Dict[str, Any]:
+    """{total_exports, total_orders, total_amount, latest_invoice_number} over all exports."""
+    result = await supabase.rpc("get_billing_totals").execute()
+    return result.data or {}
+
+
+async def get_remision_totals(supabase: AsyncSupabase) -> Dict[str, Any]:
+    """{total_remisions, total_amount, invoiced_orders} over all remisions."""
+    result = await supabase.rpc("get_remision_totals").execute()
+    return result.data or {}
@@ -1,14 +1,17 @@
 """Service for syncing entities to RAG (vector) tables."""
 
+import asyncio
+import json
 import logging
 import re
 import uuid
 
-from tenacity import retry, stop_after_attempt, wait_exponential
-
 from ..core.config import get_settings
 from ..core.supabase import get_supabase_client
+from ..core.supabase_async import run_blocking
+from .embeddings import get_embedding, get_embeddings
 from .openai_client import get_openai_client
+from .vector_index import VectorIndex, get_client_index, get_product_index
 
 logger = logging.getLogger(__name__)
 
@@ -79,20 +82,21 @@ def _parse_weight_grams(weight_str: str | None) -> float | None:
     return val
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-)
 async def generate_embedding(text: str) -> list[float]:
-    """Generate an embedding vector using OpenAI."""
-    openai = get_openai_client()
+    """Embedding vector of text (cached by content hash, see services/embeddings.py)."""
+    return await get_embedding(text)
 
-    response = await openai.client.embeddings.create(
-        input=text,
-        model="text-embedding-3-small",
-    )
 
-    return response.data[0].embedding
+async def _search_rag(index: VectorIndex, function: str, embedding: list[float], match_count: int) -> list[dict]:
+    """Nearest RAG entries: the in-process index once loaded, else rpc(function)."""
+    if get_settings().vector_index_enabled and index.loaded:
+        return index.search(embedding, match_count)
+    result = await run_blocking(lambda: get_supabase_client().rpc(function, {
+        "query_embedding": embedding,
+        "match_count": match_count,
+        "filter": {},
+    }).execute())
+    return result.data or []
 
 
 async def _upsert_rag_entry(supabase, client_id: str, content: str, entry_type: str) -> str:
@@ -120,7 +124,6 @@ async def _upsert_rag_entry(supabase, client_id: str, content: str, entry_type:
             "embedding": embedding,
             "metadata": metadata,
         }).eq("id", rag_id).execute()
-        return rag_id
     else:
         rag_id = str(uuid.uuid4())
         supabase.table("clientes_rag").insert({
@@ -129,7 +132,21 @@ async def _upsert_rag_entry(supabase, client_id: str, content: str, entry_type:
             "embedding": embedding,
             "metadata": metadata,
         }).execute()
-        return rag_id
+
+    get_client_index().upsert([{"id": rag_id, "content": content, "embedding": embedding, "metadata": metadata}])
+    return rag_id
+
+
+def _client_rag_entries(client: dict) -> list[tuple[str, str]]:
+    """(type, content) clientes_rag entries of a client.
+
+    Always the name; the razón social too when it differs from the name.
+    """
+    entries = [("name", client["name"])]
+    razon = client.get("razon_social")
+    if razon and razon.strip() and razon.strip().upper() != client["name"].strip().upper():
+        entries.append(("razon_social", razon))
+    return entries
 
 
 async def sync_client_to_rag(client_id: str) -> dict:
@@ -148,17 +165,11 @@ async def sync_client_to_rag(client_id: str) -> dict:
         return {"status": "error", "message": f"Client {client_id} not found"}
 
     entries = []
+    for entry_type, content in _client_rag_entries(client):
+        rag_id = await _upsert_rag_entry(supabase, client_id, content, entry_type)
+        entries.append({"type": entry_type, "rag_id": rag_id, "content": content})
 
-    # Always create entry for name
-    rag_id = await _upsert_rag_entry(supabase, client_id, client["name"], "name")
-    entries.append({"type": "name", "rag_id": rag_id, "content": client["name"]})
-
-    # Create entry for razón social if it exists and is different from name
-    razon = client.get("razon_social")
-    if razon and razon.strip().upper() != client["name"].strip().upper():
-        rag_id = await _upsert_rag_entry(supabase, client_id, razon, "razon_social")
-        entries.append({"type": "razon_social", "rag_id": rag_id, "content": razon})
-    else:
+    if not any(e["type"] == "razon_social" for e in entries):
         # Clean up old razon_social entry if name and razon are now the same
         old = (
             supabase.table("clientes_rag")
@@ -168,11 +179,109 @@ async def sync_client_to_rag(client_id: str) -> dict:
         )
         if old.data:
             supabase.table("clientes_rag").delete().eq("id", old.data[0]["id"]).execute()
+            get_client_index().remove([old.data[0]["id"]])
+
+    # Precompute alias / branch embeddings for order matching
+    try:
+        await warm_client_embeddings(client_id)
+    except Exception as e:
+        logger.warning(f"Could not warm embeddings for client {client_id}: {e}")
 
     logger.info(f"Synced client {client_id}: {len(entries)} entries")
     return {"status": "synced", "client_id": client_id, "entries": entries}
 
 
+# Rows per bulk productos_rag / clientes_rag write (~20 KB of JSON per embedding)
+RAG_WRITE_CHUNK_SIZE = 200
+# Rows per page of the bulk syncs' reads (below PostgREST max_rows = 1000)
+RAG_READ_PAGE_SIZE = 500
+
+
+def _select_all(query_factory) -> list[dict]:
+    """Every row of a query, paged by id (PostgREST truncates at max_rows).
+
+    query_factory builds a fresh query whose select includes id.
+    """
+    rows: list[dict] = []
+    last_id = None
+    while True:
+        query = query_factory().order("id")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = query.limit(RAG_READ_PAGE_SIZE).execute().data or []
+        rows.extend(page)
+        if len(page) < RAG_READ_PAGE_SIZE:
+            return rows
+        last_id = page[-1]["id"]
+
+
+async def sync_all_clients_to_rag() -> dict:
+    """Sync every client to clientes_rag in bulk.
+
+    Same entries as sync_client_to_rag, but embedded with batched
+    get_embeddings calls and written with chunked upserts (existing entries
+    keep their id), instead of several round-trips per client. A chunk whose
+    embedding or write fails counts its clients as errors; the other chunks
+    are still synced. Stale razón social entries are deleted and every
+    client's alias / branch embeddings are warmed.
+    """
+    supabase = get_supabase_client()
+    clients = await run_blocking(_select_all, lambda: supabase.table("clients").select("id, name, razon_social"))
+
+    existing = await run_blocking(_select_all, lambda: supabase.table("clientes_rag").select("id, metadata"))
+    existing_ids: dict[tuple[str, str], str] = {}
+    for row in existing:
+        metadata = row.get("metadata") or {}
+        existing_ids.setdefault((metadata.get("client_id"), metadata.get("type")), row["id"])
+
+    rows = []
+    failed: set[str] = set()
+    for client in clients:
+        if not (client.get("name") or "").strip():
+            logger.error(f"Client {client['id']} has no name, not synced")
+            failed.add(client["id"])
+            continue
+        for entry_type, content in _client_rag_entries(client):
+            rows.append({
+                "id": existing_ids.get((client["id"], entry_type)) or str(uuid.uuid4()),
+                "content": content,
+                "metadata": {"client_id": client["id"], "type": entry_type, "source": "api_sync"},
+            })
+
+    for start in range(0, len(rows), RAG_WRITE_CHUNK_SIZE):
+        chunk = rows[start:start + RAG_WRITE_CHUNK_SIZE]
+        try:
+            embeddings = await get_embeddings([row["content"] for row in chunk])
+            for row, embedding in zip(chunk, embeddings):
+                row["embedding"] = embedding
+            await run_blocking(supabase.table("clientes_rag").upsert(chunk).execute)
+            get_client_index().upsert(chunk)
+        except Exception as e:
+            logger.error(f"Failed to sync {len(chunk)} clientes_rag entries: {e}")
+            failed.update(row["metadata"]["client_id"] for row in chunk)
+
+    # Clean up razón social entries of clients whose razón social now equals the name
+    without_razon = {c["id"] for c in clients} - failed - {
+        row["metadata"]["client_id"] for row in rows if row["metadata"]["type"] == "razon_social"
+    }
+    stale = [
+        rag_id for (client_id, entry_type), rag_id in existing_ids.items()
+        if entry_type == "razon_social" and client_id in without_razon
+    ]
+    if stale:
+        await run_blocking(supabase.table("clientes_rag").delete().in_("id", stale).execute)
+        get_client_index().remove(stale)
+
+    try:
+        await warm_all_client_embeddings()
+    except Exception as e:
+        logger.warning(f"Could not warm client alias / branch embeddings: {e}")
+
+    synced = len(clients) - len(failed)
+    logger.info(f"Synced {synced}/{len(clients)} clients to RAG ({len(rows)} entries)")
+    return {"status": "completed", "total": len(clients), "synced": synced, "errors": len(failed)}
+
+
 MATCH_THRESHOLD = 0.50
 
 
@@ -184,20 +293,15 @@ async def match_client(extracted_name: str) -> dict | None:
     if not extracted_name or not extracted_name.strip():
         return None
 
-    supabase = get_supabase_client()
     embedding = await generate_embedding(extracted_name.strip())
 
-    result = supabase.rpc("match_clientes", {
-        "query_embedding": embedding,
-        "match_count": 1,
-        "filter": {},
-    }).execute()
+    matches = await _search_rag(get_client_index(), "match_clientes", embedding, 1)
 
-    if not result.data:
+    if not matches:
         logger.info(f"No RAG match found for '{extracted_name}'")
         return None
 
-    best = result.data[0]
+    best = matches[0]
     similarity = best["similarity"]
     client_id = best["metadata"].get("client_id")
     match_type = best["metadata"].get("type")
@@ -234,6 +338,79 @@ def _cosine_similarity(a: list[float], b: list[float]) -> float:
 BRANCH_MATCH_THRESHOLD = 0.40
 
 
+def _branch_text(branch: dict) -> str:
+    """'name | address' of a branch, as embedded for branch matching."""
+    parts = [p.strip() for p in [branch.get("name"), branch.get("address")] if p and p.strip()]
+    return " | ".join(parts)
+
+
+def _alias_text(alias: dict) -> str:
+    """Client alias as embedded for alias vector matching."""
+    return (alias.get("client_alias") or "").strip()
+
+
+async def warm_client_embeddings(client_id: str) -> dict:
+    """Precompute the embeddings of a client's product aliases and branches.
+
+    match_product and match_branch embed every alias / branch of the client
+    on each call; with them cached, a match only embeds the extracted text.
+    Call after aliases or branches change (only new texts reach OpenAI).
+    """
+    supabase = get_supabase_client()
+    aliases = (
+        supabase.table("product_aliases")
+        .select("client_alias")
+        .eq("client_id", client_id)
+        .execute()
+    ).data or []
+    branches = (
+        supabase.table("branches")
+        .select("name, address")
+        .eq("client_id", client_id)
+        .execute()
+    ).data or []
+
+    alias_texts = [t for t in (_alias_text(a) for a in aliases) if t]
+    # Single-branch clients are auto-assigned without embeddings
+    branch_texts = [t for t in (_branch_text(b) for b in branches) if t] if len(branches) > 1 else []
+    if alias_texts or branch_texts:
+        await get_embeddings(alias_texts + branch_texts)
+
+    logger.info(
+        f"Warmed embeddings for client {client_id}: "
+        f"{len(alias_texts)} aliases, {len(branch_texts)} branches"
+    )
+    return {
+        "status": "warmed",
+        "client_id": client_id,
+        "aliases": len(alias_texts),
+        "branches": len(branch_texts),
+    }
+
+
+async def warm_all_client_embeddings() -> dict:
+    """warm_client_embeddings for every client, in one batched call."""
+    supabase = get_supabase_client()
+    aliases = _select_all(lambda: supabase.table("product_aliases").select("id, client_alias"))
+    branches = _select_all(lambda: supabase.table("branches").select("id, client_id, name, address"))
+
+    by_client: dict[str, list[dict]] = {}
+    for branch in branches:
+        by_client.setdefault(branch.get("client_id"), []).append(branch)
+
+    alias_texts = [t for t in (_alias_text(a) for a in aliases) if t]
+    branch_texts = [
+        t
+        for client_branches in by_client.values() if len(client_branches) > 1
+        for t in (_branch_text(b) for b in client_branches) if t
+    ]
+    if alias_texts or branch_texts:
+        await get_embeddings(alias_texts + branch_texts)
+
+    logger.info(f"Warmed embeddings: {len(alias_texts)} aliases, {len(branch_texts)} branches")
+    return {"status": "warmed", "aliases": len(alias_texts), "branches": len(branch_texts)}
+
+
 async def match_branch(
     client_id: str,
     sucursal_text: str | None,
@@ -290,16 +467,17 @@ async def match_branch(
         }
 
     query_text = " | ".join(query_parts)
-    query_emb = await generate_embedding(query_text)
+
+    # One cached lookup for the query and every branch (precomputed by
+    # warm_client_embeddings, so usually only the query is new)
+    embeddable = [(b, _branch_text(b)) for b in branches]
+    embeddable = [(b, text) for b, text in embeddable if text]
+    query_emb, *branch_embs = await get_embeddings([query_text] + [text for _, text in embeddable])
 
     best_branch = None
     best_sim = -1.0
 
-    for b in branches:
-        parts = [p for p in [b.get("name"), b.get("address")] if p and p.strip()]
-        if not parts:
-            continue
-        branch_emb = await generate_embedding(" | ".join(parts))
+    for (b, _), branch_emb in zip(embeddable, branch_embs):
         sim = _cosine_similarity(query_emb, branch_emb)
         if sim > best_sim:
             best_sim = sim
@@ -347,6 +525,15 @@ def _get_product_weight(supabase, product_id: str) -> float | None:
     return None
 
 
+def _get_product_weights(supabase, product_ids: list[str]) -> dict[str, float | None]:
+    """{product_id: weight in grams} of several products in one query."""
+    try:
+        result = supabase.table("products").select("id, weight").in_("id", product_ids).execute()
+        return {p["id"]: _parse_weight_grams(p.get("weight")) for p in (result.data or [])}
+    except Exception:
+        return {}
+
+
 def _format_product_name(name: str, weight_grams: float | str | None) -> str:
     """Append weight to product name for disambiguation (e.g. 'Croissant Europa 30g').
 
@@ -371,6 +558,31 @@ def _format_product_name(name: str, weight_grams: float | str | None) -> str:
     return f"{name} {weight_int}g"
 
 
+def _product_rag_entry(product: dict) -> tuple[str, dict]:
+    """(content, metadata) of a product's productos_rag entry.
+
+    Content is "name | description"; metadata carries the weight in grams
+    for disambiguation during matching.
+    """
+    parts = [product["name"]]
+    if product.get("description"):
+        parts.append(product["description"])
+    content = " | ".join(parts)
+
+    weight_grams = _parse_weight_grams(product.get("weight"))
+    if weight_grams is None:
+        # Fallback: extract weight from product name (e.g. "PASTEL DE CARNE 80g")
+        _, weight_grams = _parse_product_text(product["name"])
+
+    metadata = {
+        "product_id": product["id"],
+        "source": "api_sync",
+    }
+    if weight_grams is not None:
+        metadata["weight_grams"] = weight_grams
+    return content, metadata
+
+
 async def sync_product_to_rag(product_id: str) -> dict:
     """Sync a product to productos_rag.
 
@@ -397,27 +609,9 @@ async def sync_product_to_rag(product_id: str) -> dict:
         await delete_product_from_rag(product_id)
         return {"status": "skipped", "product_id": product_id, "reason": "not active PT"}
 
-    # Build content: name | description
-    parts = [product["name"]]
-    if product.get("description"):
-        parts.append(product["description"])
-    content = " | ".join(parts)
-
+    content, metadata = _product_rag_entry(product)
     embedding = await generate_embedding(content)
 
-    # Determine weight in grams for disambiguation during matching
-    weight_grams = _parse_weight_grams(product.get("weight"))
-    if weight_grams is None:
-        # Fallback: extract weight from product name (e.g. "PASTEL DE CARNE 80g")
-        _, weight_grams = _parse_product_text(product["name"])
-
-    metadata = {
-        "product_id": product_id,
-        "source": "api_sync",
-    }
-    if weight_grams is not None:
-        metadata["weight_grams"] = weight_grams
-
     # Upsert: check existing by product_id
     existing = (
         supabase.table("productos_rag")
@@ -442,6 +636,7 @@ async def sync_product_to_rag(product_id: str) -> dict:
             "metadata": metadata,
         }).execute()
 
+    get_product_index().upsert([{"id": rag_id, "content": content, "embedding": embedding, "metadata": metadata}])
     logger.info(f"Synced product {product_id}: '{content}'")
     return {"status": "synced", "product_id": product_id, "rag_id": rag_id, "content": content}
 
@@ -460,12 +655,65 @@ async def delete_product_from_rag(product_id: str) -> dict:
     if existing.data:
         for entry in existing.data:
             supabase.table("productos_rag").delete().eq("id", entry["id"]).execute()
+        get_product_index().remove(entry["id"] for entry in existing.data)
         logger.info(f"Deleted {len(existing.data)} RAG entries for product {product_id}")
         return {"status": "deleted", "product_id": product_id, "count": len(existing.data)}
 
     return {"status": "not_found", "product_id": product_id}
 
 
+async def sync_all_products_to_rag() -> dict:
+    """Rebuild productos_rag from every active PT product.
+
+    All contents are embedded in one batched get_embeddings call before the
+    table is purged (a failed embedding run leaves the old entries in
+    place), then the entries are inserted in chunks.
+    """
+    supabase = get_supabase_client()
+    products = await run_blocking(
+        _select_all,
+        lambda: supabase.table("products")
+        .select("id, name, description, weight")
+        .eq("is_active", True)
+        .eq("category", "PT")
+    )
+
+    rows = []
+    errors = 0
+    for product in products:
+        if not (product.get("name") or "").strip():
+            logger.error(f"Product {product['id']} has no name, not synced")
+            errors += 1
+            continue
+        content, metadata = _product_rag_entry(product)
+        rows.append({"id": str(uuid.uuid4()), "content": content, "metadata": metadata})
+
+    embeddings = await get_embeddings([row["content"] for row in rows])
+    for row, embedding in zip(rows, embeddings):
+        row["embedding"] = embedding
+
+    # Purge ALL existing entries to remove stale data
+    await run_blocking(
+        supabase.table("productos_rag").delete().neq("id", "00000000-0000-0000-0000-000000000000").execute
+    )
+    logger.info("Purged all existing productos_rag entries")
+
+    written = []
+    for start in range(0, len(rows), RAG_WRITE_CHUNK_SIZE):
+        chunk = rows[start:start + RAG_WRITE_CHUNK_SIZE]
+        try:
+            await run_blocking(supabase.table("productos_rag").insert(chunk).execute)
+            written.extend(chunk)
+        except Exception as e:
+            logger.error(f"Failed to write {len(chunk)} productos_rag entries: {e}")
+            errors += len(chunk)
+    get_product_index().replace(written)
+    synced = len(written)
+
+    logger.info(f"Synced {synced}/{len(products)} products to RAG")
+    return {"status": "completed", "total": len(products), "synced": synced, "errors": errors, "purged": True}
+
+
 def _disambiguate_by_weight(
     candidates: list[dict], extracted_weight: float
 ) -> dict | None:
@@ -521,6 +769,35 @@ def _disambiguate_by_weight(
     return None
 
 
+# Matching rules shared by the single-line and batch reranker prompts
+_RERANK_RULES = """1. LIMPIEZA: Ignora códigos numéricos al inicio del nombre extraído (son códigos del cliente). Ignora diferencias de formato en peso (*20gr = 20g = 20 g).
+
+2. COINCIDENCIA DE PALABRAS CLAVE (MÁS IMPORTANTE): Extrae las palabras descriptivas del nombre (sin códigos, sin peso). Compara contra cada candidato:
+   - Si el nombre extraído dice "Croissant europa", el candidato DEBE contener "europa".
+   - Si dice "Croissant multicereal", DEBE contener "multicereal".
+   - Si dice solo "Croissant" sin ningún calificativo adicional, busca la versión más básica/simple — "Europa" es la versión clásica/estándar del croissant de panadería.
+
+3. PRINCIPIO DE EXCLUSIÓN: Si el nombre extraído NO menciona una característica específica (multicereal, integral, bicolor, almendras, frutos rojos, queso, etc.), DESCARTA candidatos que tengan esas características. Elige el candidato con menos calificativos extra.
+
+4. PESO: Si varios candidatos sobreviven, usa el peso/gramaje para desempatar.
+
+5. PRECIO: Si se proporciona precio, úsalo como confirmación adicional.
+"""
+
+
+def _candidate_match(candidate: dict, source: str) -> dict:
+    """Match dict of a RAG candidate row."""
+    product_id = candidate["metadata"].get("product_id")
+    raw_name = candidate["content"].split(" | ")[0] if candidate.get("content") else candidate["content"]
+    matched_name = _format_product_name(raw_name, candidate.get("metadata", {}).get("weight_grams"))
+    return {
+        "product_id": product_id,
+        "matched_name": matched_name,
+        "source": source,
+        "similarity": round(candidate["similarity"], 4),
+    }
+
+
 async def _rerank_products(
     extracted_name: str,
     candidates: list[dict],
@@ -560,19 +837,7 @@ Candidatos del catálogo (nombre | descripción):
 
 Reglas de análisis (aplica en orden de prioridad):
 
-1. LIMPIEZA: Ignora códigos numéricos al inicio del nombre extraído (son códigos del cliente). Ignora diferencias de formato en peso (*20gr = 20g = 20 g).
-
-2. COINCIDENCIA DE PALABRAS CLAVE (MÁS IMPORTANTE): Extrae las palabras descriptivas del nombre (sin códigos, sin peso). Compara contra cada candidato:
-   - Si el nombre extraído dice "Croissant europa", el candidato DEBE contener "europa".
-   - Si dice "Croissant multicereal", DEBE contener "multicereal".
-   - Si dice solo "Croissant" sin ningún calificativo adicional, busca la versión más básica/simple — "Europa" es la versión clásica/estándar del croissant de panadería.
-
-3. PRINCIPIO DE EXCLUSIÓN: Si el nombre extraído NO menciona una característica específica (multicereal, integral, bicolor, almendras, frutos rojos, queso, etc.), DESCARTA candidatos que tengan esas características. Elige el candidato con menos calificativos extra.
-
-4. PESO: Si varios candidatos sobreviven, usa el peso/gramaje para desempatar.
-
-5. PRECIO: Si se proporciona precio, úsalo como confirmación adicional.
-
+{_RERANK_RULES}
 6. Si ningún candidato corresponde al producto extraído, responde "0".
 
 Responde SOLO con el número del candidato correcto (1-{len(candidates)}) o "0" si ninguno aplica. Sin explicación."""
@@ -594,42 +859,123 @@ Responde SOLO con el número del candidato correcto (1-{len(candidates)}) o "0"
         if idx == 0 or idx > len(candidates):
             # Reranker rejected all — fall back to top-1 RAG result
             logger.info(f"Reranker rejected all candidates for '{extracted_name}', using top-1 RAG fallback")
-            best = candidates[0]
-            product_id = best["metadata"].get("product_id")
-            raw_name = best["content"].split(" | ")[0] if best.get("content") else best["content"]
-            matched_name = _format_product_name(raw_name, best.get("metadata", {}).get("weight_grams"))
-            return {
-                "product_id": product_id,
-                "matched_name": matched_name,
-                "source": "rag",
-                "similarity": round(best["similarity"], 4),
-            }
+            return _candidate_match(candidates[0], "rag")
 
-        selected = candidates[idx - 1]
-        product_id = selected["metadata"].get("product_id")
-        raw_name = selected["content"].split(" | ")[0] if selected.get("content") else selected["content"]
-        matched_name = _format_product_name(raw_name, selected.get("metadata", {}).get("weight_grams"))
-
-        return {
-            "product_id": product_id,
-            "matched_name": matched_name,
-            "source": "rag_reranked",
-            "similarity": round(selected["similarity"], 4),
-        }
+        return _candidate_match(candidates[idx - 1], "rag_reranked")
 
     except Exception as e:
         logger.error(f"Reranker failed for '{extracted_name}': {e}")
         # Fall back to top-1 from vector search
-        best = candidates[0]
-        product_id = best["metadata"].get("product_id")
-        raw_name = best["content"].split(" | ")[0] if best.get("content") else best["content"]
-        matched_name = _format_product_name(raw_name, best.get("metadata", {}).get("weight_grams"))
-        return {
-            "product_id": product_id,
-            "matched_name": matched_name,
-            "source": "rag",
-            "similarity": round(best["similarity"], 4),
-        }
+        return _candidate_match(candidates[0], "rag")
+
+
+# Order lines per combined reranker call
+RERANK_BATCH_SIZE = 25
+
+
+async def _rerank_products_batch(lines: list[tuple[str, list[dict], float | None]]) -> list[dict | None]:
+    """_rerank_products for several (extracted_name, candidates, precio) lines in one LLM call.
+
+    The model answers a JSON object {"<line>": <candidate number or 0>}.
+    Choices are interpreted like _rerank_products: 0 or out of range falls
+    back to the top-1 candidate, a missing or non-numeric answer gives None,
+    and a failed call falls back to top-1 for every line.
+    """
+    if len(lines) == 1:
+        extracted_name, candidates, precio = lines[0]
+        return [await _rerank_products(extracted_name, candidates, precio=precio)]
+
+    blocks = []
+    for n, (extracted_name, candidates, precio) in enumerate(lines, start=1):
+        header = f'Línea {n}: "{extracted_name}"'
+        if precio is not None:
+            header += f" (precio unitario en la orden: ${precio:,.2f})"
+        candidate_lines = [f"  {i + 1}. {c.get('content') or ''}" for i, c in enumerate(candidates)]
+        blocks.append(header + "\n" + "\n".join(candidate_lines))
+    lines_text = "\n\n".join(blocks)
+
+    prompt = f"""Eres un experto en productos de panadería industrial. Tu tarea es determinar, para cada línea de una orden de compra, cuál producto del catálogo corresponde al nombre extraído.
+
+Líneas de la orden, cada una con sus candidatos del catálogo (nombre | descripción):
+{lines_text}
+
+Para cada línea, aplica por separado estas reglas (en orden de prioridad):
+
+{_RERANK_RULES}
+6. Si ningún candidato corresponde al producto extraído, usa 0.
+
+Responde SOLO con un objeto JSON que asigne a cada número de línea el número de su candidato correcto (o 0), por ejemplo {{"1": 2, "2": 0}}. Sin explicación."""
+
+    openai = get_openai_client()
+    try:
+        response = await openai.chat_completion(
+            messages=[{"role": "user", "content": prompt}],
+            model="gpt-4o-mini",
+            temperature=0.0,
+            max_tokens=10 * len(lines) + 20,
+        )
+        text = response.strip()
+        if text.startswith("```"):
+            text = text.strip("`").removeprefix("json").strip()
+        choices = json.loads(text)
+        if not isinstance(choices, dict):
+            raise ValueError(f"expected a JSON object, got {response!r}")
+    except Exception as e:
+        logger.error(f"Batch reranker failed for {len(lines)} lines: {e}")
+        return [_candidate_match(candidates[0], "rag") for _, candidates, _ in lines]
+
+    results = []
+    for n, (extracted_name, candidates, _) in enumerate(lines, start=1):
+        choice = str(choices.get(str(n), "")).strip().strip(".")
+        if not choice.isdigit():
+            logger.warning(f"Reranker returned non-numeric response for '{extracted_name}': '{choice}'")
+            results.append(None)
+            continue
+        idx = int(choice)
+        if idx == 0 or idx > len(candidates):
+            logger.info(f"Reranker rejected all candidates for '{extracted_name}', using top-1 RAG fallback")
+            results.append(_candidate_match(candidates[0], "rag"))
+        else:
+            results.append(_candidate_match(candidates[idx - 1], "rag_reranked"))
+    return results
+
+
+def _fetch_client_aliases(client_id: str) -> list[dict]:
+    """Product aliases of a client, as match_product uses them."""
+    supabase = get_supabase_client()
+    return (
+        supabase.table("product_aliases")
+        .select("product_id, client_alias, real_product_name")
+        .eq("client_id", client_id)
+        .execute()
+    ).data or []
+
+
+async def embed_product_queries(
+    extracted_names: list[str],
+    client_id: str | None = None,
+    aliases: list[dict] | None = None,
+) -> int:
+    """Precompute, in one batched call, what match_product embeds for each line.
+
+    That is the clean name of every extracted product and, when the client
+    has product aliases, the full extracted name and the aliases too. The
+    per-line match_product calls then find every vector in the cache.
+    aliases are the client's (fetched when not given). Returns the number
+    of texts looked up.
+    """
+    names = [n.strip() for n in extracted_names if n and n.strip()]
+    texts = [_parse_product_text(name)[0] for name in names]
+    if client_id:
+        if aliases is None:
+            aliases = await run_blocking(_fetch_client_aliases, client_id)
+        alias_texts = [t for t in (_alias_text(a) for a in aliases) if t]
+        if alias_texts:
+            texts += names + alias_texts
+    texts = [t for t in texts if t.strip()]
+    if texts:
+        await get_embeddings(texts)
+    return len(texts)
 
 
 async def match_product(
@@ -650,21 +996,122 @@ async def match_product(
 
     Returns {product_id, matched_name, source, similarity} or None.
     """
+    match, rerank_candidates = await _match_product(extracted_name, client_id)
+    if rerank_candidates:
+        # Low confidence → rerank with LLM
+        reranked = await _rerank_products(extracted_name.strip(), rerank_candidates, precio=precio)
+        return _log_reranked(extracted_name, reranked)
+    return match
+
+
+def _log_reranked(extracted_name: str, reranked: dict | None) -> dict | None:
+    if reranked:
+        logger.info(
+            f"Product reranked match for '{extracted_name}': "
+            f"'{reranked['matched_name']}' (similarity={reranked['similarity']})"
+        )
+    else:
+        # Reranker rejected all candidates
+        logger.info(f"Reranker found no good match for '{extracted_name}'")
+    return reranked
+
+
+async def match_products(
+    extracted_names: list[str],
+    client_id: str | None = None,
+    precios: list[float | None] | None = None,
+    return_exceptions: bool = False,
+) -> list:
+    """match_product for every line of an order, batched.
+
+    The client's aliases and their product weights are fetched once, every
+    line's texts are embedded in one batched call, the lines are matched
+    concurrently (at most settings.product_match_concurrency at a time) and
+    the low-confidence ones are reranked together in one LLM call.
+
+    Returns one match (or None) per extracted name, in order. With
+    return_exceptions, a line whose matching failed gets its exception
+    instead of failing the whole order.
+    """
+    precios = precios or [None] * len(extracted_names)
+    supabase = get_supabase_client()
+
+    aliases = await run_blocking(_fetch_client_aliases, client_id) if client_id else []
+    alias_product_ids = list({a["product_id"] for a in aliases if a.get("product_id")})
+    weights = await run_blocking(_get_product_weights, supabase, alias_product_ids) if alias_product_ids else {}
+
+    try:
+        await embed_product_queries(extracted_names, client_id, aliases=aliases)
+    except Exception as e:
+        # Lines still embed what they miss on their own
+        logger.warning(f"Could not pre-embed {len(extracted_names)} order lines: {e}")
+
+    semaphore = asyncio.Semaphore(get_settings().product_match_concurrency)
+
+    async def match_line(extracted_name: str):
+        async with semaphore:
+            return await _match_product(extracted_name, client_id, aliases=aliases, weights=weights)
+
+    outcomes = await asyncio.gather(
+        *(match_line(name) for name in extracted_names), return_exceptions=True
+    )
+
+    results: list = [None] * len(extracted_names)
+    to_rerank = []
+    for i, outcome in enumerate(outcomes):
+        if isinstance(outcome, BaseException):
+            if not return_exceptions:
+                raise outcome
+            results[i] = outcome
+            continue
+        match, rerank_candidates = outcome
+        if rerank_candidates:
+            to_rerank.append((i, rerank_candidates))
+        else:
+            results[i] = match
+
+    for start in range(0, len(to_rerank), RERANK_BATCH_SIZE):
+        batch = to_rerank[start:start + RERANK_BATCH_SIZE]
+        reranked = await _rerank_products_batch(
+            [(extracted_names[i].strip(), candidates, precios[i]) for i, candidates in batch]
+        )
+        for (i, _), match in zip(batch, reranked):
+            results[i] = _log_reranked(extracted_names[i], match)
+
+    logger.info(
+        f"Matched {sum(1 for r in results if isinstance(r, dict))}/{len(extracted_names)} order lines "
+        f"({len(to_rerank)} reranked)"
+    )
+    return results
+
+
+async def _match_product(
+    extracted_name: str,
+    client_id: str | None = None,
+    aliases: list[dict] | None = None,
+    weights: dict[str, float | None] | None = None,
+) -> tuple[dict | None, list[dict]]:
+    """match_product up to the LLM reranker: (match, []) or (None, candidates to rerank).
+
+    aliases (the client's) and weights ({product_id: grams} of the alias
+    products) are fetched when not given. Blocking queries run on worker
+    threads, so lines can be matched concurrently.
+    """
     if not extracted_name or not extracted_name.strip():
-        return None
+        return None, []
 
     extracted_upper = extracted_name.strip().upper()
     supabase = get_supabase_client()
 
+    async def product_weight(product_id: str) -> float | None:
+        if weights is not None:
+            return weights.get(product_id)
+        return await run_blocking(_get_product_weight, supabase, product_id)
+
     # Step 1 & 2: Alias matching (only if we have a client_id)
     if client_id:
-        aliases_result = (
-            supabase.table("product_aliases")
-            .select("product_id, client_alias, real_product_name")
-            .eq("client_id", client_id)
-            .execute()
-        )
-        aliases = aliases_result.data or []
+        if aliases is None:
+            aliases = await run_blocking(_fetch_client_aliases, client_id)
 
         if aliases:
             # Step 1: Exact match
@@ -672,7 +1119,7 @@ async def match_product(
                 alias_text = (alias.get("client_alias") or "").strip().upper()
                 if alias_text and alias_text == extracted_upper:
                     raw_name = alias.get("real_product_name") or alias.get("client_alias")
-                    weight = _get_product_weight(supabase, alias["product_id"])
+                    weight = await product_weight(alias["product_id"])
                     matched_name = _format_product_name(raw_name, weight)
                     logger.info(
                         f"Alias exact match for '{extracted_name}': "
@@ -683,18 +1130,19 @@ async def match_product(
                         "matched_name": matched_name,
                         "source": "alias_exact",
                         "similarity": 1.0,
-                    }
-
-            # Step 2: Alias vector match
-            query_emb = await generate_embedding(extracted_name.strip())
+                    }, []
+
+            # Step 2: Alias vector match (alias embeddings come from the cache,
+            # precomputed by warm_client_embeddings)
+            embeddable = [(a, _alias_text(a)) for a in aliases]
+            embeddable = [(a, text) for a, text in embeddable if text]
+            query_emb, *alias_embs = await get_embeddings(
+                [extracted_name.strip()] + [text for _, text in embeddable]
+            )
             best_alias = None
             best_sim = -1.0
 
-            for alias in aliases:
-                alias_text = alias.get("client_alias")
-                if not alias_text or not alias_text.strip():
-                    continue
-                alias_emb = await generate_embedding(alias_text.strip())
+            for (alias, _), alias_emb in zip(embeddable, alias_embs):
                 sim = _cosine_similarity(query_emb, alias_emb)
                 if sim > best_sim:
                     best_sim = sim
@@ -702,7 +1150,7 @@ async def match_product(
 
             if best_alias and best_sim >= ALIAS_VECTOR_THRESHOLD:
                 raw_name = best_alias.get("real_product_name") or best_alias.get("client_alias")
-                weight = _get_product_weight(supabase, best_alias["product_id"])
+                weight = await product_weight(best_alias["product_id"])
                 matched_name = _format_product_name(raw_name, weight)
                 logger.info(
                     f"Alias vector match for '{extracted_name}': "
@@ -714,7 +1162,7 @@ async def match_product(
                     "matched_name": matched_name,
                     "source": "alias_vector",
                     "similarity": round(best_sim, 4),
-                }
+                }, []
 
     # Step 3: Two-phase RAG matching
     # Phase 1: Parse extracted name → clean name (no weight/packaging) + weight
@@ -727,35 +1175,26 @@ async def match_product(
     # Search RAG with clean name (reduces noise from packaging info)
     embedding = await generate_embedding(clean_name)
 
-    result = supabase.rpc("match_productos", {
-        "query_embedding": embedding,
-        "match_count": 10,  # More candidates for weight disambiguation
-        "filter": {},
-    }).execute()
+    # More candidates for weight disambiguation
+    matches = await _search_rag(get_product_index(), "match_productos", embedding, 10)
 
-    candidates = [r for r in (result.data or []) if r["similarity"] >= PRODUCT_MATCH_THRESHOLD]
+    candidates = [r for r in matches if r["similarity"] >= PRODUCT_MATCH_THRESHOLD]
 
     # Fallback: if clean name gives no results, try full extracted name
     if not candidates and clean_name.lower() != extracted_name.strip().lower():
         logger.info(f"Clean name gave no matches, falling back to full name")
         full_embedding = await generate_embedding(extracted_name.strip())
-        full_result = supabase.rpc("match_productos", {
-            "query_embedding": full_embedding,
-            "match_count": RERANK_CANDIDATE_COUNT,
-            "filter": {},
-        }).execute()
-        candidates = [
-            r for r in (full_result.data or []) if r["similarity"] >= PRODUCT_MATCH_THRESHOLD
-        ]
+        full_matches = await _search_rag(get_product_index(), "match_productos", full_embedding, RERANK_CANDIDATE_COUNT)
+        candidates = [r for r in full_matches if r["similarity"] >= PRODUCT_MATCH_THRESHOLD]
         extracted_weight = None  # Can't safely disambiguate weight with full-name results
 
     if not candidates:
-        best_available = (result.data or [{}])[0] if result.data else {}
+        best_available = matches[0] if matches else {}
         logger.info(
             f"No product match for '{extracted_name}': "
             f"best='{best_available.get('content', '')}' ({best_available.get('similarity', 0):.4f})"
         )
-        return None
+        return None, []
 
     # Phase 2: Weight disambiguation (if weight was extracted)
     # Picks the candidate whose weight is closest to the extracted weight
@@ -766,7 +1205,7 @@ async def match_product(
                 f"Product weight match for '{extracted_name}': "
                 f"'{weight_match['matched_name']}' (similarity={weight_match['similarity']})"
             )
-            return weight_match
+            return weight_match, []
 
     # Phase 3: Standard ranking / reranker fallback
     best = candidates[0]
@@ -786,21 +1225,10 @@ async def match_product(
             "matched_name": matched_name,
             "source": "rag",
             "similarity": round(similarity, 4),
-        }
+        }, []
 
-    # Low confidence → rerank with LLM
-    reranked = await _rerank_products(extracted_name.strip(), candidates, precio=precio)
-
-    if reranked:
-        logger.info(
-            f"Product reranked match for '{extracted_name}': "
-            f"'{reranked['matched_name']}' (similarity={reranked['similarity']})"
-        )
-        return reranked
-
-    # Reranker rejected all candidates
-    logger.info(f"Reranker found no good match for '{extracted_name}'")
-    return None
+    # Low confidence → the caller reranks with the LLM
+    return None, candidates
 
 
 # Threshold below which we consider the match "ambiguous" and should ask the user
@@ -819,17 +1247,12 @@ async def match_product_candidates(
     """
     from .rag_sync import generate_embedding, _parse_product_text
 
-    supabase = get_supabase_client()
     clean_name, _ = _parse_product_text(extracted_name.strip())
     embedding = await generate_embedding(clean_name)
 
-    result = supabase.rpc("match_productos", {
-        "query_embedding": embedding,
-        "match_count": top_n * 2,
-        "filter": {},
-    }).execute()
+    matches = await _search_rag(get_product_index(), "match_productos", embedding, top_n * 2)
 
-    candidates = [r for r in (result.data or []) if r["similarity"] >= PRODUCT_MATCH_THRESHOLD]
+    candidates = [r for r in matches if r["similarity"] >= PRODUCT_MATCH_THRESHOLD]
 
     out = []
     seen_ids = set()
@@ -862,6 +1285,7 @@ async def delete_client_from_rag(client_id: str) -> dict:
     if existing.data:
         for entry in existing.data:
             supabase.table("clientes_rag").delete().eq("id", entry["id"]).execute()
+        get_client_index().remove(entry["id"] for entry in existing.data)
         logger.info(f"Deleted {len(existing.data)} RAG entries for client {client_id}")
         return {"status": "deleted", "client_id": client_id, "count": len(existing.data)}
 
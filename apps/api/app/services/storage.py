@@ -7,11 +7,13 @@ from datetime import datetime
 from functools import lru_cache
 from typing import Optional
 
+import httpx
 from supabase import Client
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from ..core.config import get_settings
 from ..core.supabase import get_supabase_client
+from ..core.supabase_async import get_async_supabase_client
 
 logger = logging.getLogger(__name__)
 
@@ -119,6 +121,66 @@ class StorageService:
             logger.error(f"Failed to upload PDF: {e}")
             raise
 
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+    )
+    def upload_file(
+        self,
+        content: bytes,
+        path: str,
+        content_type: str,
+        upsert: bool = False,
+    ) -> str:
+        """
+        Upload bytes to a given path (sync, for code running on worker threads).
+
+        Args:
+            content: File content as bytes
+            path: Object path in the bucket
+            content_type: MIME type
+            upsert: Overwrite an existing object at path
+
+        Returns:
+            The object path
+        """
+        logger.info(f"Uploading file to storage: {self.bucket}/{path} ({len(content)} bytes)")
+
+        file_options = {"content-type": content_type}
+        if upsert:
+            file_options["upsert"] = "true"
+
+        self.supabase.storage.from_(self.bucket).upload(
+            path=path,
+            file=content,
+            file_options=file_options,
+        )
+        return path
+
+    async def open_download(self, path: str) -> httpx.Response:
+        """
+        Start a streamed download of a file over the async connection pool.
+
+        Args:
+            path: File path in storage
+
+        Returns:
+            Response whose body is not read yet (iterate aiter_bytes(),
+            then aclose())
+
+        Raises:
+            FileNotFoundError: If the object does not exist
+        """
+        response = await get_async_supabase_client().open_storage_object(self.bucket, path)
+        # Storage answers 400 {"error": "not_found"} as well as 404 for missing objects
+        if response.status_code in (400, 404):
+            await response.aclose()
+            raise FileNotFoundError(f"{self.bucket}/{path}")
+        if response.is_error:
+            await response.aclose()
+            response.raise_for_status()
+        return response
+
     async def get_signed_url(
         self, path: str, expires_in: int = 3600
     ) -> str:
@@ -190,3 +252,14 @@ def get_storage_service() -> StorageService:
         supabase=supabase,
         bucket=settings.supabase_storage_bucket,
     )
+
+
+@lru_cache()
+def get_billing_storage_service() -> StorageService:
+    """Get cached Storage service for billing Excel exports."""
+    settings = get_settings()
+    supabase = get_supabase_client()
+    return StorageService(
+        supabase=supabase,
+        bucket=settings.billing_exports_bucket,
+    )
@@ -1,5 +1,6 @@
 """Multi-step conversation flows for modifying orders."""
 
+import asyncio
 import logging
 import re
 from typing import Dict, Any, Optional, List, Tuple
@@ -9,8 +10,9 @@ from ...core.tz import today_bogota
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
+from ...core.cache import get_lookup_cache
 from ...core.supabase import get_supabase_client, set_audit_user, backfill_audit_user
-from ..rag_sync import match_product, match_client as rag_match_client, match_product_candidates, AMBIGUOUS_THRESHOLD
+from ..rag_sync import match_products, match_client as rag_match_client, match_product_candidates, AMBIGUOUS_THRESHOLD
 from . import memory, queries, formatters
 
 logger = logging.getLogger(__name__)
@@ -416,6 +418,16 @@ async def _search_client(user_id: str, name: str) -> List[Dict[str, Any]]:
     return []
 
 
+def _get_product_prices(supabase, product_ids: List[str]) -> Dict[str, float]:
+    """{product_id: products.price} (0 if unset), cached per product; one query for the misses."""
+
+    def load(missing: List[str]) -> Dict[str, float]:
+        result = supabase.table("products").select("id, price").in_("id", missing).execute()
+        return {p["id"]: p.get("price") or 0 for p in (result.data or [])}
+
+    return get_lookup_cache().get_or_load_many("product_prices", product_ids, load)
+
+
 async def _parse_products(
     text: str,
     client_id: Optional[str] = None,
@@ -439,6 +451,7 @@ async def _parse_products(
     # Split by comma or newline
     parts = re.split(r'[,\n]+', text.strip())
 
+    lines: List[Tuple[int, str]] = []
     for part in parts:
         part = part.strip()
         if not part:
@@ -458,75 +471,71 @@ async def _parse_products(
             qty = int(match.group(1))
             product_text = match.group(2).strip()
 
-        if not product_text:
-            continue
+        if product_text:
+            lines.append((qty, product_text))
 
-        # Use RAG matching (same pipeline as order import workflow)
-        result = await match_product(
-            extracted_name=product_text,
-            client_id=client_id,
+    if not lines:
+        return items, ambiguous
+
+    # Use RAG matching (same batched pipeline as order import workflow)
+    results = await match_products([product_text for _, product_text in lines], client_id=client_id)
+
+    def accepted(result: Optional[Dict[str, Any]]) -> bool:
+        # High confidence or exact alias match → accept directly
+        return bool(result and result.get("product_id")) and (
+            result.get("similarity", 0) >= AMBIGUOUS_THRESHOLD
+            or result.get("source") in ("alias_exact", "alias_vector")
         )
 
-        if result and result.get("product_id"):
-            similarity = result.get("similarity", 0)
-
-            # High confidence or exact alias match → accept directly
-            if similarity >= AMBIGUOUS_THRESHOLD or result.get("source") in ("alias_exact", "alias_vector"):
-                # Fetch price from products table
-                price = 0
-                try:
-                    price_result = (
-                        supabase.table("products")
-                        .select("price")
-                        .eq("id", result["product_id"])
-                        .limit(1)
-                        .execute()
-                    )
-                    if price_result.data:
-                        price = price_result.data[0].get("price", 0) or 0
-                except Exception:
-                    pass
-
-                items.append({
-                    "product_id": result["product_id"],
-                    "product_name": result["matched_name"],
-                    "quantity": qty,
-                    "unit_price": price,
-                })
-                logger.info(
-                    f"Product matched: '{product_text}' → '{result['matched_name']}' "
-                    f"(source={result['source']}, sim={similarity:.2f})"
-                )
-            else:
-                # Low confidence → get top 3 candidates for user to choose
-                candidates = await match_product_candidates(
-                    product_text, client_id=client_id, top_n=3,
-                )
-                ambiguous.append({
-                    "query": product_text,
-                    "quantity": qty,
-                    "candidates": candidates,
-                    "best_match": result,
-                })
-                logger.info(
-                    f"Product ambiguous: '{product_text}' → best '{result['matched_name']}' "
-                    f"(sim={similarity:.2f}), showing {len(candidates)} options"
-                )
-        else:
-            # No match at all — try to get candidates anyway
-            candidates = await match_product_candidates(
-                product_text, client_id=client_id, top_n=3,
+    # Prices from the products table (cached master data), one query for every line
+    prices: Dict[str, float] = {}
+    try:
+        prices = _get_product_prices(supabase, [r["product_id"] for r in results if accepted(r)])
+    except Exception:
+        pass
+
+    # Low confidence or no match → top 3 candidates for the user to choose
+    unresolved = [i for i, r in enumerate(results) if not accepted(r)]
+    candidate_lists = await asyncio.gather(*(
+        match_product_candidates(lines[i][1], client_id=client_id, top_n=3) for i in unresolved
+    ))
+    candidates_by_line = dict(zip(unresolved, candidate_lists))
+
+    for i, ((qty, product_text), result) in enumerate(zip(lines, results)):
+        if accepted(result):
+            items.append({
+                "product_id": result["product_id"],
+                "product_name": result["matched_name"],
+                "quantity": qty,
+                "unit_price": prices.get(result["product_id"], 0),
+            })
+            logger.info(
+                f"Product matched: '{product_text}' → '{result['matched_name']}' "
+                f"(source={result['source']}, sim={result.get('similarity', 0):.2f})"
             )
-            if candidates:
-                ambiguous.append({
-                    "query": product_text,
-                    "quantity": qty,
-                    "candidates": candidates,
-                    "best_match": None,
-                })
-                logger.info(f"Product not matched but has candidates: '{product_text}'")
-            else:
-                logger.warning(f"Product not matched: '{product_text}'")
+        elif result and result.get("product_id"):
+            candidates = candidates_by_line[i]
+            ambiguous.append({
+                "query": product_text,
+                "quantity": qty,
+                "candidates": candidates,
+                "best_match": result,
+            })
+            logger.info(
+                f"Product ambiguous: '{product_text}' → best '{result['matched_name']}' "
+                f"(sim={result.get('similarity', 0):.2f}), showing {len(candidates)} options"
+            )
+        elif candidates_by_line[i]:
+            # No match at all, but candidates anyway
+            ambiguous.append({
+                "query": product_text,
+                "quantity": qty,
+                "candidates": candidates_by_line[i],
+                "best_match": None,
+            })
+            logger.info(f"Product not matched but has candidates: '{product_text}'")
+        else:
+            logger.warning(f"Product not matched: '{product_text}'")
 
     return items, ambiguous
 
@@ -0,0 +1,276 @@
+"""In-process vector indexes of productos_rag and clientes_rag.
+
+match_product and match_client used to send every query embedding to
+Supabase (rpc match_productos / match_clientes), sometimes twice per order
+line. Both tables are small (hundreds of products, a few thousand client
+names), so their embeddings are kept in memory as a float32 matrix and a
+search is one matrix-vector product:
+
+    index = get_product_index()
+    if index.loaded:
+        rows = index.search(query_embedding, match_count=10)
+
+search() returns what the RPC returns: {id, content, metadata, similarity}
+rows of the entries whose metadata contains filter, ordered by cosine
+distance, with similarity = 1 - cosine distance (computed in float32 like
+pgvector, so values agree to ~1e-6; exact ties keep table order).
+
+Indexes are loaded at startup (load_vector_indexes), kept current by the
+rag_sync functions that write the tables (upsert / remove / replace) and
+reloaded every settings.vector_index_refresh_minutes by the scheduler, to
+pick up writes made by other instances. Until an index has loaded, callers
+fall back to the RPC. Updates that arrive while a load is running are
+replayed on top of the loaded snapshot.
+"""
+
+import json
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.config import get_settings
+from ..core.supabase_async import get_async_supabase_client
+
+logger = logging.getLogger(__name__)
+
+PRODUCTS_TABLE = "productos_rag"
+CLIENTS_TABLE = "clientes_rag"
+
+# Rows per query when loading a table
+LOAD_BATCH_SIZE = 500
+
+
+def _parse_embedding(value) -> Optional[np.ndarray]:
+    """pgvector comes back from PostgREST as the string '[0.1,0.2,...]'."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def metadata_contains(metadata, filter) -> bool:
+    """jsonb containment (metadata @> filter) for JSON values.
+
+    Nested values only match values of the same JSON type: a list filter
+    does not match a scalar, and true does not match 1.
+    """
+    if isinstance(filter, dict):
+        return isinstance(metadata, dict) and all(
+            key in metadata and metadata_contains(metadata[key], value) for key, value in filter.items()
+        )
+    if isinstance(filter, list):
+        return isinstance(metadata, list) and all(any(metadata_contains(m, f) for m in metadata) for f in filter)
+    if isinstance(filter, bool) or isinstance(metadata, bool):
+        return metadata is filter
+    return metadata == filter
+
+
+class VectorIndex:
+    """Embeddings of one RAG table as a float32 matrix (thread-safe)."""
+
+    def __init__(self, table: str):
+        self.table = table
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._contents: List[Optional[str]] = []
+        self._metadata: List[dict] = []
+        self._positions: Dict[str, int] = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        # Updates made while a load is in flight, replayed on the loaded rows
+        self._loading = False
+        self._pending: List[Tuple[str, object]] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # -- search -------------------------------------------------------------
+
+    def search(self, query_embedding: Iterable[float], match_count: int, filter: Optional[dict] = None) -> List[dict]:
+        """Top match_count entries by cosine similarity, like the match_* RPCs."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        with self._lock:
+            if not self._ids or match_count <= 0:
+                return []
+            if query.shape[0] != self._matrix.shape[1]:
+                raise ValueError(
+                    f"different vector dimensions {self._matrix.shape[1]} and {query.shape[0]}"
+                )
+            similarities = self._matrix @ query
+            query_norm = np.linalg.norm(query)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                similarities = np.clip(similarities / (self._norms * query_norm), -1.0, 1.0)
+            # pgvector: zero vectors have no direction (NaN distance), sorted last
+            similarities = np.where(np.isnan(similarities), -np.inf, similarities)
+
+            if filter:
+                candidates = np.array(
+                    [i for i, m in enumerate(self._metadata) if metadata_contains(m, filter)], dtype=np.intp
+                )
+            else:
+                candidates = np.arange(len(self._ids))
+            if candidates.size > match_count:
+                scores = similarities[candidates]
+                top = np.argpartition(-scores, match_count - 1)[:match_count]
+                candidates = np.sort(candidates[top])
+            order = candidates[np.argsort(-similarities[candidates], kind="stable")]
+
+            return [
+                {
+                    "id": self._ids[i],
+                    "content": self._contents[i],
+                    "metadata": self._metadata[i],
+                    "similarity": float(similarities[i]) if np.isfinite(similarities[i]) else float("nan"),
+                }
+                for i in order
+            ]
+
+    # -- updates ------------------------------------------------------------
+
+    def upsert(self, rows: List[dict]) -> None:
+        """Add or replace entries ({id, content, metadata, embedding} rows)."""
+        with self._lock:
+            if self._loading:
+                self._pending.append(("upsert", rows))
+            if self.loaded:
+                self._upsert(rows)
+
+    def remove(self, ids: Iterable[str]) -> None:
+        """Drop entries by id (unknown ids are ignored)."""
+        ids = list(ids)
+        with self._lock:
+            if self._loading:
+                self._pending.append(("remove", ids))
+            if self.loaded:
+                self._remove(ids)
+
+    def replace(self, rows: List[dict]) -> None:
+        """Make rows the whole content of the index (after a full re-sync)."""
+        with self._lock:
+            if self._loading:
+                self._pending.append(("replace", rows))
+            if self.loaded:
+                self._replace(rows)
+
+    def _replace(self, rows: List[dict]) -> None:
+        self._ids, self._contents, self._metadata = [], [], []
+        self._positions = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._upsert(rows)
+
+    def _upsert(self, rows: List[dict]) -> None:
+        # Last row wins for repeated ids
+        parsed = {row["id"]: (row, _parse_embedding(row.get("embedding"))) for row in rows}
+        # NULL embeddings never match (and the RPC sorts them last)
+        self._remove([rid for rid, (_, vector) in parsed.items() if vector is None])
+
+        new_vectors = []
+        for row, vector in parsed.values():
+            if vector is None:
+                continue
+            if self._matrix.size and vector.shape[0] != self._matrix.shape[1]:
+                raise ValueError(f"{self.table}: expected {self._matrix.shape[1]} dimensions, got {vector.shape[0]}")
+            position = self._positions.get(row["id"])
+            if position is not None:
+                self._contents[position] = row.get("content")
+                self._metadata[position] = row.get("metadata") or {}
+                self._matrix[position] = vector
+                self._norms[position] = np.linalg.norm(vector)
+                continue
+            self._positions[row["id"]] = len(self._ids)
+            self._ids.append(row["id"])
+            self._contents.append(row.get("content"))
+            self._metadata.append(row.get("metadata") or {})
+            new_vectors.append(vector)
+        if new_vectors:
+            added = np.vstack(new_vectors)
+            self._matrix = np.vstack([self._matrix, added]) if self._matrix.size else added
+            self._norms = np.concatenate([self._norms, np.linalg.norm(added, axis=1)])
+
+    def _remove(self, ids: Iterable[str]) -> None:
+        drop = {self._positions[i] for i in ids if i in self._positions}
+        if not drop:
+            return
+        keep = [p for p in range(len(self._ids)) if p not in drop]
+        self._ids = [self._ids[p] for p in keep]
+        self._contents = [self._contents[p] for p in keep]
+        self._metadata = [self._metadata[p] for p in keep]
+        self._matrix = self._matrix[keep]
+        self._norms = self._norms[keep]
+        self._positions = {rid: p for p, rid in enumerate(self._ids)}
+
+    # -- loading ------------------------------------------------------------
+
+    async def load(self) -> int:
+        """(Re)load every entry of the table. Returns the entry count."""
+        with self._lock:
+            self._loading = True
+            self._pending = []
+        try:
+            rows = await self._fetch_all()
+        except BaseException:
+            with self._lock:
+                self._loading = False
+                self._pending = []
+            raise
+
+        with self._lock:
+            self._replace(rows)
+            for op, payload in self._pending:
+                if op == "upsert":
+                    self._upsert(payload)
+                elif op == "remove":
+                    self._remove(payload)
+                else:
+                    self._replace(payload)
+            self._loading = False
+            self._pending = []
+            self.loaded = True
+            count = len(self._ids)
+        logger.info(f"Loaded {count} {self.table} embeddings into the vector index")
+        return count
+
+    async def _fetch_all(self) -> List[dict]:
+        supabase = get_async_supabase_client()
+        rows: List[dict] = []
+        last_id = None
+        while True:
+            query = supabase.table(self.table).select("id, content, metadata, embedding").order("id")
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            batch = (await query.limit(LOAD_BATCH_SIZE).execute()).data or []
+            rows.extend(batch)
+            if len(batch) < LOAD_BATCH_SIZE:
+                return rows
+            last_id = batch[-1]["id"]
+
+
+@lru_cache()
+def get_product_index() -> VectorIndex:
+    """Process-wide index of productos_rag."""
+    return VectorIndex(PRODUCTS_TABLE)
+
+
+@lru_cache()
+def get_client_index() -> VectorIndex:
+    """Process-wide index of clientes_rag."""
+    return VectorIndex(CLIENTS_TABLE)
+
+
+async def load_vector_indexes() -> dict:
+    """Load (or reload) both indexes; a failing table keeps its previous state."""
+    counts = {}
+    if not get_settings().vector_index_enabled:
+        return counts
+    for index in (get_product_index(), get_client_index()):
+        try:
+            counts[index.table] = await index.load()
+        except Exception as e:
+            logger.error(f"Could not load the {index.table} vector index: {e}")
+    return counts
@@ -0,0 +1 @@
+"""Offline performance benchmarks for the Bakery API (no Supabase required)."""
@@ -0,0 +1,136 @@
+"""Micro-benchmark: linear skip_blocked_periods vs BlockedCalendar.
+
+Simulates a month-long horizon where every work center has dense
+shift_blocking rows, and times the queue pass that recalculate_queue_times
+runs per batch.
+
+Usage:
+    cd apps/api
+    python -m benchmarks.bench_blocked_calendar
+    python -m benchmarks.bench_blocked_calendar --days 62 --density 0.8 --batches 2000
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.api.routes.production.blocked_calendar import BlockedCalendar
+
+
+def legacy_skip_blocked_periods(
+    start_time: datetime,
+    duration_minutes: float,
+    blocked_periods: List[tuple],
+) -> datetime:
+    """Original linear implementation (rescans the list after every move)."""
+    if not blocked_periods:
+        return start_time
+
+    end_time = start_time + timedelta(minutes=duration_minutes)
+    max_iterations = len(blocked_periods) * 2 + 1
+
+    for _ in range(max_iterations):
+        moved = False
+        for block_start, block_end in blocked_periods:
+            if block_start <= start_time < block_end:
+                start_time = block_end
+                end_time = start_time + timedelta(minutes=duration_minutes)
+                moved = True
+                break
+            if start_time < block_start < end_time:
+                start_time = block_end
+                end_time = start_time + timedelta(minutes=duration_minutes)
+                moved = True
+                break
+        if not moved:
+            break
+
+    return start_time
+
+
+def build_blocked_shifts(days: int, density: float, seed: int) -> List[Tuple[datetime, datetime]]:
+    """Blocked (start, end) shifts over `days`, each shift blocked with probability `density`."""
+    rng = random.Random(seed)
+    base = datetime(2026, 1, 4, 22, 0)
+    blocked = []
+    for day in range(days):
+        for shift in range(3):
+            if rng.random() < density:
+                start = base + timedelta(days=day, hours=8 * shift)
+                blocked.append((start, start + timedelta(hours=8)))
+    return blocked
+
+
+def queue_pass(skip, blocked, arrivals, durations) -> datetime:
+    """FIFO pass like recalculate_queue_times, using `skip` for blocked periods."""
+    queue_end = None
+    for arrival, duration in zip(arrivals, durations):
+        start = arrival if queue_end is None or arrival >= queue_end else queue_end
+        start = skip(start, duration, blocked)
+        queue_end = start + timedelta(minutes=duration)
+    return queue_end
+
+
+def run(days: int, density: float, batches: int, repeat: int, seed: int) -> dict:
+    blocked = build_blocked_shifts(days, density, seed)
+    rng = random.Random(seed + 1)
+    base = datetime(2026, 1, 4, 22, 0)
+    horizon_minutes = days * 24 * 60
+    arrivals = sorted(base + timedelta(minutes=rng.randrange(horizon_minutes)) for _ in range(batches))
+    durations = [rng.choice([30, 45, 60, 90, 120, 240]) for _ in range(batches)]
+
+    calendar = BlockedCalendar(blocked)
+
+    def calendar_skip(start, duration, _blocked):
+        return calendar.earliest_start(start, duration)
+
+    timings = {}
+    results = {}
+    for name, skip in (("legacy", legacy_skip_blocked_periods), ("calendar", calendar_skip)):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            results[name] = queue_pass(skip, blocked, arrivals, durations)
+            best = min(best, time.perf_counter() - t0)
+        timings[name] = best
+
+    assert results["legacy"] == results["calendar"], "implementations disagree"
+
+    return {
+        "days": days,
+        "blocked_rows": len(blocked),
+        "merged_periods": len(calendar),
+        "batches": batches,
+        "legacy_ms": round(timings["legacy"] * 1000, 3),
+        "calendar_ms": round(timings["calendar"] * 1000, 3),
+        "speedup": round(timings["legacy"] / timings["calendar"], 1) if timings["calendar"] else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--density", type=float, default=0.6, help="Fraction of shifts blocked")
+    parser.add_argument("--batches", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    result = run(args.days, args.density, args.batches, args.repeat, args.seed)
+    print(
+        f"{result['days']} days, {result['blocked_rows']} blocked shifts "
+        f"({result['merged_periods']} merged), {result['batches']} batches"
+    )
+    print(f"  legacy skip_blocked_periods: {result['legacy_ms']:>10.3f} ms")
+    print(f"  BlockedCalendar:             {result['calendar_ms']:>10.3f} ms")
+    print(f"  speedup:                     {result['speedup']:>10}x")
+
+
+if __name__ == "__main__":
+    main()
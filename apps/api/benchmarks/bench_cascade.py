@@ -0,0 +1,372 @@
+"""Benchmark: cascade scheduling on synthetic plants of increasing size.
+
+Runs entirely offline against benchmarks.synthetic_plant.FakeSupabase and
+times, per plant size:
+
+- recalculate_queue_times / recalculate_queue_times_hybrid on the busiest
+  work center's queue plus a new order
+- distribute_batches_to_work_centers spilling a late order over 3 WCs
+- generate_cascade_schedules (preview, create_in_db=False) for every PT
+- create_cascade_with_dependencies (PT + 3-4 levels of PP backward cascades)
+- /create-batch for a week plan with every PT
+
+Query/RPC counts are reported next to the timings: against a real Supabase
+each one is a network round-trip the fake client does not pay.
+
+Results are saved as JSON so runs can be compared for regressions.
+
+Usage:
+    cd apps/api
+    python -m benchmarks.bench_cascade
+    python -m benchmarks.bench_cascade --sizes small,medium,large,xlarge --repeat 5
+    python -m benchmarks.bench_cascade --output benchmarks/results/base.json
+    python -m benchmarks.bench_cascade --compare benchmarks/results/base.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+
+from benchmarks.synthetic_plant import (
+    PLANT_SIZES,
+    WEEK_MONDAY,
+    build_plant,
+    finished_product_ids,
+    fresh_client,
+    queue_rows,
+)
+from app.api.routes.production import cascade
+from app.api.routes.production.bom_graph import invalidate_bom_graph
+from app.api.routes.production.master_data import load_cascade_master_data
+from app.api.routes.production.staffing_calendar import invalidate_staffing_calendar
+from app.api.routes.production.queue_simulator import WorkCenterQueue
+from app.models.production import CreateCascadeBatchRequest, CreateCascadeRequest
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# A new order appended to the queue under test
+NEW_ORDER_BATCHES = 20
+
+
+def measure(fn: Callable[[], object], repeat: int, setup: Optional[Callable[[], object]] = None) -> dict:
+    """Min/median wall time of fn() in ms; setup() runs untimed before each call."""
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        t0 = time.perf_counter()
+        fn(arg) if setup else fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return {"min_ms": round(min(timings), 3), "median_ms": round(statistics.median(timings), 3)}
+
+
+def busiest_work_center(plant: dict) -> str:
+    counts: Dict[str, int] = {}
+    for s in plant["production_schedules"]:
+        counts[s["resource_id"]] = counts.get(s["resource_id"], 0) + 1
+    return max(counts, key=counts.get)
+
+
+def new_order(arrival: datetime, order_number: int, batches: int = NEW_ORDER_BATCHES) -> List[dict]:
+    return [
+        {"id": None, "is_existing": False, "arrival_time": arrival + timedelta(minutes=20 * i),
+         "duration_minutes": 45, "batch_number": i + 1, "production_order_number": order_number}
+        for i in range(batches)
+    ]
+
+
+def blocked_periods(plant: dict, wc_id: str, loop: asyncio.AbstractEventLoop):
+    supabase = fresh_client(plant, tables_written=[])
+    return loop.run_until_complete(cascade.get_blocked_shifts(
+        supabase, wc_id, WEEK_MONDAY - timedelta(weeks=2), WEEK_MONDAY + timedelta(weeks=3)
+    ))
+
+
+def bench_queue_recalculation(plant: dict, repeat: int, loop) -> dict:
+    wc_id = busiest_work_center(plant)
+    existing = queue_rows(plant, wc_id)
+    blocked = list(blocked_periods(plant, wc_id, loop))
+    schedules = existing + new_order(WEEK_MONDAY + timedelta(hours=8), 9999)
+
+    def copies():
+        return [dict(s) for s in schedules]
+
+    return {
+        "queue_length": len(schedules),
+        "blocked_periods": len(blocked),
+        "recalculate_queue_times": measure(
+            lambda rows: cascade.recalculate_queue_times(rows, blocked), repeat, copies
+        ),
+        "recalculate_queue_times_hybrid": measure(
+            lambda rows: cascade.recalculate_queue_times_hybrid(rows, blocked), repeat, copies
+        ),
+    }
+
+
+def bench_distribution(plant: dict, repeat: int, loop) -> dict:
+    operation_wcs: Dict[str, List[str]] = {}
+    for wc in plant["work_centers"]:
+        operation_wcs.setdefault(wc["operation_id"], []).append(wc["id"])
+    wc_ids = max(operation_wcs.values(), key=len)
+    wc_ids = (wc_ids + [wc["id"] for wc in plant["work_centers"] if wc["id"] not in wc_ids])[:3]
+
+    contexts = [
+        {"wc_id": wc_id, "existing_schedules": queue_rows(plant, wc_id),
+         "blocked_periods": blocked_periods(plant, wc_id, loop)}
+        for wc_id in wc_ids
+    ]
+    arrival = WEEK_MONDAY + timedelta(hours=8)
+    batches = new_order(arrival, 9999, NEW_ORDER_BATCHES * 2)
+    # Tight enough that the primary WC alone cannot make it
+    primary = WorkCenterQueue(contexts[0]["existing_schedules"], contexts[0]["blocked_periods"])
+    deadline = arrival + (primary.finish_time(batches) - arrival) * 0.6
+
+    distribution = cascade.distribute_batches_to_work_centers(batches, contexts, deadline, False)
+    return {
+        "work_centers": len(contexts),
+        "batches": len(batches),
+        "assigned": {wc_id: len(b) for wc_id, b in distribution.items()},
+        "sequential": measure(
+            lambda: cascade.distribute_batches_to_work_centers(batches, contexts, deadline, False), repeat
+        ),
+        "hybrid": measure(
+            lambda: cascade.distribute_batches_to_work_centers(batches, contexts, deadline, True), repeat
+        ),
+    }
+
+
+def cascade_requests(plant: dict) -> List[CreateCascadeRequest]:
+    """One request per PT, spread Monday-Friday of the production week."""
+    return [
+        CreateCascadeRequest(
+            work_center_id="", product_id=product_id, duration_hours=3, staff_count=2,
+            start_datetime=WEEK_MONDAY + timedelta(days=i % 5, hours=6 + (i * 3) % 12),
+        )
+        for i, product_id in enumerate(finished_product_ids(plant))
+    ]
+
+
+def bench_preview(plant: dict, repeat: int, loop) -> dict:
+    supabase = fresh_client(plant, tables_written=[])
+    requests = cascade_requests(plant)
+    master_data = load_cascade_master_data(supabase, [r.product_id for r in requests])
+    invalidate_staffing_calendar()
+
+    async def preview_all():
+        for request in requests:
+            week_start, week_end = cascade.get_production_week(request.start_datetime)
+            context_start, context_end = cascade.calculate_context_window(week_start, week_end)
+            product = master_data.get_product(request.product_id)
+            await cascade.generate_cascade_schedules(
+                supabase=supabase,
+                product_id=request.product_id,
+                product_name=product["name"],
+                start_datetime=request.start_datetime,
+                duration_hours=request.duration_hours,
+                staff_count=request.staff_count,
+                lote_minimo=float(product.get("lote_minimo") or 100),
+                production_route=master_data.get_product_route(request.product_id),
+                create_in_db=False,
+                week_start_datetime=week_start,
+                week_end_datetime=week_end,
+                context_start_datetime=context_start,
+                context_end_datetime=context_end,
+                master_data=master_data,
+            )
+
+    supabase.reset_counters()
+    timing = measure(lambda: loop.run_until_complete(preview_all()), repeat)
+    return {"cascades": len(requests), **timing, **counters(supabase, repeat)}
+
+
+def bench_create(plant: dict, repeat: int, loop) -> dict:
+    requests = cascade_requests(plant)
+    clients = []
+
+    def setup():
+        invalidate_staffing_calendar()
+        supabase = fresh_client(plant)
+        clients.append(supabase)
+        return supabase, load_cascade_master_data(supabase, [r.product_id for r in requests])
+
+    async def create_all(supabase, master_data):
+        supabase.reset_counters()
+        for request in sorted(requests, key=lambda r: r.start_datetime):
+            await cascade.create_cascade_with_dependencies(supabase, request, master_data)
+
+    timing = measure(lambda args: loop.run_until_complete(create_all(*args)), repeat, setup)
+    return {
+        "cascades": len(requests),
+        "schedules_after": len(clients[-1].tables["production_schedules"]),
+        **timing,
+        **counters(clients[-1], 1),
+    }
+
+
+def bench_create_batch(plant: dict, repeat: int, loop) -> dict:
+    request = CreateCascadeBatchRequest(items=cascade_requests(plant))
+    clients = []
+
+    def setup():
+        invalidate_bom_graph()
+        invalidate_staffing_calendar()
+        supabase = fresh_client(plant)
+        clients.append(supabase)
+        return supabase
+
+    def create_batch(supabase):
+        with patch.object(cascade, "get_supabase_client", return_value=supabase):
+            return loop.run_until_complete(cascade.create_cascade_batch(request, None))
+
+    timing = measure(create_batch, repeat, setup)
+    invalidate_bom_graph()
+    invalidate_staffing_calendar()
+    return {
+        "cascades": len(request.items),
+        "schedules_after": len(clients[-1].tables["production_schedules"]),
+        **timing,
+        **counters(clients[-1], 1),
+    }
+
+
+def counters(supabase, runs: int) -> dict:
+    return {
+        "queries": len(supabase.queries) // runs,
+        "rpcs": len(supabase.rpcs) // runs,
+    }
+
+
+def plant_summary(plant: dict) -> dict:
+    return {
+        "work_centers": len(plant["work_centers"]),
+        "products": len(plant["products"]),
+        "bom_rows": len(plant["bill_of_materials"]),
+        "existing_schedules": len(plant["production_schedules"]),
+        "blocked_shifts": len(plant["shift_blocking"]),
+    }
+
+
+def run(sizes: List[str], repeat: int, seed: int) -> dict:
+    loop = asyncio.new_event_loop()
+    results = {}
+    try:
+        for size in sizes:
+            t0 = time.perf_counter()
+            plant = build_plant(size, seed)
+            results[size] = {
+                "plant": plant_summary(plant),
+                "queue_recalculation": bench_queue_recalculation(plant, repeat, loop),
+                "distribute_batches": bench_distribution(plant, repeat, loop),
+                "generate_preview": bench_preview(plant, repeat, loop),
+                "create_cascades": bench_create(plant, repeat, loop),
+                "create_batch": bench_create_batch(plant, repeat, loop),
+            }
+            print(f"  {size}: done in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    finally:
+        loop.close()
+
+    return {
+        "benchmark": "cascade",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "seed": seed,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timings(report: dict) -> Dict[str, float]:
+    """Flatten a report to {"size.section.metric": median_ms}."""
+    flat = {}
+
+    def walk(prefix: str, node: dict):
+        for key, value in node.items():
+            if isinstance(value, dict):
+                if "median_ms" in value:
+                    flat[f"{prefix}{key}"] = value["median_ms"]
+                walk(f"{prefix}{key}.", value)
+
+    walk("", report["results"])
+    return flat
+
+
+def print_report(report: dict, baseline: Optional[dict] = None):
+    current = timings(report)
+    previous = timings(baseline) if baseline else {}
+    width = max(len(name) for name in current)
+    header = f"{'benchmark':<{width}}  {'median ms':>11}"
+    if baseline:
+        header += f"  {'baseline':>11}  {'ratio':>6}"
+    print(header)
+    for name, median in current.items():
+        line = f"{name:<{width}}  {median:>11.3f}"
+        if name in previous:
+            ratio = median / previous[name] if previous[name] else float("inf")
+            flag = "  <-- slower" if ratio > 1.2 else ""
+            line += f"  {previous[name]:>11.3f}  {ratio:>5.2f}x{flag}"
+        print(line)
+
+    for size, result in report["results"].items():
+        print(
+            f"{size}: create {result['create_cascades']['queries']} queries / "
+            f"{result['create_cascades']['rpcs']} RPCs, batch {result['create_batch']['queries']} "
+            f"queries / {result['create_batch']['rpcs']} RPCs"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=str, default="small,medium,large",
+                        help=f"Comma-separated plant sizes ({', '.join(PLANT_SIZES)})")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=str, help="JSON results path (default: benchmarks/results/cascade-<timestamp>.json)")
+    parser.add_argument("--compare", type=str, help="Previous JSON results to compare against")
+    args = parser.parse_args()
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in PLANT_SIZES]
+    if unknown:
+        parser.error(f"Unknown plant sizes: {', '.join(unknown)}")
+
+    # The cascade logs every step at INFO
+    logging.basicConfig(level=logging.ERROR)
+
+    report = run(sizes, args.repeat, args.seed)
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(report, baseline)
+
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"cascade-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Load test: concurrent throughput of sync vs async Supabase access.
+
+Fires concurrent GET /api/dispatch/stats requests (4 count queries each) at
+an in-process FastAPI app, with PostgREST replaced by a mock transport that
+answers after a fixed latency. Two variants:
+
+- sync: the handler pattern before the async client, sync supabase-py
+  .execute() calls inside an ``async def`` (each call blocks the event loop)
+- async: the real dispatch stats router on get_async_supabase_client()
+
+Reports throughput and p50/p95 latency per concurrency level. With the sync
+client throughput stays flat at ~1 / (4 x latency) whatever the
+concurrency; with the async client it scales until max_concurrency.
+
+Usage:
+    cd apps/api
+    python -m benchmarks.bench_supabase_load
+    python -m benchmarks.bench_supabase_load --latency-ms 40 --concurrency 1,10,50 --requests 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+
+from supabase import ClientOptions, create_client  # noqa: E402
+
+from app.api.routes.dispatch import stats as dispatch_stats  # noqa: E402
+from app.core import supabase_async  # noqa: E402
+
+SUPABASE_URL = "http://postgrest.local"
+COUNT_HEADERS = {"content-range": "0-0/7"}
+
+
+def sync_transport(latency: float) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(latency)
+        return httpx.Response(200, json=[], headers=COUNT_HEADERS)
+
+    return httpx.MockTransport(handler)
+
+
+def async_transport(latency: float) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json=[], headers=COUNT_HEADERS)
+
+    return httpx.MockTransport(handler)
+
+
+def sync_app(latency: float) -> FastAPI:
+    """The pre-async pattern: sync client calls inside an async handler."""
+    supabase = create_client(
+        SUPABASE_URL, "bench",
+        options=ClientOptions(httpx_client=httpx.Client(transport=sync_transport(latency))),
+    )
+    app = FastAPI()
+
+    @app.get("/api/dispatch/stats")
+    async def stats():
+        counts = [
+            supabase.table("routes").select("id", count="exact").eq("status", "planned").execute().count,
+            supabase.table("orders").select("id", count="exact").in_(
+                "status", ["dispatched", "in_delivery"]
+            ).execute().count,
+            supabase.table("orders").select("id", count="exact").eq("status", "ready_dispatch").is_(
+                "assigned_route_id", "null"
+            ).execute().count,
+            supabase.table("orders").select("id", count="exact").eq("status", "ready_dispatch").execute().count,
+        ]
+        return {"counts": counts}
+
+    return app
+
+
+def async_app(latency: float, max_concurrency: int) -> FastAPI:
+    supabase_async._async_client = supabase_async.create_async_supabase_client(
+        SUPABASE_URL, "bench",
+        max_connections=10, max_concurrency=max_concurrency, timeout_seconds=30,
+        transport=async_transport(latency),
+    )
+    app = FastAPI()
+    app.include_router(dispatch_stats.router, prefix="/api/dispatch")
+    return app
+
+
+async def load(app: FastAPI, concurrency: int, total: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    remaining = iter(range(total))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as client:
+        async def worker():
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await client.get("/api/dispatch/stats")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def run(latency_ms: float, levels: List[int], total: int, max_concurrency: int) -> dict:
+    latency = latency_ms / 1000
+    variants: Dict[str, Callable[[], FastAPI]] = {
+        "sync": lambda: sync_app(latency),
+        "async": lambda: async_app(latency, max_concurrency),
+    }
+    results = {}
+    for name, make_app in variants.items():
+        results[name] = {}
+        for concurrency in levels:
+            results[name][concurrency] = asyncio.run(load(make_app(), concurrency, total))
+            print(f"  {name} c={concurrency}: {results[name][concurrency]}")
+    supabase_async._async_client = None
+    return {"latency_ms": latency_ms, "max_concurrency": max_concurrency, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=20, help="Simulated PostgREST latency per query")
+    parser.add_argument("--concurrency", type=str, default="1,10,50")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--max-concurrency", type=int, default=50, help="Async client in-flight limit")
+    parser.add_argument("--output", type=str, help="Write results as JSON")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    report = run(args.latency_ms, levels, args.requests, args.max_concurrency)
+
+    print(f"{'variant':<8}  {'conc':>5}  {'req/s':>8}  {'p50 ms':>8}  {'p95 ms':>8}")
+    for name, by_level in report["results"].items():
+        for concurrency, result in by_level.items():
+            print(
+                f"{name:<8}  {concurrency:>5}  {result['throughput_rps']:>8.1f}  "
+                f"{result['p50_ms']:>8.1f}  {result['p95_ms']:>8.1f}"
+            )
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
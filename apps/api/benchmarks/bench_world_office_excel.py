@@ -0,0 +1,222 @@
+"""Benchmark: cell-by-cell vs write-only World Office Excel generation.
+
+Builds synthetic billing runs (orders with several items, shared clients and
+products) and times both generators at each row count, with the peak Python
+memory of each (tracemalloc). The outputs are checked to hold the same cell
+values.
+
+Usage:
+    cd apps/api
+    python -m benchmarks.bench_world_office_excel
+    python -m benchmarks.bench_world_office_excel --rows 500 5000 50000 --repeat 3
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from openpyxl import Workbook, load_workbook
+
+from app.services.excel_generator import (
+    EXCEL_COLUMNS,
+    WorldOfficeLookups,
+    calculate_due_date,
+    calculate_unit_price,
+    format_date_for_export,
+    write_world_office_excel,
+)
+
+
+def legacy_write_world_office_excel(
+    fileobj,
+    orders: List[Dict[str, Any]],
+    items_by_order: Dict[str, List[Dict[str, Any]]],
+    invoice_number_start: int,
+    lookups: WorldOfficeLookups,
+) -> int:
+    """Original generator: full in-memory Workbook, ws.cell() per value."""
+    wo_config = lookups.config
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Encab+Movim.Inven Talla y Color"
+    for col_idx, header in enumerate(EXCEL_COLUMNS, start=1):
+        ws.cell(row=1, column=col_idx, value=header)
+
+    row_num = 2
+    current_invoice = invoice_number_start
+    for order in orders:
+        items = items_by_order.get(order["id"], [])
+        if not items:
+            continue
+        client = order.get("clients") or {}
+        branch = order.get("branches") or {}
+        client_id = order.get("client_id")
+        credit_days = lookups.credit_terms.get(client_id, 30)
+        delivery_date = order.get("expected_delivery_date", "")
+        delivery_date_formatted = format_date_for_export(delivery_date)
+        due_date_formatted = calculate_due_date(delivery_date, credit_days)
+        branch_info = branch.get("name") or client.get("name") or ""
+        tercero_interno = wo_config.get("third_party_internal", "")
+        if client.get("assigned_user"):
+            cedula = client["assigned_user"].get("cedula")
+            if cedula:
+                tercero_interno = cedula
+
+        for item in items:
+            quantity_available = item.get("quantity_available")
+            if not quantity_available or quantity_available <= 0:
+                continue
+            product = item.get("products") or {}
+            product_id = item.get("product_id")
+            pc = lookups.product_configs.get(product_id, {})
+            units_per_package = pc.get("units_per_package") or product.get("units_per_package") or 1
+            quantity_in_units = quantity_available * units_per_package
+            package_price = product.get("price") or item.get("unit_price") or 0
+            unit_price = calculate_unit_price(
+                package_price, units_per_package, product_id, client_id, lookups.client_price_lists
+            )
+            product_tax_rate = product.get("tax_rate") or 0
+            iva_rate = 0 if product_tax_rate == 0 else product_tax_rate / 100
+            product_code = product.get("codigo_wo") or product.get("name") or ""
+
+            row_data = [
+                wo_config.get("company_name", ""), wo_config.get("document_type", ""),
+                wo_config.get("document_prefix", ""), current_invoice, delivery_date_formatted,
+                tercero_interno, client.get("nit") or wo_config.get("third_party_external", ""),
+                "", "Credito", delivery_date_formatted, None, None, None, None, None,
+                order.get("purchase_order_number"), *([None] * 13), branch_info, None,
+                product_code, wo_config.get("warehouse", ""), wo_config.get("unit_measure", ""),
+                quantity_in_units, iva_rate, round(unit_price), 0, due_date_formatted,
+                *([None] * 18),
+            ]
+            for col_idx, value in enumerate(row_data, start=1):
+                ws.cell(row=row_num, column=col_idx, value=value)
+            row_num += 1
+        current_invoice += 1
+
+    iva_sheet = wb.create_sheet("Hoja1")
+    iva_sheet.cell(row=1, column=1, value="IVA")
+    iva_sheet.cell(row=2, column=1, value=wo_config.get("iva_rate", 0.19))
+    wb.save(fileobj)
+    return row_num - 2
+
+
+def build_billing_run(rows: int, seed: int) -> Tuple[list, dict, WorldOfficeLookups]:
+    """Orders of 1-12 items over 80 clients and 150 products, `rows` items in total."""
+    rng = random.Random(seed)
+    clients = [
+        {"id": f"c{i}", "name": f"Cliente {i}", "nit": f"900{i:06d}",
+         "assigned_user": {"cedula": f"10{i:05d}"} if i % 3 else None}
+        for i in range(80)
+    ]
+    products = [
+        {"id": f"p{i}", "name": f"Producto {i}", "codigo_wo": f"WO{i:04d}",
+         "price": rng.choice([12000, 18500, 24000, 31000]), "tax_rate": rng.choice([0, 19])}
+        for i in range(150)
+    ]
+    orders, items_by_order = [], {}
+    while rows > 0:
+        client = rng.choice(clients)
+        order_id = f"o{len(orders)}"
+        n = min(rows, rng.randint(1, 12))
+        rows -= n
+        orders.append({
+            "id": order_id,
+            "client_id": client["id"],
+            "clients": client,
+            "branches": {"name": f"Sede {client['name']}"},
+            "expected_delivery_date": f"2026-10-{rng.randint(1, 28):02d}",
+            "purchase_order_number": f"OC-{len(orders)}",
+        })
+        items_by_order[order_id] = [
+            {"product_id": p["id"], "products": p, "quantity_available": rng.randint(1, 40)}
+            for p in rng.sample(products, n)
+        ]
+
+    lookups = WorldOfficeLookups(
+        config={"company_name": "PAN", "document_type": "FV", "document_prefix": "PAN",
+                "third_party_internal": "", "third_party_external": "", "warehouse": "BOD",
+                "unit_measure": "UN", "iva_rate": 0.19},
+        credit_terms={c["id"]: rng.choice([15, 30, 45]) for c in clients[::2]},
+        product_configs={p["id"]: {"units_per_package": rng.choice([1, 6, 12])} for p in products},
+        client_price_lists={c["id"]: {p["id"]: 1500 for p in products[:20]} for c in clients[:10]},
+    )
+    return orders, items_by_order, lookups
+
+
+def sheet_values(file_bytes: bytes) -> list:
+    """Cell values per sheet, trailing blanks dropped (write-only sheets carry no dimension)."""
+    def trim(row):
+        row = list(row)
+        while row and row[-1] is None:
+            row.pop()
+        return row
+
+    wb = load_workbook(BytesIO(file_bytes), read_only=True)
+    return [[trim(row) for row in ws.iter_rows(values_only=True)] for ws in wb.worksheets]
+
+
+def measure(write, orders, items_by_order, lookups, repeat: int) -> Tuple[float, int, bytes]:
+    """(best seconds, peak traced bytes, file bytes) of write()."""
+    best = float("inf")
+    for _ in range(repeat):
+        buffer = BytesIO()
+        t0 = time.perf_counter()
+        write(buffer, orders, items_by_order, 1000, lookups)
+        best = min(best, time.perf_counter() - t0)
+
+    buffer = BytesIO()
+    tracemalloc.start()
+    write(buffer, orders, items_by_order, 1000, lookups)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, buffer.getvalue()
+
+
+def run(rows: int, repeat: int, seed: int, verify: bool) -> dict:
+    orders, items_by_order, lookups = build_billing_run(rows, seed)
+    legacy_s, legacy_peak, legacy_bytes = measure(
+        legacy_write_world_office_excel, orders, items_by_order, lookups, repeat)
+    streaming_s, streaming_peak, streaming_bytes = measure(
+        write_world_office_excel, orders, items_by_order, lookups, repeat)
+
+    if verify:
+        assert sheet_values(legacy_bytes) == sheet_values(streaming_bytes), "implementations disagree"
+
+    return {
+        "rows": rows,
+        "orders": len(orders),
+        "legacy_ms": round(legacy_s * 1000, 1),
+        "streaming_ms": round(streaming_s * 1000, 1),
+        "speedup": round(legacy_s / streaming_s, 2) if streaming_s else None,
+        "legacy_peak_mb": round(legacy_peak / 2**20, 1),
+        "streaming_peak_mb": round(streaming_peak / 2**20, 1),
+        "file_kb": round(len(streaming_bytes) / 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--no-verify", action="store_true", help="Skip comparing cell values")
+    args = parser.parse_args()
+
+    print(f"{'rows':>7} {'orders':>7} {'legacy ms':>10} {'stream ms':>10} {'speedup':>8} "
+          f"{'legacy MB':>10} {'stream MB':>10} {'file KB':>8}")
+    for rows in args.rows:
+        r = run(rows, args.repeat, args.seed, verify=not args.no_verify)
+        print(f"{r['rows']:>7} {r['orders']:>7} {r['legacy_ms']:>10} {r['streaming_ms']:>10} "
+              f"{r['speedup']:>7}x {r['legacy_peak_mb']:>10} {r['streaming_peak_mb']:>10} {r['file_kb']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""Synthetic bakery plants and an in-memory Supabase client for benchmarks.
+
+build_plant() generates every table the cascade reads (work centers, routes,
+productivity, BOMs with several PP levels, WC mappings, staffing, blocked
+shifts and dense existing schedules). FakeSupabase answers the subset of
+PostgREST the cascade uses from those tables, counts queries and RPCs, and
+applies cascade_bulk_upsert / cascade_bulk_upsert_batch writes in memory.
+"""
+
+import copy
+import itertools
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Production week used by every plant (Saturday 22:00 -> Saturday 22:00)
+WEEK_START = datetime(2026, 1, 3, 22, 0)
+WEEK_MONDAY = datetime(2026, 1, 5)
+
+# Existing schedules and blocked shifts cover the cascade context window
+# (one week before and after the production week)
+HORIZON_START = WEEK_START - timedelta(weeks=1)
+HORIZON_DAYS = 21
+
+PLANT_SIZES = {
+    "small": {"work_centers": 6, "finished_products": 4, "pp_levels": 3, "schedules_per_wc": 60},
+    "medium": {"work_centers": 12, "finished_products": 10, "pp_levels": 3, "schedules_per_wc": 200},
+    "large": {"work_centers": 24, "finished_products": 25, "pp_levels": 4, "schedules_per_wc": 500},
+    "xlarge": {"work_centers": 40, "finished_products": 50, "pp_levels": 4, "schedules_per_wc": 1000},
+}
+
+
+# ---------------------------------------------------------------------------
+# Plant generator
+# ---------------------------------------------------------------------------
+
+def _work_centers(count: int) -> List[dict]:
+    """Every operation is served by two WCs so PP cascades can spill across them."""
+    operations = max(1, count // 2)
+    work_centers = []
+    for i in range(count):
+        wc = {"id": f"wc-{i:03d}", "name": f"Centro {i}", "operation_id": f"op-{i % operations:03d}"}
+        if i % 5 == 3:
+            wc["permite_paralelo_por_referencia"] = True
+        elif i % 5 == 4:
+            wc["tipo_capacidad"] = "carros"
+            wc["capacidad_maxima_carros"] = 6
+        work_centers.append(wc)
+    return work_centers
+
+
+def _products(rng: random.Random, finished_products: int, pp_levels: int) -> Dict[int, List[dict]]:
+    """Products by level: 0 = PT, 1..pp_levels = PP (higher levels are deeper ingredients)."""
+    levels = {0: [
+        {"id": f"pt-{i:03d}", "name": f"Producto {i}", "category": "PT",
+         "lote_minimo": rng.choice([60, 100, 150]), "is_recipe_by_grams": False}
+        for i in range(finished_products)
+    ]}
+    per_level = max(2, finished_products // 2)
+    for level in range(1, pp_levels + 1):
+        levels[level] = [
+            {"id": f"pp-{level}-{i:03d}", "name": f"Masa {level}.{i}", "category": "PP",
+             "lote_minimo": rng.choice([40, 80, 120]), "is_recipe_by_grams": False}
+            for i in range(per_level)
+        ]
+    return levels
+
+
+def _existing_schedules(rng: random.Random, work_centers: List[dict], per_wc: int) -> List[dict]:
+    """Back-to-back queues over the horizon, part of them chained to earlier WCs."""
+    horizon_minutes = HORIZON_DAYS * 24 * 60
+    slot = horizon_minutes / per_wc
+    schedules = []
+    by_wc: List[List[dict]] = []
+    for wc_index, wc in enumerate(work_centers):
+        rows = []
+        for i in range(per_wc):
+            start = HORIZON_START + timedelta(minutes=int(i * slot + rng.random() * slot * 0.2))
+            duration = max(10, int(slot * rng.uniform(0.5, 0.95)))
+            source = None
+            if wc_index and rng.random() < 0.4:
+                candidates = by_wc[rng.randrange(wc_index)]
+                source = candidates[max(0, i - rng.randrange(1, 4))] if candidates else None
+                if source and source["end_date"] > start.isoformat():
+                    source = None
+            rows.append({
+                "id": f"{wc['id']}-s{i:05d}", "resource_id": wc["id"], "product_id": f"pt-{i % 7:03d}",
+                "quantity": 50, "start_date": start.isoformat(),
+                "end_date": (start + timedelta(minutes=duration)).isoformat(),
+                "cascade_source_id": source["id"] if source else None,
+                "cascade_level": 1, "batch_number": 1, "total_batches": 1, "batch_size": 50,
+                "status": "scheduled", "production_order_number": rng.randrange(1, 60),
+                "week_plan_id": None, "produced_for_order_number": None,
+            })
+        by_wc.append(rows)
+        schedules.extend(rows)
+    return schedules
+
+
+def build_plant(size: str = "small", seed: int = 7, **overrides) -> Dict[str, List[dict]]:
+    """Tables of a synthetic plant (see PLANT_SIZES; overrides replace size settings)."""
+    config = dict(PLANT_SIZES[size], **overrides)
+    rng = random.Random(seed)
+
+    work_centers = _work_centers(config["work_centers"])
+    levels = _products(rng, config["finished_products"], config["pp_levels"])
+    deepest = max(levels)
+
+    routes, productivity, bom, mappings = [], [], [], []
+    for level, products in levels.items():
+        for product in products:
+            steps = rng.sample(work_centers, rng.randrange(2, min(4, len(work_centers)) + 1))
+            for order, wc in enumerate(steps, start=1):
+                routes.append({
+                    "product_id": product["id"], "work_center_id": wc["id"], "sequence_order": order,
+                    "is_active": True, "tiempo_reposo_horas": rng.choice([0, 0, 0.5, 1]),
+                    "work_center": wc,
+                })
+                productivity.append({
+                    "product_id": product["id"], "work_center_id": wc["id"],
+                    "operation_id": wc["operation_id"], "units_per_hour": rng.choice([60, 90, 150, 240, 400]),
+                    "usa_tiempo_fijo": rng.random() < 0.1, "tiempo_minimo_fijo": 45,
+                })
+                if product["category"] == "PP":
+                    for alt in work_centers:
+                        if alt["operation_id"] == wc["operation_id"]:
+                            mappings.append({
+                                "product_id": product["id"], "operation_id": wc["operation_id"],
+                                "work_center_id": alt["id"], "work_center": alt,
+                            })
+
+            first_operation = steps[0]["operation_id"]
+            if level < deepest:
+                for material in rng.sample(levels[level + 1], rng.randrange(1, 3)):
+                    bom.append({
+                        "product_id": product["id"], "material_id": material["id"],
+                        "quantity_needed": rng.choice([0.25, 0.5, 1]), "operation_id": first_operation,
+                        "tiempo_reposo_horas": rng.choice([0.5, 1, 2]), "is_active": True,
+                    })
+            bom.append({
+                "product_id": product["id"], "material_id": "mp-harina", "quantity_needed": 0.3,
+                "operation_id": first_operation, "tiempo_reposo_horas": None, "is_active": True,
+            })
+
+    blocked, staffing = [], []
+    for wc in work_centers:
+        for day in range(HORIZON_DAYS):
+            date = (HORIZON_START + timedelta(days=day + 1)).strftime("%Y-%m-%d")
+            for shift in (1, 2, 3):
+                if rng.random() < 0.1:
+                    blocked.append({"work_center_id": wc["id"], "date": date, "shift_number": shift})
+                staffing.append({"work_center_id": wc["id"], "date": date,
+                                 "shift_number": shift, "staff_count": 2})
+
+    products = [product for level in levels.values() for product in level]
+    products.append({"id": "mp-harina", "name": "Harina", "category": "MP", "lote_minimo": None,
+                     "is_recipe_by_grams": False})
+    return {
+        "products": products,
+        "work_centers": work_centers,
+        "production_routes": routes,
+        "production_productivity": productivity,
+        "bill_of_materials": bom,
+        "product_work_center_mapping": mappings,
+        "work_center_staffing": staffing,
+        "shift_blocking": blocked,
+        "production_schedules": _existing_schedules(rng, work_centers, config["schedules_per_wc"]),
+    }
+
+
+def finished_product_ids(plant: Dict[str, List[dict]]) -> List[str]:
+    return [p["id"] for p in plant["products"] if p["category"] == "PT"]
+
+
+def queue_rows(plant: Dict[str, List[dict]], work_center_id: str) -> List[dict]:
+    """Existing schedules of a WC shaped like get_existing_schedules_with_arrival output."""
+    rows = []
+    for s in plant["production_schedules"]:
+        if s["resource_id"] != work_center_id:
+            continue
+        start = datetime.fromisoformat(s["start_date"])
+        end = datetime.fromisoformat(s["end_date"])
+        rows.append({
+            "id": s["id"], "resource_id": work_center_id, "start_date": start, "end_date": end,
+            "arrival_time": start, "duration_minutes": (end - start).total_seconds() / 60,
+            "production_order_number": s["production_order_number"], "is_existing": True,
+        })
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# In-memory Supabase client
+# ---------------------------------------------------------------------------
+
+class _Result:
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+
+# Columns looked up with eq/in_ often enough to deserve a hash index
+_INDEXED_COLUMNS = ("id", "resource_id", "work_center_id", "product_id")
+
+
+class FakeQuery:
+    def __init__(self, client: "FakeSupabase", table: str):
+        self._client = client
+        self._table = table
+        self._filters = []
+        self._lookup = None  # (column, values) answered from an index
+        self._order = None
+        self._limit = None
+        self._range = None
+        self._single = False
+        self._insert = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, column, value):
+        if self._lookup is None and column in _INDEXED_COLUMNS:
+            self._lookup = (column, [value])
+        else:
+            self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        if self._lookup is None and column in _INDEXED_COLUMNS:
+            self._lookup = (column, list(dict.fromkeys(values)))
+        else:
+            values = set(values)
+            self._filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def gte(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] >= value)
+        return self
+
+    def gt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def lt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+
+    def lte(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] <= value)
+        return self
+
+    @property
+    def not_(self):
+        query = self
+
+        class _Not:
+            def is_(self, column, value):
+                query._filters.append(lambda row: row.get(column) is not None)
+                return query
+
+        return _Not()
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def insert(self, rows):
+        self._insert = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def execute(self):
+        self._client.queries.append(self._table)
+        if self._insert is not None:
+            self._client.insert_rows(self._table, self._insert)
+            return _Result(self._insert)
+
+        if self._lookup is not None:
+            column, values = self._lookup
+            index = self._client.index(self._table, column)
+            candidates = [row for value in values for row in index.get(value, ())]
+        else:
+            candidates = self._client.tables.get(self._table, [])
+        data = [dict(row) for row in candidates if all(f(row) for f in self._filters)]
+
+        if self._order:
+            column, desc = self._order
+            data.sort(key=lambda row: row.get(column), reverse=desc)
+        if self._range is not None:
+            data = data[self._range[0]:self._range[1] + 1]
+        if self._limit is not None:
+            data = data[:self._limit]
+        if self._single:
+            return _Result(data[0] if data else None)
+        return _Result(data)
+
+
+def _queue_context(client: "FakeSupabase", params: dict) -> dict:
+    """produccion.get_work_center_queue_context answered from the hash indexes."""
+    by_id = client.index("production_schedules", "id")
+    by_resource = client.index("production_schedules", "resource_id")
+    operations = {wc["id"]: wc.get("operation_id") for wc in client.tables["work_centers"]}
+    rest_by_key = {}
+    for bom in client.tables["bill_of_materials"]:
+        if bom.get("tiempo_reposo_horas") is not None:
+            rest_by_key.setdefault((bom["product_id"], bom["operation_id"]), float(bom["tiempo_reposo_horas"]))
+
+    schedules = []
+    blocked = []
+    for wc_id in params["p_work_center_ids"]:
+        for row in by_resource.get(wc_id, ()):
+            if not params["p_start"] <= row["start_date"] < params["p_end"]:
+                continue
+            source = by_id.get(row.get("cascade_source_id"), (None,))[0]
+            rest = None
+            if source:
+                rest = rest_by_key.get((row["product_id"], operations.get(source["resource_id"])), 0.0)
+            schedules.append(dict(
+                row,
+                source_end_date=source["end_date"] if source else None,
+                arrival_rest_hours=rest,
+            ))
+        blocked.extend(
+            dict(row) for row in client.index("shift_blocking", "work_center_id").get(wc_id, ())
+            if params["p_blocked_from"] <= row["date"] <= params["p_blocked_to"]
+        )
+    return {"schedules": schedules, "blocked_shifts": blocked}
+
+
+class FakeRpc:
+    def __init__(self, client: "FakeSupabase", name: str, params: dict):
+        self._client = client
+        self._name = name
+        self._params = params
+
+    def execute(self):
+        self._client.rpcs.append(self._name)
+        if self._name == "get_next_production_order_number":
+            return _Result(next(self._client.order_numbers))
+        if self._name == "reserve_production_order_numbers":
+            return _Result([next(self._client.order_numbers) for _ in range(self._params["p_count"])])
+        if self._name == "get_work_center_queue_context":
+            return _Result(_queue_context(self._client, self._params))
+        if self._name in ("cascade_bulk_upsert", "cascade_bulk_upsert_batch"):
+            # Parking is only an intermediate state; the end result is moves + inserts
+            by_id = self._client.index("production_schedules", "id")
+            for move in self._params["p_schedules_to_move"]:
+                row = by_id[move["id"]][0]
+                row["start_date"] = move["start_date"]
+                row["end_date"] = move["end_date"]
+            self._client.insert_rows("production_schedules", self._params["p_schedules_to_insert"])
+            return _Result({})
+        raise NotImplementedError(f"FakeSupabase does not implement RPC {self._name}")
+
+
+class FakeSupabase:
+    """Counts every query (by table) and RPC (by name) it answers."""
+
+    def __init__(self, tables: Dict[str, List[dict]]):
+        self.tables = tables
+        self.queries: List[str] = []
+        self.rpcs: List[str] = []
+        self.order_numbers = itertools.count(1000)
+        self._indexes: Dict[tuple, Dict[object, List[dict]]] = {}
+
+    def schema(self, name):
+        return self
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        return FakeRpc(self, name, params)
+
+    def index(self, table: str, column: str) -> Dict[object, List[dict]]:
+        key = (table, column)
+        if key not in self._indexes:
+            index: Dict[object, List[dict]] = {}
+            for row in self.tables.get(table, []):
+                index.setdefault(row.get(column), []).append(row)
+            self._indexes[key] = index
+        return self._indexes[key]
+
+    def insert_rows(self, table: str, rows: List[dict]) -> None:
+        new_rows = [dict(row) for row in rows]
+        self.tables.setdefault(table, []).extend(new_rows)
+        for (indexed_table, column), index in self._indexes.items():
+            if indexed_table == table:
+                for row in new_rows:
+                    index.setdefault(row.get(column), []).append(row)
+
+    def reset_counters(self) -> None:
+        self.queries.clear()
+        self.rpcs.clear()
+
+
+def fresh_client(plant: Dict[str, List[dict]], tables_written: Optional[List[str]] = None) -> FakeSupabase:
+    """FakeSupabase over a copy of the plant (only written tables are deep-copied)."""
+    tables_written = tables_written or ["production_schedules"]
+    tables = {
+        name: copy.deepcopy(rows) if name in tables_written else rows
+        for name, rows in plant.items()
+    }
+    return FakeSupabase(tables)
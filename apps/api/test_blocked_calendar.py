@@ -0,0 +1,101 @@
+"""
+Tests for the blocked-shift calendar used by cascade queue recalculation.
+
+Verifies that:
+1. Overlapping/adjacent shift blocks are merged
+2. earliest_start returns the earliest feasible start (never inside or across a block)
+3. skip_blocked_periods gives the same answer for lists and calendars
+4. Randomized shift grids agree with a brute-force reference
+"""
+
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from app.api.routes.production.blocked_calendar import BlockedCalendar, as_blocked_calendar
+from app.api.routes.production.cascade import skip_blocked_periods, recalculate_queue_times
+
+BASE = datetime(2026, 1, 4, 22, 0)
+
+
+def shift(day: int, shift_number: int):
+    """(start, end) of a shift, same mapping as get_blocked_shifts."""
+    base = datetime(2026, 1, 5) + timedelta(days=day)
+    offsets = {1: (-2, 6), 2: (6, 14), 3: (14, 22)}
+    start_h, end_h = offsets[shift_number]
+    return base + timedelta(hours=start_h), base + timedelta(hours=end_h)
+
+
+def brute_force_earliest(start, duration_minutes, blocks):
+    """Earliest feasible point among start and every block end (the only candidates)."""
+    duration = timedelta(minutes=duration_minutes)
+    candidates = sorted({start} | {e for _, e in blocks if e > start})
+    for t in candidates:
+        if all(not (s <= t < e) and not (t < s < t + duration) for s, e in blocks):
+            return t
+    raise AssertionError("no feasible start")
+
+
+class TestBlockedCalendar(unittest.TestCase):
+
+    def test_merges_adjacent_shifts(self):
+        calendar = BlockedCalendar([shift(0, 2), shift(0, 3), shift(1, 1), shift(3, 2)])
+        periods = list(calendar)
+        self.assertEqual(len(periods), 2)
+        self.assertEqual(periods[0], (shift(0, 2)[0], shift(1, 1)[1]))
+
+    def test_empty_calendar_is_falsy(self):
+        calendar = BlockedCalendar()
+        self.assertFalse(calendar)
+        self.assertEqual(calendar.earliest_start(BASE, 60), BASE)
+        self.assertIs(as_blocked_calendar(calendar), calendar)
+
+    def test_start_inside_block_moves_to_end(self):
+        calendar = BlockedCalendar([shift(0, 2)])
+        self.assertEqual(calendar.earliest_start(datetime(2026, 1, 5, 8), 30), datetime(2026, 1, 5, 14))
+
+    def test_batch_spanning_block_moves_past(self):
+        calendar = BlockedCalendar([shift(0, 2)])
+        self.assertEqual(calendar.earliest_start(datetime(2026, 1, 5, 5), 90), datetime(2026, 1, 5, 14))
+        # Ending exactly at the block start is allowed
+        self.assertEqual(calendar.earliest_start(datetime(2026, 1, 5, 5), 60), datetime(2026, 1, 5, 5))
+
+    def test_skips_gaps_that_are_too_short(self):
+        # Free windows of 8h between blocks; a 9h batch must go past all of them
+        blocks = [shift(day, 2) for day in range(5)] + [shift(day, 1) for day in range(5)]
+        calendar = BlockedCalendar(blocks)
+        self.assertEqual(calendar.earliest_start(datetime(2026, 1, 5, 14), 9 * 60), shift(4, 2)[1])
+
+    def test_skip_blocked_periods_accepts_lists(self):
+        blocks = [shift(0, 2), shift(0, 1)]
+        start = datetime(2026, 1, 5, 3)
+        self.assertEqual(
+            skip_blocked_periods(start, 45, blocks),
+            skip_blocked_periods(start, 45, BlockedCalendar(blocks)),
+        )
+
+    def test_randomized_against_brute_force(self):
+        rng = random.Random(42)
+        for _ in range(200):
+            blocks = [shift(rng.randrange(30), rng.choice([1, 2, 3])) for _ in range(rng.randrange(1, 60))]
+            calendar = BlockedCalendar(blocks)
+            for _ in range(20):
+                start = BASE + timedelta(minutes=rng.randrange(0, 32 * 24 * 60))
+                duration = rng.choice([0, 15, 60, 240, 479, 480, 481, 900])
+                self.assertEqual(
+                    calendar.earliest_start(start, duration),
+                    brute_force_earliest(start, duration, blocks),
+                )
+
+    def test_queue_recalculation_respects_blocks(self):
+        schedules = [
+            {"arrival_time": datetime(2026, 1, 5, 4), "duration_minutes": 60, "is_existing": False},
+            {"arrival_time": datetime(2026, 1, 5, 4), "duration_minutes": 120, "is_existing": False},
+        ]
+        result = recalculate_queue_times(schedules, BlockedCalendar([shift(0, 2)]))
+        self.assertEqual(result[0]["new_start_date"], datetime(2026, 1, 5, 4))
+        self.assertEqual(result[1]["new_start_date"], datetime(2026, 1, 5, 14))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Tests for the BOM dependency graph.
+
+Verifies that:
+1. Only active BOM rows with PP materials become edges
+2. pp_closure matches a brute-force reachability walk on random BOMs
+3. Cycles (self-loops, 2- and 3-cycles) are detected and reported as paths
+4. topological_levels puts every PP below the products that use it
+5. fetch_all_rows pages through PostgREST's row limit
+6. check_circular_dependency works inside a running event loop
+"""
+
+import asyncio
+import random
+import unittest
+from unittest.mock import patch
+
+from app.api.routes.production import bom_graph as bg
+from app.api.routes.production.cascade import check_circular_dependency
+from test_cascade_master_data import FakeSupabase
+
+
+def product(pid, category="PP"):
+    return {"id": pid, "name": pid.upper(), "category": category, "lote_minimo": 10}
+
+
+def edge(parent, child, active=True):
+    return {"product_id": parent, "material_id": child, "quantity_needed": 1,
+            "operation_id": None, "tiempo_reposo_horas": None, "is_active": active}
+
+
+def brute_force_reach(edges, start):
+    seen, stack = set(), list(edges.get(start, []))
+    while stack:
+        node = stack.pop()
+        if node not in seen:
+            seen.add(node)
+            stack.extend(edges.get(node, []))
+    return seen
+
+
+class TestBomGraph(unittest.TestCase):
+
+    def test_edges_only_for_active_pp_rows(self):
+        graph = bg.BomGraph(
+            [product("pt", "PT"), product("pp1"), product("pp2")],
+            [edge("pt", "pp1"), edge("pt", "pp2", active=False), edge("pt", "mp"), edge("pp1", "pp2")],
+        )
+        self.assertEqual(graph.pp_children("pt"), ["pp1"])
+        self.assertEqual(graph.pp_closure("pt"), {"pp1", "pp2"})
+        self.assertEqual(len(graph.bom_rows("pt")), 3)
+        self.assertEqual(graph.find_cycles(), [])
+        self.assertFalse(graph.has_cycle_from("pt"))
+
+    def test_closure_matches_brute_force(self):
+        rng = random.Random(5)
+        for _ in range(200):
+            nodes = [f"p{i}" for i in range(rng.randrange(2, 25))]
+            edges = {}
+            rows = []
+            for _ in range(rng.randrange(0, 40)):
+                parent, child = rng.choice(nodes), rng.choice(nodes)
+                rows.append(edge(parent, child))
+                if child not in edges.setdefault(parent, []):
+                    edges[parent].append(child)
+            graph = bg.BomGraph([product(n) for n in nodes], rows)
+            for node in nodes:
+                reach = brute_force_reach(edges, node)
+                self.assertEqual(graph.pp_closure(node), reach)
+                has_cycle = any(n in brute_force_reach(edges, n) for n in reach | {node})
+                self.assertEqual(graph.has_cycle_from(node), has_cycle)
+                cycle = graph.find_cycle_from(node)
+                if has_cycle:
+                    self.assertEqual(cycle[0], node)
+                    self.assertIn(cycle[-1], cycle[:-1])
+                    for parent, child in zip(cycle, cycle[1:]):
+                        self.assertIn(child, edges[parent])
+                else:
+                    self.assertIsNone(cycle)
+
+    def test_cycles_are_found(self):
+        graph = bg.BomGraph(
+            [product("pt", "PT")] + [product(p) for p in ("a", "b", "c", "d", "e", "s")],
+            [edge("pt", "a"), edge("a", "b"), edge("b", "a"),
+             edge("c", "d"), edge("d", "e"), edge("e", "c"), edge("s", "s")],
+        )
+        self.assertEqual(
+            sorted(sorted(cycle) for cycle in graph.find_cycles()),
+            [["a", "b"], ["c", "d", "e"], ["s"]],
+        )
+        self.assertEqual(graph.find_cycle_from("pt"), ["pt", "a", "b", "a"])
+        self.assertEqual(graph.describe_cycle(["a", "b", "a"]), "A -> B -> A")
+
+    def test_topological_levels(self):
+        graph = bg.BomGraph(
+            [product("pt", "PT")] + [product(p) for p in ("masa", "relleno", "base")],
+            [edge("pt", "masa"), edge("pt", "relleno"), edge("relleno", "base"), edge("masa", "base")],
+        )
+        levels = graph.topological_levels()
+        self.assertEqual(levels, {"base": 0, "masa": 1, "relleno": 1, "pt": 2})
+
+
+class TestLoadBomGraph(unittest.TestCase):
+
+    def setUp(self):
+        bg.invalidate_bom_graph()
+
+    def tearDown(self):
+        bg.invalidate_bom_graph()
+
+    def make_supabase(self, cyclic=False):
+        rows = [edge("pt", "pp1"), edge("pp1", "pp2")] + ([edge("pp2", "pp1")] if cyclic else [])
+        return FakeSupabase({
+            "products": [product("pt", "PT"), product("pp1"), product("pp2"), product("mp", "MP")],
+            "bill_of_materials": rows,
+        })
+
+    def test_pages_through_row_limit(self):
+        supabase = self.make_supabase()
+        with patch.object(bg, "PAGE_SIZE", 1):
+            rows = bg.fetch_all_rows(lambda: supabase.table("bill_of_materials").select("*"), bg.PAGE_SIZE)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(supabase.queries.count("bill_of_materials"), 3)
+
+    def test_graph_is_cached(self):
+        supabase = self.make_supabase()
+        first = bg.get_bom_graph(supabase)
+        self.assertIs(bg.get_bom_graph(supabase), first)
+        self.assertTrue(bg.invalidate_bom_graph())
+        self.assertIsNot(bg.get_bom_graph(supabase), first)
+
+    def test_check_circular_dependency_inside_event_loop(self):
+        async def check(supabase):
+            return check_circular_dependency(supabase, "pt")
+
+        self.assertFalse(asyncio.run(check(self.make_supabase())))
+        bg.invalidate_bom_graph()
+        self.assertTrue(asyncio.run(check(self.make_supabase(cyclic=True))))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,259 @@
+"""
+Tests for the bulk billing pipeline.
+
+Verifies that:
+1. process_billing for 200 mixed orders takes a fixed handful of round-trips
+   (one number range per counter, one remision insert, one remision_items
+   insert, one bulk deduction RPC) instead of several per order
+2. Invoice and remision numbers are consecutive from the reserved range
+3. Remisions that already have items are skipped (no deduction), orphan
+   remisions are deleted and recreated, and a failed bulk remision insert
+   falls back to per-order inserts with per-order errors
+4. deduct_inventory_for_orders maps per-order RPC results and fails every
+   order when the call itself fails
+"""
+
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.api.routes.billing import export as billing_export  # noqa: E402
+from app.api.routes.billing.inventory import deduct_inventory_for_orders  # noqa: E402
+from app.models.billing import BillingProcessRequest  # noqa: E402
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db, self.table, self.op, self.payload, self.filters = db, table, "select", None, []
+
+    def select(self, *_args, **_kwargs):
+        return self
+
+    def eq(self, col, value):
+        self.filters.append((col, [value]))
+        return self
+
+    def in_(self, col, values):
+        self.filters.append((col, list(values)))
+        return self
+
+    def insert(self, payload):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def update(self, payload):
+        self.op, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def _matches(self, row):
+        return all(row.get(col) in values for col, values in self.filters)
+
+    def execute(self):
+        self.db.calls.append((self.op, self.table))
+        rows = self.db.tables.setdefault(self.table, [])
+        if self.op == "insert":
+            new = self.payload if isinstance(self.payload, list) else [self.payload]
+            if any(row.get("order_id") in self.db.rejected_orders for row in new):
+                raise Exception("violates check constraint")
+            for row in new:
+                row.setdefault("id", f"{self.table}-{len(rows) + 1}")
+                rows.append(row)
+            return MagicMock(data=new)
+        matched = [r for r in rows if self._matches(r)]
+        if self.op == "update":
+            for row in matched:
+                row.update(self.payload)
+        elif self.op == "delete":
+            self.db.tables[self.table] = [r for r in rows if not self._matches(r)]
+        return MagicMock(data=matched)
+
+
+class FakeRpc:
+    def __init__(self, db, name, params):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self):
+        self.db.calls.append(("rpc", self.name))
+        return MagicMock(data=self.db.rpc_handlers[self.name](self.params))
+
+
+class FakeSupabase:
+    """Sync client over in-memory tables that records every round-trip."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.calls = []
+        self.counters = {"invoice_last_number": 100, "remision_number_current": 40}
+        self.deducted = []
+        self.rejected_orders = set()
+        self.rpc_handlers = {
+            "reserve_number_range": self._reserve,
+            "perform_bulk_dispatch_movements": self._bulk_dispatch,
+        }
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def schema(self, _name):
+        return self
+
+    def rpc(self, name, params):
+        return FakeRpc(self, name, params)
+
+    def _reserve(self, params):
+        self.counters[params["p_config_key"]] += params["p_count"]
+        return self.counters[params["p_config_key"]] - params["p_count"] + 1
+
+    def _bulk_dispatch(self, params):
+        self.deducted.extend(params["p_orders"])
+        return {"success": True, "errors": [], "orders": {
+            o["order_id"]: {"success": True, "skipped": not o["items"], "errors": []} for o in params["p_orders"]
+        }}
+
+
+def billing_tables(n_orders):
+    orders, items = [], []
+    for i in range(n_orders):
+        remision = i % 4 == 0
+        orders.append({
+            "id": f"o{i:03d}", "order_number": f"PED-{i}", "total_value": 1000, "client_id": "c1",
+            "requires_remision": remision, "status": "ready_dispatch", "is_invoiced": False,
+            "clients": {"id": "c1", "name": "Ana", "billing_type": "factura"},
+        })
+        for p in range(3):
+            items.append({"id": f"i{i}-{p}", "order_id": f"o{i:03d}", "product_id": f"p{p}",
+                          "quantity_requested": 5, "quantity_available": 4 if p < 2 else 0,
+                          "unit_price": 500, "products": {"id": f"p{p}", "name": f"Pan {p}"}})
+    return {"orders": orders, "order_items": items}
+
+
+class TestProcessBilling(unittest.TestCase):
+
+    def run_billing(self, supabase, order_ids):
+        with patch.object(billing_export, "get_supabase_client", return_value=supabase), \
+                patch.object(billing_export, "generate_world_office_excel",
+                             return_value={"file_bytes": b"PK..", "file_name": "WO.xlsx"}), \
+                patch.object(billing_export, "store_export_file", return_value="world-office/x.xlsx"):
+            return billing_export._process_billing(BillingProcessRequest(order_ids=order_ids), None)
+
+    def test_round_trips_constant(self):
+        supabase = FakeSupabase(billing_tables(200))
+        response = self.run_billing(supabase, [f"o{i:03d}" for i in range(200)])
+
+        self.assertTrue(response.success)
+        self.assertEqual(response.summary.direct_billing_count, 150)
+        self.assertEqual(response.remisions_created, 50)
+        self.assertEqual((response.invoice_number_start, response.invoice_number_end), (101, 250))
+
+        self.assertEqual(supabase.calls, [
+            ("select", "orders"),
+            ("select", "order_items"),
+            ("rpc", "reserve_number_range"),
+            ("insert", "export_history"),
+            ("insert", "order_invoices"),
+            ("update", "orders"),
+            ("select", "remisions"),
+            ("rpc", "reserve_number_range"),
+            ("insert", "remisions"),
+            ("insert", "remision_items"),
+            ("rpc", "perform_bulk_dispatch_movements"),
+        ])
+
+        remisions = supabase.tables["remisions"]
+        self.assertEqual([r["remision_number"] for r in remisions[:2]], ["REM-000041", "REM-000042"])
+        self.assertEqual(remisions[-1]["remision_number"], "REM-000090")
+        self.assertEqual(remisions[0]["total_amount"], 4000)
+        # Only items with available quantity become remision items
+        self.assertEqual(len(supabase.tables["remision_items"]), 100)
+        self.assertEqual(len(supabase.deducted), 200)
+        notes = {d["order_id"]: d["notes"] for d in supabase.deducted}
+        self.assertEqual(notes["o001"], "Invoice billing")
+        self.assertEqual(notes["o000"], "Remision REM-000041")
+        # prepare_order_items_for_deduction falls back to quantity_requested
+        self.assertEqual(supabase.deducted[0]["items"], [{"product_id": "p0", "quantity": 4},
+                                                       {"product_id": "p1", "quantity": 4},
+                                                       {"product_id": "p2", "quantity": 5}])
+
+    def test_existing_and_orphan_remisions(self):
+        tables = billing_tables(8)
+        for order in tables["orders"]:
+            order["requires_remision"] = True
+        tables["remisions"] = [
+            {"id": "r-done", "order_id": "o000", "remision_number": "REM-000001"},
+            {"id": "r-orphan", "order_id": "o001", "remision_number": "REM-000002"},
+        ]
+        tables["remision_items"] = [{"id": "ri1", "remision_id": "r-done"}]
+        supabase = FakeSupabase(tables)
+
+        response = self.run_billing(supabase, [f"o{i:03d}" for i in range(8)])
+
+        self.assertEqual(response.remisions_created, 8)
+        self.assertIn(("delete", "remisions"), supabase.calls)
+        by_order = {r["order_id"]: r for r in supabase.tables["remisions"]}
+        self.assertEqual(by_order["o000"]["id"], "r-done")
+        self.assertNotEqual(by_order["o001"]["id"], "r-orphan")
+        # Seven new remisions, numbered from one reserved range
+        self.assertEqual(supabase.counters["remision_number_current"], 47)
+        self.assertNotIn("o000", {d["order_id"] for d in supabase.deducted})
+        self.assertEqual(len(supabase.deducted), 7)
+
+    def test_bulk_remision_insert_falls_back_per_order(self):
+        tables = billing_tables(4)
+        for order in tables["orders"]:
+            order["requires_remision"] = True
+        supabase = FakeSupabase(tables)
+        supabase.rejected_orders = {"o002"}
+
+        response = self.run_billing(supabase, [f"o{i:03d}" for i in range(4)])
+
+        self.assertEqual(response.remisions_created, 3)
+        self.assertEqual(sorted(r["order_id"] for r in supabase.tables["remisions"]), ["o000", "o001", "o003"])
+        self.assertEqual(len(response.errors), 1)
+        self.assertIn("PED-2", response.errors[0])
+        # The rejected order gets neither remision items nor a deduction
+        self.assertEqual(sorted(d["order_id"] for d in supabase.deducted), ["o000", "o001", "o003"])
+
+
+class TestDeductInventoryForOrders(unittest.TestCase):
+
+    def test_results_per_order(self):
+        supabase = MagicMock()
+        supabase.schema.return_value.rpc.return_value.execute.return_value = MagicMock(data={
+            "success": True, "errors": [],
+            "orders": {"a": {"success": True, "skipped": False, "errors": []},
+                       "b": {"success": False, "skipped": False, "errors": [{"product_id": "p1", "error": "x"}]}},
+        })
+        orders = [{"order_id": "a", "order_number": "A", "items": [], "notes": ""},
+                  {"order_id": "b", "order_number": "B", "items": [], "notes": ""}]
+
+        results = deduct_inventory_for_orders(supabase, orders, "u1")
+        self.assertTrue(results["a"]["success"])
+        self.assertFalse(results["b"]["success"])
+        self.assertEqual(results["b"]["errors"], [{"product_id": "p1", "error": "x"}])
+        supabase.schema.assert_called_once_with("inventario")
+        self.assertEqual(supabase.schema.return_value.rpc.call_args.args[1]["p_recorded_by"], "u1")
+
+    def test_call_failure_and_missing_location(self):
+        supabase = MagicMock()
+        supabase.schema.return_value.rpc.return_value.execute.side_effect = RuntimeError("timeout")
+        orders = [{"order_id": "a", "order_number": "A", "items": [], "notes": ""}]
+        self.assertEqual(deduct_inventory_for_orders(supabase, orders, None)["a"]["errors"], ["timeout"])
+
+        supabase.schema.return_value.rpc.return_value.execute.side_effect = None
+        supabase.schema.return_value.rpc.return_value.execute.return_value = MagicMock(data={
+            "success": False, "errors": ["No default dispatch location configured"], "orders": {}})
+        result = deduct_inventory_for_orders(supabase, orders, None)["a"]
+        self.assertFalse(result["success"])
+        self.assertEqual(result["errors"], ["No default dispatch location configured"])
+        self.assertEqual(deduct_inventory_for_orders(supabase, [], None), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,469 @@
+"""
+Tests for batch cascade planning (POST /create-batch).
+
+Verifies that:
+1. Planning several cascades in one CascadePlanningContext and flushing once
+   leaves production_schedules exactly as creating them one by one would
+2. The batch flush is a single cascade_bulk_upsert_batch RPC
+3. Schedules and blocked shifts are loaded once per work center, and for
+   every work center of the batch in a single get_work_center_queue_context RPC
+4. A failed item is rolled back without affecting the others (and its
+   reserved order numbers are handed to the next item)
+5. load_work_center_queues returns the same schedules, arrival times and
+   blocked shifts as get_existing_schedules_with_arrival + get_blocked_shifts
+6. The create-batch handler reserves every order number in one RPC and
+   runs every database call on a worker thread, not on the event loop
+"""
+
+import asyncio
+import itertools
+import os
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.api.routes.production import cascade  # noqa: E402
+from app.api.routes.production.cascade import (  # noqa: E402
+    cascade_bulk_upsert_batch,
+    calculate_context_window,
+    create_cascade_with_dependencies,
+    get_blocked_shifts,
+    get_existing_schedules_with_arrival,
+    get_production_week,
+    get_work_center_queues,
+    load_work_center_queues,
+    parse_datetime_str,
+    reserve_production_order_numbers,
+)
+from app.api.routes.production.master_data import load_cascade_master_data  # noqa: E402
+from app.api.routes.production.planning_context import CascadePlanningContext  # noqa: E402
+from app.models.production import CreateCascadeBatchRequest, CreateCascadeRequest  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Helper: in-memory Supabase with the subset of PostgREST the cascade uses
+# ---------------------------------------------------------------------------
+
+def _result(data):
+    result = MagicMock()
+    result.data = data
+    return result
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._filters = []
+        self._order = None
+        self._limit = None
+        self._insert = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, column, value):
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self._filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def gte(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] >= value)
+        return self
+
+    def gt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def lt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+
+    def lte(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] <= value)
+        return self
+
+    @property
+    def not_(self):
+        query = self
+
+        class _Not:
+            def is_(self, column, value):
+                query._filters.append(lambda row: row.get(column) is not None)
+                return query
+
+        return _Not()
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def insert(self, rows):
+        self._insert = rows
+        return self
+
+    def execute(self):
+        self._client.threads.add(threading.current_thread())
+        self._client.queries.append(self._table)
+        rows = self._client.tables.setdefault(self._table, [])
+        if self._insert is not None:
+            rows.extend(dict(r) for r in self._insert)
+            return _result(self._insert)
+        data = [dict(r) for r in rows if all(f(r) for f in self._filters)]
+        if self._order:
+            column, desc = self._order
+            data.sort(key=lambda r: r.get(column), reverse=desc)
+        if self._limit is not None:
+            data = data[:self._limit]
+        return _result(data)
+
+
+def queue_context(tables, params):
+    """produccion.get_work_center_queue_context over the in-memory tables."""
+    wc_ids = set(params["p_work_center_ids"])
+    start = parse_datetime_str(params["p_start"])
+    end = parse_datetime_str(params["p_end"])
+    schedules_by_id = {row["id"]: row for row in tables["production_schedules"]}
+    operations = {wc["id"]: wc.get("operation_id") for wc in tables["work_centers"]}
+
+    schedules = []
+    for row in tables["production_schedules"]:
+        if row["resource_id"] not in wc_ids:
+            continue
+        if not start <= parse_datetime_str(row["start_date"]) < end:
+            continue
+        source = schedules_by_id.get(row.get("cascade_source_id"))
+        rest = None
+        if source:
+            operation_id = operations.get(source["resource_id"])
+            rest = next((
+                float(bom["tiempo_reposo_horas"]) for bom in tables["bill_of_materials"]
+                if bom["product_id"] == row["product_id"] and bom["operation_id"] == operation_id
+                and bom.get("tiempo_reposo_horas") is not None
+            ), 0.0)
+        schedules.append(dict(
+            row,
+            source_end_date=source["end_date"] if source else None,
+            arrival_rest_hours=rest,
+        ))
+
+    blocked = [
+        dict(row) for row in tables["shift_blocking"]
+        if row["work_center_id"] in wc_ids
+        and params["p_blocked_from"] <= row["date"] <= params["p_blocked_to"]
+    ]
+    return {"schedules": schedules, "blocked_shifts": blocked}
+
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self._client = client
+        self._name = name
+        self._params = params
+
+    def execute(self):
+        self._client.threads.add(threading.current_thread())
+        self._client.rpcs.append(self._name)
+        if self._name == "get_next_production_order_number":
+            return _result(next(self._client.order_numbers))
+        if self._name == "reserve_production_order_numbers":
+            return _result([next(self._client.order_numbers) for _ in range(self._params["p_count"])])
+        if self._name == "get_work_center_queue_context":
+            return _result(queue_context(self._client.tables, self._params))
+        schedules = self._client.tables["production_schedules"]
+        by_id = {row["id"]: row for row in schedules}
+        for row in self._params["p_schedules_to_insert"]:
+            schedules.append(dict(row))
+        for move in self._params["p_schedules_to_move"]:
+            by_id[move["id"]]["start_date"] = move["start_date"]
+            by_id[move["id"]]["end_date"] = move["end_date"]
+        return _result({})
+
+
+class FakeSupabase:
+    def __init__(self, tables):
+        self.tables = tables
+        self.queries = []
+        self.rpcs = []
+        self.threads = set()
+        self.order_numbers = itertools.count(1000)
+
+    def schema(self, name):
+        return self
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        return FakeRpc(self, name, params)
+
+
+WC_ARMADO = {"id": "wc-armado", "name": "Armado", "operation_id": "op-armado"}
+WC_HORNO = {"id": "wc-horno", "name": "Horno", "operation_id": "op-horno",
+            "tipo_capacidad": "carros", "capacidad_maxima_carros": 4}
+WC_EMPAQUE = {"id": "wc-empaque", "name": "Empaque", "operation_id": "op-empaque"}
+WC_MASA = {"id": "wc-masa", "name": "Amasado", "operation_id": "op-masa"}
+
+WEEK_MONDAY = datetime(2026, 1, 5)
+
+
+def make_plant():
+    def route(product_id, wc, order, rest=0):
+        return {"product_id": product_id, "work_center_id": wc["id"], "sequence_order": order,
+                "is_active": True, "tiempo_reposo_horas": rest, "work_center": wc}
+
+    existing = []
+    for i in range(6):
+        start = WEEK_MONDAY + timedelta(hours=6 + i * 3)
+        existing.append({
+            "id": f"existing-{i}", "resource_id": "wc-empaque", "product_id": "other",
+            "quantity": 10, "start_date": start.isoformat(),
+            "end_date": (start + timedelta(hours=1)).isoformat(),
+            "cascade_source_id": None, "cascade_level": 1, "batch_number": 1,
+            "total_batches": 1, "batch_size": 10, "status": "scheduled",
+            "production_order_number": 900 + i, "week_plan_id": None,
+        })
+
+    return {
+        "products": [
+            {"id": "pt-a", "name": "Croissant", "category": "PT", "lote_minimo": 100},
+            {"id": "pt-b", "name": "Pan", "category": "PT", "lote_minimo": 80},
+            {"id": "pp", "name": "Masa", "category": "PP", "lote_minimo": 50},
+        ],
+        "bill_of_materials": [
+            {"product_id": "pt-a", "material_id": "pp", "quantity_needed": 0.5,
+             "operation_id": "op-armado", "tiempo_reposo_horas": 2, "is_active": True},
+            {"product_id": "pt-a", "material_id": "pp", "quantity_needed": 0.5,
+             "operation_id": "op-horno", "tiempo_reposo_horas": 0.5, "is_active": False},
+            {"product_id": "pt-b", "material_id": "pp", "quantity_needed": 0.25,
+             "operation_id": "op-armado", "tiempo_reposo_horas": 1, "is_active": True},
+        ],
+        "production_routes": [
+            route("pt-a", WC_ARMADO, 1), route("pt-a", WC_HORNO, 2, 0.5), route("pt-a", WC_EMPAQUE, 3),
+            route("pt-b", WC_ARMADO, 1), route("pt-b", WC_HORNO, 2), route("pt-b", WC_EMPAQUE, 3),
+            route("pp", WC_MASA, 1),
+        ],
+        "production_productivity": [
+            {"product_id": "pt-a", "work_center_id": "wc-armado", "units_per_hour": 150},
+            {"product_id": "pt-a", "work_center_id": "wc-horno", "units_per_hour": 200},
+            {"product_id": "pt-a", "work_center_id": "wc-empaque", "units_per_hour": 120},
+            {"product_id": "pt-b", "work_center_id": "wc-armado", "units_per_hour": 100},
+            {"product_id": "pt-b", "work_center_id": "wc-horno", "units_per_hour": 160},
+            {"product_id": "pt-b", "work_center_id": "wc-empaque", "units_per_hour": 90},
+            {"product_id": "pp", "work_center_id": "wc-masa", "units_per_hour": 80},
+        ],
+        "product_work_center_mapping": [],
+        "work_centers": [WC_ARMADO, WC_HORNO, WC_EMPAQUE, WC_MASA],
+        "shift_blocking": [
+            {"work_center_id": "wc-empaque", "date": "2026-01-06", "shift_number": 2},
+            {"work_center_id": "wc-masa", "date": "2026-01-05", "shift_number": 1},
+        ],
+        "work_center_staffing": [],
+        "production_schedules": existing,
+    }
+
+
+def make_items():
+    return [
+        CreateCascadeRequest(work_center_id="wc-armado", product_id="pt-a",
+                             start_datetime=WEEK_MONDAY + timedelta(hours=8), duration_hours=3),
+        CreateCascadeRequest(work_center_id="wc-armado", product_id="pt-b",
+                             start_datetime=WEEK_MONDAY + timedelta(hours=7), duration_hours=2),
+        CreateCascadeRequest(work_center_id="wc-armado", product_id="pt-a",
+                             start_datetime=WEEK_MONDAY + timedelta(hours=8), duration_hours=1.5),
+    ]
+
+
+def planning_order(items):
+    return sorted(range(len(items)), key=lambda i: (items[i].start_datetime, i))
+
+
+def canonical_state(supabase):
+    """production_schedules without generated ids (sources referenced by key)."""
+    rows = supabase.tables["production_schedules"]
+
+    def key(row):
+        if row["id"].startswith("existing-"):
+            return row["id"]
+        return (row["production_order_number"], row["resource_id"], row["batch_number"])
+
+    by_id = {row["id"]: row for row in rows}
+    state = {}
+    for row in rows:
+        source = by_id.get(row.get("cascade_source_id"))
+        state[key(row)] = (
+            parse_datetime_str(row["start_date"]),
+            parse_datetime_str(row["end_date"]),
+            key(source) if source else None,
+            row.get("quantity"),
+        )
+    return state
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestCascadeBatch(unittest.TestCase):
+
+    def create_one_by_one(self, items):
+        supabase = FakeSupabase(make_plant())
+        master_data = load_cascade_master_data(supabase, [item.product_id for item in items])
+        for index in planning_order(items):
+            run(create_cascade_with_dependencies(supabase, items[index], master_data))
+        return supabase
+
+    def create_batch(self, items):
+        supabase = FakeSupabase(make_plant())
+        master_data = load_cascade_master_data(supabase, [item.product_id for item in items])
+        window = calculate_context_window(*get_production_week(items[0].start_datetime))
+        context = CascadePlanningContext(*window, rest_lookup=master_data.get_arrival_rest_hours)
+        context.reserve_order_numbers(reserve_production_order_numbers(
+            supabase, sum(master_data.count_cascade_orders(item.product_id) for item in items)
+        ))
+        supabase.queries.clear()
+        results = {}
+        for index in planning_order(items):
+            results[index] = run(create_cascade_with_dependencies(
+                supabase, items[index], master_data, context
+            ))
+        cascade_bulk_upsert_batch(
+            supabase,
+            schedules_to_move=context.pending_moves(),
+            schedules_to_insert=context.pending_inserts(),
+            parking_zone_start=context.window_end + timedelta(days=30),
+            parking_zone_end=context.window_end + timedelta(days=32),
+        )
+        return supabase, context, results
+
+    def test_matches_one_by_one_creation(self):
+        items = make_items()
+        expected = canonical_state(self.create_one_by_one(items))
+        batch_supabase, _, _ = self.create_batch(items)
+        self.assertEqual(canonical_state(batch_supabase), expected)
+
+    def test_existing_schedules_are_moved(self):
+        _, context, _ = self.create_batch(make_items())
+        moved_ids = {m["id"] for m in context.pending_moves()}
+        self.assertTrue(moved_ids)
+        self.assertTrue(all(i.startswith("existing-") for i in moved_ids))
+
+    def test_single_flush_rpc(self):
+        supabase, _, _ = self.create_batch(make_items())
+        writes = [
+            name for name in supabase.rpcs
+            if name not in ("reserve_production_order_numbers", "get_work_center_queue_context")
+        ]
+        self.assertEqual(writes, ["cascade_bulk_upsert_batch"])
+
+    def test_queues_loaded_once_per_work_center(self):
+        items = make_items()
+        supabase, _, _ = self.create_batch(items)
+        batch_reads = supabase.rpcs.count("get_work_center_queue_context")
+        one_by_one = self.create_one_by_one(items)
+        self.assertEqual(batch_reads, 4)  # armado, horno, empaque, masa
+        self.assertNotIn("shift_blocking", supabase.queries)
+        self.assertGreater(one_by_one.rpcs.count("get_work_center_queue_context"), batch_reads)
+
+    def test_preloaded_queues_single_rpc(self):
+        items = make_items()
+        supabase = FakeSupabase(make_plant())
+        master_data = load_cascade_master_data(supabase, [item.product_id for item in items])
+        window = calculate_context_window(*get_production_week(items[0].start_datetime))
+        context = CascadePlanningContext(*window, rest_lookup=master_data.get_arrival_rest_hours)
+        run(get_work_center_queues(supabase, list(master_data.work_centers), *window, context))
+        for index in planning_order(items):
+            run(create_cascade_with_dependencies(supabase, items[index], master_data, context))
+        self.assertEqual(supabase.rpcs.count("get_work_center_queue_context"), 1)
+
+    def test_rollback_discards_failed_item(self):
+        supabase = FakeSupabase(make_plant())
+        master_data = load_cascade_master_data(supabase, ["pt-a"])
+        window = calculate_context_window(*get_production_week(WEEK_MONDAY))
+        context = CascadePlanningContext(*window, rest_lookup=master_data.get_arrival_rest_hours)
+
+        run(create_cascade_with_dependencies(supabase, make_items()[0], master_data, context))
+        inserts_before = [dict(row) for row in context.pending_inserts()]
+        moves_before = context.pending_moves()
+
+        checkpoint = context.checkpoint()
+        run(create_cascade_with_dependencies(supabase, make_items()[2], master_data, context))
+        self.assertGreater(len(context.pending_inserts()), len(inserts_before))
+        context.rollback(checkpoint)
+
+        self.assertEqual(context.pending_inserts(), inserts_before)
+        self.assertEqual(context.pending_moves(), moves_before)
+
+    def test_rollback_reuses_order_numbers(self):
+        context = CascadePlanningContext(*calculate_context_window(*get_production_week(WEEK_MONDAY)))
+        context.reserve_order_numbers([7, 8, 9])
+        self.assertEqual(context.take_order_number(), 7)
+        checkpoint = context.checkpoint()
+        self.assertEqual(context.take_order_number(), 8)
+        context.rollback(checkpoint)
+        self.assertEqual([context.take_order_number() for _ in range(3)], [8, 9, None])
+
+    def test_handler_keeps_queries_off_the_event_loop(self):
+        supabase = FakeSupabase(make_plant())
+        with patch.object(cascade, "get_supabase_client", return_value=supabase), \
+                patch.object(cascade, "get_bom_graph", return_value=None):
+            response = run(cascade.create_cascade_batch(
+                CreateCascadeBatchRequest(items=make_items()), authorization=None
+            ))
+
+        self.assertEqual([item.error for item in response.items], [None, None, None])
+        self.assertIn("cascade_bulk_upsert_batch", supabase.rpcs)
+        self.assertEqual(supabase.rpcs.count("reserve_production_order_numbers"), 1)
+        self.assertNotIn("get_next_production_order_number", supabase.rpcs)
+        self.assertTrue(supabase.threads)
+        self.assertNotIn(threading.main_thread(), supabase.threads)
+
+
+class TestWorkCenterQueueLoader(unittest.TestCase):
+
+    def test_matches_per_work_center_queries(self):
+        # Create cascades first so schedules have sources and BOM rest times
+        supabase = TestCascadeBatch().create_one_by_one(make_items())
+        window = calculate_context_window(*get_production_week(WEEK_MONDAY))
+        wc_ids = ["wc-armado", "wc-horno", "wc-empaque", "wc-masa", "wc-unused"]
+
+        supabase.rpcs.clear()
+        loaded = run(load_work_center_queues(supabase, wc_ids, *window))
+        self.assertEqual(supabase.rpcs, ["get_work_center_queue_context"])
+        self.assertEqual(list(loaded), wc_ids)
+
+        def by_id(schedules):
+            return {schedule["id"]: schedule for schedule in schedules}
+
+        for wc_id in wc_ids:
+            expected = run(get_existing_schedules_with_arrival(supabase, wc_id, *window))
+            self.assertEqual(by_id(loaded[wc_id]["existing_schedules"]), by_id(expected))
+            self.assertEqual(
+                list(loaded[wc_id]["blocked_periods"]),
+                list(run(get_blocked_shifts(supabase, wc_id, *window))),
+            )
+        rested = [
+            s for s in loaded["wc-horno"]["existing_schedules"] if s.get("arrival_rest_hours")
+        ]
+        self.assertTrue(rested)
+
+    def test_empty_request_skips_rpc(self):
+        supabase = FakeSupabase(make_plant())
+        self.assertEqual(run(load_work_center_queues(supabase, [], WEEK_MONDAY, WEEK_MONDAY)), {})
+        self.assertEqual(supabase.rpcs, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
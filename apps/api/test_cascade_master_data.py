@@ -0,0 +1,242 @@
+"""
+Tests for the cascade master data snapshot.
+
+Verifies that:
+1. The loader walks the BOM and pulls routes/productivity for every reachable PP
+2. Lookups match the semantics of the per-row query helpers in cascade.py
+3. The cascade helpers serve from the snapshot without touching Supabase
+4. The process cache honours TTL and invalidation
+5. Loading the closure from the BOM graph gives the same snapshot without BOM queries
+"""
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+
+from app.api.routes.production import master_data as md
+from app.api.routes.production.bom_graph import invalidate_bom_graph, load_bom_graph
+from app.api.routes.production.cascade import (
+    get_product_route,
+    get_productivity,
+    get_pp_ingredients,
+    get_rest_time_hours,
+    get_rest_time_from_route,
+)
+
+
+# ---------------------------------------------------------------------------
+# Helper: in-memory Supabase client that honours eq/in_ filters
+# ---------------------------------------------------------------------------
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._filters = []
+        self._range = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, column, value):
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self._filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def execute(self):
+        self._client.queries.append(self._table)
+        rows = [r for r in self._client.tables.get(self._table, []) if all(f(r) for f in self._filters)]
+        if self._range:
+            rows = rows[self._range[0]:self._range[1] + 1]
+        result = MagicMock()
+        result.data = rows
+        return result
+
+
+class FakeSupabase:
+    def __init__(self, tables):
+        self.tables = tables
+        self.queries = []
+
+    def schema(self, name):
+        return self
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+WC_ARMADO = {"id": "wc-armado", "name": "Armado", "operation_id": "op-armado"}
+WC_HORNO = {"id": "wc-horno", "name": "Horno", "operation_id": "op-horno"}
+WC_MASA = {"id": "wc-masa", "name": "Amasado", "operation_id": "op-masa"}
+
+
+def make_plant():
+    return {
+        "products": [
+            {"id": "pt", "name": "Croissant", "category": "PT", "lote_minimo": 100},
+            {"id": "pp1", "name": "Masa", "category": "PP", "lote_minimo": 50},
+            {"id": "pp2", "name": "Empaste", "category": "PP", "lote_minimo": 20},
+            {"id": "mp", "name": "Harina", "category": "MP", "lote_minimo": None},
+        ],
+        "bill_of_materials": [
+            {"product_id": "pt", "material_id": "pp1", "quantity_needed": 0.5,
+             "operation_id": "op-armado", "tiempo_reposo_horas": 2, "is_active": True},
+            {"product_id": "pt", "material_id": "mp", "quantity_needed": 0.1,
+             "operation_id": "op-horno", "tiempo_reposo_horas": None, "is_active": True},
+            {"product_id": "pp1", "material_id": "pp2", "quantity_needed": 0.2,
+             "operation_id": "op-masa", "tiempo_reposo_horas": 1, "is_active": True},
+        ],
+        "production_routes": [
+            {"product_id": "pt", "work_center_id": "wc-horno", "sequence_order": 2,
+             "is_active": True, "tiempo_reposo_horas": 0, "work_center": WC_HORNO},
+            {"product_id": "pt", "work_center_id": "wc-armado", "sequence_order": 1,
+             "is_active": True, "tiempo_reposo_horas": 0.5, "work_center": WC_ARMADO},
+            {"product_id": "pp1", "work_center_id": "wc-masa", "sequence_order": 1,
+             "is_active": True, "tiempo_reposo_horas": 3, "work_center": WC_MASA},
+            {"product_id": "pp2", "work_center_id": "wc-masa", "sequence_order": 1,
+             "is_active": False, "tiempo_reposo_horas": 4, "work_center": WC_MASA},
+        ],
+        "production_productivity": [
+            {"product_id": "pt", "work_center_id": "wc-armado", "units_per_hour": 120},
+            {"product_id": "pt", "work_center_id": None, "operation_id": "op-horno", "units_per_hour": 300},
+            {"product_id": "pp1", "work_center_id": "wc-masa", "units_per_hour": 60},
+        ],
+        "product_work_center_mapping": [
+            {"product_id": "pt", "operation_id": "op-armado", "work_center_id": "wc-armado",
+             "work_center": WC_ARMADO},
+        ],
+    }
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestLoadCascadeMasterData(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase = FakeSupabase(make_plant())
+        self.snapshot = md.load_cascade_master_data(self.supabase, ["pt"])
+
+    def test_closure_includes_nested_pp(self):
+        self.assertEqual(self.snapshot.product_ids, {"pt", "pp1", "pp2"})
+        self.assertFalse(self.snapshot.covers("mp"))
+
+    def test_query_count_is_independent_of_route_length(self):
+        # products + 3 BOM levels (+ material lookups) + routes/productivity/mappings
+        self.assertLessEqual(len(self.supabase.queries), 10)
+
+    def test_route_is_active_and_ordered(self):
+        route = self.snapshot.get_product_route("pt")
+        self.assertEqual([r["work_center_id"] for r in route], ["wc-armado", "wc-horno"])
+        self.assertEqual(self.snapshot.get_product_route("pp2"), [])
+        self.assertEqual(self.snapshot.work_centers["wc-masa"]["name"], "Amasado")
+
+    def test_productivity_falls_back_to_operation(self):
+        self.assertEqual(self.snapshot.get_productivity("pt", "wc-armado")["units_per_hour"], 120)
+        self.assertIsNone(self.snapshot.get_productivity("pt", "wc-horno"))
+        self.assertEqual(
+            self.snapshot.get_productivity("pt", "wc-horno", "op-horno")["units_per_hour"], 300
+        )
+
+    def test_rest_times(self):
+        self.assertEqual(self.snapshot.get_rest_time_hours("pt", "op-armado"), 2.0)
+        self.assertEqual(self.snapshot.get_rest_time_hours("pt", "op-horno"), 0)
+        self.assertEqual(self.snapshot.get_rest_time_hours("pt", None), 0)
+        self.assertEqual(self.snapshot.get_rest_time_from_route("pp1", "wc-masa"), 3.0)
+        # Inactive route rows still provide rest time (matches get_rest_time_from_route)
+        self.assertEqual(self.snapshot.get_rest_time_from_route("pp2", "wc-masa"), 4.0)
+
+    def test_pp_ingredients_only_returns_pp(self):
+        ingredients = self.snapshot.get_pp_ingredients("pt")
+        self.assertEqual(len(ingredients), 1)
+        self.assertEqual(ingredients[0]["material"]["id"], "pp1")
+        self.assertEqual(ingredients[0]["quantity_needed"], 0.5)
+        self.assertEqual(ingredients[0]["material"]["lote_minimo"], 50)
+
+
+class TestCascadeHelpersUseSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = md.load_cascade_master_data(FakeSupabase(make_plant()), ["pt"])
+        self.live = MagicMock()
+
+    def test_helpers_do_not_query(self):
+        route = run(get_product_route(self.live, "pt", self.snapshot))
+        productivity = run(get_productivity(self.live, "pp1", "wc-masa", master_data=self.snapshot))
+        ingredients = run(get_pp_ingredients(self.live, "pp1", self.snapshot))
+        rest_bom = run(get_rest_time_hours(self.live, "pp1", "op-masa", self.snapshot))
+        rest_route = run(get_rest_time_from_route(self.live, "pp1", "wc-masa", self.snapshot))
+
+        self.assertEqual(len(route), 2)
+        self.assertEqual(productivity["units_per_hour"], 60)
+        self.assertEqual(ingredients[0]["material"]["id"], "pp2")
+        self.assertEqual(rest_bom, 1.0)
+        self.assertEqual(rest_route, 3.0)
+        self.live.schema.assert_not_called()
+        self.live.table.assert_not_called()
+
+
+class TestLoadFromBomGraph(unittest.TestCase):
+
+    def setUp(self):
+        supabase = FakeSupabase(make_plant())
+        self.walked = md.load_cascade_master_data(supabase, ["pt"])
+        graph = load_bom_graph(supabase)
+        supabase.queries.clear()
+        self.from_graph = md.load_cascade_master_data(supabase, ["pt"], graph)
+        self.queries = supabase.queries
+
+    def test_same_closure_and_lookups(self):
+        self.assertEqual(self.from_graph.product_ids, self.walked.product_ids)
+        for product_id in ("pt", "pp1", "pp2"):
+            self.assertEqual(self.from_graph.get_pp_ingredients(product_id),
+                             self.walked.get_pp_ingredients(product_id))
+            self.assertEqual(self.from_graph.get_product_route(product_id),
+                             self.walked.get_product_route(product_id))
+        self.assertEqual(self.from_graph.get_rest_time_hours("pt", "op-armado"), 2.0)
+
+    def test_no_bom_queries(self):
+        self.assertNotIn("bill_of_materials", self.queries)
+        self.assertNotIn("products", self.queries)
+
+
+class TestMasterDataCache(unittest.TestCase):
+
+    def setUp(self):
+        md.invalidate_cascade_master_data()
+        invalidate_bom_graph()
+        self.supabase = FakeSupabase(make_plant())
+
+    def tearDown(self):
+        md.invalidate_cascade_master_data()
+        invalidate_bom_graph()
+
+    def test_cached_until_invalidated(self):
+        first = md.get_cascade_master_data(self.supabase, "pt")
+        self.assertIs(md.get_cascade_master_data(self.supabase, "pt"), first)
+
+        # Editing a nested PP drops every snapshot that includes it
+        self.assertEqual(md.invalidate_cascade_master_data("pp2"), 1)
+        self.assertIsNot(md.get_cascade_master_data(self.supabase, "pt"), first)
+
+    def test_unrelated_invalidation_keeps_snapshot(self):
+        first = md.get_cascade_master_data(self.supabase, "pt")
+        self.assertEqual(md.invalidate_cascade_master_data("other"), 0)
+        self.assertIs(md.get_cascade_master_data(self.supabase, "pt"), first)
+
+    def test_expired_snapshot_is_reloaded(self):
+        first = md.get_cascade_master_data(self.supabase, "pt")
+        self.assertIsNot(md.get_cascade_master_data(self.supabase, "pt", ttl_seconds=-1), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
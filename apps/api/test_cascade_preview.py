@@ -0,0 +1,191 @@
+"""
+Tests for the in-memory cascade preview engine.
+
+Verifies that:
+1. compute_cascade_preview matches generate_cascade_schedules(create_in_db=False)
+   on random plants (sequential, hybrid and parallel WCs, blocked shifts,
+   existing queues with cascade sources)
+2. compute_cascade_preview does not touch Supabase
+3. Preview inputs are cached per product/window in a bounded cache and
+   dropped on invalidation
+"""
+
+import asyncio
+import random
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.api.routes.production import preview_engine
+from app.api.routes.production.cascade import (
+    calculate_context_window,
+    generate_cascade_schedules,
+    get_production_week,
+)
+from app.api.routes.production.master_data import load_cascade_master_data
+from app.core.cache import TTLCache
+from test_cascade_batch import FakeSupabase
+
+WEEK_MONDAY = datetime(2026, 1, 5)
+
+WORK_CENTERS = [
+    {"id": "wc-armado", "name": "Armado", "operation_id": "op-armado"},
+    {"id": "wc-fermento", "name": "Fermentacion", "operation_id": "op-fermento",
+     "permite_paralelo_por_referencia": True},
+    {"id": "wc-horno", "name": "Horno", "operation_id": "op-horno",
+     "tipo_capacidad": "carros", "capacidad_maxima_carros": 6},
+    {"id": "wc-empaque", "name": "Empaque", "operation_id": "op-empaque"},
+]
+
+
+def random_plant(rng):
+    routes, productivity, bom = [], [], []
+    for order, wc in enumerate(WORK_CENTERS, start=1):
+        routes.append({"product_id": "pt", "work_center_id": wc["id"], "sequence_order": order,
+                       "is_active": True, "tiempo_reposo_horas": rng.choice([0, 0.5]), "work_center": wc})
+        productivity.append({"product_id": "pt", "work_center_id": wc["id"],
+                             "units_per_hour": rng.choice([60, 90, 150, 240]),
+                             "usa_tiempo_fijo": rng.random() < 0.15, "tiempo_minimo_fijo": 45})
+        if rng.random() < 0.5:
+            bom.append({"product_id": "pt", "material_id": "mp", "quantity_needed": 1,
+                        "operation_id": wc["operation_id"], "tiempo_reposo_horas": rng.choice([0.25, 1]),
+                        "is_active": True})
+
+    schedules = []
+    for wc in WORK_CENTERS:
+        for i in range(rng.randrange(0, 15)):
+            start = WEEK_MONDAY + timedelta(minutes=rng.randrange(0, 4 * 24 * 60))
+            source = rng.choice(schedules) if schedules and rng.random() < 0.4 else None
+            schedules.append({
+                "id": f"{wc['id']}-{i}", "resource_id": wc["id"], "product_id": "pt",
+                "quantity": 10, "start_date": start.isoformat(),
+                "end_date": (start + timedelta(minutes=rng.choice([30, 60, 90]))).isoformat(),
+                "cascade_source_id": source["id"] if source else None, "cascade_level": 1,
+                "batch_number": 1, "total_batches": 1, "batch_size": 10, "status": "scheduled",
+                "production_order_number": rng.choice([1, 2, 3]), "week_plan_id": None,
+            })
+
+    blocked = []
+    for wc in WORK_CENTERS:
+        for day in range(7):
+            for shift in (1, 2, 3):
+                if rng.random() < 0.15:
+                    blocked.append({"work_center_id": wc["id"],
+                                    "date": (WEEK_MONDAY + timedelta(days=day)).strftime("%Y-%m-%d"),
+                                    "shift_number": shift})
+
+    rng.shuffle(routes)
+    return {
+        "products": [
+            {"id": "pt", "name": "Croissant", "category": "PT", "lote_minimo": rng.choice([40, 100, 150])},
+            {"id": "mp", "name": "Harina", "category": "MP", "lote_minimo": None},
+        ],
+        "bill_of_materials": bom,
+        "production_routes": routes,
+        "production_productivity": productivity,
+        "product_work_center_mapping": [],
+        "work_centers": WORK_CENTERS,
+        "shift_blocking": blocked,
+        "work_center_staffing": [],
+        "production_schedules": schedules,
+    }
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def comparable(result):
+    return {
+        "total_units": result["total_units"],
+        "num_batches": result["num_batches"],
+        "cascade_start": result["cascade_start"],
+        "cascade_end": result["cascade_end"],
+        "work_centers": [wc.model_dump() for wc in result["work_centers"]],
+    }
+
+
+def load_inputs(supabase, start):
+    master_data = load_cascade_master_data(supabase, ["pt"])
+    window = calculate_context_window(*get_production_week(start))
+    inputs = run(preview_engine.load_cascade_preview_inputs(
+        supabase, master_data.get_product("pt"), master_data, *window
+    ))
+    return master_data, inputs
+
+
+class TestComputeCascadePreview(unittest.TestCase):
+
+    def test_matches_generate_cascade_schedules(self):
+        rng = random.Random(21)
+        for _ in range(60):
+            supabase = FakeSupabase(random_plant(rng))
+            start = WEEK_MONDAY + timedelta(hours=rng.randrange(0, 72), minutes=rng.choice([0, 20, 45]))
+            master_data, inputs = load_inputs(supabase, start)
+            week_start, week_end = get_production_week(start)
+            context_start, context_end = calculate_context_window(week_start, week_end)
+
+            for duration_hours, staff_count in ((1, 1), (2.5, 2), (6, 3)):
+                expected = run(generate_cascade_schedules(
+                    supabase=supabase,
+                    product_id="pt",
+                    product_name="Croissant",
+                    start_datetime=start,
+                    duration_hours=duration_hours,
+                    staff_count=staff_count,
+                    lote_minimo=inputs.lote_minimo,
+                    production_route=[r for r in master_data.get_product_route("pt")],
+                    create_in_db=False,
+                    week_start_datetime=week_start,
+                    week_end_datetime=week_end,
+                    context_start_datetime=context_start,
+                    context_end_datetime=context_end,
+                    master_data=master_data,
+                ))
+                actual = preview_engine.compute_cascade_preview(inputs, start, duration_hours, staff_count)
+                self.assertEqual(comparable(actual), comparable(expected))
+
+    def test_compute_does_not_query(self):
+        supabase = FakeSupabase(random_plant(random.Random(4)))
+        _, inputs = load_inputs(supabase, WEEK_MONDAY + timedelta(hours=8))
+        supabase.queries.clear()
+        preview_engine.compute_cascade_preview(inputs, WEEK_MONDAY + timedelta(hours=9), 3, 2)
+        self.assertEqual(supabase.queries, [])
+
+
+class TestPreviewInputsCache(unittest.TestCase):
+
+    def setUp(self):
+        preview_engine.invalidate_cascade_preview_inputs()
+        self.supabase = FakeSupabase(random_plant(random.Random(8)))
+        self.master_data = load_cascade_master_data(self.supabase, ["pt"])
+        self.window = calculate_context_window(*get_production_week(WEEK_MONDAY + timedelta(hours=8)))
+
+    def get(self):
+        return run(preview_engine.get_cascade_preview_inputs(
+            self.supabase, self.master_data.get_product("pt"), self.master_data, *self.window
+        ))
+
+    def test_second_preview_hits_cache(self):
+        first = self.get()
+        self.supabase.queries.clear()
+        self.assertIs(self.get(), first)
+        self.assertEqual(self.supabase.queries, [])
+
+    def test_invalidation_reloads(self):
+        first = self.get()
+        self.assertEqual(preview_engine.invalidate_cascade_preview_inputs(), 1)
+        self.assertIsNot(self.get(), first)
+
+    def test_cache_is_bounded(self):
+        with patch.object(preview_engine, "_preview_inputs_cache", TTLCache(max_entries=2, ttl_seconds=60)):
+            for week in range(3):
+                self.window = calculate_context_window(
+                    *get_production_week(WEEK_MONDAY + timedelta(weeks=week, hours=8))
+                )
+                self.get()
+            self.assertEqual(len(preview_engine._preview_inputs_cache), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,350 @@
+"""
+Tests for batched embeddings and the bulk RAG syncs built on them.
+
+Verifies that:
+1. chunk_by_tokens keeps order and respects the token and input limits
+2. embed_batch splits texts into requests, keeps at most
+   embedding_batch_concurrency of them in flight and retries only the
+   request that failed
+3. sync_all_products_to_rag embeds the catalog in a few requests, purges
+   only after embedding succeeded and inserts the entries in chunks
+4. sync_all_clients_to_rag reuses existing entry ids, drops stale razón
+   social entries, warms every client's alias / branch embeddings and
+   counts a chunk that failed to embed as errors instead of aborting
+5. embed_product_queries pre-embeds an order so per-line matching makes no
+   further OpenAI calls
+"""
+
+import asyncio
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from tenacity import wait_none
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.core.config import get_settings  # noqa: E402
+from app.services import embeddings, rag_sync  # noqa: E402
+from app.services.embeddings import chunk_by_tokens, embed_batch, estimate_tokens  # noqa: E402
+from test_embedding_cache import EmbeddingTestCase, fake_vector  # noqa: E402
+
+
+class FakeTable:
+    """Sync PostgREST query builder over a list of rows, logging writes.
+
+    Reads return at most db.max_rows rows, like PostgREST.
+    """
+
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.filters = []
+        self.write = None
+        self.ordered = False
+        self.row_limit = None
+
+    def select(self, *args):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) > value)
+        return self
+
+    def order(self, column):
+        self.ordered = True
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def insert(self, rows):
+        self.write = ("insert", rows)
+        return self
+
+    def upsert(self, rows):
+        self.write = ("upsert", rows)
+        return self
+
+    def delete(self):
+        self.write = ("delete", None)
+        return self
+
+    def execute(self):
+        rows = self.db.data.setdefault(self.name, [])
+        matching = [row for row in rows if all(f(row) for f in self.filters)]
+        if self.write is None:
+            if self.ordered:
+                matching = sorted(matching, key=lambda row: row["id"])
+            return SimpleNamespace(data=matching[:min(self.row_limit or self.db.max_rows, self.db.max_rows)])
+        op, payload = self.write
+        self.db.log.append((self.name, op, payload if payload is not None else matching))
+        if op == "delete":
+            self.db.data[self.name] = [row for row in rows if row not in matching]
+        else:
+            ids = {row["id"] for row in payload}
+            self.db.data[self.name] = [row for row in rows if row["id"] not in ids] + list(payload)
+        return SimpleNamespace(data=payload)
+
+
+class FakeDatabase:
+
+    def __init__(self, **tables):
+        self.data = tables
+        self.log = []
+        self.max_rows = 1000
+
+    def table(self, name):
+        return FakeTable(self, name)
+
+    def rpc(self, name, params):
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=[
+            {"content": "Pan Tajado", "similarity": 0.95, "metadata": {"product_id": "p1"}}
+        ]))
+
+    def writes(self, table):
+        return [(op, payload) for name, op, payload in self.log if name == table]
+
+
+def batch_settings(**overrides):
+    return get_settings().model_copy(update=overrides)
+
+
+class TestChunking(unittest.TestCase):
+
+    def test_chunk_by_tokens(self):
+        texts = [f"PRODUCTO {i}" for i in range(10)] + ["X" * 300] + ["Y"]
+        per_text = estimate_tokens("PRODUCTO 0")
+        chunks = chunk_by_tokens(texts, max_tokens=per_text * 4, max_inputs=3)
+
+        self.assertEqual([t for chunk in chunks for t in chunk], texts)
+        self.assertTrue(all(len(chunk) <= 3 for chunk in chunks))
+        # The oversized text travels alone
+        self.assertIn(["X" * 300], chunks)
+        self.assertEqual(chunk_by_tokens([], 100, 10), [])
+
+
+class TestEmbedBatch(EmbeddingTestCase):
+
+    def test_bounded_concurrency_and_order(self):
+        in_flight = peak = 0
+        create = self.openai.client.embeddings.create
+
+        async def slow_create(input, model):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return await create(input=input, model=model)
+
+        self.openai.client.embeddings.create = slow_create
+        texts = [f"texto {i}" for i in range(45)]
+        settings = batch_settings(embedding_batch_max_inputs=10, embedding_batch_concurrency=2)
+        with patch.object(embeddings, "get_settings", return_value=settings):
+            vectors = asyncio.run(embed_batch(texts))
+
+        self.assertEqual([len(r) for r in self.openai.requests], [10, 10, 10, 10, 5])
+        self.assertEqual(peak, 2)
+        self.assertEqual(vectors, [fake_vector(t) for t in texts])
+
+    def test_retries_only_failed_chunk(self):
+        create = self.openai.client.embeddings.create
+        failures = []
+
+        async def flaky_create(input, model):
+            if input[0] == "texto 10" and not failures:
+                failures.append(input)
+                raise RuntimeError("429 Too Many Requests")
+            return await create(input=input, model=model)
+
+        self.openai.client.embeddings.create = flaky_create
+        settings = batch_settings(embedding_batch_max_inputs=10)
+        with patch.object(embeddings, "get_settings", return_value=settings), \
+                patch.object(embeddings._embed_chunk.retry, "wait", wait_none()):
+            vectors = asyncio.run(embed_batch([f"texto {i}" for i in range(30)]))
+
+        self.assertEqual(len(vectors), 30)
+        self.assertEqual(len(failures), 1)
+        # Each chunk answered once: the other two were not re-sent
+        self.assertEqual(len(self.openai.requests), 3)
+        self.assertEqual(self.openai.requests[-1], failures[0])
+
+
+class BulkSyncTestCase(EmbeddingTestCase):
+
+    def use_database(self, **tables):
+        self.db = FakeDatabase(**tables)
+        p = patch.object(rag_sync, "get_supabase_client", return_value=self.db)
+        p.start()
+        self.addCleanup(p.stop)
+
+
+class TestSyncAllProducts(BulkSyncTestCase):
+
+    def setUp(self):
+        super().setUp()
+        products = [
+            {"id": f"p{i}", "name": f"PRODUCTO {i}", "description": "Congelado" if i % 2 else None,
+             "weight": "100 g", "is_active": True, "category": "PT"}
+            for i in range(450)
+        ]
+        products.append({"id": "mp1", "name": "HARINA", "weight": None, "is_active": True, "category": "MP"})
+        self.use_database(products=products, productos_rag=[{"id": "old", "content": "Viejo"}])
+
+    def test_bulk_sync(self):
+        result = asyncio.run(rag_sync.sync_all_products_to_rag())
+
+        self.assertEqual(result, {"status": "completed", "total": 450, "synced": 450, "errors": 0, "purged": True})
+        self.assertEqual(len(self.openai.requests), 1)
+        writes = self.db.writes("productos_rag")
+        self.assertEqual([op for op, _ in writes], ["delete", "insert", "insert", "insert"])
+        self.assertEqual([len(rows) for _, rows in writes[1:]], [200, 200, 50])
+        row = writes[1][1][1]
+        self.assertEqual(row["content"], "PRODUCTO 1 | Congelado")
+        self.assertEqual(row["metadata"], {"product_id": "p1", "source": "api_sync", "weight_grams": 100.0})
+        self.assertEqual(len(self.db.data["productos_rag"]), 450)
+
+        # A re-sync is served entirely from the embedding cache
+        asyncio.run(rag_sync.sync_all_products_to_rag())
+        self.assertEqual(len(self.openai.requests), 1)
+
+    def test_reads_past_max_rows(self):
+        self.db.max_rows = 100
+        with patch.object(rag_sync, "RAG_READ_PAGE_SIZE", 60):
+            result = asyncio.run(rag_sync.sync_all_products_to_rag())
+        self.assertEqual((result["total"], result["synced"]), (450, 450))
+
+    def test_embedding_failure_keeps_old_entries(self):
+        async def failing_create(input, model):
+            raise RuntimeError("OpenAI down")
+
+        self.openai.client.embeddings.create = failing_create
+        with patch.object(embeddings._embed_chunk.retry, "wait", wait_none()):
+            with self.assertRaises(Exception):
+                asyncio.run(rag_sync.sync_all_products_to_rag())
+        self.assertEqual(self.db.writes("productos_rag"), [])
+
+
+class TestSyncAllClients(BulkSyncTestCase):
+
+    def test_bulk_sync(self):
+        self.use_database(
+            clients=[
+                {"id": "c1", "name": "Cafe Uno", "razon_social": "Cafe Uno SAS"},
+                {"id": "c2", "name": "Hotel Dos", "razon_social": "HOTEL DOS"},
+                {"id": "c3", "name": "Club Tres", "razon_social": None},
+            ],
+            clientes_rag=[
+                {"id": "r1", "metadata": {"client_id": "c1", "type": "name"}},
+                {"id": "r2", "metadata": {"client_id": "c2", "type": "razon_social"}},
+                {"id": "r9", "metadata": {"client_id": "gone", "type": "razon_social"}},
+            ],
+            product_aliases=[{"id": 1, "client_id": "c1", "client_alias": "PAN ESPECIAL"}],
+            branches=[
+                {"id": "b1", "client_id": "c1", "name": "Norte", "address": "Calle 1"},
+                {"id": "b2", "client_id": "c1", "name": "Sur", "address": "Calle 2"},
+                {"id": "b3", "client_id": "c2", "name": "Unica", "address": "Calle 3"},
+            ],
+        )
+        result = asyncio.run(rag_sync.sync_all_clients_to_rag())
+
+        self.assertEqual(result, {"status": "completed", "total": 3, "synced": 3, "errors": 0})
+        (op, rows), (delete_op, deleted) = self.db.writes("clientes_rag")
+        self.assertEqual((op, delete_op), ("upsert", "delete"))
+        by_key = {(r["metadata"]["client_id"], r["metadata"]["type"]): r for r in rows}
+        self.assertEqual(sorted(by_key), [("c1", "name"), ("c1", "razon_social"), ("c2", "name"), ("c3", "name")])
+        self.assertEqual(by_key[("c1", "name")]["id"], "r1")
+        self.assertEqual(by_key[("c1", "razon_social")]["content"], "Cafe Uno SAS")
+        # c2's razón social now equals its name; unknown clients are left alone
+        self.assertEqual([r["id"] for r in deleted], ["r2"])
+
+        # Entries, then aliases and multi-branch client branches
+        self.assertEqual(len(self.openai.requests), 2)
+        self.assertEqual(self.openai.requests[1], ["PAN ESPECIAL", "Norte | Calle 1", "Sur | Calle 2"])
+
+    def test_reads_past_max_rows(self):
+        clients = [{"id": f"c{i:03d}", "name": f"Cliente {i}", "razon_social": None} for i in range(23)]
+        self.use_database(
+            clients=clients,
+            clientes_rag=[{"id": f"r{i:03d}", "metadata": {"client_id": f"c{i:03d}", "type": "name"}}
+                          for i in range(23)],
+            product_aliases=[{"id": i, "client_alias": f"ALIAS {i}"} for i in range(12)],
+            branches=[],
+        )
+        self.db.max_rows = 7
+        with patch.object(rag_sync, "RAG_READ_PAGE_SIZE", 5):
+            result = asyncio.run(rag_sync.sync_all_clients_to_rag())
+
+        self.assertEqual(result["synced"], 23)
+        # Every entry keeps its id: no duplicates beyond the first page
+        (_, rows), = self.db.writes("clientes_rag")
+        self.assertEqual(sorted(r["id"] for r in rows), [f"r{i:03d}" for i in range(23)])
+        self.assertEqual(len(self.db.data["clientes_rag"]), 23)
+        self.assertEqual(len(self.openai.requests[1]), 12)
+
+    def test_embedding_failure_counts_chunk_clients(self):
+        self.use_database(
+            clients=[
+                {"id": "c1", "name": "Cafe Uno", "razon_social": "   "},
+                {"id": "c2", "name": "Hotel Dos", "razon_social": None},
+                {"id": "c3", "name": "Club Tres", "razon_social": None},
+            ],
+            clientes_rag=[], product_aliases=[], branches=[],
+        )
+        create = self.openai.client.embeddings.create
+
+        async def failing_create(input, model):
+            if "Hotel Dos" in input:
+                raise RuntimeError("OpenAI down")
+            return await create(input, model)
+
+        self.openai.client.embeddings.create = failing_create
+        with patch.object(rag_sync, "RAG_WRITE_CHUNK_SIZE", 1), \
+                patch.object(embeddings._embed_chunk.retry, "wait", wait_none()):
+            result = asyncio.run(rag_sync.sync_all_clients_to_rag())
+
+        self.assertEqual(result, {"status": "completed", "total": 3, "synced": 2, "errors": 1})
+        # A blank razón social is not an entry; the other chunks are still written
+        written = [row["metadata"] for _, rows in self.db.writes("clientes_rag") for row in rows]
+        self.assertEqual(written, [{"client_id": "c1", "type": "name", "source": "api_sync"},
+                                   {"client_id": "c3", "type": "name", "source": "api_sync"}])
+
+
+class TestEmbedProductQueries(BulkSyncTestCase):
+
+    def test_order_lines_embedded_once(self):
+        self.use_database(
+            product_aliases=[{"client_id": "c1", "product_id": f"p{i}", "client_alias": f"ALIAS {i}",
+                              "real_product_name": f"Producto {i}"} for i in range(20)],
+        )
+        lines = [f"PAN LINEA {i} 100 GR" for i in range(30)]
+
+        async def scenario():
+            count = await rag_sync.embed_product_queries(lines, client_id="c1")
+            matches = [await rag_sync.match_product(line, client_id="c1") for line in lines]
+            return count, matches
+
+        count, matches = asyncio.run(scenario())
+        self.assertEqual(count, 30 * 2 + 20)
+        self.assertEqual(len(self.openai.requests), 1)
+        self.assertTrue(all(matches))
+
+
+if __name__ == "__main__":
+    unittest.main()
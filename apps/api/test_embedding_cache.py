@@ -0,0 +1,202 @@
+"""
+Tests for the content-hash embedding cache.
+
+Verifies that:
+1. Texts are normalized and deduplicated, and only texts missing from the
+   in-process LRU and the embedding_cache table reach OpenAI (in one request)
+2. Computed vectors are written back to the table and come back identical
+   (float32) from memory, from the table and from OpenAI
+3. A failing persistent cache falls through to OpenAI
+4. Matching a 30-line order for a client with 40 aliases and several
+   branches embeds each distinct text once, and nothing new after
+   warm_client_embeddings
+"""
+
+import asyncio
+import json
+import os
+import random
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.core.supabase_async import create_async_supabase_client  # noqa: E402
+from app.services import embeddings, rag_sync  # noqa: E402
+from app.services.embeddings import content_hash, get_embeddings, normalize_text  # noqa: E402
+
+
+def fake_vector(text, dims=8):
+    rng = random.Random(text)
+    return [rng.uniform(-1, 1) for _ in range(dims)]
+
+
+class FakeOpenAI:
+    """embeddings.create that records every input list."""
+
+    def __init__(self):
+        self.requests = []
+
+        async def create(input, model):
+            texts = [input] if isinstance(input, str) else list(input)
+            self.requests.append(texts)
+            data = [SimpleNamespace(index=i, embedding=fake_vector(t)) for i, t in enumerate(texts)]
+            return SimpleNamespace(data=list(reversed(data)))
+
+        self.client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+
+    @property
+    def texts(self):
+        return [t for request in self.requests for t in request]
+
+
+class FakeCacheTable:
+    """PostgREST embedding_cache table over a dict (vectors as pgvector strings)."""
+
+    def __init__(self, fail=False):
+        self.rows = {}
+        self.fail = fail
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if self.fail:
+            raise httpx.ConnectError("connection refused", request=request)
+        if request.method == "GET":
+            wanted = request.url.params["content_hash"][len("in.("):-1].split(",")
+            return httpx.Response(200, json=[
+                {"content_hash": h, "embedding": json.dumps(self.rows[h]["embedding"])}
+                for h in wanted if h in self.rows
+            ])
+        for row in json.loads(request.content):
+            self.rows.setdefault(row["content_hash"], row)
+        return httpx.Response(201, json=[])
+
+
+class EmbeddingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        embeddings._memory_cache = None
+        self.openai = FakeOpenAI()
+        self.table = FakeCacheTable()
+        patches = [
+            patch.object(embeddings, "get_openai_client", return_value=self.openai),
+            patch.object(embeddings, "get_async_supabase_client", side_effect=self.async_client),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def async_client(self):
+        return create_async_supabase_client(
+            "http://postgrest.local", "test-key",
+            max_connections=2, max_concurrency=5, timeout_seconds=5,
+            transport=httpx.MockTransport(self.table),
+        )
+
+
+class TestGetEmbeddings(EmbeddingTestCase):
+
+    def test_memory_table_and_openai(self):
+        first = asyncio.run(get_embeddings(["Pan  tajado ", "CROISSANT", "Pan tajado"]))
+        self.assertEqual(self.openai.requests, [["Pan tajado", "CROISSANT"]])
+        self.assertEqual(first[0], first[2])
+        # Stored normalized, under the model-qualified hash
+        row = self.table.rows[content_hash("Pan tajado")]
+        self.assertEqual((row["model"], row["content"]), ("text-embedding-3-small", "Pan tajado"))
+
+        # In-process hit
+        again = asyncio.run(get_embeddings(["CROISSANT"]))
+        self.assertEqual(len(self.openai.requests), 1)
+        self.assertEqual(again[0], first[1])
+
+        # Fresh process: served from the table
+        embeddings._memory_cache = None
+        from_table = asyncio.run(get_embeddings(["Pan tajado", "CROISSANT", "Torta"]))
+        self.assertEqual(self.openai.requests[1:], [["Torta"]])
+        self.assertEqual(from_table[:2], first[:2])
+
+    def test_float32_and_normalization(self):
+        vector = asyncio.run(get_embeddings(["Café"]))[0]
+        self.assertNotEqual(vector, fake_vector("Café"))
+        self.assertEqual([round(v, 6) for v in vector], [round(v, 6) for v in fake_vector("Café")])
+        self.assertEqual(normalize_text("Café\t\n  con   leche "), "Café con leche")
+        with self.assertRaises(ValueError):
+            asyncio.run(get_embeddings(["ok", "   "]))
+
+    def test_table_failure_falls_through(self):
+        self.table.fail = True
+        with self.assertLogs(embeddings.logger, level="WARNING"):
+            vectors = asyncio.run(get_embeddings(["A", "B"]))
+        self.assertEqual(len(vectors), 2)
+        self.assertEqual(self.openai.requests, [["A", "B"]])
+
+
+class FakeSyncSupabase:
+    """Sync client for rag_sync: aliases, branches and match_productos."""
+
+    def __init__(self, aliases, branches):
+        self.data = {"product_aliases": aliases, "branches": branches}
+
+    def table(self, name):
+        query = MagicMock()
+        for method in ("select", "eq", "order", "limit", "contains"):
+            getattr(query, method).return_value = query
+        query.execute.return_value = MagicMock(data=self.data.get(name, []))
+        return query
+
+    def rpc(self, name, params):
+        query = MagicMock()
+        query.execute.return_value = MagicMock(data=[
+            {"content": "Pan Tajado", "similarity": 0.95, "metadata": {"product_id": "p1"}}
+        ])
+        return query
+
+
+class TestMatching(EmbeddingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        aliases = [{"product_id": f"p{i}", "client_alias": f"ALIAS PRODUCTO {i}",
+                    "real_product_name": f"Producto {i}"} for i in range(40)]
+        branches = [{"id": f"b{i}", "name": f"Sede {i}", "address": f"Calle {i}", "is_main": i == 0}
+                    for i in range(5)]
+        supabase = FakeSyncSupabase(aliases, branches)
+        p = patch.object(rag_sync, "get_supabase_client", return_value=supabase)
+        p.start()
+        self.addCleanup(p.stop)
+        self.lines = [f"PAN LINEA {i} 100 GR" for i in range(30)]
+
+    def match_order(self):
+        async def scenario():
+            await rag_sync.match_branch("c1", "SEDE TRES", "Cra 3 # 4-5")
+            for line in self.lines:
+                await rag_sync.match_product(line, client_id="c1")
+        asyncio.run(scenario())
+
+    def test_each_text_embedded_once(self):
+        self.match_order()
+        # 40 aliases + 5 branches + branch query + per line: query and clean name
+        self.assertEqual(len(self.openai.texts), 40 + 5 + 1 + 30 * 2)
+        self.assertEqual(len(set(self.openai.texts)), len(self.openai.texts))
+
+        # Same order again: everything cached
+        before = len(self.openai.texts)
+        self.match_order()
+        self.assertEqual(len(self.openai.texts), before)
+
+    def test_warm_client_embeddings(self):
+        result = asyncio.run(rag_sync.warm_client_embeddings("c1"))
+        self.assertEqual((result["aliases"], result["branches"]), (40, 5))
+        self.assertEqual(len(self.openai.requests), 1)
+
+        self.match_order()
+        warmed = set(self.openai.requests[0])
+        self.assertFalse(warmed & set(self.openai.texts[len(warmed):]))
+        self.assertEqual(len(self.openai.texts), 45 + 1 + 30 * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,226 @@
+"""
+Tests for billing Excel exports in object storage.
+
+Verifies that:
+1. decode_legacy_file_data reads every legacy file_data encoding
+   (bytea hex of base64, raw bytea, JSON index dict, Buffer dict, base64)
+2. Downloads of migrated exports stream the object from storage without
+   touching file_data; legacy rows still download from file_data
+3. store_export_file returns None (inline fallback) when storage fails
+4. The migration walks pending rows in batches, uploads each file under the
+   export id, clears file_data and skips rows it cannot decode
+"""
+
+import asyncio
+import base64
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+from fastapi import FastAPI
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.api.routes.billing import export as billing_export  # noqa: E402
+from app.core import supabase_async  # noqa: E402
+from app.jobs import migrate_export_files as migration  # noqa: E402
+from app.services import export_files  # noqa: E402
+from app.services.export_files import decode_legacy_file_data, export_file_path  # noqa: E402
+from app.services.storage import StorageService  # noqa: E402
+
+XLSX = b"PK\x03\x04" + bytes(range(256)) * 40
+
+
+def bytea(raw: bytes) -> str:
+    return "\\x" + raw.hex()
+
+
+class TestDecodeLegacyFileData(unittest.TestCase):
+
+    def test_encodings(self):
+        b64 = base64.b64encode(XLSX).decode()
+        index_dict = {str(i): b for i, b in enumerate(XLSX[:50])}
+        cases = [
+            bytea(b64.encode()),
+            bytea(XLSX),
+            b64,
+            "0x" + XLSX.hex(),
+            {"type": "Buffer", "data": list(XLSX)},
+            XLSX,
+        ]
+        for file_data in cases:
+            self.assertEqual(decode_legacy_file_data(file_data), XLSX)
+        self.assertEqual(decode_legacy_file_data(bytea(json.dumps(index_dict).encode())), XLSX[:50])
+        self.assertEqual(decode_legacy_file_data(index_dict), XLSX[:50])
+
+    def test_undecodable(self):
+        for file_data in ("not hex or base64!", {"x": 1}, 42):
+            with self.assertRaises(ValueError):
+                decode_legacy_file_data(file_data)
+
+    def test_export_file_path(self):
+        path = export_file_path("WO Facturas 1-5.xlsx", key="e1")
+        self.assertRegex(path, r"^world-office/\d{4}/\d{2}/e1_WO_Facturas_1-5\.xlsx$")
+
+
+class TestDownload(unittest.TestCase):
+
+    def run_download(self, row, objects):
+        requests = []
+
+        def fake(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.url.path.startswith("/storage/v1/object/"):
+                key = request.url.path[len("/storage/v1/object/"):]
+                if key in objects:
+                    return httpx.Response(200, content=objects[key])
+                return httpx.Response(400, json={"error": "not_found"})
+            select = request.url.params["select"]
+            return httpx.Response(200, json={k: row.get(k) for k in select.split(",")})
+
+        app = FastAPI()
+        app.include_router(billing_export.router, prefix="/api/billing")
+
+        async def run():
+            supabase_async._async_client = supabase_async.create_async_supabase_client(
+                "http://postgrest.local", "test-key",
+                max_connections=2, max_concurrency=10, timeout_seconds=5,
+                transport=httpx.MockTransport(fake),
+            )
+            try:
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as client:
+                    return await client.get("/api/billing/history/e1/download")
+            finally:
+                await supabase_async.close_async_supabase_client()
+
+        return asyncio.run(run()), requests
+
+    def test_streams_from_storage(self):
+        path = "world-office/2026/10/e1_WO.xlsx"
+        response, requests = self.run_download(
+            {"file_name": "WO.xlsx", "file_path": path}, {f"billing-exports/{path}": XLSX}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, XLSX)
+        self.assertEqual(response.headers["content-disposition"], 'attachment; filename="WO.xlsx"')
+        self.assertEqual(response.headers["content-length"], str(len(XLSX)))
+        # file_data is never selected for migrated rows
+        selects = [r.url.params.get("select") for r in requests if r.url.path.startswith("/rest/")]
+        self.assertEqual(selects, ["file_name,file_path"])
+        self.assertEqual(requests[-1].headers["authorization"], "Bearer test-key")
+
+    def test_missing_object(self):
+        response, _ = self.run_download({"file_name": "WO.xlsx", "file_path": "world-office/gone.xlsx"}, {})
+        self.assertEqual(response.status_code, 404)
+
+    def test_legacy_row(self):
+        row = {"file_name": "WO.xlsx", "file_path": None, "file_data": bytea(base64.b64encode(XLSX))}
+        response, _ = self.run_download(row, {})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, XLSX)
+
+
+class TestStoreExportFile(unittest.TestCase):
+
+    def test_upload_and_fallback(self):
+        storage = StorageService(MagicMock(), "billing-exports")
+        with patch.object(export_files, "get_billing_storage_service", return_value=storage):
+            path = export_files.store_export_file(XLSX, "WO.xlsx")
+            self.assertTrue(path.startswith("world-office/") and path.endswith("_WO.xlsx"))
+            upload = storage.supabase.storage.from_.return_value.upload
+            self.assertEqual(upload.call_args.kwargs["path"], path)
+
+            with patch.object(StorageService, "upload_file", side_effect=RuntimeError("storage down")):
+                self.assertIsNone(export_files.store_export_file(XLSX, "WO.xlsx"))
+
+
+class TestMigration(unittest.TestCase):
+
+    def make_supabase(self, rows):
+        """export_history rows keyed by id, with the queries the migration issues."""
+        supabase = MagicMock()
+        supabase.list_calls = []
+
+        def table(name):
+            query = MagicMock()
+            state = {}
+            for method in ("select", "is_", "order", "single"):
+                getattr(query, method).return_value = query
+            query.not_.is_.return_value = query
+            query.limit.side_effect = lambda n: state.update(limit=n) or query
+            query.gt.side_effect = lambda col, v: state.update(gt=v) or query
+            query.eq.side_effect = lambda col, v: state.update(eq=v) or query
+
+            def update(values):
+                state["update"] = values
+                return query
+
+            def execute():
+                if "update" in state:
+                    rows[state["eq"]].update(state["update"])
+                    return MagicMock(data=[rows[state["eq"]]])
+                if "eq" in state:
+                    return MagicMock(data={"file_data": rows[state["eq"]]["file_data"]})
+                supabase.list_calls.append(state.get("gt"))
+                pending = sorted(
+                    (r for r in rows.values() if r["file_path"] is None and r["file_data"] is not None),
+                    key=lambda r: r["id"],
+                )
+                pending = [r for r in pending if state.get("gt") is None or r["id"] > state["gt"]]
+                return MagicMock(data=[{k: r[k] for k in ("id", "file_name", "created_at")}
+                                       for r in pending[:state["limit"]]])
+
+            query.update.side_effect = update
+            query.execute.side_effect = execute
+            return query
+
+        supabase.table.side_effect = table
+        return supabase
+
+    def test_batches(self):
+        rows = {
+            f"e{i:02d}": {"id": f"e{i:02d}", "file_name": f"WO {i}.xlsx", "created_at": "2025-03-04T10:00:00",
+                          "file_path": None, "file_data": bytea(base64.b64encode(XLSX))}
+            for i in range(7)
+        }
+        rows["e03"]["file_data"] = "garbage!"
+        rows["e05"].update(file_path="world-office/done.xlsx", file_data=None)
+        supabase = self.make_supabase(rows)
+        storage = MagicMock()
+
+        with patch.object(migration, "get_supabase_client", return_value=supabase), \
+                patch.object(migration, "get_billing_storage_service", return_value=storage):
+            result = migration.migrate_export_files(batch_size=2)
+
+        self.assertEqual(result, {"migrated": 5, "failed": 1, "dry_run": False})
+        self.assertEqual(supabase.list_calls, [None, "e01", "e03", "e06"])
+        uploaded = {c.args[1]: c.args[0] for c in storage.upload_file.call_args_list}
+        self.assertEqual(uploaded["world-office/2025/03/e00_WO_0.xlsx"], XLSX)
+        self.assertTrue(all(c.kwargs["upsert"] for c in storage.upload_file.call_args_list))
+        self.assertEqual(rows["e00"]["file_path"], "world-office/2025/03/e00_WO_0.xlsx")
+        self.assertIsNone(rows["e00"]["file_data"])
+        # Undecodable row keeps its inline data
+        self.assertIsNone(rows["e03"]["file_path"])
+        self.assertEqual(rows["e03"]["file_data"], "garbage!")
+
+    def test_dry_run_and_limit(self):
+        rows = {
+            f"e{i}": {"id": f"e{i}", "file_name": "WO.xlsx", "created_at": None,
+                      "file_path": None, "file_data": base64.b64encode(XLSX).decode()}
+            for i in range(5)
+        }
+        storage = MagicMock()
+        with patch.object(migration, "get_supabase_client", return_value=self.make_supabase(rows)), \
+                patch.object(migration, "get_billing_storage_service", return_value=storage):
+            result = migration.migrate_export_files(batch_size=2, limit=3, dry_run=True)
+
+        self.assertEqual(result, {"migrated": 3, "failed": 0, "dry_run": True})
+        storage.upload_file.assert_not_called()
+        self.assertTrue(all(r["file_path"] is None for r in rows.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Tests for the pooled Microsoft Graph and OpenAI HTTP clients.
+
+Verifies that:
+1. Every Graph call goes through the service's one pooled client, and
+   aclose()/close_graph_service() shut it down
+2. Concurrent requests with an expired token trigger a single MSAL call,
+   made off the event loop
+3. The OpenAI SDK and the raw Responses API call share one pooled client,
+   counted as LLM round-trips
+"""
+
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.core.metrics import LLM, RequestStats, _request_stats  # noqa: E402
+from app.services import microsoft_graph  # noqa: E402
+from app.services.microsoft_graph import MicrosoftGraphService  # noqa: E402
+from app.services.openai_client import OpenAIClient  # noqa: E402
+
+
+def make_graph(handler, token_latency=0.0):
+    service = MicrosoftGraphService(
+        client_id="id", client_secret="secret", tenant_id="tenant",
+        target_mailbox="box@example.com", transport=httpx.MockTransport(handler),
+    )
+    calls = []
+
+    def acquire_token_for_client(scopes):
+        calls.append(scopes)
+        time.sleep(token_latency)
+        return {"access_token": f"token-{len(calls)}", "expires_in": 3600}
+
+    service.msal_app = MagicMock()
+    service.msal_app.acquire_token_for_client.side_effect = acquire_token_for_client
+    return service, calls
+
+
+class TestGraphClient(unittest.TestCase):
+
+    def test_calls_share_one_pool(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            return httpx.Response(200, json={"value": []})
+
+        async def scenario():
+            service, _ = make_graph(handler)
+            await service._make_request("GET", "/users/box@example.com/messages")
+            client = service.http_client
+            await service._make_request("GET", "/subscriptions")
+            self.assertIs(service.http_client, client)
+            await service.aclose()
+            self.assertTrue(client.is_closed)
+            self.assertIsNone(service._http_client)
+
+        asyncio.run(scenario())
+        self.assertEqual([r.url.path for r in seen], ["/v1.0/users/box@example.com/messages", "/v1.0/subscriptions"])
+        self.assertEqual(seen[0].headers["authorization"], "Bearer token-1")
+
+    def test_single_flight_token_refresh_off_loop(self):
+        async def scenario():
+            service, calls = make_graph(lambda r: httpx.Response(200, json={}), token_latency=0.2)
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            tick_task = asyncio.create_task(ticker())
+            tokens = await asyncio.gather(*(service._get_access_token() for _ in range(10)))
+            tick_task.cancel()
+            return tokens, calls, ticks
+
+        tokens, calls, ticks = asyncio.run(scenario())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(set(tokens), {"token-1"})
+        # The loop kept running while MSAL blocked for 200 ms
+        self.assertGreater(ticks, 5)
+
+    def test_close_graph_service(self):
+        service = MagicMock()
+        service.aclose = MagicMock(side_effect=lambda: asyncio.sleep(0))
+        with patch.object(microsoft_graph, "get_graph_service") as get_service:
+            get_service.cache_info.return_value = MagicMock(currsize=0)
+            asyncio.run(microsoft_graph.close_graph_service())
+            get_service.assert_not_called()
+
+            get_service.cache_info.return_value = MagicMock(currsize=1)
+            get_service.return_value = service
+            asyncio.run(microsoft_graph.close_graph_service())
+            service.aclose.assert_called_once()
+
+
+class TestOpenAIClient(unittest.TestCase):
+
+    def test_sdk_and_responses_api_share_pool(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request.url.path)
+            if request.url.path == "/v1/responses":
+                return httpx.Response(200, json={"output": [{"content": [{"text": "ok"}]}]})
+            return httpx.Response(200, json={
+                "id": "c1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "hola"}}],
+            })
+
+        async def scenario():
+            client = OpenAIClient(api_key="sk-test", transport=httpx.MockTransport(handler))
+            stats = RequestStats()
+            token = _request_stats.set(stats)
+            try:
+                reply = await client.chat_completion([{"role": "user", "content": "hi"}])
+                extracted = await client.extract_from_pdf_file("file-1", "extract")
+            finally:
+                _request_stats.reset(token)
+            self.assertIs(client.client._client, client.http_client)
+            await client.http_client.aclose()
+            return reply, extracted, stats
+
+        reply, extracted, stats = asyncio.run(scenario())
+        self.assertEqual((reply, extracted), ("hola", "ok"))
+        self.assertEqual(seen, ["/v1/chat/completions", "/v1/responses"])
+        self.assertEqual(stats.calls[LLM], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
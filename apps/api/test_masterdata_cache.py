@@ -0,0 +1,249 @@
+"""
+Tests for the master data read-through cache.
+
+Verifies that:
+1. TTLCache evicts least recently used entries beyond max_entries and
+   reloads entries older than the TTL
+2. get_or_load_many only loads missing ids and remembers absent ones
+3. /masterdata endpoints are served from cache with an ETag, answer 304 to
+   a matching If-None-Match, and reload after invalidation
+4. Invalidation cascades to dependents (clients -> branches), rejects
+   unknown resources, and runs on the sync-rag hooks
+5. excel_generator lookups hit Supabase once per id across exports, in a
+   cache of their own that cannot evict the catalogs
+"""
+
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+from fastapi import FastAPI
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.api.routes import masterdata  # noqa: E402
+from app.core import cache, supabase_async  # noqa: E402
+from app.core.cache import TTLCache, invalidate_masterdata  # noqa: E402
+from app.services import excel_generator  # noqa: E402
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        c = TTLCache(max_entries=2, ttl_seconds=60)
+        c.set(("a",), 1)
+        c.set(("b",), 2)
+        c.get(("a",))
+        c.set(("c",), 3)
+        self.assertIsNone(c.get(("b",)))
+        self.assertEqual(c.get(("a",)).value, 1)
+        self.assertEqual(len(c), 2)
+
+    def test_ttl_expiry(self):
+        c = TTLCache(max_entries=10, ttl_seconds=60)
+        calls = []
+        loader = lambda: calls.append(1) or {"x": len(calls)}  # noqa: E731
+        first = c.get_or_load(("a",), loader)
+        self.assertIs(c.get_or_load(("a",), loader), first)
+        first.loaded_at = time.monotonic() - 61
+        self.assertEqual(c.get_or_load(("a",), loader).value, {"x": 2})
+        self.assertEqual(len(calls), 2)
+
+    def test_get_or_load_many(self):
+        c = TTLCache(max_entries=100, ttl_seconds=60)
+        loads = []
+
+        def loader(ids):
+            loads.append(sorted(ids))
+            return {i: i.upper() for i in ids if i != "zz"}
+
+        self.assertEqual(c.get_or_load_many("t", ["a", "b", "zz", "a"], loader), {"a": "A", "b": "B"})
+        self.assertEqual(c.get_or_load_many("t", ["a", "c", "zz"], loader), {"a": "A", "c": "C"})
+        self.assertEqual(loads, [["a", "b", "zz"], ["c"]])
+
+    def test_invalidate_by_resource(self):
+        c = TTLCache(max_entries=100, ttl_seconds=60)
+        c.set(("products", True, None), 1)
+        c.set(("products", False, ("PT",)), 2)
+        c.set(("clients",), 3)
+        self.assertEqual(c.invalidate("products"), 2)
+        self.assertEqual(c.get(("clients",)).value, 3)
+        self.assertEqual(c.invalidate(), 1)
+
+
+class FakePostgrest:
+    def __init__(self):
+        self.requests = []
+        self.rows = {"products": [{"id": "p1", "name": "Croissant"}], "clients": [{"id": "c1", "name": "Ana"}],
+                     "branches": [{"id": "b1", "client": {"id": "c1", "name": "Ana"}}]}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        table = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json=self.rows.get(table, []))
+
+
+class TestMasterdataEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        cache._masterdata_cache = TTLCache(max_entries=32, ttl_seconds=300)
+        cache._lookup_cache = TTLCache(max_entries=32, ttl_seconds=300)
+        self.postgrest = FakePostgrest()
+
+    def tearDown(self):
+        cache._masterdata_cache = None
+        cache._lookup_cache = None
+
+    def run_requests(self, scenario):
+        app = FastAPI()
+        app.include_router(masterdata.router, prefix="/api")
+
+        async def run():
+            supabase_async._async_client = supabase_async.create_async_supabase_client(
+                "http://postgrest.local", "test-key",
+                max_connections=2, max_concurrency=10, timeout_seconds=5,
+                transport=httpx.MockTransport(self.postgrest),
+            )
+            try:
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as client:
+                    return await scenario(client)
+            finally:
+                await supabase_async.close_async_supabase_client()
+
+        return asyncio.run(run())
+
+    def test_cached_with_etag(self):
+        async def scenario(client):
+            first = await client.get("/api/masterdata/products")
+            second = await client.get("/api/masterdata/products")
+            not_modified = await client.get(
+                "/api/masterdata/products", headers={"If-None-Match": first.headers["etag"]}
+            )
+            other_filter = await client.get("/api/masterdata/products?category=PT,PP")
+            return first, second, not_modified, other_filter
+
+        first, second, not_modified, other_filter = self.run_requests(scenario)
+        self.assertEqual(first.json(), {"products": [{"id": "p1", "name": "Croissant"}]})
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.headers["etag"], first.headers["etag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+        self.assertEqual(other_filter.status_code, 200)
+        # One load for the default filter, one for category=PT,PP
+        self.assertEqual(len(self.postgrest.requests), 2)
+        self.assertEqual(self.postgrest.requests[1].url.params["category"], "in.(PP,PT)")
+
+    def test_invalidation_reloads(self):
+        async def scenario(client):
+            await client.get("/api/masterdata/clients")
+            await client.get("/api/masterdata/branches")
+            await client.get("/api/masterdata/vehicles")
+            invalidated = await client.post("/api/masterdata/cache/invalidate?resource=clients")
+            bad = await client.post("/api/masterdata/cache/invalidate?resource=nope")
+            await client.get("/api/masterdata/clients")
+            await client.get("/api/masterdata/branches")
+            await client.get("/api/masterdata/vehicles")
+            return invalidated, bad
+
+        invalidated, bad = self.run_requests(scenario)
+        # clients also drops branches (they embed client names), not vehicles
+        self.assertEqual(invalidated.json(), {"invalidated": 2})
+        self.assertEqual(bad.status_code, 400)
+        tables = [r.url.path.rsplit("/", 1)[-1] for r in self.postgrest.requests]
+        self.assertEqual(tables, ["clients", "branches", "vehicles", "clients", "branches"])
+
+    def test_errors_are_not_cached(self):
+        self.postgrest = MagicMock(side_effect=[httpx.Response(500, json={"message": "down"}),
+                                                httpx.Response(200, json=[{"id": "v1"}])])
+
+        async def scenario(client):
+            failed = await client.get("/api/masterdata/vehicles")
+            ok = await client.get("/api/masterdata/vehicles")
+            return failed.json(), ok.json()
+
+        failed, ok = self.run_requests(scenario)
+        self.assertEqual(failed, {"vehicles": []})
+        self.assertEqual(ok, {"vehicles": [{"id": "v1"}]})
+
+    def test_sync_rag_invalidates(self):
+        cache.get_masterdata_cache().set(("products", True, None), {"products": []})
+        cache.get_lookup_cache().set(("product_prices", "p1"), 10)
+        cache.get_masterdata_cache().set(("clients",), {"clients": []})
+        with patch.object(masterdata, "sync_product_to_rag"):
+            asyncio.run(masterdata.sync_product_rag("p1", MagicMock()))
+        self.assertEqual(len(cache.get_masterdata_cache()), 1)
+        self.assertEqual(len(cache.get_lookup_cache()), 0)
+        self.assertEqual(invalidate_masterdata(), 1)
+
+
+class TestExcelLookups(unittest.TestCase):
+
+    def setUp(self):
+        cache._masterdata_cache = TTLCache(max_entries=256, ttl_seconds=300)
+        cache._lookup_cache = TTLCache(max_entries=256, ttl_seconds=300)
+
+    def tearDown(self):
+        cache._masterdata_cache = None
+        cache._lookup_cache = None
+
+    def make_supabase(self, rows_by_table):
+        supabase = MagicMock()
+        supabase.queried = []
+
+        def table(name):
+            query = MagicMock()
+
+            def in_(column, values):
+                supabase.queried.append((name, sorted(values)))
+                result = MagicMock()
+                result.data = [r for r in rows_by_table[name] if r[column] in values]
+                query.execute.return_value = result
+                return query
+
+            query.select.return_value = query
+            query.in_.side_effect = in_
+            return query
+
+        supabase.table.side_effect = table
+        return supabase
+
+    def test_lookups_cached_per_id(self):
+        supabase = self.make_supabase({
+            "client_credit_terms": [{"client_id": "c1", "credit_days": 15}],
+            "product_config": [{"product_id": "p1", "units_per_package": 6}],
+            "client_price_lists": [{"client_id": "c1", "product_id": "p1", "unit_price": 900}],
+        })
+
+        self.assertEqual(excel_generator.get_credit_terms(supabase, ["c1", "c2"]), {"c1": 15})
+        self.assertEqual(excel_generator.get_credit_terms(supabase, ["c2", "c1"]), {"c1": 15})
+        self.assertEqual(excel_generator.get_product_configs(supabase, ["p1"])["p1"]["units_per_package"], 6)
+        self.assertEqual(excel_generator.get_client_price_lists(supabase, ["c1", "c2"]), {"c1": {"p1": 900}})
+        self.assertEqual(excel_generator.get_client_price_lists(supabase, ["c1", "c2", "c3"]), {"c1": {"p1": 900}})
+
+        self.assertEqual(supabase.queried, [
+            ("client_credit_terms", ["c1", "c2"]),
+            ("product_config", ["p1"]),
+            ("client_price_lists", ["c1", "c2"]),
+            ("client_price_lists", ["c3"]),
+        ])
+
+        invalidate_masterdata("credit_terms")
+        excel_generator.get_credit_terms(supabase, ["c1"])
+        self.assertEqual(supabase.queried[-1], ("client_credit_terms", ["c1"]))
+
+    def test_lookups_do_not_evict_catalogs(self):
+        cache.get_masterdata_cache().set(("products", True, None), {"products": []})
+        ids = [f"c{i}" for i in range(1000)]
+        supabase = self.make_supabase({"client_credit_terms": [{"client_id": i, "credit_days": 30} for i in ids]})
+
+        self.assertEqual(len(excel_generator.get_credit_terms(supabase, ids)), 1000)
+        self.assertIsNotNone(cache.get_masterdata_cache().get(("products", True, None)))
+        self.assertEqual(len(cache.get_lookup_cache()), 256)
+
+
+if __name__ == "__main__":
+    unittest.main()
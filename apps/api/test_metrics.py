@@ -0,0 +1,213 @@
+"""
+Tests for request metrics and round-trip accounting.
+
+Verifies that:
+1. Histograms render cumulative buckets, sum and count in Prometheus text
+   format, with escaped label values
+2. RequestMetricsMiddleware labels requests by route template, counts the
+   async and sync Supabase round-trips, LLM and Graph calls made while
+   serving them (including on worker threads) and logs slow requests with
+   their "N queries / X ms DB / Y ms LLM" breakdown
+3. Calls outside a request only reach the service histogram
+4. The sync client's schema() clients share the instrumented session
+5. GET /metrics serves the registry in Prometheus text format
+"""
+
+import asyncio
+import os
+import time
+import unittest
+
+import httpx
+from fastapi import FastAPI
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from supabase import ClientOptions  # noqa: E402
+
+from app.core import metrics  # noqa: E402
+from app.core.metrics import (  # noqa: E402
+    DB,
+    GRAPH,
+    LLM,
+    Histogram,
+    InstrumentedTransport,
+    RequestMetricsMiddleware,
+    current_request_stats,
+    record_call,
+    render_metrics,
+    reset_metrics,
+    track,
+)
+from app.core.supabase import _SharedSessionClient  # noqa: E402
+from app.core.supabase_async import create_async_supabase_client, run_blocking  # noqa: E402
+
+
+def postgrest_handler(requests):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=[{"id": "o1"}])
+    return handler
+
+
+def make_sync_client(requests):
+    http_client = httpx.Client(transport=InstrumentedTransport(httpx.MockTransport(postgrest_handler(requests)), DB))
+    return _SharedSessionClient.create(
+        "http://postgrest.local", "test-key", options=ClientOptions(httpx_client=http_client)
+    )
+
+
+def build_app(slow_request_ms):
+    requests = []
+    async_client = create_async_supabase_client(
+        "http://postgrest.local", "test-key",
+        max_connections=2, max_concurrency=5, timeout_seconds=5,
+        transport=httpx.MockTransport(postgrest_handler(requests)),
+    )
+    sync_client = make_sync_client(requests)
+    seen = {}
+    app = FastAPI()
+
+    @app.get("/api/orders/{order_id}")
+    async def get_order(order_id: str):
+        await async_client.table("orders").select("id").eq("id", order_id).execute()
+        await async_client.table("order_items").select("id").eq("order_id", order_id).execute()
+        await run_blocking(lambda: sync_client.table("clients").select("id").execute())
+        with track(LLM):
+            time.sleep(0.02)
+        seen["stats"] = current_request_stats()
+        return {"id": order_id}
+
+    @app.get("/api/sync")
+    def sync_endpoint():
+        # Sync endpoints run on the threadpool
+        sync_client.table("products").select("id").execute()
+        return {}
+
+    app.add_middleware(RequestMetricsMiddleware, slow_request_ms=slow_request_ms)
+    return app, requests, seen
+
+
+def get(app, *paths):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(path) for path in paths]
+    return asyncio.run(scenario())
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_render(self):
+        histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, "/a")
+        histogram.observe(0.5, "/a")
+        histogram.observe(3, "/a")
+        histogram.observe(0.1, 'say "hi"')
+
+        lines = histogram.render()
+        self.assertEqual(lines[:2], ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"])
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{route="/a",le="1"} 2', lines)
+        self.assertIn('latency_seconds_bucket{route="/a",le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_sum{route="/a"} 3.55', lines)
+        self.assertIn('latency_seconds_count{route="/a"} 3', lines)
+        # Upper bounds are inclusive
+        self.assertIn('latency_seconds_bucket{route="say \\"hi\\"",le="0.1"} 1', lines)
+
+
+class TestRequestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        reset_metrics()
+
+    def test_counts_round_trips_per_request(self):
+        app, requests, seen = build_app(slow_request_ms=0)
+        responses = get(app, "/api/orders/o1", "/api/orders/o2", "/missing")
+
+        self.assertEqual([r.status_code for r in responses], [200, 200, 404])
+        self.assertEqual(len(requests), 6)
+        stats = seen["stats"]
+        self.assertEqual(stats.calls, {DB: 3, LLM: 1, GRAPH: 0})
+        self.assertGreaterEqual(stats.seconds[LLM], 0.02)
+
+        text = render_metrics()
+        self.assertIn(
+            'bakery_http_request_duration_seconds_count{method="GET",route="/api/orders/{order_id}",status="200"} 2',
+            text,
+        )
+        self.assertIn(
+            'bakery_http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1', text
+        )
+        self.assertIn(
+            'bakery_http_request_external_calls_total{route="/api/orders/{order_id}",service="db"} 6', text
+        )
+        self.assertIn(
+            'bakery_http_request_external_calls_total{route="/api/orders/{order_id}",service="llm"} 2', text
+        )
+        self.assertIn('bakery_external_call_duration_seconds_count{service="db"} 6', text)
+
+    def test_sync_endpoint_and_outside_request(self):
+        app, _, _ = build_app(slow_request_ms=0)
+        get(app, "/api/sync")
+        record_call(GRAPH, 0.2)
+
+        text = render_metrics()
+        self.assertIn('bakery_http_request_external_calls_total{route="/api/sync",service="db"} 1', text)
+        self.assertIn('bakery_external_call_duration_seconds_count{service="graph"} 1', text)
+        per_route = [line for line in text.splitlines() if line.startswith("bakery_http_request_external")]
+        self.assertFalse([line for line in per_route if 'service="graph"' in line])
+        self.assertIsNone(current_request_stats())
+
+    def test_slow_request_log(self):
+        app, _, _ = build_app(slow_request_ms=10)
+        with self.assertLogs(metrics.logger, level="WARNING") as logs:
+            get(app, "/api/orders/o1")
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        self.assertIn("Slow request GET /api/orders/o1 (/api/orders/{order_id}) 200", record.getMessage())
+        self.assertIn("3 queries / ", record.getMessage())
+        self.assertIn(" ms LLM", record.getMessage())
+        self.assertEqual((record.db_queries, record.llm_calls, record.graph_calls), (3, 1, 0))
+        self.assertGreaterEqual(record.llm_ms, 20)
+
+        app, _, _ = build_app(slow_request_ms=60_000)
+        with self.assertNoLogs(metrics.logger, level="WARNING"):
+            get(app, "/api/orders/o1")
+
+
+class TestSyncClient(unittest.TestCase):
+
+    def test_schema_shares_instrumented_session(self):
+        reset_metrics()
+        requests = []
+        client = make_sync_client(requests)
+        client.schema("inventario").rpc("perform_bulk_dispatch_movements", {"p_orders": []}).execute()
+        client.table("orders").select("id").execute()
+
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(requests[0].headers["content-profile"], "inventario")
+        self.assertEqual(requests[0].headers["apikey"], "test-key")
+        self.assertEqual(requests[0].url.path, "/rest/v1/rpc/perform_bulk_dispatch_movements")
+        self.assertIn('bakery_external_call_duration_seconds_count{service="db"} 2', render_metrics())
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def test_prometheus_text(self):
+        from app.main import app
+        reset_metrics()
+        first, second = get(app, "/", "/metrics")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(second.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn("# TYPE bakery_http_request_duration_seconds histogram", second.text)
+        self.assertIn('bakery_http_request_duration_seconds_count{method="GET",route="/",status="200"} 1', second.text)
+        # Scrapes are not recorded
+        self.assertNotIn('route="/metrics"', second.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Tests for the order/delivery/billing aggregate RPC wrappers.
+
+Verifies that:
+1. Each wrapper calls its RPC with the expected parameters
+2. /orders/stats, list_orders delivery percentages, billing stats and the
+   WhatsApp entregas report are built from the aggregates (no row downloads)
+3. delivery_percentage and _format_pct round exactly like the old
+   client-side computations
+4. Months without exports are zero-filled in /stats/monthly
+"""
+
+import asyncio
+import json
+import os
+import random
+import unittest
+
+import httpx
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.core import supabase_async  # noqa: E402
+from app.core.supabase_async import create_async_supabase_client  # noqa: E402
+from app.jobs.whatsapp_reports import _format_pct  # noqa: E402
+from app.services.order_aggregates import (  # noqa: E402
+    delivery_percentage,
+    get_delivery_percentages,
+    get_order_status_counts,
+)
+
+
+class FakeRpc:
+    """Mock PostgREST answering /rpc/<name> with canned payloads."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        assert path.startswith("/rest/v1/rpc/"), f"unexpected table query {path}"
+        name = path.rsplit("/", 1)[-1]
+        self.calls.append((name, json.loads(request.content or b"{}")))
+        return httpx.Response(200, json=self.responses[name])
+
+
+def run_with_client(fake, coro_fn):
+    async def scenario():
+        supabase_async._async_client = create_async_supabase_client(
+            "http://postgrest.local", "test-key",
+            max_connections=2, max_concurrency=10, timeout_seconds=5,
+            transport=httpx.MockTransport(fake),
+        )
+        try:
+            return await coro_fn(supabase_async._async_client)
+        finally:
+            await supabase_async.close_async_supabase_client()
+
+    return asyncio.run(scenario())
+
+
+class TestOrderAggregates(unittest.TestCase):
+
+    def test_order_status_counts(self):
+        from app.api.routes.orders.views.stats import get_order_stats
+
+        counts = {"today": 3, "tomorrow": 1, "this_week": 9, "by_status": {"received": 7, "ready_dispatch": 2}, "total": 9}
+        fake = FakeRpc({"get_order_status_counts": counts})
+
+        direct = run_with_client(fake, lambda s: get_order_status_counts(s, "2026-10-17", "2026-10-18", "2026-10-24"))
+        self.assertEqual(direct, counts)
+        name, params = fake.calls[0]
+        self.assertEqual(params, {
+            "p_today": "2026-10-17", "p_tomorrow": "2026-10-18", "p_week_end": "2026-10-24",
+            "p_excluded_statuses": ["delivered", "cancelled", "returned"],
+        })
+
+        stats = run_with_client(fake, lambda s: get_order_stats())
+        self.assertEqual(stats.model_dump(), counts)
+        self.assertEqual([c[0] for c in fake.calls], ["get_order_status_counts"] * 2)
+
+    def test_delivery_percentages_match_client_side_sum(self):
+        rng = random.Random(3)
+        items = [
+            {"order_id": f"o{rng.randrange(20)}", "quantity_requested": rng.randrange(0, 50),
+             "quantity_delivered": rng.randrange(0, 50)}
+            for _ in range(300)
+        ]
+        # What list_orders computed from the order_items rows
+        totals = {}
+        for item in items:
+            t = totals.setdefault(item["order_id"], {"requested": 0, "delivered": 0})
+            t["requested"] += item["quantity_requested"]
+            t["delivered"] += item["quantity_delivered"]
+        expected = {
+            oid: round((t["delivered"] / t["requested"]) * 100) if t["requested"] > 0 else 0
+            for oid, t in totals.items()
+        }
+
+        fake = FakeRpc({"get_order_delivery_totals": [
+            {"order_id": oid, "quantity_requested": t["requested"], "quantity_delivered": t["delivered"]}
+            for oid, t in totals.items()
+        ]})
+        result = run_with_client(fake, lambda s: get_delivery_percentages(s, list(totals)))
+        self.assertEqual(result, expected)
+        self.assertEqual(delivery_percentage(0, 5), 0)
+
+        self.assertEqual(run_with_client(fake, lambda s: get_delivery_percentages(s, [])), {})
+        self.assertEqual(len(fake.calls), 1)
+
+    def test_billing_stats(self):
+        from app.api.routes.billing.config import get_billing_stats, get_monthly_stats, get_remision_stats
+
+        fake = FakeRpc({
+            "get_billing_totals": {"total_exports": 4, "total_orders": 90, "total_amount": 1250.5, "latest_invoice_number": 812},
+            "get_remision_totals": {"total_remisions": 10, "total_amount": 500, "invoiced_orders": 3},
+            "get_monthly_billing_totals": [
+                {"month": 2, "exports": 1, "orders": 30, "amount": 400.0},
+                {"month": 11, "exports": 3, "orders": 60, "amount": 850.5},
+            ],
+        })
+
+        billing = run_with_client(fake, lambda s: get_billing_stats())
+        self.assertEqual(billing.total_exports, 4)
+        self.assertEqual(billing.avg_orders_per_export, 22.5)
+        self.assertEqual(billing.latest_invoice_number, 812)
+
+        remisions = run_with_client(fake, lambda s: get_remision_stats())
+        self.assertEqual(remisions.pending_remisions, 7)
+        self.assertEqual(remisions.avg_remision_amount, 50.0)
+
+        monthly = run_with_client(fake, lambda s: get_monthly_stats(year=2026))
+        self.assertEqual(len(monthly.stats), 12)
+        self.assertEqual(monthly.stats[1].orders, 30)
+        self.assertEqual(monthly.stats[10].amount, 850.5)
+        self.assertEqual(monthly.stats[0].exports, 0)
+        self.assertEqual(fake.calls[-1], ("get_monthly_billing_totals", {"p_year": 2026}))
+
+    def test_format_pct_matches_report(self):
+        rng = random.Random(8)
+        for _ in range(200):
+            total = rng.randrange(0, 300)
+            part = rng.randrange(0, total + 1)
+            expected = f"{round(part / total * 100, 1)}%" if total else "0%"
+            self.assertEqual(_format_pct(part, total), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
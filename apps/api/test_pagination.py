@@ -0,0 +1,286 @@
+"""
+Tests for keyset pagination and NDJSON streaming of history lists.
+
+Verifies that:
+1. Cursors round-trip and malformed cursors are rejected (400)
+2. Following next_cursor walks the whole history newest-first, with no
+   gaps or duplicates even when many rows share a created_at
+3. Cursor pages skip the count by default; ?count=estimated asks
+   PostgREST for a planner estimate; offset pages keep the exact count
+4. ?format=ndjson streams every matching row, one JSON object per line
+5. Completed routes page by (route_date, id)
+6. Rows with a NULL created_at are listed last and paging continues
+   through them
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import unittest
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import FastAPI
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.api.routes.billing import export as billing_export  # noqa: E402
+from app.api.routes.orders import crud as orders_crud  # noqa: E402
+from app.api.routes.routes import crud as routes_crud  # noqa: E402
+from app.core import pagination, supabase_async  # noqa: E402
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor  # noqa: E402
+
+KEYSET = re.compile(
+    r'^\((?P<col>\w+)\.lt\."(?P<v>[^"]*)",and\((?P=col)\.eq\."(?P=v)",id\.lt\."(?P<id>[^"]*)"\),(?P=col)\.is\.null\)$'
+)
+KEYSET_NULL = re.compile(r'^\(and\((?P<col>\w+)\.is\.null,id\.lt\."(?P<id>[^"]*)"\)\)$')
+
+
+class FakePostgrest:
+    """Applies eq, order, limit/offset, count and the keyset or= filter to in-memory tables."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        name = request.url.path.rsplit("/", 1)[-1]
+        if request.url.path.startswith("/rest/v1/rpc/"):
+            return httpx.Response(200, json=[])
+        rows = list(self.tables[name])
+        params = request.url.params
+
+        for key, value in params.multi_items():
+            if key == "or" and KEYSET_NULL.match(value):
+                match = KEYSET_NULL.match(value)
+                col, rid = match["col"], match["id"]
+                rows = [r for r in rows if r[col] is None and r["id"] < rid]
+            elif key == "or":
+                match = KEYSET.match(value)
+                assert match, value
+                col, v, rid = match["col"], match["v"], match["id"]
+                rows = [r for r in rows if r[col] is None or r[col] < v or (r[col] == v and r["id"] < rid)]
+            elif key not in ("select", "order", "limit", "offset") and value.startswith("eq."):
+                rows = [r for r in rows if str(r.get(key)) == value[3:]]
+            elif key == "id" and value.startswith("in."):
+                ids = value[4:-1].split(",")
+                rows = [r for r in rows if r["id"] in ids]
+
+        for term in reversed(params.get("order", "").split(",")):
+            if term:
+                col, direction = term.split(".")[:2]
+                rows.sort(key=lambda r: (r[col] is not None, r[col] or ""), reverse=direction == "desc")
+                if not term.endswith(".nullslast"):
+                    # Postgres default for DESC: NULLs first
+                    rows.sort(key=lambda r: r[col] is not None, reverse=direction != "desc")
+
+        total = len(rows)
+        offset = int(params.get("offset", 0))
+        limit = int(params["limit"]) if "limit" in params else None
+        rows = rows[offset:offset + limit] if limit is not None else rows[offset:]
+
+        headers = {}
+        prefer = request.headers.get("prefer", "")
+        if "count=" in prefer:
+            headers["content-range"] = f"{offset}-{offset + len(rows) - 1}/{total}"
+        return httpx.Response(200, json=rows, headers=headers)
+
+
+def order_rows(n, seed=4):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(n):
+        # Few distinct timestamps, so many rows tie on created_at
+        created = start + timedelta(minutes=rng.randrange(n // 5 + 1))
+        rows.append({
+            "id": f"{rng.getrandbits(64):016x}",
+            "order_number": f"PED-{i}",
+            "expected_delivery_date": "2024-02-01",
+            "requested_delivery_date": None,
+            "status": rng.choice(["received", "delivered"]),
+            "total_value": 100,
+            "client_id": "c1",
+            "branch_id": None,
+            "created_at": created.isoformat(),
+            "has_pending_missing": False,
+            "clients": {"id": "c1", "name": "Ana"},
+            "branches": None,
+            "created_by_user": None,
+        })
+    return rows
+
+
+def expected_order(rows, sort_column="created_at"):
+    """Newest first by (sort_column, id), NULL sort values last."""
+    return [
+        r["id"] for r in sorted(rows, key=lambda r: (r[sort_column] is not None, r[sort_column] or "", r["id"]),
+                                reverse=True)
+    ]
+
+
+class TestCursor(unittest.TestCase):
+
+    def test_round_trip(self):
+        cursor = encode_cursor("2026-10-17T08:00:00+00:00", "abc")
+        self.assertNotIn("=", cursor)
+        self.assertEqual(decode_cursor(cursor), ("2026-10-17T08:00:00+00:00", "abc"))
+
+    def test_malformed(self):
+        for bad in ("not-a-cursor", encode_cursor("2026-10-17", None), "e30"):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(bad)
+
+    def test_count_method(self):
+        self.assertEqual(pagination.count_method(None, None), "exact")
+        self.assertIsNone(pagination.count_method(None, "c"))
+        self.assertEqual(pagination.count_method("estimated", "c"), "estimated")
+        self.assertIsNone(pagination.count_method("none", None))
+
+
+class TestKeysetEndpoints(unittest.TestCase):
+
+    def run_requests(self, tables, scenario):
+        self.postgrest = FakePostgrest(tables)
+        app = FastAPI()
+        app.include_router(orders_crud.router, prefix="/api/orders")
+        app.include_router(billing_export.router, prefix="/api/billing")
+        app.include_router(routes_crud.router, prefix="/api/routes")
+
+        async def run():
+            supabase_async._async_client = supabase_async.create_async_supabase_client(
+                "http://postgrest.local", "test-key",
+                max_connections=2, max_concurrency=10, timeout_seconds=5,
+                transport=httpx.MockTransport(self.postgrest),
+            )
+            try:
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as client:
+                    return await scenario(client)
+            finally:
+                await supabase_async.close_async_supabase_client()
+
+        return asyncio.run(run())
+
+    def test_cursor_walk_matches_full_order(self):
+        rows = order_rows(237)
+
+        async def scenario(client):
+            seen, pages, cursor = [], [], None
+            while True:
+                url = "/api/orders/?limit=25" + (f"&cursor={cursor}" if cursor else "")
+                body = (await client.get(url)).json()
+                pages.append(body)
+                seen.extend(o["id"] for o in body["orders"])
+                cursor = body["next_cursor"]
+                if not body["has_more"]:
+                    return seen, pages
+
+        seen, pages = self.run_requests({"orders": rows}, scenario)
+        self.assertEqual(seen, expected_order(rows))
+        self.assertEqual(len(pages), 10)
+        # First page (no cursor) keeps the exact count, cursor pages skip it
+        self.assertEqual(pages[0]["total_count"], 237)
+        self.assertTrue(all(p["total_count"] is None for p in pages[1:]))
+        self.assertIsNone(pages[-1]["next_cursor"])
+
+        table_requests = [r for r in self.postgrest.requests if r.url.path == "/rest/v1/orders"]
+        self.assertIn("count=exact", table_requests[0].headers.get("prefer", ""))
+        self.assertNotIn("count=", table_requests[1].headers.get("prefer", ""))
+        self.assertEqual(table_requests[1].url.params["limit"], "26")
+
+    def test_cursor_walk_past_null_created_at(self):
+        rows = order_rows(53)
+        for row in rows[::4]:
+            row["created_at"] = None
+
+        async def scenario(client):
+            seen, cursor = [], None
+            while True:
+                url = "/api/orders/?limit=5" + (f"&cursor={cursor}" if cursor else "")
+                response = await client.get(url)
+                self.assertEqual(response.status_code, 200)
+                body = response.json()
+                seen.extend(o["id"] for o in body["orders"])
+                cursor = body["next_cursor"]
+                if not body["has_more"]:
+                    return seen
+
+        seen = self.run_requests({"orders": rows}, scenario)
+        self.assertEqual(seen, expected_order(rows))
+        self.assertEqual({r["id"] for r in rows if r["created_at"] is None}, set(seen[-14:]))
+        order = [r for r in self.postgrest.requests if r.url.path == "/rest/v1/orders"][0].url.params["order"]
+        self.assertEqual(order, "created_at.desc.nullslast,id.desc")
+
+    def test_estimated_count_and_offset_compat(self):
+        rows = order_rows(60)
+
+        async def scenario(client):
+            estimated = await client.get("/api/orders/?limit=10&count=estimated&cursor=" + encode_cursor(
+                rows[0]["created_at"], rows[0]["id"]))
+            offset_page = (await client.get("/api/orders/?limit=10&page=3")).json()
+            bad = await client.get("/api/orders/?cursor=garbage")
+            return estimated, offset_page, bad
+
+        estimated, offset_page, bad = self.run_requests({"orders": rows}, scenario)
+        self.assertEqual(estimated.status_code, 200)
+        self.assertIn("count=estimated", self.postgrest.requests[0].headers["prefer"])
+        self.assertEqual([o["id"] for o in offset_page["orders"]], expected_order(rows)[20:30])
+        self.assertEqual(offset_page["total_count"], 60)
+        self.assertTrue(offset_page["has_more"])
+        self.assertEqual(bad.status_code, 400)
+
+    def test_ndjson_stream(self):
+        rows = order_rows(1234)
+        exports = [
+            {"id": f"e{i:04d}", "export_date": None, "invoice_number_start": i, "invoice_number_end": i,
+             "total_orders": 1, "total_amount": 10, "file_name": f"f{i}.xlsx", "created_by": None,
+             "created_at": f"2026-01-{1 + i % 28:02d}T00:00:00", "created_by_user": None}
+            for i in range(30)
+        ]
+
+        async def scenario(client):
+            orders = await client.get("/api/orders/?format=ndjson&status=received")
+            history = await client.get("/api/billing/history?format=ndjson")
+            return orders, history
+
+        orders, history = self.run_requests({"orders": rows, "export_history": exports}, scenario)
+        self.assertEqual(orders.headers["content-type"], "application/x-ndjson")
+        streamed = [json.loads(line) for line in orders.text.splitlines()]
+        received = [r for r in rows if r["status"] == "received"]
+        self.assertEqual([o["id"] for o in streamed], expected_order(received))
+        self.assertEqual(streamed[0]["client_name"], "Ana")
+        # 500-row keyset batches
+        order_requests = [r for r in self.postgrest.requests if r.url.path == "/rest/v1/orders"]
+        self.assertEqual(len(order_requests), len(received) // 500 + 1)
+
+        self.assertEqual([json.loads(line)["id"] for line in history.text.splitlines()], expected_order(exports))
+
+    def test_completed_routes_by_route_date(self):
+        rng = random.Random(2)
+        routes = [
+            {"id": f"r{i:03d}", "route_number": i, "route_name": f"Ruta {i}", "status": "completed",
+             "route_date": f"2026-03-{1 + rng.randrange(5):02d}", "driver_id": None, "created_at": None,
+             "route_orders": []}
+            for i in range(47)
+        ]
+
+        async def scenario(client):
+            seen, cursor = [], None
+            while True:
+                url = "/api/routes/completed/list?role=admin&limit=10" + (f"&cursor={cursor}" if cursor else "")
+                body = (await client.get(url)).json()
+                seen.extend(r["id"] for r in body["routes"])
+                cursor = body["next_cursor"]
+                if not body["has_more"]:
+                    return seen
+
+        seen = self.run_requests({"routes": routes}, scenario)
+        self.assertEqual(seen, expected_order(routes, "route_date"))
+
+
+if __name__ == "__main__":
+    unittest.main()
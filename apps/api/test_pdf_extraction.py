@@ -0,0 +1,263 @@
+"""
+Tests for concurrent PDF attachment processing and page rendering.
+
+Verifies that:
+1. render_pdf_pages encodes PyMuPDF pixmaps straight to JPEG data URLs at
+   the requested DPI, in the process pool or on a worker thread
+2. pdf_to_image_urls renders at most pdf_vision_max_pages pages (only the
+   first by default) and caches them by PDF hash, DPI and quality, so a
+   retried extraction renders nothing
+3. The vision fallback sends every rendered page in one request
+4. process_email handles PDF attachments concurrently (bounded by
+   email_attachment_concurrency), keeps each attachment's log together and
+   in attachment order, and a failing attachment does not stop the others
+"""
+
+import asyncio
+import base64
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import fitz
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.core.config import get_settings  # noqa: E402
+from app.models.email import EmailAttachment, EmailMessage  # noqa: E402
+from app.models.purchase_order import ClassificationResult, ClassificationType  # noqa: E402
+from app.services import ai_extractor, email_processor  # noqa: E402
+from app.services.ai_extractor import PDFExtractor, pdf_to_image_urls, render_pdf_pages  # noqa: E402
+from app.services.email_processor import EmailProcessor  # noqa: E402
+
+EXTRACTION_JSON = (
+    '{"CLIENTE": "Cafe Uno", "OC": "OC-1", "FECHA DE ENTREGA": "2099-01-01", '
+    '"PRODUCTOS": [{"PRODUCTO": "PAN", "CANTIDAD SOLICITADA": 2, "PRECIO": 100}]}'
+)
+
+
+def make_pdf(pages):
+    """Letter-size PDF with one line of text per page."""
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page(width=612, height=792)
+        page.insert_text((72, 72), f"Orden de compra - pagina {number + 1}")
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+def jpeg_size(data_url):
+    prefix = "data:image/jpeg;base64,"
+    assert data_url.startswith(prefix)
+    jpeg = base64.b64decode(data_url[len(prefix):])
+    assert jpeg[:2] == b"\xff\xd8"
+    pix = fitz.Pixmap(jpeg)
+    return pix.width, pix.height
+
+
+class RenderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        ai_extractor._page_cache = None
+        self.use_settings(pdf_render_workers=0)
+        self.addCleanup(ai_extractor.shutdown_render_pool)
+
+    def use_settings(self, **overrides):
+        settings = get_settings().model_copy(update=overrides)
+        p = patch.object(ai_extractor, "get_settings", return_value=settings)
+        p.start()
+        self.addCleanup(p.stop)
+
+
+class TestRendering(RenderTestCase):
+
+    def test_render_pdf_pages(self):
+        pdf = make_pdf(3)
+        urls = render_pdf_pages(pdf, [0, 2], dpi=100, jpeg_quality=80)
+        self.assertEqual(len(urls), 2)
+        self.assertEqual(jpeg_size(urls[0]), (850, 1100))
+        # Lower quality, smaller image
+        low = render_pdf_pages(pdf, [0], dpi=100, jpeg_quality=20)[0]
+        self.assertLess(len(low), len(urls[0]))
+
+    def test_pages_capped_and_cached(self):
+        self.use_settings(pdf_render_workers=0, pdf_vision_max_pages=2, pdf_render_dpi=72)
+        pdf = make_pdf(5)
+        calls = []
+
+        def counting_render(pdf_content, pages, dpi, jpeg_quality):
+            calls.append(list(pages))
+            return render_pdf_pages(pdf_content, pages, dpi, jpeg_quality)
+
+        with patch.object(ai_extractor, "render_pdf_pages", side_effect=counting_render):
+            first = asyncio.run(pdf_to_image_urls(pdf))
+            again = asyncio.run(pdf_to_image_urls(pdf))
+            self.assertEqual(len(first), 2)
+            self.assertEqual(jpeg_size(first[1]), (612, 792))
+            self.assertEqual(again, first)
+            self.assertEqual(sorted(calls), [[0], [1]])
+
+            # Another PDF or another resolution is rendered again
+            asyncio.run(pdf_to_image_urls(make_pdf(1)))
+            self.use_settings(pdf_render_workers=0, pdf_vision_max_pages=2, pdf_render_dpi=100)
+            asyncio.run(pdf_to_image_urls(pdf))
+            self.assertEqual(len(calls), 5)
+
+    def test_first_page_only_by_default(self):
+        self.use_settings(pdf_render_workers=0, pdf_render_dpi=72)
+        pdf = make_pdf(3)
+        urls = asyncio.run(pdf_to_image_urls(pdf))
+        self.assertEqual(urls, render_pdf_pages(pdf, [0], dpi=72, jpeg_quality=85))
+
+    def test_process_pool(self):
+        self.use_settings(pdf_render_workers=2, pdf_vision_max_pages=2, pdf_render_dpi=72)
+        pdf = make_pdf(2)
+        urls = asyncio.run(pdf_to_image_urls(pdf))
+        self.assertIsNotNone(ai_extractor._render_pool)
+        self.assertEqual(urls, render_pdf_pages(pdf, [0, 1], dpi=72, jpeg_quality=85))
+
+        ai_extractor.shutdown_render_pool()
+        self.assertIsNone(ai_extractor._render_pool)
+
+    def test_invalid_pdf(self):
+        extractor = PDFExtractor(openai_client=None)
+        with self.assertLogs(ai_extractor.logger, level="ERROR"):
+            self.assertEqual(asyncio.run(extractor._pdf_to_image_urls(b"not a pdf")), [])
+
+
+class FakeVisionClient:
+    """Files API that always fails, vision completion that records its images."""
+
+    def __init__(self):
+        self.images = []
+
+    async def upload_file(self, content, filename):
+        raise RuntimeError("unsupported file")
+
+    async def vision_completion(self, prompt, image_url):
+        self.images.append(image_url)
+        return EXTRACTION_JSON
+
+
+class TestVisionFallback(RenderTestCase):
+
+    def test_pages_sent_together_and_reused(self):
+        self.use_settings(pdf_render_workers=0, pdf_vision_max_pages=2, pdf_render_dpi=72)
+        client = FakeVisionClient()
+        extractor = PDFExtractor(client)
+        pdf = make_pdf(2)
+
+        with patch.object(ai_extractor, "count_pdf_pages", wraps=ai_extractor.count_pdf_pages) as count, \
+                self.assertLogs(ai_extractor.logger, level="WARNING"):
+            for _ in range(2):
+                result = asyncio.run(extractor.extract_from_pdf_bytes(pdf, "oc.pdf"))
+                self.assertEqual((result.cliente, result.oc_number), ("Cafe Uno", "OC-1"))
+
+        self.assertEqual(count.call_count, 1)
+        self.assertEqual([len(images) for images in client.images], [2, 2])
+        self.assertEqual(client.images[0], client.images[1])
+
+
+class FakeGraph:
+
+    def __init__(self, attachments):
+        self.attachments = attachments
+
+    async def get_email(self, email_id):
+        return EmailMessage(id=email_id, subject="OC", from_address="compras@cliente.co",
+                            receivedDateTime=datetime(2026, 1, 1), hasAttachments=True)
+
+    async def get_attachments(self, email_id):
+        return self.attachments
+
+    async def download_attachment(self, email_id, attachment_id):
+        await asyncio.sleep(0.01)
+        return attachment_id.encode()
+
+
+class FakeClassifier:
+
+    async def classify(self, subject, body_preview):
+        return ClassificationResult(classification=ClassificationType.PURCHASE_ORDER, confidence=0.99)
+
+
+class FakeStorage:
+
+    async def upload_pdf(self, content, original_name):
+        return {"path": f"ordenes/{original_name}", "url": ""}
+
+
+class FakeExtractor:
+    """Extraction that takes a while; attachments named 'roto' fail."""
+
+    def __init__(self):
+        self.in_flight = self.peak = 0
+
+    async def extract_from_pdf_bytes(self, pdf_content, filename, email_body=None, email_subject=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+            if "roto" in filename:
+                raise ValueError("Could not convert PDF to images for vision fallback")
+            return PDFExtractor(None)._parse_extraction_response(EXTRACTION_JSON)
+        finally:
+            self.in_flight -= 1
+
+
+class TestProcessEmail(unittest.TestCase):
+
+    def test_attachments_processed_concurrently(self):
+        names = ["a.pdf", "roto.pdf", "c.pdf", "d.pdf", "foto.png"]
+        attachments = [
+            EmailAttachment(id=name, name=name, contentType="image/png" if name.endswith("png") else "application/pdf",
+                            size=100)
+            for name in names
+        ]
+        extractor = FakeExtractor()
+        processor = EmailProcessor(
+            graph_service=FakeGraph(attachments),
+            classifier=FakeClassifier(),
+            extractor=extractor,
+            storage=FakeStorage(),
+            supabase=None,
+        )
+
+        async def save(email, storage_result, extraction, processing_logs):
+            await asyncio.sleep(0.01)
+            return "order-" + storage_result["path"].rsplit("/", 1)[1]
+
+        settings = get_settings().model_copy(update={"email_attachment_concurrency": 2})
+        with patch.object(email_processor, "get_settings", return_value=settings), \
+                patch.object(processor, "_save_to_database", side_effect=save), \
+                self.assertLogs(email_processor.logger, level="ERROR"):
+            result = asyncio.run(processor.process_email("m1"))
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.orders_created, 3)
+        self.assertEqual(extractor.peak, 2)
+
+        logs = result.details["logs"]
+        downloads = [log for log in logs if log["step"] == "download_attachment" and log["status"] == "started"]
+        self.assertEqual([log["attachment"] for log in downloads], ["a.pdf", "roto.pdf", "c.pdf", "d.pdf"])
+        # Each attachment's steps stay together
+        steps = [(log["step"], log["status"]) for log in logs]
+        first = steps.index(("download_attachment", "started"))
+        self.assertEqual(steps[first:first + 8], [
+            ("download_attachment", "started"), ("download_attachment", "completed"),
+            ("upload_storage", "started"), ("upload_storage", "completed"),
+            ("extract_data", "started"), ("extract_data", "completed"),
+            ("save_database", "started"), ("save_database", "completed"),
+        ])
+        self.assertEqual(steps[first + 13], ("process_attachment", "error"))
+        self.assertEqual(
+            [log["order_id"] for log in logs if log["step"] == "save_database" and log["status"] == "completed"],
+            ["order-a.pdf", "order-c.pdf", "order-d.pdf"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
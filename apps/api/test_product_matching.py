@@ -0,0 +1,192 @@
+"""
+Tests for batched order-line product matching.
+
+Verifies that:
+1. match_products fetches the client's aliases and their weights once,
+   embeds every line in one request, matches lines concurrently (bounded by
+   product_match_concurrency) and returns results in line order
+2. Low-confidence lines are reranked together in one LLM call; a single
+   line keeps the single-line prompt and an unusable answer falls back to
+   the top-1 candidate
+3. With return_exceptions a failing line gets its exception while the rest
+   of the order is matched
+4. The Telegram _parse_products flow prices every accepted line with one
+   products query
+"""
+
+import asyncio
+import json
+import os
+import re
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.core.cache import invalidate_masterdata  # noqa: E402
+from app.core.config import get_settings  # noqa: E402
+from app.services import rag_sync  # noqa: E402
+from app.services.telegram import conversation  # noqa: E402
+from test_embedding_batches import FakeDatabase, FakeTable  # noqa: E402
+from test_embedding_cache import EmbeddingTestCase, fake_vector  # noqa: E402
+
+
+def line_names(prefix, count):
+    # Letters only: a trailing number would be parsed as a weight
+    return [f"{prefix} {chr(65 + i % 26)}{chr(65 + i // 26)}" for i in range(count)]
+
+
+class CountingDatabase(FakeDatabase):
+
+    def __init__(self, **tables):
+        super().__init__(**tables)
+        self.queries = []
+
+    def table(self, name):
+        self.queries.append(name)
+        return FakeTable(self, name)
+
+
+class FakeReranker:
+    """chat_completion answering the single-line or the batch prompt."""
+
+    def __init__(self, answer=None):
+        self.prompts = []
+        self.answer = answer
+
+    async def chat_completion(self, messages, **kwargs):
+        prompt = messages[0]["content"]
+        self.prompts.append(prompt)
+        if self.answer is not None:
+            return self.answer
+        lines = re.findall(r'^Línea (\d+):', prompt, re.MULTILINE)
+        if not lines:
+            return "2"
+        # Second candidate for odd lines, "none" (top-1 fallback) for even ones
+        return json.dumps({n: 2 if int(n) % 2 else 0 for n in lines})
+
+
+class MatchingTestCase(EmbeddingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db = CountingDatabase(
+            product_aliases=[
+                {"client_id": "c1", "product_id": "pa", "client_alias": "ALIAS EXACTO",
+                 "real_product_name": "Pan Aliado"},
+            ],
+            products=[{"id": "pa", "weight": "80 g", "price": 1500}],
+        )
+        self.reranker = FakeReranker()
+        self.vectors = {}
+        self.in_flight = self.peak = 0
+        self.searches = 0
+        settings = get_settings().model_copy(update={"product_match_concurrency": 4})
+        patches = [
+            patch.object(rag_sync, "get_supabase_client", return_value=self.db),
+            patch.object(rag_sync, "get_openai_client", return_value=self.reranker),
+            patch.object(rag_sync, "get_settings", return_value=settings),
+            patch.object(rag_sync, "_search_rag", side_effect=self.search),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def text_of(self, embedding):
+        for text in list(self.openai.texts):
+            self.vectors.setdefault(tuple(round(v, 4) for v in fake_vector(text)), text)
+        return self.vectors[tuple(round(v, 4) for v in embedding)]
+
+    async def search(self, index, function, embedding, match_count):
+        """ALTO lines match with high confidence, DUDA lines need reranking."""
+        self.searches += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        text = self.text_of(embedding)
+        if text.startswith("ALTO"):
+            return [{"content": text, "similarity": 0.9, "metadata": {"product_id": f"p-{text}"}}]
+        if text.startswith("DUDA"):
+            return [
+                {"content": f"{text} Uno", "similarity": 0.6, "metadata": {"product_id": f"p1-{text}"}},
+                {"content": f"{text} Dos", "similarity": 0.55, "metadata": {"product_id": f"p2-{text}"}},
+            ]
+        return []
+
+
+class TestMatchProducts(MatchingTestCase):
+
+    def test_large_order(self):
+        lines = line_names("ALTO", 40) + line_names("DUDA", 10) + ["alias exacto", "NADA"]
+        results = asyncio.run(rag_sync.match_products(lines, client_id="c1", precios=[1000.0] * len(lines)))
+
+        self.assertEqual(len(results), len(lines))
+        self.assertEqual(self.db.queries, ["product_aliases", "products"])
+        self.assertEqual(len(self.openai.requests), 1)
+        self.assertEqual(self.peak, 4)
+
+        self.assertTrue(all(r["source"] == "rag" and r["product_id"] == f"p-{line}"
+                            for line, r in zip(lines[:40], results[:40])))
+        self.assertEqual(results[50], {"product_id": "pa", "matched_name": "Pan Aliado 80g",
+                                       "source": "alias_exact", "similarity": 1.0})
+        self.assertIsNone(results[51])
+
+        # One reranker call for the ten ambiguous lines
+        self.assertEqual(len(self.reranker.prompts), 1)
+        self.assertIn("precio unitario en la orden: $1,000.00", self.reranker.prompts[0])
+        doubtful = results[40:50]
+        self.assertEqual([r["source"] for r in doubtful], ["rag_reranked", "rag"] * 5)
+        self.assertEqual(doubtful[0]["product_id"], f"p2-{lines[40]}")
+        self.assertEqual(doubtful[1]["product_id"], f"p1-{lines[41]}")
+
+    def test_single_ambiguous_line_uses_single_prompt(self):
+        results = asyncio.run(rag_sync.match_products(["DUDA UNICA"]))
+        self.assertEqual(results[0]["source"], "rag_reranked")
+        self.assertIn("Nombre extraído de la orden", self.reranker.prompts[0])
+        self.assertEqual(self.db.queries, [])
+
+    def test_unusable_batch_answer_falls_back_to_top1(self):
+        self.reranker.answer = "no sé"
+        with self.assertLogs(rag_sync.logger, level="ERROR"):
+            results = asyncio.run(rag_sync.match_products(["DUDA A", "DUDA B"]))
+        self.assertEqual([(r["source"], r["product_id"]) for r in results],
+                         [("rag", "p1-DUDA A"), ("rag", "p1-DUDA B")])
+
+    def test_failed_line(self):
+        search = self.search
+
+        async def failing_search(index, function, embedding, match_count):
+            if self.text_of(embedding) == "ALTO ROTO":
+                raise RuntimeError("boom")
+            return await search(index, function, embedding, match_count)
+
+        with patch.object(rag_sync, "_search_rag", side_effect=failing_search):
+            results = asyncio.run(rag_sync.match_products(["ALTO A", "ALTO ROTO", "ALTO B"], return_exceptions=True))
+            self.assertIsInstance(results[1], RuntimeError)
+            self.assertEqual([results[0]["product_id"], results[2]["product_id"]], ["p-ALTO A", "p-ALTO B"])
+
+            with self.assertRaises(RuntimeError):
+                asyncio.run(rag_sync.match_products(["ALTO A", "ALTO ROTO"]))
+
+
+class TestTelegramParseProducts(MatchingTestCase):
+
+    def test_prices_in_one_query(self):
+        invalidate_masterdata("product_prices")
+        names = line_names("ALTO", 6)
+        self.db.data["products"] += [{"id": f"p-{name}", "price": 100 + i} for i, name in enumerate(names)]
+        text = ", ".join(f"{i + 1} {name}" for i, name in enumerate(names)) + "\n3 DUDA X, 2 NADA"
+
+        with patch.object(conversation, "get_supabase_client", return_value=self.db):
+            items, ambiguous = asyncio.run(conversation._parse_products(text))
+
+        self.assertEqual([(i["quantity"], i["unit_price"]) for i in items], [(n + 1, 100 + n) for n in range(6)])
+        self.assertEqual(self.db.queries.count("products"), 1)
+        self.assertEqual([(a["query"], a["quantity"]) for a in ambiguous], [("DUDA X", 3)])
+        self.assertEqual(ambiguous[0]["best_match"]["source"], "rag_reranked")
+
+
+if __name__ == "__main__":
+    unittest.main()
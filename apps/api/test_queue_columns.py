@@ -0,0 +1,163 @@
+"""
+Tests for columnar queue recalculation.
+
+Verifies that:
+1. recalculate_queue_times / recalculate_queue_times_hybrid (now QueueColumns)
+   return the same order and times as the original row-by-row implementation,
+   with fractional durations, arrival ties and dense blocked shifts
+2. moved_existing returns exactly the existing schedules whose times changed
+3. new_schedules returns only the new batches, in queue order
+4. Unmoved schedules are not touched
+"""
+
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from app.api.routes.production.blocked_calendar import BlockedCalendar
+from app.api.routes.production.cascade import (
+    recalculate_queue_times,
+    recalculate_queue_times_hybrid,
+)
+from app.api.routes.production.queue_columns import QueueColumns
+
+BASE = datetime(2026, 1, 5, 6, 0)
+
+
+def _process(schedule, queue_end, calendar):
+    arrival = schedule["arrival_time"]
+    duration = schedule["duration_minutes"]
+    start_time = arrival if queue_end is None or arrival >= queue_end else queue_end
+    if calendar:
+        start_time = calendar.earliest_start(start_time, duration)
+    schedule["new_start_date"] = start_time
+    schedule["new_end_date"] = start_time + timedelta(minutes=duration)
+    return schedule["new_end_date"]
+
+
+def legacy_recalculate(all_schedules, blocked_periods=None):
+    """The original row-by-row FIFO pass."""
+    calendar = BlockedCalendar(blocked_periods) if blocked_periods else None
+    sorted_schedules = sorted(all_schedules, key=lambda x: x["arrival_time"])
+    queue_end = None
+    for schedule in sorted_schedules:
+        queue_end = _process(schedule, queue_end, calendar)
+    return sorted_schedules
+
+
+def legacy_recalculate_hybrid(all_schedules, blocked_periods=None):
+    """The original per-production-order FIFO pass."""
+    calendar = BlockedCalendar(blocked_periods) if blocked_periods else None
+    groups = {}
+    for schedule in all_schedules:
+        groups.setdefault(schedule.get("production_order_number"), []).append(schedule)
+    for group_schedules in groups.values():
+        queue_end = None
+        for schedule in sorted(group_schedules, key=lambda x: x["arrival_time"]):
+            queue_end = _process(schedule, queue_end, calendar)
+    return sorted(all_schedules, key=lambda x: x["new_start_date"])
+
+
+def random_queue(rng, count):
+    schedules = []
+    for i in range(count):
+        # Coarse grid so ties in arrival are common
+        arrival = BASE + timedelta(minutes=rng.randrange(0, 3 * 24 * 60, 15))
+        duration = rng.choice([30, 45, 60, 100 / 150 * 60, 50 / 90 * 60, 240, 0.5])
+        existing = rng.random() < 0.7
+        schedule = {
+            "id": f"s{i}",
+            "is_existing": existing,
+            "arrival_time": arrival,
+            "duration_minutes": duration,
+            "production_order_number": rng.choice([1, 2, 3, 4, None]),
+        }
+        if existing:
+            shift = timedelta(minutes=rng.choice([0, 0, 0, 5, 30]))
+            schedule["start_date"] = arrival + shift
+            schedule["end_date"] = arrival + shift + timedelta(minutes=duration)
+        schedules.append(schedule)
+    return schedules
+
+
+def random_blocked(rng, density):
+    blocked = []
+    for day in range(5):
+        for shift in range(3):
+            if rng.random() < density:
+                start = BASE - timedelta(hours=8) + timedelta(days=day, hours=8 * shift)
+                blocked.append((start, start + timedelta(hours=8)))
+    return blocked
+
+
+def snapshot(schedules):
+    return [(s["id"], s["new_start_date"], s["new_end_date"]) for s in schedules]
+
+
+class TestQueueColumns(unittest.TestCase):
+
+    def test_matches_legacy_implementation(self):
+        rng = random.Random(3)
+        for _ in range(400):
+            schedules = random_queue(rng, rng.randrange(1, 60))
+            blocked = random_blocked(rng, rng.choice([0, 0.2, 0.6]))
+            for new, old in ((recalculate_queue_times, legacy_recalculate),
+                             (recalculate_queue_times_hybrid, legacy_recalculate_hybrid)):
+                expected = snapshot(old([dict(s) for s in schedules], blocked or None))
+                actual = snapshot(new([dict(s) for s in schedules], blocked or None))
+                self.assertEqual(actual, expected)
+
+    def test_accepts_blocked_calendar(self):
+        rng = random.Random(11)
+        schedules = random_queue(rng, 40)
+        blocked = random_blocked(rng, 0.5)
+        self.assertEqual(
+            snapshot(recalculate_queue_times([dict(s) for s in schedules], BlockedCalendar(blocked))),
+            snapshot(legacy_recalculate([dict(s) for s in schedules], blocked)),
+        )
+
+    def test_moved_existing_and_new_schedules(self):
+        rng = random.Random(17)
+        for _ in range(100):
+            schedules = random_queue(rng, rng.randrange(1, 40))
+            blocked = random_blocked(rng, 0.3)
+            is_hybrid = rng.random() < 0.5
+            legacy = legacy_recalculate_hybrid if is_hybrid else legacy_recalculate
+            reference = legacy([dict(s) for s in schedules], blocked or None)
+
+            queue = QueueColumns([dict(s) for s in schedules], blocked or None, is_hybrid=is_hybrid)
+            self.assertEqual(
+                snapshot(queue.moved_existing()),
+                snapshot([
+                    s for s in reference
+                    if s["is_existing"] and (
+                        s["new_start_date"] != s["start_date"] or s["new_end_date"] != s["end_date"]
+                    )
+                ]),
+            )
+            self.assertEqual(
+                snapshot(queue.new_schedules()),
+                snapshot([s for s in reference if not s["is_existing"]]),
+            )
+
+    def test_unmoved_schedules_are_not_touched(self):
+        existing = {
+            "id": "e1", "is_existing": True, "arrival_time": BASE, "duration_minutes": 60,
+            "start_date": BASE, "end_date": BASE + timedelta(hours=1),
+        }
+        new = {"id": None, "is_existing": False, "arrival_time": BASE, "duration_minutes": 30}
+        queue = QueueColumns([existing, new])
+        self.assertEqual(queue.moved_existing(), [])
+        placed = queue.new_schedules()
+        self.assertEqual(placed[0]["new_start_date"], BASE + timedelta(hours=1))
+        self.assertNotIn("new_start_date", existing)
+
+    def test_empty_queue(self):
+        queue = QueueColumns([])
+        self.assertEqual(queue.to_schedules(), [])
+        self.assertEqual(queue.moved_existing(), [])
+        self.assertEqual(recalculate_queue_times([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
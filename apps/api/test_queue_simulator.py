@@ -0,0 +1,182 @@
+"""
+Tests for incremental finish-time simulation in multi-WC distribution.
+
+Verifies that:
+1. WorkCenterQueue.finish_time matches a full recalculate_queue_times(_hybrid) pass
+2. WorkCenterQueue.place returns the new batches' times in recalculated order
+3. The existing schedules are not mutated by simulation
+4. distribute_batches_to_work_centers (binary-searched split) matches the
+   one-batch-at-a-time spill it replaced
+"""
+
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from app.api.routes.production.blocked_calendar import BlockedCalendar
+from app.api.routes.production.cascade import (
+    distribute_batches_to_work_centers,
+    recalculate_queue_times,
+    recalculate_queue_times_hybrid,
+)
+from app.api.routes.production.queue_simulator import WorkCenterQueue
+
+BASE = datetime(2026, 1, 5, 6, 0)
+
+
+def full_recalc_finish(new_batches, existing, blocked, is_hybrid):
+    """Reference: copy everything, recalculate the whole queue, take the last new end."""
+    if not new_batches:
+        return None
+    all_schedules = [{**s} for s in existing] + [{**b} for b in new_batches]
+    recalc = recalculate_queue_times_hybrid if is_hybrid else recalculate_queue_times
+    ends = [s["new_end_date"] for s in recalc(all_schedules, blocked or None) if not s.get("is_existing")]
+    return max(ends)
+
+
+def linear_distribution(new_batches, wc_contexts, deadline, is_hybrid):
+    """Reference: the original pop-one-batch-and-resimulate loop."""
+    distribution = {ctx["wc_id"]: [] for ctx in wc_contexts}
+    distribution[wc_contexts[0]["wc_id"]] = list(new_batches)
+
+    def ok(idx):
+        ctx = wc_contexts[idx]
+        finish = full_recalc_finish(distribution[ctx["wc_id"]], ctx["existing_schedules"],
+                                    ctx["blocked_periods"], is_hybrid)
+        return finish is None or finish <= deadline
+
+    if ok(0):
+        return {k: v for k, v in distribution.items() if v}
+    source_idx = 0
+    for target_idx in range(1, len(wc_contexts)):
+        source_id = wc_contexts[source_idx]["wc_id"]
+        target_id = wc_contexts[target_idx]["wc_id"]
+        while distribution[source_id]:
+            distribution[target_id].insert(0, distribution[source_id].pop())
+            if ok(source_idx) and ok(target_idx):
+                return {k: v for k, v in distribution.items() if v}
+        source_idx = target_idx
+    return {k: v for k, v in distribution.items() if v}
+
+
+def random_existing(rng, count, order_numbers=(101, 102, 103)):
+    schedules = []
+    for _ in range(count):
+        arrival = BASE + timedelta(minutes=rng.randrange(0, 5 * 24 * 60))
+        schedules.append({
+            "id": f"s{len(schedules)}",
+            "is_existing": True,
+            "arrival_time": arrival,
+            "duration_minutes": rng.choice([20, 45, 60, 90]),
+            "production_order_number": rng.choice(order_numbers),
+        })
+    return schedules
+
+
+def random_blocked(rng):
+    blocked = []
+    for day in range(6):
+        for shift_start in (-2, 6, 14):
+            if rng.random() < 0.3:
+                start = datetime(2026, 1, 5) + timedelta(days=day, hours=shift_start)
+                blocked.append((start, start + timedelta(hours=8)))
+    return BlockedCalendar(blocked)
+
+
+def random_new_batches(rng, count, order_number=200):
+    arrival = BASE + timedelta(minutes=rng.randrange(0, 2 * 24 * 60))
+    batches = []
+    for number in range(1, count + 1):
+        arrival += timedelta(minutes=rng.choice([0, 10, 30, 60]))
+        batches.append({
+            "id": None,
+            "is_existing": False,
+            "arrival_time": arrival,
+            "duration_minutes": rng.choice([30, 60, 75]),
+            "batch_number": number,
+            "production_order_number": order_number,
+        })
+    return batches
+
+
+class TestWorkCenterQueue(unittest.TestCase):
+
+    def test_matches_full_recalculation(self):
+        rng = random.Random(3)
+        for is_hybrid in (False, True):
+            for _ in range(150):
+                existing = random_existing(rng, rng.randrange(0, 40))
+                blocked = random_blocked(rng)
+                queue = WorkCenterQueue(existing, blocked, is_hybrid)
+                new_batches = random_new_batches(rng, rng.randrange(1, 12), rng.choice([101, 200, None]))
+                for k in range(len(new_batches) + 1):
+                    self.assertEqual(
+                        queue.finish_time(new_batches[k:]),
+                        full_recalc_finish(new_batches[k:], existing, blocked, is_hybrid),
+                    )
+
+    def test_place_matches_full_recalculation(self):
+        rng = random.Random(9)
+        for is_hybrid in (False, True):
+            recalc = recalculate_queue_times_hybrid if is_hybrid else recalculate_queue_times
+            for _ in range(100):
+                existing = random_existing(rng, rng.randrange(0, 30))
+                blocked = random_blocked(rng)
+                new_batches = random_new_batches(rng, rng.randrange(1, 6), 101)
+                new_batches += random_new_batches(rng, rng.randrange(1, 6), 200)
+                expected = [
+                    (s["batch_number"], s["production_order_number"], s["new_start_date"], s["new_end_date"])
+                    for s in recalc([{**s} for s in existing] + [{**b} for b in new_batches], blocked or None)
+                    if not s.get("is_existing")
+                ]
+                placed = WorkCenterQueue(existing, blocked, is_hybrid).place(new_batches)
+                self.assertEqual(
+                    [(b["batch_number"], b["production_order_number"], start, end) for b, start, end in placed],
+                    expected,
+                )
+
+    def test_does_not_mutate_existing(self):
+        existing = random_existing(random.Random(1), 10)
+        snapshot = [dict(s) for s in existing]
+        WorkCenterQueue(existing, None).finish_time(random_new_batches(random.Random(2), 5))
+        self.assertEqual(existing, snapshot)
+
+    def test_empty_batches_finish_none(self):
+        self.assertIsNone(WorkCenterQueue([], None).finish_time([]))
+
+
+class TestDistributeBatches(unittest.TestCase):
+
+    def test_matches_linear_spill(self):
+        rng = random.Random(11)
+        for is_hybrid in (False, True):
+            for _ in range(120):
+                contexts = [
+                    {
+                        "wc_id": f"wc-{i}",
+                        "existing_schedules": random_existing(rng, rng.randrange(0, 30)),
+                        "blocked_periods": random_blocked(rng),
+                    }
+                    for i in range(rng.randrange(2, 5))
+                ]
+                batches = random_new_batches(rng, rng.randrange(1, 16))
+                deadline = batches[0]["arrival_time"] + timedelta(hours=rng.randrange(1, 30))
+
+                result = distribute_batches_to_work_centers(batches, contexts, deadline, is_hybrid)
+                expected = linear_distribution(batches, contexts, deadline, is_hybrid)
+                self.assertEqual(
+                    {k: [b["batch_number"] for b in v] for k, v in result.items()},
+                    {k: [b["batch_number"] for b in v] for k, v in expected.items()},
+                )
+
+    def test_no_deadline_keeps_primary(self):
+        batches = random_new_batches(random.Random(5), 4)
+        contexts = [
+            {"wc_id": "a", "existing_schedules": [], "blocked_periods": []},
+            {"wc_id": "b", "existing_schedules": [], "blocked_periods": []},
+        ]
+        self.assertEqual(list(distribute_batches_to_work_centers(batches, contexts, None, False)), ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+Tests for the cached work center staffing calendar.
+
+Verifies that:
+1. get_staffed_work_centers returns the same WCs as the per-shift
+   work_center_staffing query (staff_count > 0, only the requested WCs)
+2. A whole production week is loaded with one query and served from cache
+3. Shift dates map to the production week of get_production_week
+4. Calendars expire after the TTL and can be invalidated per week or all
+"""
+
+import asyncio
+import random
+import unittest
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock
+
+from fastapi import HTTPException
+
+from app.api.routes.production import staffing_calendar
+from app.api.routes.production.cascade import (
+    get_production_week,
+    get_staffed_work_centers,
+    invalidate_staffing,
+)
+from app.api.routes.production.staffing_calendar import (
+    determine_shift_from_datetime,
+    get_staffed_work_centers_at,
+    get_staffing_calendar,
+    invalidate_staffing_calendar,
+    staffing_week_start,
+)
+
+WC_IDS = [f"wc-{i}" for i in range(6)]
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self._client = client
+        self._filters = []
+        self._range = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def gte(self, column, value):
+        self._filters.append(lambda row: row[column] >= value)
+        return self
+
+    def lte(self, column, value):
+        self._filters.append(lambda row: row[column] <= value)
+        return self
+
+    def gt(self, column, value):
+        self._filters.append(lambda row: row[column] > value)
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def execute(self):
+        self._client.queries += 1
+        rows = [dict(r) for r in self._client.rows if all(f(r) for f in self._filters)]
+        if self._range:
+            rows = rows[self._range[0]:self._range[1] + 1]
+        result = MagicMock()
+        result.data = rows
+        return result
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def schema(self, name):
+        return self
+
+    def table(self, name):
+        assert name == "work_center_staffing"
+        return FakeQuery(self)
+
+
+def random_staffing(rng, start, days):
+    rows = []
+    for day in range(days):
+        for shift in (1, 2, 3):
+            for wc_id in WC_IDS:
+                if rng.random() < 0.5:
+                    rows.append({
+                        "work_center_id": wc_id,
+                        "date": (start + timedelta(days=day)).isoformat(),
+                        "shift_number": shift,
+                        "staff_count": rng.choice([0, 1, 2, 3]),
+                    })
+    return rows
+
+
+def query_staffed(rows, wc_ids, target_date, shift_number):
+    """What the old per-shift query returned."""
+    return {
+        row["work_center_id"] for row in rows
+        if row["work_center_id"] in wc_ids and row["date"] == target_date.isoformat()
+        and row["shift_number"] == shift_number and row["staff_count"] > 0
+    }
+
+
+class TestStaffingCalendar(unittest.TestCase):
+
+    def setUp(self):
+        invalidate_staffing_calendar()
+
+    def tearDown(self):
+        invalidate_staffing_calendar()
+
+    def test_matches_per_shift_query(self):
+        rng = random.Random(5)
+        rows = random_staffing(rng, date(2026, 1, 3), 21)
+        supabase = FakeSupabase(rows)
+        for day in range(1, 20):
+            target_date = date(2026, 1, 3) + timedelta(days=day)
+            for shift in (1, 2, 3):
+                wc_ids = rng.sample(WC_IDS, rng.randrange(1, len(WC_IDS)))
+                staffed = get_staffed_work_centers(supabase, wc_ids, target_date, shift)
+                self.assertEqual(
+                    {s["work_center_id"] for s in staffed},
+                    query_staffed(rows, wc_ids, target_date, shift),
+                )
+                self.assertTrue(all(s["staff_count"] > 0 for s in staffed))
+        # Shift dates Jan 4..Jan 22 span three production weeks
+        self.assertEqual(supabase.queries, 3)
+
+    def test_staffed_at_datetime(self):
+        rows = [
+            {"work_center_id": "wc-0", "date": "2026-01-05", "shift_number": 1, "staff_count": 2},
+            {"work_center_id": "wc-1", "date": "2026-01-05", "shift_number": 2, "staff_count": 1},
+        ]
+        supabase = FakeSupabase(rows)
+        # 23:00 on Jan 4 is T1 of Jan 5
+        self.assertEqual(get_staffed_work_centers_at(supabase, datetime(2026, 1, 4, 23)), {"wc-0": 2})
+        self.assertEqual(get_staffed_work_centers_at(supabase, datetime(2026, 1, 5, 7)), {"wc-1": 1})
+        self.assertEqual(get_staffed_work_centers_at(supabase, datetime(2026, 1, 5, 15)), {})
+        self.assertEqual(supabase.queries, 1)
+
+    def test_week_matches_production_week(self):
+        start = datetime(2026, 1, 1)
+        for hour in range(0, 24 * 21, 1):
+            dt = start + timedelta(hours=hour)
+            shift_date, _ = determine_shift_from_datetime(dt)
+            week_start, _ = get_production_week(dt)
+            # Production week starts Saturday 22:00, i.e. with T1 of Sunday
+            self.assertEqual(staffing_week_start(shift_date), (week_start + timedelta(hours=2)).date())
+
+    def test_ttl_and_invalidation(self):
+        rows = random_staffing(random.Random(1), date(2026, 1, 4), 14)
+        supabase = FakeSupabase(rows)
+        first = get_staffing_calendar(supabase, date(2026, 1, 5))
+        get_staffing_calendar(supabase, date(2026, 1, 12))
+        self.assertIs(get_staffing_calendar(supabase, date(2026, 1, 10)), first)
+        self.assertEqual(supabase.queries, 2)
+
+        self.assertIsNot(get_staffing_calendar(supabase, date(2026, 1, 5), ttl_seconds=0), first)
+        self.assertEqual(supabase.queries, 3)
+
+        self.assertEqual(invalidate_staffing_calendar(date(2026, 1, 6)), 1)
+        self.assertEqual(invalidate_staffing_calendar(date(2026, 1, 6)), 0)
+        self.assertEqual(len(staffing_calendar._staffing_calendars), 1)
+        self.assertEqual(asyncio.run(invalidate_staffing()), {"invalidated": 1})
+
+    def test_invalidate_endpoint_rejects_bad_date(self):
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(invalidate_staffing(date="06/01/2026"))
+        self.assertEqual(ctx.exception.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,347 @@
+"""
+Tests for the async Supabase client layer.
+
+Verifies that:
+1. Query builders keep the sync client's ergonomics (table/schema/rpc,
+   filters, count) and send the service key and schema headers
+2. Every schema shares the one pooled HTTP client
+3. No more than max_concurrency requests are in flight at once
+4. execute(query, timeout=...) enforces a per-call timeout
+5. Migrated routers await the async client and do not block the event loop
+6. backfill_audit_user_async updates the same rows as backfill_audit_user
+7. gather_queries runs independent queries concurrently (latency of the
+   slowest, not the sum), isolates optional failures and raises required ones
+8. Page init endpoints fan their queries out with gather_queries
+"""
+
+import asyncio
+import os
+import time
+import unittest
+
+import httpx
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.core import supabase_async  # noqa: E402
+from app.core.supabase_async import (  # noqa: E402
+    backfill_audit_user_async,
+    create_async_supabase_client,
+    execute,
+    gather_queries,
+)
+from postgrest.exceptions import APIError  # noqa: E402
+
+
+class FakePostgrest:
+    """Mock transport handler that records requests and tracks concurrency."""
+
+    def __init__(self, latency=0.0, rows=None, total=None, failing_tables=()):
+        self.latency = latency
+        self.rows = rows if rows is not None else []
+        self.total = total
+        self.failing_tables = set(failing_tables)
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if request.url.path.rsplit("/", 1)[-1] in self.failing_tables:
+            return httpx.Response(500, json={"message": "boom", "code": "XX000"})
+        headers = {"content-range": f"0-{len(self.rows)}/{self.total}"} if self.total is not None else {}
+        return httpx.Response(200, json=self.rows, headers=headers)
+
+
+def make_client(postgrest, max_concurrency=10, timeout_seconds=5):
+    return create_async_supabase_client(
+        "http://postgrest.local", "test-key",
+        max_connections=2, max_concurrency=max_concurrency, timeout_seconds=timeout_seconds,
+        transport=httpx.MockTransport(postgrest),
+    )
+
+
+class TestAsyncSupabase(unittest.TestCase):
+
+    def test_query_builder_ergonomics(self):
+        postgrest = FakePostgrest(rows=[{"id": "o1"}], total=12)
+
+        async def scenario():
+            client = make_client(postgrest)
+            result = await client.table("orders").select("id", count="exact").eq(
+                "status", "received"
+            ).execute()
+            await client.schema("produccion").rpc("get_work_center_queue_context", {"p": 1}).execute()
+            await client.aclose()
+            return result
+
+        result = asyncio.run(scenario())
+        self.assertEqual(result.data, [{"id": "o1"}])
+        self.assertEqual(result.count, 12)
+
+        table_request, rpc_request = postgrest.requests
+        self.assertEqual(table_request.url.path, "/rest/v1/orders")
+        self.assertEqual(table_request.url.params["status"], "eq.received")
+        self.assertEqual(table_request.headers["apikey"], "test-key")
+        self.assertEqual(table_request.headers["authorization"], "Bearer test-key")
+        self.assertEqual(rpc_request.url.path, "/rest/v1/rpc/get_work_center_queue_context")
+        self.assertEqual(rpc_request.headers["content-profile"], "produccion")
+
+    def test_schemas_share_http_client(self):
+        client = make_client(FakePostgrest())
+        self.assertIs(client.schema("produccion"), client.schema("produccion"))
+        self.assertIs(client.schema("produccion").session, client.http_client)
+        self.assertIs(client.schema("public").session, client.http_client)
+
+    def test_concurrency_limit(self):
+        postgrest = FakePostgrest(latency=0.01)
+
+        async def scenario():
+            client = make_client(postgrest, max_concurrency=3)
+            await asyncio.gather(*(client.table("orders").select("id").execute() for _ in range(20)))
+            await client.aclose()
+
+        asyncio.run(scenario())
+        self.assertEqual(len(postgrest.requests), 20)
+        self.assertEqual(postgrest.max_in_flight, 3)
+
+    def test_per_call_timeout(self):
+        postgrest = FakePostgrest(latency=0.5)
+
+        async def scenario():
+            client = make_client(postgrest)
+            try:
+                with self.assertRaises(asyncio.TimeoutError):
+                    await execute(client.table("orders").select("id"), timeout=0.01)
+            finally:
+                await client.aclose()
+
+        asyncio.run(scenario())
+
+    def test_router_does_not_block_event_loop(self):
+        from app.api.routes.dispatch.stats import get_dispatch_stats
+
+        postgrest = FakePostgrest(latency=0.05, total=3)
+
+        async def scenario():
+            supabase_async._async_client = make_client(postgrest)
+            try:
+                ticks = 0
+
+                async def ticker():
+                    nonlocal ticks
+                    while True:
+                        ticks += 1
+                        await asyncio.sleep(0.005)
+
+                task = asyncio.create_task(ticker())
+                stats = await get_dispatch_stats()
+                task.cancel()
+                return stats, ticks
+            finally:
+                await supabase_async.close_async_supabase_client()
+
+        stats, ticks = asyncio.run(scenario())
+        self.assertEqual(stats.active_routes, 3)
+        self.assertEqual(len(postgrest.requests), 4)
+        # The loop kept running while the 4 queries (one 50 ms wave) were in flight
+        self.assertGreater(ticks, 5)
+
+    def test_order_items_router_uses_async_client(self):
+        from app.api.routes.orders.items import list_order_items
+
+        item = {"id": "i1", "product_id": "p1", "quantity_requested": 2, "unit_price": 3.0,
+                "products": {"id": "p1", "name": "Pan"}}
+        postgrest = FakePostgrest(latency=0.05, rows=[item])
+
+        async def scenario():
+            supabase_async._async_client = make_client(postgrest)
+            try:
+                ticks = 0
+
+                async def ticker():
+                    nonlocal ticks
+                    while True:
+                        ticks += 1
+                        await asyncio.sleep(0.005)
+
+                task = asyncio.create_task(ticker())
+                body = await list_order_items("o1")
+                task.cancel()
+                return body, ticks
+            finally:
+                await supabase_async.close_async_supabase_client()
+
+        body, ticks = asyncio.run(scenario())
+        self.assertEqual(body["total_count"], 1)
+        self.assertEqual(body["items"][0].subtotal, 6.0)
+        self.assertEqual([r.url.path for r in postgrest.requests], ["/rest/v1/orders", "/rest/v1/order_items"])
+        # Two sequential 50 ms queries, awaited rather than run on the loop thread
+        self.assertGreater(ticks, 10)
+
+    def test_backfill_audit_user_async(self):
+        postgrest = FakePostgrest()
+
+        async def scenario():
+            client = make_client(postgrest)
+            await backfill_audit_user_async(client, "user-1", "order-1", ["orders_audit"])
+            await backfill_audit_user_async(client, None, "order-1")
+            await client.aclose()
+
+        asyncio.run(scenario())
+        (request,) = postgrest.requests
+        self.assertEqual(request.method, "PATCH")
+        self.assertEqual(request.url.path, "/rest/v1/orders_audit")
+        self.assertEqual(request.url.params["order_id"], "eq.order-1")
+        self.assertEqual(request.url.params["changed_by"], "is.null")
+        self.assertIn("changed_at", request.url.params)
+
+
+class TestGatherQueries(unittest.TestCase):
+
+    def test_latency_is_slowest_query(self):
+        postgrest = FakePostgrest(latency=0.05, total=1)
+
+        async def scenario():
+            client = make_client(postgrest)
+            try:
+                start = time.perf_counter()
+                results = await gather_queries({
+                    f"q{i}": client.table("orders").select("id", count="exact") for i in range(7)
+                })
+                return results, time.perf_counter() - start
+            finally:
+                await client.aclose()
+
+        results, elapsed = asyncio.run(scenario())
+        self.assertEqual(list(results), [f"q{i}" for i in range(7)])
+        self.assertTrue(all(r.count == 1 for r in results.values()))
+        self.assertEqual(postgrest.max_in_flight, 7)
+        # Serial would take 7 x 50 ms
+        self.assertLess(elapsed, 0.2)
+
+    def test_skipped_and_optional_queries(self):
+        postgrest = FakePostgrest(rows=[{"id": "v1"}], failing_tables={"vehicles"})
+
+        async def scenario():
+            client = make_client(postgrest)
+            try:
+                return await gather_queries({
+                    "routes": client.table("routes").select("id"),
+                    "vehicles": client.table("vehicles").select("id"),
+                    "drivers": None,
+                }, optional=["vehicles"])
+            finally:
+                await client.aclose()
+
+        with self.assertLogs("app.core.supabase_async", level="WARNING"):
+            results = asyncio.run(scenario())
+        self.assertEqual(results["routes"].data, [{"id": "v1"}])
+        self.assertIsNone(results["vehicles"])
+        self.assertIsNone(results["drivers"])
+        self.assertEqual(len(postgrest.requests), 2)
+
+    def test_required_failure_raises_after_all_finish(self):
+        postgrest = FakePostgrest(latency=0.02, failing_tables={"routes"})
+
+        async def scenario():
+            client = make_client(postgrest)
+            try:
+                with self.assertRaises(APIError):
+                    await gather_queries({
+                        "routes": client.table("routes").select("id"),
+                        "orders": client.table("orders").select("id"),
+                    })
+                self.assertEqual(postgrest.in_flight, 0)
+            finally:
+                await client.aclose()
+
+        asyncio.run(scenario())
+        self.assertEqual(len(postgrest.requests), 2)
+
+    def test_dispatch_init_fans_out(self):
+        from app.api.routes.dispatch.stats import get_dispatch_init_data
+
+        postgrest = FakePostgrest(latency=0.05, total=2, failing_tables={"vehicles"})
+
+        async def scenario():
+            supabase_async._async_client = make_client(postgrest)
+            try:
+                start = time.perf_counter()
+                data = await get_dispatch_init_data()
+                return data, time.perf_counter() - start
+            finally:
+                await supabase_async.close_async_supabase_client()
+
+        data, elapsed = asyncio.run(scenario())
+        # Vehicles failing does not fail the page
+        self.assertEqual(data["vehicles"], [])
+        self.assertEqual(data["stats"]["active_routes"], 2)
+        self.assertEqual(len(postgrest.requests), 7)
+        self.assertEqual(postgrest.max_in_flight, 7)
+        self.assertLess(elapsed, 0.2)
+
+    def test_routes_init_lookups_run_concurrently(self):
+        from app.api.routes.routes.stats import get_routes_init_data
+
+        route = {
+            "id": "r1", "route_name": "Norte", "route_date": "2026-10-17", "status": "planned",
+            "driver_id": "d1", "vehicle_id": "v1", "route_orders": [{"id": "ro1", "order_id": "o1"}],
+            # The fake answers every table with this row, so it doubles as user and vehicle
+            "name": "Ana", "vehicle_code": "V-01",
+        }
+        postgrest = FakePostgrest(latency=0.05, rows=[route], total=1)
+
+        async def scenario():
+            supabase_async._async_client = make_client(postgrest)
+            try:
+                return await get_routes_init_data(authorization=None)
+            finally:
+                await supabase_async.close_async_supabase_client()
+
+        data = asyncio.run(scenario())
+        self.assertTrue(data["success"])
+        self.assertEqual(data["stats"]["active_routes"], 1)
+        # 4 page queries, then orders/drivers/vehicles lookups in a second wave
+        self.assertEqual(len(postgrest.requests), 7)
+        self.assertEqual(postgrest.max_in_flight, 4)
+
+    def test_dashboard_runs_stats_and_alerts_together(self):
+        from app.api.routes.orders.views.stats import get_dashboard_data
+
+        counts = {"today": 1, "tomorrow": 0, "this_week": 1, "by_status": {"received": 1}, "total": 1}
+        postgrest = FakePostgrest(latency=0.05, rows=[{"id": "o1", "status": "received"}], total=1)
+
+        async def handler(request):
+            response = await postgrest(request)
+            if request.url.path.startswith("/rest/v1/rpc/"):
+                return httpx.Response(200, json=counts)
+            return response
+
+        async def scenario():
+            supabase_async._async_client = create_async_supabase_client(
+                "http://postgrest.local", "test-key",
+                max_connections=2, max_concurrency=10, timeout_seconds=5,
+                transport=httpx.MockTransport(handler),
+            )
+            try:
+                return await get_dashboard_data()
+            finally:
+                await supabase_async.close_async_supabase_client()
+
+        data = asyncio.run(scenario())
+        self.assertEqual(data["stats"], counts)
+        self.assertEqual(data["alerts"]["needs_review_count"], 1)
+        # Status counts RPC + recent orders + 2 alert counts, all in one wave
+        self.assertEqual(len(postgrest.requests), 4)
+        self.assertEqual(postgrest.max_in_flight, 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,285 @@
+"""
+Tests for the in-process productos_rag / clientes_rag vector index.
+
+Verifies that:
+1. search() returns the rows match_productos / match_clientes return: same
+   ids, order and similarity (1 - cosine distance), jsonb @> filtering
+   (values of different JSON types never match) and match_count limits
+2. load() pages through the table by id, parses pgvector strings and
+   replays updates made while it was loading
+3. upsert / remove / replace keep the index current, and updates before
+   the first load are ignored
+4. match_client / match_product search the loaded index instead of calling
+   the RPC, fall back to it before loading, and the rag_sync writers keep
+   the index in step with the tables
+"""
+
+import asyncio
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+import numpy as np
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.core.supabase_async import create_async_supabase_client  # noqa: E402
+from app.services import rag_sync, vector_index  # noqa: E402
+from app.services.vector_index import VectorIndex, metadata_contains  # noqa: E402
+from test_embedding_batches import BulkSyncTestCase  # noqa: E402
+
+DIMS = 16
+
+
+def make_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "content": f"Producto {i}",
+            "metadata": {"product_id": f"p{i}", "tags": ["pt", "frozen" if i % 3 else "fresh"]},
+            "embedding": rng.normal(size=DIMS).astype(np.float32).tolist(),
+        }
+        for i in range(n)
+    ]
+
+
+def rpc_reference(rows, query, match_count, filter=None):
+    """match_productos in Python: metadata @> filter, order by <=>, limit."""
+    query = np.asarray(query, dtype=np.float64)
+    scored = []
+    for row in rows:
+        if filter and not metadata_contains(row["metadata"], filter):
+            continue
+        vector = np.asarray(row["embedding"], dtype=np.float64)
+        distance = 1 - vector @ query / (np.linalg.norm(vector) * np.linalg.norm(query))
+        scored.append((distance, row))
+    scored.sort(key=lambda item: item[0])
+    return [
+        {"id": r["id"], "content": r["content"], "metadata": r["metadata"], "similarity": 1 - d}
+        for d, r in scored[:match_count]
+    ]
+
+
+def loaded_index(rows):
+    index = VectorIndex("productos_rag")
+    index.loaded = True
+    index.upsert(rows)
+    return index
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = make_rows(300)
+        self.index = loaded_index(self.rows)
+        self.queries = np.random.default_rng(1).normal(size=(20, DIMS)).tolist()
+
+    def assert_same(self, got, expected):
+        self.assertEqual([r["id"] for r in got], [r["id"] for r in expected])
+        self.assertEqual([r["metadata"] for r in got], [r["metadata"] for r in expected])
+        for g, e in zip(got, expected):
+            self.assertAlmostEqual(g["similarity"], e["similarity"], places=5)
+
+    def test_matches_rpc(self):
+        for query in self.queries:
+            for match_count in (1, 5, 10):
+                self.assert_same(self.index.search(query, match_count), rpc_reference(self.rows, query, match_count))
+        # More requested than stored
+        self.assertEqual(len(self.index.search(self.queries[0], 1000)), 300)
+
+    def test_filter(self):
+        for query in self.queries[:5]:
+            self.assert_same(
+                self.index.search(query, 5, {"tags": ["fresh"]}),
+                rpc_reference(self.rows, query, 5, {"tags": ["fresh"]}),
+            )
+        self.assertEqual(self.index.search(self.queries[0], 5, {"product_id": "p7"})[0]["content"], "Producto 7")
+        self.assertEqual(self.index.search(self.queries[0], 5, {"product_id": "nope"}), [])
+
+    def test_metadata_contains(self):
+        metadata = {"client_id": "c1", "type": "name", "tags": ["a", "b"]}
+        self.assertTrue(metadata_contains(metadata, {}))
+        self.assertTrue(metadata_contains(metadata, {"client_id": "c1", "tags": ["b"]}))
+        self.assertFalse(metadata_contains(metadata, {"client_id": "c2"}))
+        self.assertFalse(metadata_contains(metadata, {"tags": ["c"]}))
+        self.assertFalse(metadata_contains(metadata, {"missing": None}))
+
+    def test_metadata_contains_type_mismatch(self):
+        metadata = {"client_id": "c1", "count": 1, "active": True, "tags": ["a"]}
+        # A list filter against a scalar never matches (jsonb @>)
+        self.assertFalse(metadata_contains(metadata, {"client_id": ["c1"]}))
+        self.assertFalse(metadata_contains(metadata, {"tags": "a"}))
+        self.assertFalse(metadata_contains(metadata, {"count": True}))
+        self.assertFalse(metadata_contains(metadata, {"active": 1}))
+        self.assertFalse(metadata_contains(metadata, {"count": "1"}))
+        self.assertTrue(metadata_contains(metadata, {"count": 1.0, "active": True}))
+
+    def test_dimension_mismatch(self):
+        with self.assertRaises(ValueError):
+            self.index.search([0.1] * (DIMS + 1), 1)
+
+
+class TestUpdates(unittest.TestCase):
+
+    def test_upsert_remove_replace(self):
+        rows = make_rows(10)
+        index = VectorIndex("productos_rag")
+        index.upsert(rows)
+        self.assertEqual(len(index), 0)
+
+        index.loaded = True
+        index.upsert(rows)
+        query = rows[3]["embedding"]
+        self.assertEqual(index.search(query, 1)[0]["id"], rows[3]["id"])
+
+        # Replace an entry's vector and content in place
+        moved = dict(rows[5], content="Nuevo", embedding=query)
+        index.upsert([moved])
+        self.assertEqual(len(index), 10)
+        self.assertEqual({r["content"] for r in index.search(query, 2)}, {"Producto 3", "Nuevo"})
+
+        index.remove([rows[3]["id"], "unknown"])
+        self.assertEqual(index.search(query, 1)[0]["content"], "Nuevo")
+        self.assertEqual(len(index), 9)
+
+        # NULL embeddings drop the entry
+        index.upsert([dict(rows[5], embedding=None)])
+        self.assertNotIn("Nuevo", [r["content"] for r in index.search(query, 10)])
+
+        index.replace(rows[:2])
+        self.assertEqual(sorted(r["id"] for r in index.search(query, 10)), [rows[0]["id"], rows[1]["id"]])
+
+
+class FakeRagTable:
+    """PostgREST productos_rag: select ordered by id, gt / limit paging."""
+
+    def __init__(self, rows, on_request=None):
+        self.rows = rows
+        self.requests = []
+        self.on_request = on_request
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.on_request:
+            self.on_request(len(self.requests))
+        params = request.url.params
+        rows = sorted(self.rows, key=lambda r: r["id"])
+        if "id" in params:
+            after = params["id"][len("gt."):]
+            rows = [r for r in rows if r["id"] > after]
+        rows = rows[:int(params["limit"])]
+        return httpx.Response(200, json=[dict(r, embedding=json.dumps(r["embedding"])) for r in rows])
+
+
+class TestLoad(unittest.TestCase):
+
+    def load(self, table, index):
+        client = create_async_supabase_client(
+            "http://postgrest.local", "test-key",
+            max_connections=2, max_concurrency=5, timeout_seconds=5,
+            transport=httpx.MockTransport(table),
+        )
+        with patch.object(vector_index, "get_async_supabase_client", return_value=client), \
+                patch.object(vector_index, "LOAD_BATCH_SIZE", 100):
+            return asyncio.run(index.load())
+
+    def test_pages_and_parses(self):
+        rows = make_rows(250)
+        table = FakeRagTable(rows)
+        index = VectorIndex("productos_rag")
+
+        self.assertEqual(self.load(table, index), 250)
+        self.assertTrue(index.loaded)
+        self.assertEqual(len(table.requests), 3)
+        self.assertEqual(table.requests[0].url.params["order"], "id.asc")
+        query = rows[42]["embedding"]
+        self.assertEqual(index.search(query, 1)[0]["id"], rows[42]["id"])
+
+    def test_updates_during_load_are_replayed(self):
+        rows = make_rows(150)
+        index = VectorIndex("productos_rag")
+        extra = make_rows(152, seed=5)[150:]
+
+        def during_load(request_number):
+            if request_number == 1:
+                index.upsert([dict(extra[0], id="new-entry")])
+                index.remove([rows[0]["id"]])
+
+        self.load(FakeRagTable(rows, on_request=during_load), index)
+        ids = {r["id"] for r in index.search(rows[1]["embedding"], 1000)}
+        self.assertEqual(len(ids), 150)
+        self.assertIn("new-entry", ids)
+        self.assertNotIn(rows[0]["id"], ids)
+
+    def test_failed_load_keeps_previous_state(self):
+        index = loaded_index(make_rows(5))
+
+        def failing(request):
+            raise httpx.ConnectError("connection refused", request=request)
+
+        with self.assertRaises(httpx.ConnectError):
+            self.load(failing, index)
+        self.assertTrue(index.loaded)
+        self.assertEqual(len(index), 5)
+
+
+class TestMatching(BulkSyncTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.products = VectorIndex("productos_rag")
+        self.clients = VectorIndex("clientes_rag")
+        for name, index in (("get_product_index", self.products), ("get_client_index", self.clients)):
+            p = patch.object(rag_sync, name, return_value=index)
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_match_client_uses_index(self):
+        self.use_database()
+        self.db.rpc = MagicMock(side_effect=AssertionError("RPC called"))
+        embedding = asyncio.run(rag_sync.generate_embedding("Cafe Uno SAS"))
+        self.clients.loaded = True
+        self.clients.upsert([
+            {"id": "r1", "content": "Cafe Uno SAS", "embedding": embedding,
+             "metadata": {"client_id": "c1", "type": "razon_social"}},
+            {"id": "r2", "content": "Otro", "embedding": [-v for v in embedding],
+             "metadata": {"client_id": "c2", "type": "name"}},
+        ])
+
+        match = asyncio.run(rag_sync.match_client("Cafe Uno SAS"))
+        self.assertEqual((match["client_id"], match["match_type"]), ("c1", "razon_social"))
+        self.assertAlmostEqual(match["similarity"], 1.0, places=5)
+
+    def test_falls_back_to_rpc_until_loaded(self):
+        self.use_database()
+        match = asyncio.run(rag_sync.match_product("PAN TAJADO 500 GR"))
+        self.assertEqual(match["product_id"], "p1")
+
+    def test_syncs_keep_index_current(self):
+        products = [
+            {"id": f"p{i}", "name": f"PRODUCTO {letter}", "description": None, "weight": f"{i + 1}0 g",
+             "is_active": True, "category": "PT"}
+            for i, letter in enumerate("ABCDE")
+        ]
+        self.use_database(products=products, productos_rag=[])
+        self.db.rpc = MagicMock(side_effect=AssertionError("RPC called"))
+        self.products.loaded = True
+        self.products.upsert([{"id": "stale", "content": "Viejo", "metadata": {}, "embedding": [1.0] * 8}])
+
+        asyncio.run(rag_sync.sync_all_products_to_rag())
+        self.assertEqual(len(self.products), 5)
+        self.assertEqual(
+            {r["id"] for r in self.products.search([1.0] * 8, 10)},
+            {r["id"] for r in self.db.data["productos_rag"]},
+        )
+
+        match = asyncio.run(rag_sync.match_product("PRODUCTO D"))
+        self.assertEqual((match["product_id"], match["source"]), ("p3", "rag"))
+
+
+if __name__ == "__main__":
+    unittest.main()
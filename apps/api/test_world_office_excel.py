@@ -0,0 +1,99 @@
+"""
+Tests for the write-only World Office Excel generator.
+
+Verifies that:
+1. The streamed workbook holds the same cell values as the original
+   cell-by-cell generator (benchmarks.bench_world_office_excel)
+2. Items without available quantity are skipped, invoice numbers advance
+   per billed order, and client price lists win over package prices
+3. generate_world_office_excel returns the whole workbook
+"""
+
+import os
+import unittest
+from io import BytesIO
+from unittest.mock import patch
+
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from app.services import excel_generator  # noqa: E402
+from app.services.excel_generator import WorldOfficeLookups, iter_world_office_rows  # noqa: E402
+from benchmarks.bench_world_office_excel import (  # noqa: E402
+    build_billing_run,
+    legacy_write_world_office_excel,
+    sheet_values,
+)
+
+LOOKUPS = WorldOfficeLookups(
+    config={"company_name": "PAN", "document_type": "FV", "document_prefix": "PAN",
+            "third_party_internal": "111", "warehouse": "BOD", "unit_measure": "UN", "iva_rate": 0.19},
+    credit_terms={"c1": 15},
+    product_configs={"p1": {"units_per_package": 6}},
+    client_price_lists={"c1": {"p2": 700}},
+)
+
+
+class TestRows(unittest.TestCase):
+
+    def test_rows(self):
+        orders = [
+            {"id": "o1", "client_id": "c1", "clients": {"name": "Ana", "nit": "900"},
+             "expected_delivery_date": "2026-10-01T00:00:00", "purchase_order_number": "OC-1"},
+            {"id": "o2", "client_id": "c2", "clients": {"name": "Beto", "assigned_user": {"cedula": "222"}},
+             "branches": {"name": "Norte"}, "expected_delivery_date": "2026-10-02"},
+            {"id": "o3", "client_id": "c2", "expected_delivery_date": "2026-10-03"},
+        ]
+        items = {
+            "o1": [
+                {"product_id": "p1", "products": {"codigo_wo": "WO1", "price": 6000, "tax_rate": 19},
+                 "quantity_available": 2},
+                {"product_id": "p2", "products": {"name": "Pan", "price": 5000}, "quantity_available": 3},
+                {"product_id": "p3", "products": {"name": "Torta"}, "quantity_available": 0},
+            ],
+            "o2": [{"product_id": "p1", "products": {"codigo_wo": "WO1", "price": 6000, "tax_rate": 19},
+                    "quantity_available": 1}],
+        }
+
+        rows = list(iter_world_office_rows(orders, items, 500, LOOKUPS))
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(all(len(r) == len(excel_generator.EXCEL_COLUMNS) for r in rows))
+
+        first, second, third = rows
+        # Documento Número, Fecha, Tercero Interno/Externo, Personalizado 2
+        self.assertEqual(first[3:7], [500, "01/10/2026", "111", "900"])
+        self.assertEqual(first[15], "OC-1")
+        # Producto, Cantidad (6 per package), IVA, Valor Unitario, Vencimiento (15 credit days)
+        self.assertEqual([first[31], first[34], first[35], first[36], first[38]],
+                         ["WO1", 12, 0.19, 1000, "16/10/2026"])
+        # Client price list overrides the package price
+        self.assertEqual([second[31], second[34], second[36]], ["Pan", 3, 700])
+        self.assertEqual(third[3:6], [501, "02/10/2026", "222"])
+        self.assertEqual(third[29], "Norte")
+        self.assertEqual(third[38], "01/11/2026")
+
+    def test_matches_cell_by_cell_generator(self):
+        orders, items, lookups = build_billing_run(400, seed=3)
+        legacy, streamed = BytesIO(), BytesIO()
+        legacy_rows = legacy_write_world_office_excel(legacy, orders, items, 77, lookups)
+        streamed_rows = excel_generator.write_world_office_excel(streamed, orders, items, 77, lookups)
+
+        self.assertEqual(streamed_rows, legacy_rows)
+        self.assertEqual(sheet_values(streamed.getvalue()), sheet_values(legacy.getvalue()))
+
+
+class TestGenerate(unittest.TestCase):
+
+    def test_returns_whole_workbook(self):
+        orders, items, lookups = build_billing_run(2000, seed=5)
+
+        with patch.object(excel_generator, "load_world_office_lookups", return_value=lookups):
+            result = excel_generator.generate_world_office_excel(orders, items, 1, supabase=None)
+
+        self.assertEqual(result["row_count"], 2000)
+        self.assertTrue(result["file_bytes"].startswith(b"PK"))
+        self.assertEqual(len(sheet_values(result["file_bytes"])[0]), 2001)
+
+
+if __name__ == "__main__":
+    unittest.main()
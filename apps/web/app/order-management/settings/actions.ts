@@ -2,6 +2,7 @@
 
 import { createClient as createSupabaseClient } from "@supabase/supabase-js"
 import { cookies } from "next/headers"
+import { invalidateMasterdataCache, syncClientEmbeddings } from "@/lib/api/masterdata"
 
 // Create authenticated Supabase client using user's session from cookies
 // This ensures RLS policies work correctly (client_frequencies requires authenticated role)
@@ -243,6 +244,7 @@ export async function toggleClientActive(id: string, isActive: boolean): Promise
       .eq("id", id)
 
     if (error) throw error
+    invalidateMasterdataCache("clients")
     return { success: true, error: null }
   } catch (err) {
     console.error("Error toggling client active:", err)
@@ -260,6 +262,8 @@ export async function createBranch(branchData: Omit<Branch, "id" | "created_at">
       .single()
 
     if (error) throw error
+    invalidateMasterdataCache("branches")
+    if (data?.client_id) syncClientEmbeddings(data.client_id)
     return { data, error: null }
   } catch (err) {
     console.error("Error creating branch:", err)
@@ -270,12 +274,16 @@ export async function createBranch(branchData: Omit<Branch, "id" | "created_at">
 export async function updateBranch(id: string, branchData: Partial<Branch>): Promise<{ success: boolean; error: string | null }> {
   try {
     const supabase = await createAuthenticatedClient()
-    const { error } = await supabase
+    const { data, error } = await supabase
       .from("branches")
       .update(branchData)
       .eq("id", id)
+      .select("client_id")
+      .single()
 
     if (error) throw error
+    invalidateMasterdataCache("branches")
+    if (data?.client_id) syncClientEmbeddings(data.client_id)
     return { success: true, error: null }
   } catch (err) {
     console.error("Error updating branch:", err)
@@ -292,6 +300,7 @@ export async function deleteBranch(id: string): Promise<{ success: boolean; erro
       .eq("id", id)
 
     if (error) throw error
+    invalidateMasterdataCache("branches")
     return { success: true, error: null }
   } catch (err) {
     console.error("Error deleting branch:", err)
@@ -350,6 +359,7 @@ export async function updateCreditTerm(clientId: string, creditDays: number): Pr
       )
 
     if (error) throw error
+    invalidateMasterdataCache("credit_terms")
     return { success: true, error: null }
   } catch (err) {
     console.error("Error updating credit term:", err)
@@ -366,6 +376,7 @@ export async function updateClientBillingType(clientId: string, billingType: "fa
       .eq("id", clientId)
 
     if (error) throw error
+    invalidateMasterdataCache("clients")
     return { success: true, error: null }
   } catch (err) {
     console.error("Error updating billing type:", err)
@@ -13,6 +13,7 @@ import { useWorkCenters } from "@/hooks/use-work-centers"
 import { useProductWorkCenterMapping } from "@/hooks/use-product-work-center-mapping"
 import { useProductionRoutes } from "@/hooks/use-production-routes"
 import { supabase } from "@/lib/supabase"
+import { invalidateCascadeMasterData } from "@/lib/api/production"
 import { toast } from "sonner"
 
 interface Product {
@@ -142,6 +143,7 @@ export function OperacionesConfig() {
           .insert(batch)
         if (error) throw error
       }
+      invalidateCascadeMasterData()
 
       await refetchMappings()
       toast.success(`${newMappings.length} asignaciones creadas automáticamente`)
@@ -5,6 +5,7 @@ import { Input } from "@/components/ui/input"
 import { Search, Check, Plus, X } from "lucide-react"
 import { SearchableSelect } from "@/components/ui/searchable-select"
 import { supabase } from "@/lib/supabase"
+import { invalidateCascadeMasterData } from "@/lib/api/production"
 import { toast } from "sonner"
 
 type PTProduct = {
@@ -179,6 +180,7 @@ export function PTProportionsMatrix() {
         .update({ quantity_needed: parsed, original_quantity: parsed, updated_at: new Date().toISOString() })
         .eq("id", bomId)
       if (error) throw error
+      invalidateCascadeMasterData()
 
       setBomEntries(prev => prev.map(b => b.id === bomId ? { ...b, quantity_needed: parsed } : b))
       markSaved(bomId)
@@ -202,6 +204,7 @@ export function PTProportionsMatrix() {
         .update({ material_id: newMaterialId, updated_at: new Date().toISOString() })
         .eq("id", bomId)
       if (error) throw error
+      invalidateCascadeMasterData()
 
       setBomEntries(prev => prev.map(b =>
         b.id === bomId ? { ...b, material_id: newMaterialId, material_name: mat.name } : b
@@ -227,6 +230,7 @@ export function PTProportionsMatrix() {
         .delete()
         .eq("id", bomId)
       if (error) throw error
+      invalidateCascadeMasterData()
 
       setBomEntries(prev => prev.filter(b => b.id !== bomId))
       toast.success("Material eliminado")
@@ -292,6 +296,7 @@ export function PTProportionsMatrix() {
         .single()
 
       if (error) throw error
+      invalidateCascadeMasterData(productId)
 
       setBomEntries(prev => [...prev, {
         ...data,
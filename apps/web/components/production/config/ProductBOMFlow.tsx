@@ -33,6 +33,7 @@ import { useBillOfMaterials } from "@/hooks/use-bill-of-materials"
 import { useBomVariants, type BomVariant } from "@/hooks/use-bom-variants"
 import { toast } from "sonner"
 import { supabase } from "@/lib/supabase"
+import { invalidateCascadeMasterData } from "@/lib/api/production"
 
 interface BOMItem {
   id: string
@@ -618,6 +619,7 @@ export function ProductBOMFlow({ productId, productName, productWeight, productL
         .eq("id", productId)
 
       if (error) throw error
+      invalidateCascadeMasterData(productId)
 
       toast.success("Lote mínimo actualizado")
       setIsEditingLoteMinimo(false)
@@ -667,6 +669,7 @@ export function ProductBOMFlow({ productId, productName, productWeight, productL
         }
       }
 
+      invalidateCascadeMasterData(productId)
       toast.success(next ? "Receta por gramos activada" : "Receta por gramos desactivada")
       await loadProduct()
       await loadBOMItems()
@@ -872,6 +875,7 @@ export function ProductBOMFlow({ productId, productName, productWeight, productL
           })
           setLoteMinimo(newLote.toString())
         }
+        invalidateCascadeMasterData(productId)
       } else {
         const qty = parseFloat(inlineRow.quantity)
         if (!Number.isFinite(qty) || qty <= 0) {
@@ -1047,6 +1051,7 @@ export function ProductBOMFlow({ productId, productName, productWeight, productL
         })
         .eq("id", bomId)
       await supabase.from("products").update({ lote_minimo: newLote }).eq("id", productId)
+      invalidateCascadeMasterData(productId)
 
       setLoteMinimo(newLote.toString())
       await loadBOMItems()
@@ -2,6 +2,7 @@
 
 import { useState, useCallback } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateCascadeMasterData } from "@/lib/api/production"
 import type { Database } from "@/lib/database.types"
 import type {
   BillOfMaterialsWithOriginal,
@@ -145,6 +146,7 @@ export function useBillOfMaterials() {
         }))
       )
       await persistFractions(adjusted)
+      invalidateCascadeMasterData(productId)
     } catch (err) {
       console.error("Error normalizing BOM quantities:", err)
       throw err
@@ -324,6 +326,7 @@ export function useBillOfMaterials() {
       throw err
     } finally {
       setLoading(false)
+      invalidateCascadeMasterData(bomItem.product_id as string | undefined)
     }
   }, [getIsRecipeByGrams, fetchActiveFractions, persistFractions, resolveDefaultVariantId])
 
@@ -403,6 +406,7 @@ export function useBillOfMaterials() {
       throw err
     } finally {
       setLoading(false)
+      invalidateCascadeMasterData()
     }
   }, [getIsRecipeByGrams, fetchActiveFractions, persistFractions])
 
@@ -452,6 +456,7 @@ export function useBillOfMaterials() {
       throw err
     } finally {
       setLoading(false)
+      invalidateCascadeMasterData(productId)
     }
   }, [getIsRecipeByGrams, fetchActiveFractions, persistFractions])
 
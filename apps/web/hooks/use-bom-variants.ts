@@ -2,6 +2,7 @@
 
 import { useCallback, useState } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateCascadeMasterData } from "@/lib/api/production"
 
 export interface BomVariant {
   id: string
@@ -196,6 +197,7 @@ export function useBomVariants() {
         .delete()
         .eq("id", variantId)
       if (delErr) throw delErr
+      invalidateCascadeMasterData(target.product_id)
     } catch (err: any) {
       setError(err?.message || "Error deleting variant")
       throw err
@@ -263,6 +265,7 @@ export function useBomVariants() {
           .from("bill_of_materials")
           .insert(inserts)
         if (insErr) throw insErr
+        invalidateCascadeMasterData(created.product_id)
       }
 
       return created as BomVariant
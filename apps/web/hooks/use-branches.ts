@@ -1,6 +1,7 @@
 import { useState, useEffect } from "react"
 import { supabase } from "@/lib/supabase"
 import { toast } from "@/hooks/use-toast"
+import { syncClientEmbeddings } from "@/lib/api/masterdata"
 
 export interface Branch {
   id: string
@@ -94,6 +95,7 @@ export function useBranches() {
       }
 
       setBranches(prev => [data, ...prev])
+      syncClientEmbeddings(data.client_id)
       return data
     } catch (err: any) {
       console.error("Error creating branch:", err)
@@ -123,6 +125,7 @@ export function useBranches() {
           branch.id === branchId ? data : branch
         )
       )
+      syncClientEmbeddings(data.client_id)
       return data
     } catch (err: any) {
       console.error("Error updating branch:", err)
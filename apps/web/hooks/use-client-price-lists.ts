@@ -2,6 +2,7 @@
 
 import { useState, useEffect } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateMasterdataCache } from "@/lib/api/masterdata"
 import { useToast } from "@/hooks/use-toast"
 import type { Database } from "@/lib/database.types"
 
@@ -106,6 +107,8 @@ export function useClientPriceLists() {
         throw error
       }
 
+      invalidateMasterdataCache("client_price_lists")
+
       setPriceLists(prev => [data, ...prev])
       return data
     } catch (error: any) {
@@ -143,6 +146,8 @@ export function useClientPriceLists() {
         throw error
       }
 
+      invalidateMasterdataCache("client_price_lists")
+
       setPriceLists(prev => 
         prev.map(price => price.id === id ? data : price)
       )
@@ -164,6 +169,8 @@ export function useClientPriceLists() {
         throw error
       }
 
+      invalidateMasterdataCache("client_price_lists")
+
       setPriceLists(prev => prev.filter(price => price.id !== id))
       return true
     } catch (error: any) {
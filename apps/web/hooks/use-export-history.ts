@@ -5,6 +5,19 @@ import { supabase } from "@/lib/supabase"
 import { useToast } from "@/hooks/use-toast"
 import type { Database } from "@/lib/database.types"
 
+const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000"
+
+function saveBlob(blob: Blob, fileName: string) {
+  const url = window.URL.createObjectURL(blob)
+  const link = document.createElement("a")
+  link.href = url
+  link.download = fileName
+  document.body.appendChild(link)
+  link.click()
+  window.URL.revokeObjectURL(url)
+  document.body.removeChild(link)
+}
+
 type ExportHistory = Database["public"]["Tables"]["export_history"]["Row"] & {
   created_by_user?: {
     id: string
@@ -197,10 +210,24 @@ export function useExportHistory() {
 
       const { data, error } = await supabase
         .from("export_history")
-        .select("file_data")
+        .select("file_path, file_data")
         .eq("id", exportId)
         .single()
 
+      // Exports in storage (file_path) are streamed by the API
+      if (!error && data?.file_path) {
+        const response = await fetch(`${API_URL}/api/billing/history/${exportId}/download`, { cache: "no-store" })
+        if (!response.ok) {
+          throw new Error("No hay archivo disponible para descargar")
+        }
+        saveBlob(await response.blob(), fileName)
+        toast({
+          title: "Descarga iniciada",
+          description: `Se está descargando ${fileName}`,
+        })
+        return
+      }
+
       console.log("Database query result:", {
         hasError: !!error,
         hasData: !!data,
@@ -398,14 +425,7 @@ export function useExportHistory() {
         blobType: blob.type
       })
 
-      const url = window.URL.createObjectURL(blob)
-      const link = document.createElement("a")
-      link.href = url
-      link.download = fileName
-      document.body.appendChild(link)
-      link.click()
-      window.URL.revokeObjectURL(url)
-      document.body.removeChild(link)
+      saveBlob(blob, fileName)
 
       console.log("=== Export file download completed successfully ===")
 
@@ -2,6 +2,8 @@
 
 import { useState, useEffect, useCallback } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateMasterdataCache } from "@/lib/api/masterdata"
+import { invalidateCascadeMasterData } from "@/lib/api/production"
 import type { Database } from "@/lib/database.types"
 
 type Material = Database["produccion"]["Tables"]["materials"]["Row"]
@@ -65,6 +67,7 @@ export function useMaterials() {
         .single()
 
       if (error) throw error
+      invalidateMasterdataCache("products")
 
       const adaptedMaterial = {
         id: data.id,
@@ -99,6 +102,7 @@ export function useMaterials() {
         .single()
 
       if (error) throw error
+      invalidateMasterdataCache("products")
 
       const adaptedMaterial = {
         id: data.id,
@@ -129,6 +133,7 @@ export function useMaterials() {
         .eq("id", id)
 
       if (error) throw error
+      invalidateMasterdataCache("products")
 
       setMaterials(prev => prev.filter(mat => mat.id !== id))
     } catch (err) {
@@ -204,6 +209,7 @@ export function useBillOfMaterials(productId?: string) {
         .single()
 
       if (error) throw error
+      invalidateCascadeMasterData(data.product_id)
       
       setBillOfMaterials(prev => [...prev, data])
       return data
@@ -225,6 +231,7 @@ export function useBillOfMaterials(productId?: string) {
         .single()
 
       if (error) throw error
+      invalidateCascadeMasterData(data.product_id)
       
       setBillOfMaterials(prev => 
         prev.map(bom => bom.id === id ? data : bom)
@@ -246,6 +253,7 @@ export function useBillOfMaterials(productId?: string) {
         .eq("id", id)
 
       if (error) throw error
+      invalidateCascadeMasterData()
       
       setBillOfMaterials(prev => prev.filter(bom => bom.id !== id))
     } catch (err) {
@@ -2,6 +2,8 @@
 
 import { useState, useCallback } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateMasterdataCache } from "@/lib/api/masterdata"
+import { invalidateCascadeMasterData } from "@/lib/api/production"
 import { toast } from "sonner"
 
 export interface MigrationResult {
@@ -103,6 +105,10 @@ export function useMigrateToProduction() {
         }
       }
 
+      if (prototype.is_new_product || materialsCreated > 0) {
+        invalidateMasterdataCache("products")
+      }
+
       // 6. Crear operaciones personalizadas en produccion.operations
       const operationIdMapping: Record<string, string> = {}
 
@@ -183,6 +189,7 @@ export function useMigrateToProduction() {
           .insert(bomItems)
 
         if (bomError) throw bomError
+        invalidateCascadeMasterData(productId!)
       }
 
       // 8. Actualizar estado del prototipo a 'approved'
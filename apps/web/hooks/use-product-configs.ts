@@ -2,6 +2,7 @@
 
 import { useState, useEffect } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateMasterdataCache, syncClientEmbeddings } from "@/lib/api/masterdata"
 import { useToast } from "@/hooks/use-toast"
 
 export interface ProductConfig {
@@ -92,6 +93,8 @@ export function useProductConfigs() {
         throw error
       }
 
+      invalidateMasterdataCache("product_configs")
+
       // Update local state
       setProductConfigs(prev => 
         prev.map(config => 
@@ -132,6 +135,8 @@ export function useProductConfigs() {
         throw error
       }
 
+      invalidateMasterdataCache("product_configs")
+
       setProductConfigs(prev => [data, ...prev])
       return data
     } catch (error: any) {
@@ -227,6 +232,7 @@ export function useProductAliases() {
       }
 
       setProductAliases(prev => [data, ...prev])
+      syncClientEmbeddings(client_id)
       return data
     } catch (error: any) {
       console.error("Error creating product alias:", error)
@@ -266,6 +272,7 @@ export function useProductAliases() {
       setProductAliases(prev => 
         prev.map(alias => alias.id === id ? data : alias)
       )
+      syncClientEmbeddings(data.client_id)
       return data
     } catch (error: any) {
       console.error("Error updating product alias:", error)
@@ -2,6 +2,7 @@
 
 import { useState, useEffect, useCallback } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateCascadeMasterData } from "@/lib/api/production"
 import type { Database } from "@/lib/database.types"
 
 type ProductWorkCenterMapping = Database["produccion"]["Tables"]["product_work_center_mapping"]["Row"]
@@ -104,6 +105,7 @@ export function useProductWorkCenterMapping() {
         .single()
 
       if (error) throw error
+      invalidateCascadeMasterData(data.product_id)
 
       setMappings(prev => [...prev, data])
       return data
@@ -126,6 +128,7 @@ export function useProductWorkCenterMapping() {
         .single()
 
       if (error) throw error
+      invalidateCascadeMasterData(data.product_id)
 
       setMappings(prev =>
         prev.map(m => m.id === id ? data : m)
@@ -148,6 +151,7 @@ export function useProductWorkCenterMapping() {
         .eq("id", id)
 
       if (error) throw error
+      invalidateCascadeMasterData()
 
       setMappings(prev => prev.filter(m => m.id !== id))
     } catch (err) {
@@ -2,6 +2,7 @@
 
 import { useState, useEffect, useCallback } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateCascadeMasterData } from "@/lib/api/production"
 import type { Database } from "@/lib/database.types"
 
 type ProductionRoute = Database["produccion"]["Tables"]["production_routes"]["Row"] & {
@@ -93,6 +94,7 @@ export function useProductionRoutes() {
         .single()
 
       if (error) throw error
+      invalidateCascadeMasterData(data.product_id)
 
       setRoutes(prev => [...prev, data])
       return data
@@ -115,6 +117,7 @@ export function useProductionRoutes() {
         .single()
 
       if (error) throw error
+      invalidateCascadeMasterData(data.product_id)
 
       setRoutes(prev =>
         prev.map(route => route.id === id ? data : route)
@@ -137,6 +140,7 @@ export function useProductionRoutes() {
         .eq("id", id)
 
       if (error) throw error
+      invalidateCascadeMasterData()
 
       setRoutes(prev => prev.filter(route => route.id !== id))
     } catch (err) {
@@ -2,6 +2,7 @@
 
 import { useState, useCallback } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateCascadeMasterData } from "@/lib/api/production"
 import type { Database } from "@/lib/database.types"
 
 type Productivity = Database["produccion"]["Tables"]["production_productivity"]["Row"]
@@ -61,6 +62,7 @@ export function useProductivity() {
           .single()
 
         if (error) throw error
+        invalidateCascadeMasterData(productId)
         return data
       } else {
         // Crear nuevo
@@ -78,6 +80,7 @@ export function useProductivity() {
           .single()
 
         if (error) throw error
+        invalidateCascadeMasterData(productId)
         return data
       }
     } catch (err) {
@@ -101,6 +104,7 @@ export function useProductivity() {
         .eq("id", id)
 
       if (error) throw error
+      invalidateCascadeMasterData()
     } catch (err) {
       console.error("Error deleting productivity:", err)
       setError(err instanceof Error ? err.message : "Error deleting productivity")
@@ -2,6 +2,7 @@
 
 import { useState, useEffect, useCallback, useMemo } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateMasterdataCache } from "@/lib/api/masterdata"
 import type { Database } from "@/lib/database.types"
 
 type Product = Database["public"]["Tables"]["products"]["Row"]
@@ -179,6 +180,7 @@ export function useProducts() {
         .single()
 
       if (error) throw error
+      invalidateMasterdataCache("products")
 
       // Update local state
       setProducts(prev => [...prev, data])
@@ -200,6 +202,7 @@ export function useProducts() {
         .single()
 
       if (error) throw error
+      invalidateMasterdataCache("products")
 
       // Update local state
       setProducts(prev =>
@@ -223,6 +226,7 @@ export function useProducts() {
         .eq("id", id)
 
       if (error) throw error
+      invalidateMasterdataCache("products")
 
       // Update local state
       setProducts(prev => prev.filter(product => product.id !== id))
@@ -246,6 +250,7 @@ export function useProducts() {
         .single()
 
       if (error) throw error
+      invalidateMasterdataCache("products")
 
       // Update local state
       setProducts(prev =>
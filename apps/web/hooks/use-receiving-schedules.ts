@@ -2,6 +2,7 @@
 
 import { useState, useEffect } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateMasterdataCache } from "@/lib/api/masterdata"
 import type { Database } from "@/lib/database.types"
 
 type ReceivingSchedule = Database["public"]["Tables"]["receiving_schedules"]["Row"]
@@ -78,6 +79,8 @@ export function useReceivingSchedules() {
         throw error
       }
 
+      invalidateMasterdataCache("receiving_schedules")
+
       setSchedules(prev => [...prev, data])
       return data
     } catch (err: any) {
@@ -103,6 +106,8 @@ export function useReceivingSchedules() {
         throw error
       }
 
+      invalidateMasterdataCache("receiving_schedules")
+
       setSchedules(prev => 
         prev.map(schedule => 
           schedule.id === scheduleId ? data : schedule
@@ -127,6 +132,8 @@ export function useReceivingSchedules() {
         throw error
       }
 
+      invalidateMasterdataCache("receiving_schedules")
+
       setSchedules(prev => prev.filter(schedule => schedule.id !== scheduleId))
     } catch (err: any) {
       console.error("Error deleting receiving schedule:", err)
@@ -191,6 +198,8 @@ export function useReceivingSchedules() {
         throw error
       }
 
+      invalidateMasterdataCache("receiving_schedules")
+
       setSchedules(prev => [...prev, ...data])
       return data
     } catch (err: any) {
@@ -211,6 +220,8 @@ export function useReceivingSchedules() {
         throw error
       }
 
+      invalidateMasterdataCache("receiving_schedules")
+
       setSchedules(prev => prev.filter(schedule => !scheduleIds.includes(schedule.id)))
     } catch (err: any) {
       console.error("Error deleting bulk schedules:", err)
@@ -2,6 +2,7 @@
 
 import { useState, useEffect } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateMasterdataCache } from "@/lib/api/masterdata"
 import type { Database } from "@/lib/database.types"
 
 type ReceivingTemplate = Database["public"]["Tables"]["receiving_templates"]["Row"]
@@ -161,6 +162,7 @@ export function useReceivingTemplates() {
           console.error("Error deleting existing schedules:", deleteError)
           throw deleteError
         }
+        invalidateMasterdataCache("receiving_schedules")
       }
 
       // Create new schedules from template
@@ -192,6 +194,8 @@ export function useReceivingTemplates() {
           throw error
         }
 
+        invalidateMasterdataCache("receiving_schedules")
+
         return data
       }
 
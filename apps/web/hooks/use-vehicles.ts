@@ -2,6 +2,7 @@
 
 import { useState, useEffect } from "react"
 import { supabase } from "@/lib/supabase"
+import { invalidateMasterdataCache } from "@/lib/api/masterdata"
 import type { Database } from "@/lib/database.types"
 
 type Vehicle = Database["public"]["Tables"]["vehicles"]["Row"] & {
@@ -74,6 +75,7 @@ export function useVehicles() {
         .single()
 
       if (error) throw error
+      invalidateMasterdataCache("vehicles")
       await fetchVehicles()
       return data
     } catch (err) {
@@ -90,6 +92,7 @@ export function useVehicles() {
         .eq("id", id)
 
       if (error) throw error
+      invalidateMasterdataCache("vehicles")
       await fetchVehicles()
     } catch (err) {
       setError(err instanceof Error ? err.message : "Error updating vehicle")
@@ -105,6 +108,7 @@ export function useVehicles() {
         .eq("id", id)
 
       if (error) throw error
+      invalidateMasterdataCache("vehicles")
       await fetchVehicles()
     } catch (err) {
       setError(err instanceof Error ? err.message : "Error deleting vehicle")
@@ -123,6 +127,7 @@ export function useVehicles() {
         .eq("id", vehicleId)
 
       if (error) throw error
+      invalidateMasterdataCache("vehicles")
       await fetchVehicles()
     } catch (err) {
       setError(err instanceof Error ? err.message : "Error assigning driver to vehicle")
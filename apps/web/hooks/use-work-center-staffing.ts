@@ -5,6 +5,18 @@ import { supabase } from "@/lib/supabase"
 import { toast } from "sonner"
 import { format } from "date-fns"
 
+const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000"
+
+/**
+ * Drop the API's cached staffing calendar so cascades see the change right away
+ * (the cache expires on its own after a minute, so failures are only logged)
+ */
+function invalidateStaffingCache(date?: string) {
+  const query = date ? `?date=${date}` : ""
+  fetch(`${API_URL}/api/production/cascade/staffing/invalidate${query}`, { method: "POST" })
+    .catch(err => console.warn("Could not invalidate staffing cache:", err))
+}
+
 export interface WorkCenterStaffing {
   id: string
   work_center_id: string
@@ -101,6 +113,7 @@ export function useWorkCenterStaffing(weekStartDate?: Date) {
         .single()
 
       if (upsertError) throw upsertError
+      invalidateStaffingCache(dateStr)
 
       // Update local state
       setStaffings(prev => {
@@ -153,6 +166,7 @@ export function useWorkCenterStaffing(weekStartDate?: Date) {
         .select()
 
       if (upsertError) throw upsertError
+      invalidateStaffingCache()
 
       // Update local state
       setStaffings(prev => {
@@ -199,6 +213,7 @@ export function useWorkCenterStaffing(weekStartDate?: Date) {
         .eq("id", id)
 
       if (deleteError) throw deleteError
+      invalidateStaffingCache()
 
       // Update local state
       setStaffings(prev => prev.filter(s => s.id !== id))
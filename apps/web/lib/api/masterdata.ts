@@ -169,6 +169,25 @@ export async function getClientFrequencies(): Promise<ApiResult<ClientFrequency[
   }
 }
 
+/**
+ * Drop the API's cached master data after editing it directly in Supabase
+ * (entries also expire on their own after a few minutes, so failures are only logged)
+ */
+export async function invalidateMasterdataCache(resource?: string): Promise<void> {
+  const query = resource ? `?resource=${resource}` : ""
+  await fetch(`${API_URL}/api/masterdata/cache/invalidate${query}`, { method: "POST" })
+    .catch(err => console.warn("Could not invalidate master data cache:", err))
+}
+
+/**
+ * Precompute a client's product alias and branch embeddings after editing them,
+ * so order matching does not embed them on every purchase order (best effort)
+ */
+export async function syncClientEmbeddings(clientId: string): Promise<void> {
+  await fetch(`${API_URL}/api/masterdata/clients/${clientId}/sync-embeddings`, { method: "POST" })
+    .catch(err => console.warn("Could not sync client embeddings:", err))
+}
+
 // === Helper Functions ===
 
 /**
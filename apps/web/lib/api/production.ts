@@ -0,0 +1,13 @@
+const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000"
+
+/**
+ * Drop the API's cached cascade master data (routes, productivity, work center
+ * mappings, BOMs, lote mínimo) and BOM graph after editing them directly in
+ * Supabase, so the next schedule and the BOM cycle check see the change
+ * (entries also expire on their own after a few minutes, so failures are only logged)
+ */
+export function invalidateCascadeMasterData(productId?: string) {
+  const query = productId ? `?product_id=${productId}` : ""
+  fetch(`${API_URL}/api/production/cascade/master-data/invalidate${query}`, { method: "POST" })
+    .catch(err => console.warn("Could not invalidate cascade master data:", err))
+}
@@ -0,0 +1,78 @@
+-- RPC function to load the queue context of several work centers in a single DB round-trip
+-- Replaces, per work center, the four queries of get_existing_schedules_with_arrival
+-- (schedules, source schedules, source WC operations, BOM rest times) plus the
+-- shift_blocking query. The API computes arrival_time = source_end_date + arrival_rest_hours.
+
+CREATE OR REPLACE FUNCTION produccion.get_work_center_queue_context(
+    p_work_center_ids text[],
+    p_start timestamptz,
+    p_end timestamptz,
+    p_blocked_from date,
+    p_blocked_to date
+)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT jsonb_build_object(
+        'schedules', COALESCE((
+            SELECT jsonb_agg(
+                jsonb_build_object(
+                    'id', s.id,
+                    'resource_id', s.resource_id,
+                    'start_date', s.start_date,
+                    'end_date', s.end_date,
+                    'cascade_source_id', s.cascade_source_id,
+                    'product_id', s.product_id,
+                    'quantity', s.quantity,
+                    'cascade_level', s.cascade_level,
+                    'batch_number', s.batch_number,
+                    'total_batches', s.total_batches,
+                    'batch_size', s.batch_size,
+                    'status', s.status,
+                    'production_order_number', s.production_order_number,
+                    'week_plan_id', s.week_plan_id,
+                    -- Only set when the source schedule exists
+                    'source_end_date', src.end_date,
+                    'arrival_rest_hours', CASE WHEN src.id IS NOT NULL THEN COALESCE(rest.hours, 0) END
+                )
+                ORDER BY s.resource_id, s.start_date, s.id
+            )
+            FROM produccion.production_schedules s
+            LEFT JOIN produccion.production_schedules src ON src.id = s.cascade_source_id
+            LEFT JOIN produccion.work_centers src_wc ON src_wc.id::text = src.resource_id
+            LEFT JOIN LATERAL (
+                SELECT b.tiempo_reposo_horas::float8 AS hours
+                FROM produccion.bill_of_materials b
+                WHERE b.product_id = s.product_id
+                  AND b.operation_id = src_wc.operation_id
+                  AND b.tiempo_reposo_horas IS NOT NULL
+                LIMIT 1
+            ) rest ON true
+            WHERE s.resource_id = ANY(p_work_center_ids)
+              AND s.start_date >= p_start
+              AND s.start_date < p_end
+        ), '[]'::jsonb),
+        'blocked_shifts', COALESCE((
+            SELECT jsonb_agg(
+                jsonb_build_object(
+                    'work_center_id', sb.work_center_id,
+                    'date', sb.date,
+                    'shift_number', sb.shift_number
+                )
+                ORDER BY sb.work_center_id, sb.date, sb.shift_number
+            )
+            FROM produccion.shift_blocking sb
+            WHERE sb.work_center_id::text = ANY(p_work_center_ids)
+              AND sb.date >= p_blocked_from
+              AND sb.date <= p_blocked_to
+        ), '[]'::jsonb)
+    );
+$$;
+
+-- Grant access
+GRANT EXECUTE ON FUNCTION produccion.get_work_center_queue_context(text[], timestamptz, timestamptz, date, date) TO authenticated;
+GRANT EXECUTE ON FUNCTION produccion.get_work_center_queue_context(text[], timestamptz, timestamptz, date, date) TO service_role;
+
+COMMENT ON FUNCTION produccion.get_work_center_queue_context IS 'Existing schedules (with source end and BOM rest for arrival times) and blocked shifts of several work centers in a single DB round-trip.';
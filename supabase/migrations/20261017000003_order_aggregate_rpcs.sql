@@ -0,0 +1,158 @@
+-- Aggregate RPC functions for order, delivery and billing statistics
+-- The API used to download rows and count them in Python: the status of every
+-- open order (get_order_stats), every order_items row of a list page
+-- (delivery_percentage), every export_history / remisions row (billing stats)
+-- and every item of the day's orders (WhatsApp in-full report). These return
+-- the aggregates only, so payloads stay constant as order history grows.
+
+-- Counts by delivery date window and by status of the orders not in p_excluded_statuses
+CREATE OR REPLACE FUNCTION public.get_order_status_counts(
+    p_today date,
+    p_tomorrow date,
+    p_week_end date,
+    p_excluded_statuses text[] DEFAULT ARRAY['delivered', 'cancelled', 'returned']
+)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    WITH open_orders AS (
+        SELECT o.status, o.expected_delivery_date
+        FROM public.orders o
+        WHERE o.status::text <> ALL(p_excluded_statuses)
+    )
+    SELECT jsonb_build_object(
+        'today', (SELECT count(*) FROM open_orders WHERE expected_delivery_date = p_today),
+        'tomorrow', (SELECT count(*) FROM open_orders WHERE expected_delivery_date = p_tomorrow),
+        'this_week', (
+            SELECT count(*) FROM open_orders
+            WHERE expected_delivery_date >= p_today AND expected_delivery_date <= p_week_end
+        ),
+        'by_status', COALESCE((
+            SELECT jsonb_object_agg(status, n)
+            FROM (SELECT status, count(*) AS n FROM open_orders GROUP BY status) s
+        ), '{}'::jsonb),
+        'total', (SELECT count(*) FROM open_orders)
+    );
+$$;
+
+-- Requested / delivered unit totals per order (delivery_percentage of list pages)
+CREATE OR REPLACE FUNCTION public.get_order_delivery_totals(p_order_ids uuid[])
+RETURNS TABLE (order_id uuid, quantity_requested bigint, quantity_delivered bigint)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT
+        oi.order_id,
+        COALESCE(sum(oi.quantity_requested), 0)::bigint,
+        COALESCE(sum(oi.quantity_delivered), 0)::bigint
+    FROM public.order_items oi
+    WHERE oi.order_id = ANY(p_order_ids)
+    GROUP BY oi.order_id;
+$$;
+
+-- Orders and units of one delivery date (WhatsApp entregas report)
+CREATE OR REPLACE FUNCTION public.get_delivery_summary(p_date date)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT jsonb_build_object(
+        'orders_total', (SELECT count(*) FROM public.orders o WHERE o.expected_delivery_date = p_date),
+        'orders_delivered', (
+            SELECT count(*) FROM public.orders o
+            WHERE o.expected_delivery_date = p_date AND o.status = 'delivered'
+        ),
+        'units_requested', COALESCE((
+            SELECT sum(oi.quantity_requested)
+            FROM public.order_items oi
+            JOIN public.orders o ON o.id = oi.order_id
+            WHERE o.expected_delivery_date = p_date
+        ), 0),
+        'units_delivered', COALESCE((
+            SELECT sum(oi.quantity_delivered)
+            FROM public.order_items oi
+            JOIN public.orders o ON o.id = oi.order_id
+            WHERE o.expected_delivery_date = p_date
+        ), 0)
+    );
+$$;
+
+-- Export count, orders and amount per month of p_year (World Office exports)
+CREATE OR REPLACE FUNCTION public.get_monthly_billing_totals(p_year int)
+RETURNS TABLE (month int, exports bigint, orders bigint, amount numeric)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT
+        EXTRACT(MONTH FROM eh.export_date)::int,
+        count(*),
+        COALESCE(sum(eh.total_orders), 0)::bigint,
+        COALESCE(sum(eh.total_amount), 0)
+    FROM public.export_history eh
+    WHERE eh.export_date >= make_date(p_year, 1, 1)
+      AND eh.export_date < make_date(p_year + 1, 1, 1)
+    GROUP BY 1
+    ORDER BY 1;
+$$;
+
+-- Totals of all World Office exports
+CREATE OR REPLACE FUNCTION public.get_billing_totals()
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT jsonb_build_object(
+        'total_exports', count(*),
+        'total_orders', COALESCE(sum(eh.total_orders), 0),
+        'total_amount', COALESCE(sum(eh.total_amount), 0),
+        'latest_invoice_number', COALESCE(max(eh.invoice_number_end), 0)
+    )
+    FROM public.export_history eh;
+$$;
+
+-- Remision count and amount, and how many of their orders were invoiced
+CREATE OR REPLACE FUNCTION public.get_remision_totals()
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT jsonb_build_object(
+        'total_remisions', count(*),
+        'total_amount', COALESCE(sum(r.total_amount), 0),
+        'invoiced_orders', count(DISTINCT o.id) FILTER (WHERE o.is_invoiced_from_remision)
+    )
+    FROM public.remisions r
+    LEFT JOIN public.orders o ON o.id = r.order_id;
+$$;
+
+-- Delivery date lookups of the open-order counts and the daily report
+CREATE INDEX IF NOT EXISTS idx_orders_expected_delivery_date_status
+    ON public.orders (expected_delivery_date, status);
+
+-- Grant access
+GRANT EXECUTE ON FUNCTION public.get_order_status_counts(date, date, date, text[]) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.get_order_status_counts(date, date, date, text[]) TO service_role;
+GRANT EXECUTE ON FUNCTION public.get_order_delivery_totals(uuid[]) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.get_order_delivery_totals(uuid[]) TO service_role;
+GRANT EXECUTE ON FUNCTION public.get_delivery_summary(date) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.get_delivery_summary(date) TO service_role;
+GRANT EXECUTE ON FUNCTION public.get_monthly_billing_totals(int) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.get_monthly_billing_totals(int) TO service_role;
+GRANT EXECUTE ON FUNCTION public.get_billing_totals() TO authenticated;
+GRANT EXECUTE ON FUNCTION public.get_billing_totals() TO service_role;
+GRANT EXECUTE ON FUNCTION public.get_remision_totals() TO authenticated;
+GRANT EXECUTE ON FUNCTION public.get_remision_totals() TO service_role;
+
+COMMENT ON FUNCTION public.get_order_status_counts IS 'Open-order counts for today, tomorrow, the next 7 days and per status (dashboard badges).';
+COMMENT ON FUNCTION public.get_order_delivery_totals IS 'Sum of requested and delivered units per order, for delivery percentages of order lists.';
+COMMENT ON FUNCTION public.get_delivery_summary IS 'Orders delivered and units delivered vs requested for one expected delivery date.';
+COMMENT ON FUNCTION public.get_monthly_billing_totals IS 'World Office exports, invoiced orders and amount per month of a year.';
+COMMENT ON FUNCTION public.get_billing_totals IS 'Totals over all World Office exports and the latest invoice number.';
+COMMENT ON FUNCTION public.get_remision_totals IS 'Remision count and amount, and how many remisioned orders were invoiced.';
@@ -0,0 +1,17 @@
+-- Indexes for keyset (cursor) pagination of history lists
+-- The API pages orders, remisions and export history by (created_at, id) and
+-- completed routes by (route_date, id), newest first, continuing after the
+-- last row of the previous page. These composite indexes make every page an
+-- index range scan regardless of depth (offset pages had to walk all skipped rows).
+
+CREATE INDEX IF NOT EXISTS idx_orders_created_at_id
+    ON public.orders (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_remisions_created_at_id
+    ON public.remisions (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_export_history_created_at_id
+    ON public.export_history (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_routes_status_route_date_id
+    ON public.routes (status, route_date DESC, id DESC);
@@ -0,0 +1,23 @@
+-- Billing Excel exports in object storage
+-- World Office workbooks used to be base64-encoded into export_history.file_data
+-- (bytea), which bloated the table and every query touching its rows. New
+-- exports are uploaded to the private billing-exports bucket and referenced
+-- by file_path; file_data is only kept for rows not migrated yet
+-- (python -m app.jobs.migrate_export_files moves them in batches).
+
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('billing-exports', 'billing-exports', false)
+ON CONFLICT (id) DO NOTHING;
+
+ALTER TABLE public.export_history
+    ADD COLUMN IF NOT EXISTS file_path text;
+
+COMMENT ON COLUMN public.export_history.file_path IS
+    'Object path of the Excel file in the billing-exports storage bucket';
+COMMENT ON COLUMN public.export_history.file_data IS
+    'Legacy inline Excel file (base64 in bytea); NULL once moved to storage (file_path)';
+
+-- Rows still waiting for the storage migration, walked by id
+CREATE INDEX IF NOT EXISTS idx_export_history_pending_file_migration
+    ON public.export_history (id)
+    WHERE file_path IS NULL AND file_data IS NOT NULL;
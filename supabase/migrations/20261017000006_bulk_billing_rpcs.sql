@@ -0,0 +1,138 @@
+-- Bulk billing: number range reservation and one-call inventory deduction
+-- process_billing used to read and upsert system_config for every remision
+-- number and, per order, check inventory_deducted, read the dispatch config,
+-- call perform_batch_dispatch_movements and update the flag (~5 round-trips
+-- per order, ~1,000 for a 200-order run). These functions let a billing run
+-- reserve each number range once and deduct inventory for all of its orders
+-- in a single call.
+
+-- Atomically advance a numeric system_config counter by p_count and return the
+-- first number of the reserved range (last + 1). Concurrent runs get disjoint
+-- ranges; a missing or non-numeric counter starts from 0.
+CREATE OR REPLACE FUNCTION public.reserve_number_range(
+    p_config_key text,
+    p_count integer
+)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_last integer;
+BEGIN
+    IF p_count IS NULL OR p_count < 1 THEN
+        RAISE EXCEPTION 'p_count must be at least 1 (got %)', p_count;
+    END IF;
+
+    INSERT INTO public.system_config (config_key, config_value, updated_at)
+    VALUES (p_config_key, p_count::text, now())
+    ON CONFLICT (config_key) DO UPDATE
+        SET config_value = (
+                CASE WHEN trim(public.system_config.config_value) ~ '^[0-9]+$'
+                     THEN trim(public.system_config.config_value)::integer
+                     ELSE 0
+                END + p_count
+            )::text,
+            updated_at = now()
+    RETURNING config_value::integer INTO v_last;
+
+    RETURN v_last - p_count + 1;
+END;
+$$;
+
+-- Deduct dispatch inventory for many orders in one call.
+-- p_orders: [{"order_id", "order_number", "items": [{"product_id", "quantity"}], "notes"}]
+-- Orders already flagged inventory_deducted (or without items) are skipped;
+-- the rest go through perform_batch_dispatch_movements, and every order that
+-- succeeded is flagged with a single UPDATE. Orders are locked while being
+-- processed so concurrent runs cannot deduct the same order twice.
+-- Returns {"success", "errors", "orders": {order_id: {"success", "skipped", "errors"}}}.
+CREATE OR REPLACE FUNCTION inventario.perform_bulk_dispatch_movements(
+    p_orders jsonb,
+    p_recorded_by uuid DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_location_id uuid;
+    v_order jsonb;
+    v_order_id uuid;
+    v_result json;
+    v_results jsonb := '{}'::jsonb;
+    v_deducted uuid[] := ARRAY[]::uuid[];
+    v_already uuid[];
+BEGIN
+    SELECT default_dispatch_location_id INTO v_location_id
+    FROM public.dispatch_inventory_config
+    WHERE id = '00000000-0000-0000-0000-000000000000';
+
+    IF v_location_id IS NULL THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'errors', jsonb_build_array('No default dispatch location configured'),
+            'orders', '{}'::jsonb
+        );
+    END IF;
+
+    PERFORM 1
+    FROM public.orders o
+    WHERE o.id IN (SELECT (e->>'order_id')::uuid FROM jsonb_array_elements(p_orders) e)
+    FOR UPDATE;
+
+    SELECT coalesce(array_agg(o.id), ARRAY[]::uuid[]) INTO v_already
+    FROM public.orders o
+    WHERE o.id IN (SELECT (e->>'order_id')::uuid FROM jsonb_array_elements(p_orders) e)
+      AND o.inventory_deducted;
+
+    FOR v_order IN SELECT * FROM jsonb_array_elements(p_orders)
+    LOOP
+        v_order_id := (v_order->>'order_id')::uuid;
+
+        IF v_order_id = ANY(v_already)
+           OR jsonb_array_length(coalesce(v_order->'items', '[]'::jsonb)) = 0 THEN
+            v_results := v_results || jsonb_build_object(v_order_id::text, jsonb_build_object(
+                'success', true, 'skipped', true, 'errors', '[]'::jsonb));
+            CONTINUE;
+        END IF;
+
+        v_result := inventario.perform_batch_dispatch_movements(
+            v_order_id,
+            v_order->>'order_number',
+            v_order->'items',
+            v_location_id,
+            v_order->>'notes',
+            p_recorded_by
+        );
+
+        IF coalesce((v_result->>'success')::boolean, false) THEN
+            v_deducted := v_deducted || v_order_id;
+        END IF;
+
+        v_results := v_results || jsonb_build_object(v_order_id::text, jsonb_build_object(
+            'success', coalesce((v_result->>'success')::boolean, false),
+            'skipped', false,
+            'errors', coalesce(
+                v_result->'errors',
+                CASE WHEN v_result->>'error' IS NOT NULL
+                     THEN json_build_array(v_result->>'error') ELSE '[]'::json END
+            )
+        ));
+    END LOOP;
+
+    UPDATE public.orders
+    SET inventory_deducted = true
+    WHERE id = ANY(v_deducted);
+
+    RETURN jsonb_build_object('success', true, 'errors', '[]'::jsonb, 'orders', v_results);
+END;
+$$;
+
+-- Grant access
+GRANT EXECUTE ON FUNCTION public.reserve_number_range(text, integer) TO service_role;
+GRANT EXECUTE ON FUNCTION inventario.perform_bulk_dispatch_movements(jsonb, uuid) TO authenticated;
+GRANT EXECUTE ON FUNCTION inventario.perform_bulk_dispatch_movements(jsonb, uuid) TO service_role;
+
+COMMENT ON FUNCTION public.reserve_number_range IS 'Advance a numeric system_config counter (invoice_last_number, remision_number_current) by p_count and return the first reserved number.';
+COMMENT ON FUNCTION inventario.perform_bulk_dispatch_movements IS 'Dispatch inventory movements for many orders in one call, skipping orders already deducted and flagging the rest with one UPDATE.';
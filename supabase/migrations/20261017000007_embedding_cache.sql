@@ -0,0 +1,27 @@
+-- Persistent cache of OpenAI text embeddings
+-- Order matching embedded every client alias and branch on each call (a
+-- 30-line purchase order for a client with 40 aliases cost over a thousand
+-- embedding requests). The API now looks embeddings up by content hash,
+-- sha256(model || E'\n' || normalized text), in memory and then here, and only
+-- asks OpenAI for texts it has never seen (app/services/embeddings.py).
+
+CREATE TABLE IF NOT EXISTS public.embedding_cache (
+    content_hash text PRIMARY KEY,
+    model text NOT NULL,
+    content text NOT NULL,
+    embedding extensions.vector(1536) NOT NULL,
+    created_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+-- Only the API (service role) reads and writes the cache
+ALTER TABLE public.embedding_cache ENABLE ROW LEVEL SECURITY;
+GRANT SELECT, INSERT, UPDATE, DELETE ON public.embedding_cache TO service_role;
+
+-- Dropping the entries of a retired model
+CREATE INDEX IF NOT EXISTS idx_embedding_cache_model
+    ON public.embedding_cache (model);
+
+COMMENT ON TABLE public.embedding_cache IS
+    'Text embeddings keyed by sha256(model + newline + normalized text); filled by the API on cache misses';
+COMMENT ON COLUMN public.embedding_cache.content IS
+    'Normalized text that was embedded (NFC, trimmed, whitespace collapsed)';
@@ -0,0 +1,30 @@
+-- Cascade batches: reserve production order numbers once per batch
+-- create-batch called get_next_production_order_number once per cascade and
+-- once per PP cascade (one round-trip each). This function hands out p_count
+-- numbers from the same sequence in a single call, so a batch reserves all
+-- of its order numbers up front. Concurrent callers get disjoint numbers; a
+-- range may have gaps when other cascades are created at the same time.
+CREATE OR REPLACE FUNCTION produccion.reserve_production_order_numbers(
+    p_count integer
+)
+RETURNS integer[]
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF p_count IS NULL OR p_count < 1 THEN
+        RAISE EXCEPTION 'p_count must be at least 1 (got %)', p_count;
+    END IF;
+
+    RETURN ARRAY(
+        SELECT nextval('produccion.production_order_number_seq')::integer AS number
+        FROM generate_series(1, p_count)
+        ORDER BY number
+    );
+END;
+$$;
+
+-- Grant access
+GRANT EXECUTE ON FUNCTION produccion.reserve_production_order_numbers(integer) TO authenticated;
+GRANT EXECUTE ON FUNCTION produccion.reserve_production_order_numbers(integer) TO service_role;
+
+COMMENT ON FUNCTION produccion.reserve_production_order_numbers IS 'Return p_count production order numbers from production_order_number_seq in one call (ascending, not necessarily contiguous).';